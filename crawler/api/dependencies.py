@@ -2,9 +2,10 @@
 """
 定義 FastAPI 應用中使用的依賴項。
 """
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from sqlmodel import Session
-from crawler.database.connection import get_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from crawler.database.connection import get_async_read_engine, get_engine, get_read_engine
 
 def get_db_session() -> Generator[Session, None, None]:
     """
@@ -12,7 +13,31 @@ def get_db_session() -> Generator[Session, None, None]:
 
     使用 `yield` 確保 session 在請求處理完畢後總能被關閉，
     即使在處理過程中發生了錯誤。
+    API 只做查詢，設定唯讀副本時 session 連到可用的副本，不與爬蟲的大量寫入競爭主庫。
     """
-    engine = get_engine()
+    engine = get_read_engine()
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def get_primary_db_session() -> Generator[Session, None, None]:
+    """
+    FastAPI 依賴項：提供一個連到主庫的 Session。
+
+    給需要與主庫上的其他讀取保持一致的路由使用 (例如 /jobs/changes 從主庫讀取變更紀錄，
+    附上的職缺內容也必須來自主庫，否則延遲的副本可能回傳舊內容或把剛新增的職缺當成已刪除)。
+    """
+    with Session(get_engine()) as session:
+        yield session
+
+
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI 依賴項：為 async 路由提供一個非同步資料庫 Session。
+
+    與 `get_db_session` 相同，請求結束後 session 一定會被關閉，
+    但等待資料庫期間不會佔用 FastAPI 的 threadpool。
+    """
+    engine = await get_async_read_engine()
+    async with AsyncSession(engine) as session:
+        yield session
@@ -0,0 +1,122 @@
+# crawler/api/export.py
+"""
+大量匯出用的串流序列化工具。
+
+每個函數都接收「一批一批」的資料列 (來自 repository.stream_rows)，
+並逐批產出位元組，讓 StreamingResponse 可以邊查詢邊傳送，
+API 容器的記憶體用量與匯出總筆數無關。
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from sqlalchemy import Table
+from sqlalchemy.sql import ColumnElement
+
+from crawler.utilis.arrow_utils import (
+    arrow_schema_for_table,
+    import_pyarrow,
+    record_batch_from_rows,
+)
+
+RowChunks = Iterable[List[Dict[str, Any]]]
+
+
+class ExportFormat(str, Enum):
+    """`/jobs/export` 支援的輸出格式。"""
+
+    ndjson = "ndjson"
+    csv = "csv"
+    parquet = "parquet"
+
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iter_ndjson(chunks: RowChunks) -> Iterator[bytes]:
+    """將資料列批次序列化為 NDJSON (每行一筆 JSON)。"""
+    for rows in chunks:
+        lines = [json.dumps(row, ensure_ascii=False, default=_json_default) for row in rows]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_csv(chunks: RowChunks, columns: List[str]) -> Iterator[bytes]:
+    """將資料列批次序列化為 CSV，第一批之前輸出標題列。"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """只累積寫入位元組的檔案物件，讓 ParquetWriter 的輸出可以被逐批取走。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_parquet(
+    chunks: RowChunks, columns: Union[Table, Iterable[ColumnElement]], dictionary_columns: Iterable[str] = ()
+) -> Iterator[bytes]:
+    """
+    將資料列批次寫成 Parquet 串流，每批資料成為一個 row group。
+
+    Args:
+        chunks (RowChunks): 資料列批次。
+        columns (Union[Table, Iterable[ColumnElement]]): 來源資料表或查詢的欄位 (例如 JOIN 查詢的
+            selected_columns)，用於推導具型別的 Arrow Schema。
+        dictionary_columns (Iterable[str]): 以 dictionary 編碼的低基數欄位。
+    """
+    _, pq = import_pyarrow()
+    schema = arrow_schema_for_table(columns, dictionary_columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in chunks:
+            if rows:
+                writer.write_batch(record_batch_from_rows(rows, schema))
+                yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
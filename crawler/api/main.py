@@ -3,13 +3,36 @@
 FastAPI 應用程式的主進入點。
 定義所有 API 路由 (endpoints)。
 """
-from fastapi import FastAPI, Depends, Query
-from sqlmodel import Session, select
-from typing import List
-from datetime import date
+import heapq
+import time
 
-from crawler.api.dependencies import get_db_session
-from crawler.database.schema import Job  # 直接複用我們已有的 Job 模型
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlmodel import Session, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Iterable, List, Optional, Tuple
+from datetime import date, datetime
+from enum import Enum
+
+from crawler import config
+from crawler.api.dependencies import get_db_session, get_async_db_session, get_primary_db_session
+from crawler.api.export import ExportFormat, MEDIA_TYPES, iter_csv, iter_ndjson, iter_parquet
+from crawler.database.repository import get_job_changes, stream_rows
+from crawler.metrics import API_REQUEST_DURATION, render_latest
+from crawler.database.schema import (  # 直接複用我們已有的 Job 模型
+    COMPANY_ATTRIBUTES,
+    Company,
+    CrawlProgress,
+    CrawlProgressRead,
+    Job,
+    JobChangePage,
+    JobChangeRead,
+    JobRead,
+    JobStat,
+    LOW_CARDINALITY_COLUMNS,
+)
+from crawler.utilis.geo import bounding_box, covering_geohashes, haversine_km
+from crawler.utilis.progress import PROGRESS_FINALIZING, PROGRESS_RUNNING
 
 
 # 建立 FastAPI 應用實例
@@ -20,6 +43,84 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """記錄每個 API 請求的處理時間；以路由樣板作為標籤，避免路徑參數造成標籤數量爆增。"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        API_REQUEST_DURATION.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
+
+
+
+def _apply_job_filters(
+    statement,
+    company_name: Optional[str],
+    title: Optional[str],
+    canonical_only: bool = False,
+    company_id: Optional[str] = None,
+    updated_since: Optional[date] = None,
+):
+    """將共用的職缺篩選條件加到查詢語句上 (語句需已 LEFT JOIN tb_companies，見 _select_jobs_with_company)。"""
+    if canonical_only:
+        # 尚未計算過重複的舊資料 (canonical_job_id 為 NULL) 也視為代表職缺
+        statement = statement.where(
+            or_(Job.canonical_job_id == Job.job_id, Job.canonical_job_id.is_(None))
+        )
+
+    if company_id:
+        statement = statement.where(Job.company_id == company_id)
+
+    if company_name:
+        statement = statement.where(Company.company_name.contains(company_name))
+
+    if title:
+        statement = statement.where(Job.title.contains(title))
+
+    if updated_since:
+        # tb_jobs 按 update_date 分區時，只會掃描此日期之後的分區
+        statement = statement.where(Job.update_date >= updated_since)
+
+    return statement
+
+
+def _select_jobs_with_company():
+    """查詢職缺與其公司資料 (tb_jobs LEFT JOIN tb_companies)，每列為 (Job, company_name, industry, employees)。"""
+    return select(Job, *(getattr(Company, name) for name in COMPANY_ATTRIBUTES)).outerjoin(
+        Company, Company.company_id == Job.company_id
+    )
+
+
+def _to_job_reads(rows: Iterable[Tuple]) -> List[JobRead]:
+    """把 _select_jobs_with_company 的查詢結果轉為 API 回應模型。"""
+    return [
+        JobRead(**job.model_dump(), **dict(zip(COMPANY_ATTRIBUTES, company)))
+        for job, *company in rows
+    ]
+
+
+def _build_jobs_statement(
+    company_name: Optional[str],
+    title: Optional[str],
+    limit: int,
+    canonical_only: bool = False,
+    company_id: Optional[str] = None,
+    updated_since: Optional[date] = None,
+):
+    """依查詢條件組出職缺查詢語句，供同步與非同步路由共用。"""
+    # 使用 SQLModel 建立查詢語句，更安全、更優雅
+    statement = _apply_job_filters(
+        _select_jobs_with_company(), company_name, title, canonical_only, company_id, updated_since
+    )
+    return statement.limit(limit)
+
 
 # --- API 路由定義 ---
 
@@ -29,33 +130,248 @@ def read_root():
     return {"message": "Welcome to the Crawler Job Data API!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """以 Prometheus 文字格式輸出 API 的指標。"""
+    content, content_type = render_latest()
+    return Response(content=content, media_type=content_type)
+
+
 # 定義取得台灣股價的 API 路由
-@app.get("/jobs/", response_model=List[Job], tags=["Jobs"])
+@app.get("/jobs/", response_model=List[JobRead], tags=["Jobs"])
 def get_jobs(
     *,
     session: Session = Depends(get_db_session),
     company_name: str = Query(None, description="依公司名稱進行模糊查詢 (例如: '新加坡商')"),
+    company_id: str = Query(None, description="依公司代碼精確查詢 (走 tb_jobs.company_id 索引)"),
     title: str = Query(None, description="依職稱進行模糊查詢 (例如: 'Python')"),
-    limit: int = Query(10, description="回傳的資料筆數上限", ge=1, le=100)
-) -> List[Job]:
+    limit: int = Query(10, description="回傳的資料筆數上限", ge=1, le=100),
+    updated_since: Optional[date] = Query(None, description="只回傳 update_date 在此日期 (含) 之後的職缺"),
+    canonical_only: bool = Query(False, description="只回傳近似重複群組中的代表職缺"),
+) -> List[JobRead]:
     """
     查詢職缺資料。
 
-    可以根據多種條件進行篩選和查詢。
+    可以根據多種條件進行篩選和查詢。公司名稱、產業與員工人數來自 tb_companies。
     """
-    # 使用 SQLModel 建立查詢語句，更安全、更優雅
-    statement = select(Job)
+    statement = _build_jobs_statement(company_name, title, limit, canonical_only, company_id, updated_since)
+    return _to_job_reads(session.exec(statement).all())
 
-    if company_name:
-        statement = statement.where(Job.company_name.contains(company_name))
-    
-    if title:
-        statement = statement.where(Job.title.contains(title))
-    
-    statement = statement.limit(limit)
-    
-    jobs = session.exec(statement).all()
-    return jobs
+
+@app.get("/async/jobs/", response_model=List[JobRead], tags=["Jobs"])
+async def get_jobs_async(
+    *,
+    session: AsyncSession = Depends(get_async_db_session),
+    company_name: str = Query(None, description="依公司名稱進行模糊查詢 (例如: '新加坡商')"),
+    company_id: str = Query(None, description="依公司代碼精確查詢 (走 tb_jobs.company_id 索引)"),
+    title: str = Query(None, description="依職稱進行模糊查詢 (例如: 'Python')"),
+    limit: int = Query(10, description="回傳的資料筆數上限", ge=1, le=100),
+    updated_since: Optional[date] = Query(None, description="只回傳 update_date 在此日期 (含) 之後的職缺"),
+    canonical_only: bool = Query(False, description="只回傳近似重複群組中的代表職缺"),
+) -> List[JobRead]:
+    """
+    查詢職缺資料 (非同步版本)。
+
+    查詢條件與 `/jobs/` 完全相同，但使用非同步 MySQL 驅動，
+    高併發下不受 FastAPI threadpool 大小的限制。
+    """
+    statement = _build_jobs_statement(company_name, title, limit, canonical_only, company_id, updated_since)
+    result = await session.exec(statement)
+    return _to_job_reads(result.all())
+
+
+@app.get("/jobs/near", response_model=List[JobRead], tags=["Jobs"])
+def get_jobs_near(
+    *,
+    session: Session = Depends(get_db_session),
+    lat: float = Query(..., description="中心點緯度", ge=-90, le=90),
+    lon: float = Query(..., description="中心點經度", ge=-180, le=180),
+    radius_km: float = Query(5, description="搜尋半徑 (公里)", gt=0, le=100),
+    limit: int = Query(10, description="回傳的資料筆數上限", ge=1, le=100),
+) -> List[JobRead]:
+    """
+    查詢指定半徑內的職缺，依距離由近到遠排序。
+
+    先以 Geohash 前綴與經緯度矩形在索引上取出候選職缺 (只讀座標欄位)，
+    再以球面距離精確過濾，最後只載入最近的 `limit` 筆完整資料。
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    candidates = select(Job.job_id, Job.latitude, Job.longitude).where(
+        Job.latitude.between(min_lat, max_lat),
+        Job.longitude.between(min_lon, max_lon),
+    )
+    prefixes = covering_geohashes(lat, lon, radius_km)
+    if prefixes:
+        candidates = candidates.where(or_(*(Job.geohash.like(f"{prefix}%") for prefix in prefixes)))
+
+    in_radius = (
+        (haversine_km(lat, lon, row.latitude, row.longitude), row.job_id)
+        for row in session.exec(candidates)
+    )
+    nearest = heapq.nsmallest(limit, (item for item in in_radius if item[0] <= radius_km))
+    if not nearest:
+        return []
+
+    statement = _select_jobs_with_company().where(Job.job_id.in_([job_id for _, job_id in nearest]))
+    jobs = {job.job_id: job for job in _to_job_reads(session.exec(statement).all())}
+    return [jobs[job_id] for _, job_id in nearest if job_id in jobs]
+
+
+@app.get("/jobs/export", tags=["Jobs"])
+def export_jobs(
+    *,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="輸出格式: ndjson / csv / parquet"),
+    company_name: str = Query(None, description="依公司名稱進行模糊查詢"),
+    company_id: str = Query(None, description="依公司代碼精確查詢"),
+    title: str = Query(None, description="依職稱進行模糊查詢"),
+    updated_since: Optional[date] = Query(None, description="只匯出 update_date 在此日期 (含) 之後的職缺"),
+    canonical_only: bool = Query(False, description="只匯出近似重複群組中的代表職缺"),
+) -> StreamingResponse:
+    """
+    以串流方式匯出符合條件的所有職缺。
+
+    資料直接從伺服器端游標逐批讀出並序列化，不受 `/jobs/` 的筆數上限限制，
+    API 容器的記憶體用量也與結果集大小無關。
+    Parquet 格式中每一批資料會成為一個 row group。每筆職缺附上 tb_companies 的公司欄位。
+    """
+    job_table = Job.__table__
+    company_table = Company.__table__
+    statement = select(job_table, *(company_table.c[name] for name in COMPANY_ATTRIBUTES)).select_from(
+        job_table.outerjoin(company_table, job_table.c.company_id == company_table.c.company_id)
+    )
+    statement = _apply_job_filters(statement, company_name, title, canonical_only, company_id, updated_since)
+    columns = list(statement.selected_columns)
+    chunks = stream_rows(statement, chunk_size=config.EXPORT_CHUNK_SIZE, read_only=True)
+
+    if format is ExportFormat.csv:
+        body = iter_csv(chunks, [column.name for column in columns])
+    elif format is ExportFormat.parquet:
+        body = iter_parquet(
+            chunks, columns, LOW_CARDINALITY_COLUMNS["tb_jobs"] + LOW_CARDINALITY_COLUMNS["tb_companies"]
+        )
+    else:
+        body = iter_ndjson(chunks)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="jobs.{format.value}"'},
+    )
+
+
+@app.get("/jobs/changes", response_model=JobChangePage, tags=["Jobs"])
+def get_job_changes_feed(
+    *,
+    session: Session = Depends(get_primary_db_session),
+    since: int = Query(0, description="上一次回應的 next_cursor；0 代表從保留範圍的開頭讀起", ge=0),
+    limit: int = Query(500, description="回傳的變更筆數上限", ge=1, le=5000),
+    include_jobs: bool = Query(False, description="附上每個職缺目前的內容"),
+) -> JobChangePage:
+    """
+    依 change_id 順序增量讀取新增、更新與刪除的職缺。
+
+    下游保存回應中的 next_cursor，下次以 `since=<next_cursor>` 讀取之後的變更；
+    回傳的變更數少於 limit 代表已經追上。同一個職缺可能出現多次，以 version 最大者為準。
+    變更紀錄與 include_jobs 附上的職缺內容都讀取主庫，兩者來自同一個資料庫。
+    游標早於保留範圍 (config.JOB_CHANGES_RETENTION_DAYS) 時回傳 410，下游需要改用 `/jobs/export` 重新完整同步。
+    """
+    changes, oldest = get_job_changes(since, limit)
+    if since and oldest is not None and oldest - 1 > since:
+        raise HTTPException(
+            status_code=410,
+            detail=f"cursor {since} 早於保留中的最小變更 {oldest}，請以 /jobs/export 重新完整同步。",
+        )
+
+    jobs = {}
+    if include_jobs and changes:
+        statement = _select_jobs_with_company().where(Job.job_id.in_({change["job_id"] for change in changes}))
+        jobs = {job.job_id: job for job in _to_job_reads(session.exec(statement).all())}
+    return JobChangePage(
+        changes=[JobChangeRead(**change, job=jobs.get(change["job_id"])) for change in changes],
+        next_cursor=changes[-1]["change_id"] if changes else since,
+    )
+
+
+class StatDimension(str, Enum):
+    """預先彙總統計支援的維度。"""
+
+    job_category = "job_category"
+    location = "location"
+    industry = "industry"
+    posted_date = "posted_date"
+
+
+class StatSort(str, Enum):
+    """統計結果的排序欄位 (一律遞減)。"""
+
+    job_count = "job_count"
+    salary_p50 = "salary_p50"
+    remote_ratio = "remote_ratio"
+    dimension_value = "dimension_value"
+
+
+@app.get("/stats/{dimension}", response_model=List[JobStat], tags=["Stats"])
+def get_job_stats(
+    *,
+    session: Session = Depends(get_db_session),
+    dimension: StatDimension,
+    value: str = Query(None, description="只回傳指定的維度值 (例如: '台北市信義區')"),
+    sort: StatSort = Query(StatSort.job_count, description="排序欄位，一律由大到小"),
+    limit: int = Query(50, description="回傳的資料筆數上限", ge=1, le=1000),
+) -> List[JobStat]:
+    """
+    查詢依維度預先彙總的職缺統計：職缺數、月薪分佈 (平均 / 四分位數) 與遠端工作比例。
+
+    資料來自 tb_job_stats，在每次職缺詳細資料任務結束後增量更新，
+    查詢時不需要對 tb_jobs 做 GROUP BY。
+    """
+    statement = select(JobStat).where(JobStat.dimension == dimension.value)
+    if value:
+        statement = statement.where(JobStat.dimension_value == value)
+    statement = statement.order_by(getattr(JobStat, sort.value).desc()).limit(limit)
+    return session.exec(statement).all()
+
+
+def _to_progress_read(progress: CrawlProgress, now: datetime) -> CrawlProgressRead:
+    """
+    附上是否停滯：任務仍在執行，但超過 config.CRAWL_PROGRESS_STALL_SECONDS 沒有更新進度；
+    收尾階段的步驟較久才發布一次心跳，改用 config.CRAWL_PROGRESS_FINALIZE_STALL_SECONDS。
+    """
+    stall_seconds = {
+        PROGRESS_RUNNING: config.CRAWL_PROGRESS_STALL_SECONDS,
+        PROGRESS_FINALIZING: config.CRAWL_PROGRESS_FINALIZE_STALL_SECONDS,
+    }.get(progress.state)
+    stalled = stall_seconds is not None and (now - progress.updated_at).total_seconds() > stall_seconds
+    return CrawlProgressRead(**progress.model_dump(), stalled=stalled)
+
+
+@app.get("/crawls/", response_model=List[CrawlProgressRead], tags=["Crawls"])
+def list_crawls(
+    *,
+    session: Session = Depends(get_db_session),
+    state: str = Query(None, description="只回傳指定狀態的任務 (RUNNING / FINALIZING / SUCCESS / FAILURE)"),
+    limit: int = Query(20, description="回傳的任務數上限", ge=1, le=200),
+) -> List[CrawlProgressRead]:
+    """列出最近更新過進度的爬取任務，最新的在前。"""
+    statement = select(CrawlProgress)
+    if state:
+        statement = statement.where(CrawlProgress.state == state.upper())
+    statement = statement.order_by(CrawlProgress.updated_at.desc()).limit(limit)
+    now = datetime.now()
+    return [_to_progress_read(progress, now) for progress in session.exec(statement).all()]
+
+
+@app.get("/crawls/{task_id}", response_model=CrawlProgressRead, tags=["Crawls"])
+def get_crawl_progress(*, session: Session = Depends(get_db_session), task_id: str) -> CrawlProgressRead:
+    """
+    查詢單一爬取任務的即時進度：已完成、成功、失敗與進行中的數量，最近一分鐘的 QPS 與預估剩餘時間。
+
+    進度每 config.CRAWL_PROGRESS_INTERVAL_SECONDS 秒更新一次；stalled 為 True 代表任務可能卡住。
+    """
+    progress = session.get(CrawlProgress, task_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"找不到任務 {task_id} 的進度。")
+    return _to_progress_read(progress, datetime.now())
 
 
 # @app.get("/jobs")
@@ -7,12 +7,139 @@ Celery Application Definition.
 以確保一致性並避免循環導入問題。
 """
 
-from celery import Celery
+import logging
+import os
+from fnmatch import fnmatch
+
+from celery import Celery, Task
+from kombu import Exchange, Queue
 from . import config
+from .project_104 import config_104
+from .utilis.profiling import PROFILE_MODES, profile_block
+
+logger = logging.getLogger(__name__)
+
+# 呼叫任務時可額外傳入此參數開啟單次剖析，例如 task.apply_async(kwargs={"_profile": True})；
+# 值為 True 時使用 config.TASK_PROFILING_MODE，也可直接指定 "sample" 或 "cprofile"
+PROFILE_KWARG = "_profile"
+_PROFILED_TASK_PREFIX = "crawler.project_104"
+
+
+def _profiling_mode(task_name: str, requested):
+    """依任務參數與 config.TASK_PROFILING 決定剖析模式，不需剖析時回傳 None。"""
+    mode = _requested_profiling_mode(task_name, requested)
+    if mode is not None and mode not in PROFILE_MODES:
+        # 設定錯誤不應讓任務失敗，只略過剖析
+        logger.warning(f"不支援的剖析模式 {mode!r} (可用: {PROFILE_MODES})，任務 {task_name} 將不進行剖析。")
+        return None
+    return mode
+
+
+def _requested_profiling_mode(task_name: str, requested):
+    if requested is not None:
+        if requested is True:
+            return config.TASK_PROFILING_MODE
+        return requested or None
+    if not task_name.startswith(_PROFILED_TASK_PREFIX):
+        return None
+    setting = config.TASK_PROFILING.strip()
+    if not setting:
+        return None
+    if setting.lower() in ("1", "true", "all"):
+        return config.TASK_PROFILING_MODE
+    patterns = [p.strip() for p in setting.split(",") if p.strip()]
+    return config.TASK_PROFILING_MODE if any(fnmatch(task_name, p) for p in patterns) else None
+
+
+class ProfiledTask(Task):
+    """
+    所有任務共用的基底類別，在需要時以 `crawler.utilis.profiling.profile_block` 包住任務執行。
+
+    剖析檔寫入 {DATA_DIR}/profiles，任務結束時 (無論成功或失敗) 在日誌中輸出前 N 名熱點函數。
+    未開啟剖析時只多幾次字串比對，不影響一般執行。
+    """
+
+    def __call__(self, *args, **kwargs):
+        mode = _profiling_mode(self.name, kwargs.pop(PROFILE_KWARG, None))
+        if mode is None:
+            return super().__call__(*args, **kwargs)
+
+        task_id = self.request.id or "local"
+        reports = []
+        try:
+            with profile_block(
+                f"{self.name.rsplit('.', 1)[-1]}_{task_id}",
+                os.path.join(config.DATA_DIR, "profiles"),
+                mode=mode,
+                interval=config.TASK_PROFILING_INTERVAL_MS / 1000,
+                top_n=config.TASK_PROFILING_TOP_N,
+            ) as reports:
+                return super().__call__(*args, **kwargs)
+        finally:
+            # profile_block 結束時才寫出檔案並填入 reports，成功或失敗都記錄
+            for report in reports:
+                logger.info(f"任務 {self.name} 剖析結果已寫入 {report.path} {report.extra or ''}\n{report.summary}")
+
+
+# --- 佇列拓撲 ---
+# 每個階段使用獨立的佇列，讓長時間的詳情任務不會卡住類別更新與 URL 探索，
+# 各佇列可由不同的 worker 服務消費並各自調整併發數 (見 docker-compose.yml)。
+QUEUE_DISCOVERY = "discovery_104"
+QUEUE_DETAILS = "details_104"
+QUEUE_CATEGORY = "category_104"
+QUEUE_MAINTENANCE = "maintenance_104"
+# RabbitMQ 優先權佇列的上限；數字越大越優先
+MAX_PRIORITY = 9
+
+# --- 任務名稱 ---
+# Producer 與派發子任務的任務以名稱建立 signature (app.signature(name).apply_async())，
+# 不需要導入任務模組及其依賴 (pandas、BeautifulSoup、資料庫連線)，短命的 Producer 容器可以快速啟動。
+TASK_PROCESS_CATEGORY = "crawler.project_104.task_category_104.process_category_data"
+TASK_SCHEDULE_RECRAWLS = "crawler.project_104.task_scheduler_104.schedule_recrawls"
+TASK_PLAN_URL_CRAWLS = "crawler.project_104.task_urls_104.plan_and_dispatch_url_crawls"
+TASK_FETCH_URLS = "crawler.project_104.task_urls_104.fetch_and_save_all_urls"
+TASK_FETCH_JOB_DETAILS = "crawler.project_104.task_job_details.fetch_and_save_all"
+TASK_REBUILD_JOB_STATS = "crawler.project_104.task_stats_104.rebuild_job_stats"
+TASK_REBUILD_DUPLICATE_INDEX = "crawler.project_104.task_dedup_104.rebuild_duplicate_index"
+TASK_EXPORT_PARQUET = "crawler.project_104.task_export_104.export_parquet_snapshots"
+TASK_ARCHIVE_EXPIRED_JOBS = "crawler.project_104.task_retention_104.archive_expired_jobs"
+
+# 任務名稱 -> (佇列, 優先權)。producer 不需指定 queue，由此表路由
+TASK_ROUTES = {
+    TASK_PROCESS_CATEGORY: (QUEUE_CATEGORY, 9),
+    # 規劃任務只派發子任務，應排在大量的單一類別任務之前
+    TASK_SCHEDULE_RECRAWLS: (QUEUE_DISCOVERY, 8),
+    TASK_PLAN_URL_CRAWLS: (QUEUE_DISCOVERY, 7),
+    TASK_FETCH_URLS: (QUEUE_DISCOVERY, 5),
+    TASK_FETCH_JOB_DETAILS: (QUEUE_DETAILS, 5),
+    TASK_REBUILD_JOB_STATS: (QUEUE_MAINTENANCE, 7),
+    TASK_REBUILD_DUPLICATE_INDEX: (QUEUE_MAINTENANCE, 5),
+    TASK_EXPORT_PARQUET: (QUEUE_MAINTENANCE, 3),
+    TASK_ARCHIVE_EXPIRED_JOBS: (QUEUE_MAINTENANCE, 3),
+}
+
+# 各佇列的任務是否在執行完成後才 ack。所有任務都以 upsert 寫入，可安全重跑，
+# 但詳情任務常執行數小時，超過 RabbitMQ 的 consumer_timeout (預設 30 分鐘) 會被強制斷線，因此維持提早 ack。
+QUEUE_ACKS_LATE = {
+    QUEUE_DISCOVERY: True,
+    QUEUE_DETAILS: False,
+    QUEUE_CATEGORY: True,
+    QUEUE_MAINTENANCE: True,
+}
+
+
+def _build_queues():
+    exchange = Exchange("crawler_104", type="direct")
+    return [
+        Queue(name, exchange, routing_key=name, queue_arguments={"x-max-priority": MAX_PRIORITY})
+        for name in QUEUE_ACKS_LATE
+    ]
+
 
 # 建立 Celery 應用程式實例
 app = Celery(
     "crawler_app",
+    task_cls=ProfiledTask,
     broker=(
         f"pyamqp://{config.RABBITMQ_DEFAULT_USER}:{config.RABBITMQ_DEFAULT_PASS}@"
         f"{config.RABBITMQ_HOST}:{config.RABBITMQ_PORT}/"
@@ -21,6 +148,11 @@ app = Celery(
         "crawler.project_104.task_urls_104",
         "crawler.project_104.task_job_details_104",
         "crawler.project_104.task_category_104",
+        "crawler.project_104.task_stats_104",
+        "crawler.project_104.task_export_104",
+        "crawler.project_104.task_dedup_104",
+        "crawler.project_104.task_scheduler_104",
+        "crawler.project_104.task_retention_104",
     ],
 )
 
@@ -31,9 +163,65 @@ app.conf.update(
     task_serializer="json",
     result_serializer="json",
     accept_content=["json"],
-    # 保持 task_default_queue 的設定
-    task_default_queue="worker_104",
+    task_queues=_build_queues(),
+    task_routes={name: {"queue": queue, "priority": priority} for name, (queue, priority) in TASK_ROUTES.items()},
+    task_annotations={name: {"acks_late": QUEUE_ACKS_LATE[queue]} for name, (queue, _) in TASK_ROUTES.items()},
+    # 未列在 TASK_ROUTES 的任務送到維護佇列
+    task_default_queue=QUEUE_MAINTENANCE,
+    task_default_exchange="crawler_104",
+    task_default_routing_key=QUEUE_MAINTENANCE,
+    task_default_priority=5,
+    task_queue_max_priority=MAX_PRIORITY,
+    # acks_late 的任務在 worker 程序意外終止時重新排入佇列，而不是直接視為完成
+    task_reject_on_worker_lost=True,
+    # 任務多為長時間執行，預取多筆會讓單一 worker 囤積任務並使優先權失效；
+    # 各 worker 服務可用 --prefetch-multiplier 覆寫
+    worker_prefetch_multiplier=config.CELERY_PREFETCH_MULTIPLIER,
     # 建議添加時區設定
     timezone="Asia/Taipei",
     enable_utc=True,
-)
\ No newline at end of file
+)
+
+# --- 週期任務 (由 `celery -A crawler.app beat` 觸發) ---
+beat_schedule = {}
+if config_104.RECRAWL_INTERVAL_MINUTES > 0:
+    beat_schedule["schedule-recrawls-104"] = {
+        "task": TASK_SCHEDULE_RECRAWLS,
+        "schedule": config_104.RECRAWL_INTERVAL_MINUTES * 60,
+        # 下一輪開始時仍未執行的排程已經過時，直接丟棄
+        "options": {"expires": config_104.RECRAWL_INTERVAL_MINUTES * 60},
+    }
+if config.JOBS_RETENTION_DAYS > 0 or config.JOB_CHANGES_RETENTION_DAYS > 0:
+    beat_schedule["archive-expired-jobs-104"] = {
+        "task": TASK_ARCHIVE_EXPIRED_JOBS,
+        "schedule": 24 * 60 * 60,
+        "options": {"expires": 24 * 60 * 60},
+    }
+if beat_schedule:
+    app.conf.beat_schedule = beat_schedule
+
+# --- 職缺變更事件 (config.JOB_CHANGE_EVENTS) ---
+# 下游服務把自己的佇列綁定到此 fanout exchange 即可收到通知；事件可能遺失，可重播的來源是 /jobs/changes
+JOB_CHANGES_EXCHANGE = Exchange("crawler_104.job_changes", type="fanout")
+
+
+def publish_job_changes(changes):
+    """
+    將一批職缺變更發布到 JOB_CHANGES_EXCHANGE。
+
+    Args:
+        changes (List[Dict[str, Any]]): repository.upsert_jobs / delete_jobs 記錄的變更。
+    """
+    payload = [
+        {**change, "changed_at": change["changed_at"].isoformat()}
+        for change in changes
+    ]
+    with app.producer_or_acquire() as producer:
+        producer.publish(
+            {"changes": payload},
+            exchange=JOB_CHANGES_EXCHANGE,
+            routing_key="",
+            serializer="json",
+            declare=[JOB_CHANGES_EXCHANGE],
+            retry=True,
+        )
@@ -0,0 +1,5 @@
+"""
+將 `crawler.benchmark` 目錄標記為一個 Python 包。
+
+此套件存放可獨立執行的效能基準測試腳本，不會被 Worker 或 API 導入。
+"""
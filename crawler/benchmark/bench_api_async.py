@@ -0,0 +1,121 @@
+# crawler/benchmark/bench_api_async.py
+"""
+同步 vs 非同步 API 路徑的負載基準測試。
+
+對正在運行的 API 服務 (預設 http://localhost:8000) 的 `/jobs/` 與 `/async/jobs/`
+以相同的查詢參數與併發數發出請求，比較吞吐量 (req/s) 與 p50 / p99 延遲。
+
+使用方式:
+    python -m crawler.benchmark.bench_api_async --concurrency 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import httpx
+
+
+@dataclass
+class BenchResult:
+    """單一路徑的基準測試結果。"""
+
+    path: str
+    total: int
+    errors: int
+    elapsed: float
+    latencies: List[float]
+
+    @property
+    def throughput(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """回傳指定百分位數的延遲 (毫秒)。"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+
+async def _run_path(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Dict[str, str],
+    concurrency: int,
+    total_requests: int,
+) -> BenchResult:
+    """以固定併發數對單一路徑發出 total_requests 個請求。"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total_requests
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return BenchResult(path, total_requests, errors, elapsed, latencies)
+
+
+async def run_benchmark(
+    base_url: str, paths: List[str], params: Dict[str, str], concurrency: int, total_requests: int
+) -> List[BenchResult]:
+    """依序對每個路徑執行基準測試 (先暖機，避免連線池建立時間影響結果)。"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results: List[BenchResult] = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for path in paths:
+            await _run_path(client, path, params, min(concurrency, 10), min(total_requests, 50))
+            results.append(await _run_path(client, path, params, concurrency, total_requests))
+    return results
+
+
+def _print_report(results: List[BenchResult], concurrency: int) -> None:
+    print(f"\nconcurrency={concurrency}")
+    print(f"{'path':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for r in results:
+        mean_ms = statistics.fmean(r.latencies) * 1000 if r.latencies else 0.0
+        print(
+            f"{r.path:<16}{r.total:>10}{r.errors:>8}{r.throughput:>10.1f}"
+            f"{r.percentile(50):>10.1f}{r.percentile(99):>10.1f}{mean_ms:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比較 /jobs/ 與 /async/jobs/ 的吞吐量與 p99 延遲。")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requests", type=int, default=2000, help="每個路徑、每個併發等級的請求數")
+    parser.add_argument("--title", default="", help="傳給 API 的 title 查詢參數")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    params = {"limit": str(args.limit)}
+    if args.title:
+        params["title"] = args.title
+
+    for concurrency in args.concurrency:
+        results = asyncio.run(
+            run_benchmark(args.base_url, ["/jobs/", "/async/jobs/"], params, concurrency, args.requests)
+        )
+        _print_report(results, concurrency)
+
+
+if __name__ == "__main__":
+    main()
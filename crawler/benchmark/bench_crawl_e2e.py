@@ -0,0 +1,255 @@
+# crawler/benchmark/bench_crawl_e2e.py
+"""
+離線端對端爬取基準測試。
+
+啟動本機的 104 假伺服器 (`fake_104_server`，獨立程序)，並讓爬蟲以 SQLite 取代 MySQL，
+依序執行與正式環境相同的三個階段：
+
+1. 類別同步：`process_category_data`
+2. URL 探索：對前 N 個葉類別執行 `KeywordScraper` (經由 `_run_scraping_session`) 並寫入 tb_urls
+3. 職缺詳情：`fetch_and_save_all_job_details`
+4. 詳情複查：再執行一次職缺詳情，列表摘要沒有變動的職缺應全部略過
+
+每個階段回報耗時、pages/sec 或 jobs/sec、至今的峰值 RSS，以及批次寫入資料庫的時間
+(取自 `crawler.metrics` 的 crawler_batch_flush_duration_seconds)。
+
+由於設定在模組載入時讀取環境變數，爬蟲相關模組都在環境變數設定完成後才匯入。
+
+使用方式:
+    python -m crawler.benchmark.bench_crawl_e2e --jobcats 3 --pages 5 --latency-ms 30
+    python -m crawler.benchmark.bench_crawl_e2e --error-rate 0.02 --rate-limit-qps 200 --json result.json
+    python -m crawler.benchmark.bench_crawl_e2e --parse-processes auto --latency-ms 5  # 比較解析管線
+    python -m crawler.benchmark.bench_crawl_e2e --profile sample --workdir /tmp/bench  # 剖析檔在 /tmp/bench/data/profiles
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+_CATEGORY_ATTEMPTS = 5
+
+
+@dataclass
+class PhaseResult:
+    """單一階段的量測結果。"""
+
+    name: str
+    elapsed: float
+    units: int
+    unit_name: str
+    peak_rss_mb: float
+    db_write_seconds: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.units / self.elapsed if self.elapsed else 0.0
+
+
+def _peak_rss_mb() -> float:
+    # Linux 的 ru_maxrss 單位為 KB (macOS 為 bytes)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _flush_seconds(table: str) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value("crawler_batch_flush_duration_seconds_sum", {"table": table}) or 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_fake_server(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "crawler.benchmark.fake_104_server",
+        "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-qps", str(args.rate_limit_qps),
+        "--pages", str(args.pages),
+        "--jobs-per-page", str(args.jobs_per_page),
+        "--seed", str(args.seed),
+    ]
+    if args.fixtures_dir:
+        command += ["--fixtures-dir", args.fixtures_dir]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    ready = process.stdout.readline()
+    if "listening" not in ready:
+        process.kill()
+        raise RuntimeError(f"假伺服器啟動失敗: {ready!r}")
+    return process
+
+
+def _measure(name: str, unit_name: str, tables: List[str], func: Callable[[], Dict[str, Any]]) -> PhaseResult:
+    flush_before = sum(_flush_seconds(table) for table in tables)
+    start = time.perf_counter()
+    extra = func()
+    elapsed = time.perf_counter() - start
+    return PhaseResult(
+        name=name,
+        elapsed=elapsed,
+        units=extra.pop("units"),
+        unit_name=unit_name,
+        peak_rss_mb=_peak_rss_mb(),
+        db_write_seconds=sum(_flush_seconds(table) for table in tables) - flush_before,
+        extra=extra,
+    )
+
+
+def _count_rows(table: str) -> int:
+    from sqlalchemy import func, select
+
+    from crawler.database.connection import get_engine
+    from crawler.database.schema import metadata
+
+    with get_engine().connect() as connection:
+        return connection.execute(select(func.count()).select_from(metadata.tables[table])).scalar_one()
+
+
+def run_benchmark(args: argparse.Namespace, base_url: str, workdir: str) -> List[PhaseResult]:
+    """設定環境變數後匯入爬蟲模組並依序執行三個階段。"""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "CRAWLER_104_BASE_URL": base_url,
+        "CRAWLER_104_STATIC_URL": base_url,
+        "SEARCH_PAGE_DELAY_MIN": "0",
+        "SEARCH_PAGE_DELAY_MAX": str(args.page_delay),
+        "DETAIL_REQUESTS_PER_SECOND": str(args.detail_qps),
+        "MAX_WORKERS": str(args.workers),
+        "PARSE_PROCESSES": args.parse_processes,
+    })
+    # 基準測試在單一程序內執行，指標直接從預設 registry 讀取
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    from crawler.app import PROFILE_KWARG
+    from crawler.database.connection import initialize_database_tables
+    from crawler.database.repository import get_leaf_categories, get_urls_needing_details
+    from crawler.project_104 import config_104
+    from crawler.project_104.task_category_104 import CATEGORY_SOURCE, process_category_data
+    from crawler.project_104.task_job_details_104 import fetch_and_save_all_job_details
+    from crawler.project_104.task_urls_104 import _run_scraping_session, _save_job_urls_to_db
+
+    initialize_database_tables()
+    results: List[PhaseResult] = []
+
+    def categories() -> Dict[str, Any]:
+        # 在 worker 中失敗時由 Celery 重新排程 (self.retry)；這裡直接重跑以模擬同樣的行為
+        for attempt in range(1, _CATEGORY_ATTEMPTS + 1):
+            try:
+                process_category_data.run(cache_duration_hours=0)
+                break
+            except Exception:
+                if attempt == _CATEGORY_ATTEMPTS:
+                    raise
+        return {"units": _count_rows("tb_category"), "attempts": attempt}
+
+    results.append(_measure("category sync", "categories", ["tb_category"], categories))
+
+    def discovery() -> Dict[str, Any]:
+        pages = 0
+        jobcats = get_leaf_categories(CATEGORY_SOURCE)[:args.jobcats]
+        for jobcat in jobcats:
+            session = _run_scraping_session(args.keywords, jobcat, args.pages)
+            _save_job_urls_to_db(session.urls, listings=session.listings)
+            pages += session.request_count
+        return {"units": pages, "jobcats": len(jobcats), "urls": _count_rows("tb_urls")}
+
+    results.append(_measure("url discovery", "pages", ["tb_urls"], discovery))
+
+    def details() -> Dict[str, Any]:
+        # 經由 Task.__call__ 呼叫，才會套用 ProfiledTask 的剖析
+        fetch_and_save_all_job_details(**({PROFILE_KWARG: args.profile} if args.profile else {}))
+        return {"units": _count_rows("tb_jobs"), "detail_qps_limit": config_104.DETAIL_REQUESTS_PER_SECOND}
+
+    results.append(_measure("job details", "jobs", ["tb_jobs"], details))
+
+    def details_recheck() -> Dict[str, Any]:
+        # 列表摘要沒有變動，第二次執行應該略過所有已抓取的職缺
+        pending = len(get_urls_needing_details(CATEGORY_SOURCE))
+        fetch_and_save_all_job_details()
+        return {"units": pending, "urls": _count_rows("tb_urls")}
+
+    results.append(_measure("details recheck", "jobs", ["tb_jobs"], details_recheck))
+    return results
+
+
+def _print_report(results: List[PhaseResult], server_stats: Dict[str, int]) -> None:
+    print(f"\n{'phase':<16}{'elapsed':>10}{'units':>10}{'rate':>16}{'peak RSS':>12}{'DB write':>12}")
+    for r in results:
+        print(
+            f"{r.name:<16}{r.elapsed:>9.2f}s{r.units:>10}{r.throughput:>10.1f} {r.unit_name + '/s':<6}"
+            f"{r.peak_rss_mb:>9.1f} MB{r.db_write_seconds:>11.2f}s"
+        )
+    print("\nfake server responses:")
+    for key in sorted(server_stats):
+        print(f"  {key:<24}{server_stats[key]:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="以本機假伺服器與 SQLite 執行離線端對端爬取基準測試。")
+    parser.add_argument("--keywords", nargs="+", default=["python", "java"])
+    parser.add_argument("--jobcats", type=int, default=3, help="URL 探索階段要爬的葉類別數")
+    parser.add_argument("--pages", type=int, default=5, help="每個搜尋條件的結果頁數")
+    parser.add_argument("--jobs-per-page", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-qps", type=float, default=0.0, help="假伺服器超過此每秒請求數時回傳 429")
+    parser.add_argument("--detail-qps", type=float, default=0.0, help="爬蟲端的詳情 API 速率限制，0 代表不限速")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="搜尋頁請求前隨機等待的上限秒數")
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--parse-processes", default="0", help="解析管線的程序數 (auto / 數字)，0 代表在抓取執行緒中解析")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures-dir", default=None, help="包含錄製的 detail.json / JobCat.json 的目錄")
+    parser.add_argument("--profile", choices=["sample", "cprofile"], default=None, help="剖析職缺詳情階段")
+    parser.add_argument("--workdir", default=None, help="SQLite 與快取檔案的目錄 (預設為暫存目錄，結束後刪除)")
+    parser.add_argument("--json", dest="json_path", default=None, help="將結果另存為 JSON，方便比較不同版本")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_crawl_")
+    os.makedirs(workdir, exist_ok=True)
+    port = _free_port()
+    server = _start_fake_server(args, port)
+    base_url = f"http://127.0.0.1:{port}"
+    server_stats: Dict[str, int] = {}
+    try:
+        results = run_benchmark(args, base_url, workdir)
+        with urllib.request.urlopen(f"{base_url}/__stats") as response:
+            server_stats = json.load(response)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    _print_report(results, server_stats)
+    if args.json_path:
+        payload: Dict[str, Optional[Any]] = {
+            "args": vars(args),
+            "phases": [{**asdict(r), "throughput": r.throughput} for r in results],
+            "server": server_stats,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
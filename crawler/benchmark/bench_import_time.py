@@ -0,0 +1,171 @@
+# crawler/benchmark/bench_import_time.py
+"""
+進入點的啟動時間 (import time) 基準測試。
+
+每個進入點都在全新的 Python 程序中以 `-X importtime` 執行，量測：
+
+- 程序總耗時 (直譯器啟動 + 導入，等同短命容器執行 Producer 的固定成本)
+- 進入點本身的導入耗時 (`-X importtime` 的累計微秒數)
+- 導入最久的模組，以及是否載入了 pandas、BeautifulSoup 等重量級依賴
+
+Worker 進入點另外執行 `app.loader.import_default_modules()`，與 `celery worker` 啟動時
+導入 `include` 中所有任務模組的行為相同。資料庫以暫存目錄中的 SQLite 取代，不需要 MySQL 或 RabbitMQ。
+
+使用方式:
+    python -m crawler.benchmark.bench_import_time --repeat 5
+    python -m crawler.benchmark.bench_import_time --entry producer_urls --top 20
+    python -m crawler.benchmark.bench_import_time --max-producer-seconds 1.0  # 超過時以非零狀態碼結束 (適合 CI)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Tuple
+
+# 進入點名稱 -> 在子程序中執行的程式碼
+ENTRY_POINTS: Dict[str, str] = {
+    "producer_urls": "import crawler.project_104.producer_urls",
+    "producer_category": "import crawler.project_104.producer_category",
+    "producer_job_details": "import crawler.project_104.producer_job_details",
+    "api": "import crawler.api.main",
+    "worker": "import crawler.worker; from crawler.app import app; app.loader.import_default_modules()",
+}
+# 短命 Producer 容器不應載入的模組
+HEAVY_MODULES = ("pandas", "numpy", "bs4", "sqlmodel", "sqlalchemy", "pyarrow")
+_PROBE = "import sys; print('\\n' + ','.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+@dataclass
+class ImportResult:
+    """單一進入點的量測結果 (各次執行的中位數)。"""
+
+    entry: str
+    wall_seconds: float
+    import_seconds: float
+    heavy_loaded: List[str]
+    top_modules: List[Tuple[str, float]] = field(default_factory=list)
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """解析 `-X importtime` 的輸出，回傳 (模組, self 微秒, 累計微秒)。"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((parts[2].rstrip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def _run_once(code: str, env: Dict[str, str]) -> Tuple[float, float, List[str], List[Tuple[str, int, int]]]:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{code}; {_PROBE.format(heavy=HEAVY_MODULES)}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"執行失敗 ({code}):\n{completed.stderr[-2000:]}")
+    rows = _parse_importtime(completed.stderr)
+    # 只計算 crawler 套件的頂層導入 (縮排最少的 crawler.* 列)，排除直譯器啟動時的 site 等模組
+    crawler_rows = [row for row in rows if row[0].strip().startswith("crawler")]
+    min_indent = min((len(name) - len(name.lstrip()) for name, _, _ in crawler_rows), default=0)
+    import_us = sum(cumulative for name, _, cumulative in crawler_rows if len(name) - len(name.lstrip()) == min_indent)
+    heavy = [m for m in completed.stdout.strip().splitlines()[-1].split(",") if m] if completed.stdout.strip() else []
+    return wall, import_us / 1e6, heavy, rows
+
+
+def measure(entry: str, repeat: int, top: int, env: Dict[str, str]) -> ImportResult:
+    """
+    以全新程序量測單一進入點 repeat 次，回傳中位數。
+
+    Args:
+        entry (str): ENTRY_POINTS 中的名稱。
+        repeat (int): 量測次數 (第一次可能受檔案快取影響，取中位數較穩定)。
+        top (int): 列出 self 耗時最久的模組數量。
+        env (Dict[str, str]): 子程序的環境變數。
+
+    Returns:
+        ImportResult: 量測結果。
+    """
+    runs = [_run_once(ENTRY_POINTS[entry], env) for _ in range(repeat)]
+    walls, imports, heavies, rows = zip(*runs)
+    self_total: Dict[str, List[int]] = {}
+    for run_rows in rows:
+        for name, own, _ in run_rows:
+            self_total.setdefault(name.strip(), []).append(own)
+    slowest = sorted(
+        ((name, statistics.median(values) / 1e6) for name, values in self_total.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return ImportResult(
+        entry=entry,
+        wall_seconds=statistics.median(walls),
+        import_seconds=statistics.median(imports),
+        heavy_loaded=heavies[-1],
+        top_modules=slowest,
+    )
+
+
+def print_report(results: List[ImportResult]) -> None:
+    print(f"\n{'entry':<24}{'process':>10}{'import':>10}  heavy modules loaded")
+    for result in results:
+        print(
+            f"{result.entry:<24}{result.wall_seconds:>9.3f}s{result.import_seconds:>9.3f}s  "
+            f"{', '.join(result.heavy_loaded) or '-'}"
+        )
+    for result in results:
+        print(f"\n[{result.entry}] slowest modules (self time)")
+        for name, seconds in result.top_modules:
+            print(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="量測 worker、producer 與 API 進入點的啟動 (導入) 時間。")
+    parser.add_argument("--entry", nargs="+", choices=sorted(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="每個進入點列出 self 耗時最久的模組數量")
+    parser.add_argument(
+        "--max-producer-seconds", type=float, default=0.0,
+        help="任一 producer 的程序總耗時超過此秒數時以狀態碼 1 結束，0 代表不檢查",
+    )
+    parser.add_argument("--json", dest="json_path", default=None, help="將結果另存為 JSON，方便比較不同版本")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as workdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "DATA_DIR": os.path.join(workdir, "data"),
+            "WORKER_METRICS_PORT": "0",
+        }
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        results = [measure(entry, args.repeat, args.top, env) for entry in args.entry]
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(result) for result in results], f, ensure_ascii=False, indent=2)
+
+    slow = [
+        r for r in results
+        if args.max_producer_seconds > 0 and r.entry.startswith("producer") and r.wall_seconds > args.max_producer_seconds
+    ]
+    if slow:
+        print(f"\n以下 producer 超過 {args.max_producer_seconds}s: {', '.join(r.entry for r in slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
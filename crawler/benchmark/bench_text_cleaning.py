@@ -0,0 +1,94 @@
+# crawler/benchmark/bench_text_cleaning.py
+"""
+文字清理函數的吞吐量基準測試。
+
+比較原本逐字元呼叫 `ord()` 的 `remove_illegal_chars`、逐筆 `re.sub` 的 `clean_text`
+與 `crawler.utilis.data_processing` 中以轉換表 / 單一編譯正規表示式實作的批次版本，
+並確認新舊實作的輸出完全一致。
+
+使用方式:
+    python -m crawler.benchmark.bench_text_cleaning --rows 20000
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Any, Callable, List
+
+from crawler.utilis.data_processing import (
+    clean_job_text_batch,
+    clean_text_batch,
+    remove_illegal_chars_batch,
+)
+
+_SAMPLE_FRAGMENTS = [
+    "負責後端 API 設計與開發，熟悉 Python / Django / FastAPI。",
+    "具備 MySQL、Redis 使用經驗，了解資料庫索引與查詢優化。\n",
+    "Experience with Docker, Kubernetes and CI/CD pipelines.\r\n",
+    "【加分條件】有大型流量系統維運經驗者佳！😀🚀",
+    "工作地點：台北市信義區（近捷運站），彈性上下班。\t",
+    "​零寬字元與　全形空白也會出現在內文中。\n\n\n\n",
+]
+
+
+def _legacy_remove_illegal_chars(text: Any) -> Any:
+    """原本的逐字元實作，僅作為比較基準。"""
+    if isinstance(text, str):
+        return "".join(
+            char
+            for char in text
+            if 0x20 <= ord(char) <= 0x7E
+            or ord(char) in [0x0A, 0x0D]
+            or (0x4E00 <= ord(char) <= 0x9FFF)
+        )
+    return text
+
+
+def _legacy_clean_text(text: Any) -> str:
+    """原本的逐筆 re.sub 實作，僅作為比較基準。"""
+    if not isinstance(text, str):
+        text = str(text)
+    text = text.replace('\n', ' ').replace('\r', ' ')
+    return re.sub(r'[^\w\s.,!?;:()\'"-—一-鿿]+', '', text).strip()
+
+
+def _make_texts(rows: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(_SAMPLE_FRAGMENTS, k=rng.randint(5, 30))) for _ in range(rows)]
+
+
+def _measure(label: str, func: Callable[[List[str]], List[Any]], texts: List[str], repeat: int) -> List[Any]:
+    total_chars = sum(len(t) for t in texts)
+    best = float("inf")
+    result: List[Any] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(texts)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<44}{best * 1000:>10.1f} ms{len(texts) / best:>14.0f} rows/s{total_chars / best / 1e6:>10.1f} Mchar/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比較逐字元與批次文字清理的吞吐量。")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = _make_texts(args.rows)
+    print(f"rows={args.rows}, avg chars/row={sum(map(len, texts)) / len(texts):.0f}\n")
+
+    legacy = _measure("remove_illegal_chars (per-char ord)", lambda ts: [_legacy_remove_illegal_chars(t) for t in ts], texts, args.repeat)
+    batched = _measure("remove_illegal_chars_batch (translate)", remove_illegal_chars_batch, texts, args.repeat)
+    assert legacy == batched, "remove_illegal_chars_batch 的輸出與原實作不一致"
+
+    legacy = _measure("clean_text (per-row re.sub)", lambda ts: [_legacy_clean_text(t) for t in ts], texts, args.repeat)
+    batched = _measure("clean_text_batch (precompiled regex)", clean_text_batch, texts, args.repeat)
+    assert legacy == batched, "clean_text_batch 的輸出與原實作不一致"
+
+    _measure("clean_job_text_batch (pipeline stage)", clean_job_text_batch, texts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# crawler/benchmark/fake_104_server.py
+"""
+離線基準測試用的 104 假伺服器。
+
+在本機模擬三種端點，回應格式與爬蟲實際解析的結構一致：
+
+- `/jobs/search/`：搜尋結果頁 HTML (div.job-summary 內的 a.info-job__text、a.info-company__text、
+  .date-container，以及 a.paging__link)。
+- `/job/ajax/content/{job_id}`：職缺詳情 JSON。
+- `/category-tool/json/JobCat.json`：職務類別樹 (支援 ETag / If-None-Match)。
+
+可設定回應延遲、隨機錯誤率，以及超過每秒請求數時回傳 429。
+回應內容預設由 seed 決定性地產生；`--fixtures-dir` 中若有錄製的 `detail.json`
+(完整 API 回應) 或 `JobCat.json`，會以它們作為範本。
+`/__stats` 回傳各端點與狀態碼的請求數。
+
+使用方式:
+    python -m crawler.benchmark.fake_104_server --port 8104 --latency-ms 50 --error-rate 0.01
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_ID_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+_DESCRIPTION_LINES = [
+    "負責後端 API 設計與開發，熟悉 Python / Django / FastAPI。",
+    "具備 MySQL、Redis 使用經驗，了解資料庫索引與查詢優化。",
+    "Experience with Docker, Kubernetes and CI/CD pipelines.",
+    "與產品經理討論需求並撰寫技術文件，參與 code review。",
+    "維護既有系統並持續改善效能，有大型流量系統維運經驗者佳。",
+    "工作地點：台北市信義區（近捷運站），彈性上下班。",
+]
+_REGIONS = ["台北市信義區", "台北市內湖區", "新北市板橋區", "台中市西屯區", "高雄市前鎮區"]
+
+
+@dataclass
+class FakeSiteConfig:
+    """假伺服器的行為設定。"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # 每秒可服務的請求數，超過時回傳 429；0 代表不限制
+    rate_limit_qps: float = 0.0
+    total_pages: int = 5
+    jobs_per_page: int = 20
+    # 搜尋結果中重複出現的職缺比例 (模擬不同關鍵字搜到同一個職缺)
+    overlap_ratio: float = 0.2
+    category_count: int = 50
+    seed: int = 42
+    fixtures_dir: Optional[str] = None
+
+
+class _TokenBucket:
+    """全域速率限制，容量為一秒的請求量。"""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def _job_id(*parts: Any) -> str:
+    digest = int.from_bytes(hashlib.sha1("|".join(map(str, parts)).encode()).digest()[:8], "big")
+    chars = []
+    for _ in range(6):
+        digest, index = divmod(digest, len(_ID_ALPHABET))
+        chars.append(_ID_ALPHABET[index])
+    return "".join(chars)
+
+
+class FakeSite:
+    """產生假資料並記錄請求統計；與 HTTP 層分離以便直接測試。"""
+
+    def __init__(self, site_config: FakeSiteConfig) -> None:
+        self.config = site_config
+        self.bucket = _TokenBucket(site_config.rate_limit_qps) if site_config.rate_limit_qps > 0 else None
+        self.random = random.Random(site_config.seed)
+        self.random_lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+        self.detail_template = self._load_fixture("detail.json")
+        self.jobcat = self._load_fixture("JobCat.json") or self._build_jobcat()
+        self.jobcat_body = json.dumps(self.jobcat, ensure_ascii=False).encode("utf-8")
+        self.jobcat_etag = '"' + hashlib.md5(self.jobcat_body).hexdigest() + '"'
+
+    def _load_fixture(self, name: str) -> Optional[Any]:
+        if not self.config.fixtures_dir:
+            return None
+        path = os.path.join(self.config.fixtures_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _build_jobcat(self) -> List[Dict[str, Any]]:
+        roots = []
+        per_root = max(1, self.config.category_count // 5)
+        for r in range(5):
+            root_no = f"20{r:02d}000000"
+            middle_no = f"20{r:02d}001000"
+            leaves = [{"no": f"20{r:02d}001{i:03d}", "des": f"類別 {r}-{i}"} for i in range(1, per_root + 1)]
+            roots.append({"no": root_no, "des": f"大類 {r}", "n": [{"no": middle_no, "des": f"中類 {r}", "n": leaves}]})
+        return roots
+
+    def record(self, endpoint: str, status: int) -> None:
+        key = f"{endpoint} {status}"
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def gate(self) -> Optional[int]:
+        """套用延遲、速率限制與隨機錯誤；回傳需要改回的錯誤狀態碼 (無則為 None)。"""
+        with self.random_lock:
+            delay = self.config.latency_ms + self.random.uniform(-1, 1) * self.config.jitter_ms
+            fail = self.random.random() < self.config.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.bucket is not None and not self.bucket.take():
+            return 429
+        return 500 if fail else None
+
+    def search_page(self, jobcat: str, keyword: str, page: int) -> str:
+        cfg = self.config
+        page = max(1, page)
+        items = []
+        if page <= cfg.total_pages:
+            for i in range(cfg.jobs_per_page):
+                # 一部分職缺與關鍵字無關，不同關鍵字會搜到同一批職缺
+                shared = (i / cfg.jobs_per_page) < cfg.overlap_ratio
+                job_id = _job_id(jobcat, page, i) if shared else _job_id(jobcat, keyword, page, i)
+                items.append(
+                    f'<div class="job-summary"><a class="info-job__text" '
+                    f'href="//www.104.com.tw/job/{job_id}?jobsource=index_s">職缺 {job_id}</a>'
+                    f'<a class="info-company__text">公司 {job_id[:2]}</a>'
+                    f'<span class="date-container">6/01</span></div>'
+                )
+        paging = "".join(f'<a class="paging__link">{n}</a>' for n in range(1, cfg.total_pages + 1)) if items else ""
+        return f"<html><body>{''.join(items)}<nav>{paging}</nav></body></html>"
+
+    def detail(self, job_id: str) -> Dict[str, Any]:
+        rng = random.Random(f"{self.config.seed}:{job_id}")
+        if self.detail_template is not None:
+            # 錄製的回應可能是完整的 {"data": {...}}，也可能只有 data 本身
+            template = copy.deepcopy(self.detail_template)
+            data = template.get("data", template)
+            data.setdefault("header", {})["jobName"] = f"{data['header'].get('jobName', '職缺')} {job_id}"
+            return {"data": data}
+
+        salary_min = rng.choice([35000, 40000, 45000, 50000, 60000])
+        region = rng.choice(_REGIONS)
+        return {
+            "data": {
+                "header": {"jobName": f"後端工程師 {job_id}", "appearDate": "2025/06/01", "custName": f"公司 {job_id[:2]}"},
+                "jobDetail": {
+                    "jobDescription": "\n".join(rng.sample(_DESCRIPTION_LINES, 4)) + f"\n職缺代碼 {job_id}",
+                    "salary": f"月薪{salary_min:,}~{salary_min + 20000:,}元",
+                    "salaryMin": salary_min, "salaryMax": salary_min + 20000, "salaryType": 50,
+                    "workPeriod": "日班", "jobType": 1, "needEmp": "1~2人",
+                    "addressRegion": region, "addressDetail": "某某路 1 號",
+                    "latitude": f"{25.0 + rng.random() * 0.1:.6f}", "longitude": f"{121.5 + rng.random() * 0.1:.6f}",
+                    "remoteWork": None,
+                    "jobCategory": [{"description": "軟體工程師"}],
+                },
+                "condition": {
+                    "edu": "大學", "workExp": "2年以上", "major": [], "specialty": [{"description": "Python"}],
+                    "skill": [], "other": "具備良好溝通能力",
+                },
+                "custNo": f"c{job_id[:2]}",
+                "industry": "電腦軟體服務業",
+                "employees": "100人",
+                "contact": {"hrName": "王小姐", "phone": []},
+                "interactionRecord": {"lastProcessedResumeAtTime": "0", "nowTimestamp": str(int(time.time()))},
+            }
+        }
+
+
+def _make_handler(site: FakeSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - 覆寫父類別簽章
+            return
+
+        def _send(self, endpoint: str, status: int, body: bytes, content_type: str, headers: Tuple = ()) -> None:
+            site.record(endpoint, status)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            parsed = urlparse(self.path)
+            if parsed.path == "/__stats":
+                body = json.dumps(site.stats).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            if parsed.path.startswith("/jobs/search"):
+                endpoint = "search_page"
+            elif parsed.path.startswith("/job/ajax/content/"):
+                endpoint = "detail_api"
+            elif parsed.path.endswith("/JobCat.json"):
+                endpoint = "category_json"
+            else:
+                self._send("unknown", 404, b"not found", "text/plain")
+                return
+
+            error = site.gate()
+            if error == 429:
+                self._send(endpoint, 429, b"too many requests", "text/plain", (("Retry-After", "1"),))
+                return
+            if error:
+                self._send(endpoint, error, b"internal error", "text/plain")
+                return
+
+            if endpoint == "search_page":
+                query = parse_qs(parsed.query)
+                html = site.search_page(
+                    query.get("jobcat", [""])[0], query.get("keyword", [""])[0], int(query.get("page", ["1"])[0])
+                )
+                self._send(endpoint, 200, html.encode("utf-8"), "text/html; charset=utf-8")
+            elif endpoint == "detail_api":
+                job_id = parsed.path.rsplit("/", 1)[-1]
+                body = json.dumps(site.detail(job_id), ensure_ascii=False).encode("utf-8")
+                self._send(endpoint, 200, body, "application/json")
+            elif self.headers.get("If-None-Match") == site.jobcat_etag:
+                self._send(endpoint, 304, b"", "application/json", (("ETag", site.jobcat_etag),))
+            else:
+                self._send(endpoint, 200, site.jobcat_body, "application/json", (("ETag", site.jobcat_etag),))
+
+    return Handler
+
+
+def create_server(site_config: FakeSiteConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """建立 (尚未啟動的) 假伺服器；port 為 0 時由系統分配。"""
+    server = ThreadingHTTPServer((host, port), _make_handler(FakeSite(site_config)))
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="離線基準測試用的 104 假伺服器。")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8104)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-qps", type=float, default=0.0)
+    parser.add_argument("--pages", type=int, default=5, help="每個搜尋條件的結果頁數")
+    parser.add_argument("--jobs-per-page", type=int, default=20)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures-dir", default=None)
+    args = parser.parse_args()
+
+    server = create_server(
+        FakeSiteConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_qps=args.rate_limit_qps,
+            total_pages=args.pages,
+            jobs_per_page=args.jobs_per_page,
+            category_count=args.categories,
+            seed=args.seed,
+            fixtures_dir=args.fixtures_dir,
+        ),
+        args.host,
+        args.port,
+    )
+    print(f"fake 104 server listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,87 @@ MYSQL_PORT: Final[int] = int(os.environ.get("MYSQL_PORT", "3306"))
 MYSQL_ACCOUNT: Final[str] = os.environ.get("MYSQL_USER", "user")
 MYSQL_PASSWORD: Final[str] = os.environ.get("MYSQL_PASSWORD", "password")
 MYSQL_DATABASE: Final[str] = os.environ.get("MYSQL_DATABASE", "job_data")
+# 完整的 SQLAlchemy 連線 URL；設定後取代上方的 MySQL 設定 (例如離線基準測試使用 sqlite:///bench.db)
+DATABASE_URL: Final[str] = os.environ.get("DATABASE_URL", "")
+# 非同步 API 路徑使用的 MySQL 驅動 (asyncmy 或 aiomysql)
+MYSQL_ASYNC_DRIVER: Final[str] = os.environ.get("MYSQL_ASYNC_DRIVER", "asyncmy")
+# 非同步引擎的連線池大小；async 路由不受 threadpool 限制，需要較大的連線池
+MYSQL_ASYNC_POOL_SIZE: Final[int] = int(os.environ.get("MYSQL_ASYNC_POOL_SIZE", "20"))
+MYSQL_ASYNC_MAX_OVERFLOW: Final[int] = int(os.environ.get("MYSQL_ASYNC_MAX_OVERFLOW", "20"))
+
+# --- Read Replicas ---
+# 唯讀副本的 host[:port]，以逗號分隔 (帳號、密碼與資料庫名稱與主庫相同)；空字串代表所有讀取都走主庫
+MYSQL_REPLICA_HOSTS: Final[str] = os.environ.get("MYSQL_REPLICA_HOSTS", "")
+# 唯讀副本的完整 SQLAlchemy 連線 URL，以逗號分隔；設定後取代 MYSQL_REPLICA_HOSTS (同步引擎)
+DATABASE_REPLICA_URLS: Final[str] = os.environ.get("DATABASE_REPLICA_URLS", "")
+# 副本落後主庫超過此秒數 (或複寫已停止、無法連線) 時，讀取改走主庫
+REPLICA_MAX_LAG_SECONDS: Final[float] = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+# 每個副本的延遲檢查結果快取秒數，避免每次讀取都查詢複寫狀態
+REPLICA_LAG_CHECK_SECONDS: Final[float] = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+# 程序內公司資料 LRU 快取的容量 (公司數)；快取中的公司資料沒有變動時不寫入 tb_companies，0 代表停用
+COMPANY_CACHE_SIZE: Final[int] = int(os.environ.get("COMPANY_CACHE_SIZE", "20000"))
+
+# tb_jobs 大型文字欄位 (description、qualification_*、remote_work_description) 的儲存方式：
+# 空字串為原本的 TEXT；"zlib" / "zstd" 改為壓縮的 BLOB (zstd 需要 zstandard)；
+# "raw" 維持 BLOB 但不再壓縮新資料 (開啟過壓縮後要停用時使用，已壓縮的資料仍可讀取)
+JOBS_TEXT_CODEC: Final[str] = os.environ.get("JOBS_TEXT_CODEC", "").strip().lower()
+
+# --- Retention / Partitioning ---
+# 設為 1 時 tb_jobs 以 update_date 按月 RANGE 分區 (僅 MySQL)，initialize_database_tables 會轉換既有表格
+JOBS_PARTITIONED: Final[bool] = os.environ.get("JOBS_PARTITIONED", "0") == "1"
+# 預先建立的未來月份分區數
+JOBS_PARTITION_MONTHS_AHEAD: Final[int] = int(os.environ.get("JOBS_PARTITION_MONTHS_AHEAD", "3"))
+# 超過此天數沒有更新、搜尋結果列表上也不再出現的職缺視為已下架，由維護任務移出 tb_jobs；0 代表不清理
+JOBS_RETENTION_DAYS: Final[int] = int(os.environ.get("JOBS_RETENTION_DAYS", "180"))
+# 下架職缺的去處："table" (tb_jobs_archive)、"parquet" ({DATA_DIR}/archive 下的 zstd 壓縮檔) 或 "none" (直接刪除)
+JOBS_ARCHIVE_MODE: Final[str] = os.environ.get("JOBS_ARCHIVE_MODE", "table")
+
+# --- Change Feed ---
+# tb_job_changes 保留的天數，由職缺歸檔任務清理；游標早於保留範圍的下游需要重新完整同步
+JOB_CHANGES_RETENTION_DAYS: Final[int] = int(os.environ.get("JOB_CHANGES_RETENTION_DAYS", "30"))
+# 寫入變更紀錄的交易超過此秒數仍未結束時 (例如 worker 中途終止)，視為已放棄，不再阻擋 /jobs/changes 的游標
+JOB_CHANGE_WRITER_TIMEOUT_SECONDS: Final[float] = float(os.environ.get("JOB_CHANGE_WRITER_TIMEOUT_SECONDS", "600"))
+# 設為 1 時，每次寫入職缺後另外發布一則 AMQP 事件 (fanout exchange "crawler_104.job_changes")
+JOB_CHANGE_EVENTS: Final[bool] = os.environ.get("JOB_CHANGE_EVENTS", "0") == "1"
+
+# --- Crawl Progress ---
+# 執行中的任務每隔幾秒把進度寫入 tb_crawl_progress (GET /crawls/{task_id})
+CRAWL_PROGRESS_INTERVAL_SECONDS: Final[float] = float(os.environ.get("CRAWL_PROGRESS_INTERVAL_SECONDS", "5"))
+# 仍在執行但超過此秒數沒有更新進度的任務視為停滯
+CRAWL_PROGRESS_STALL_SECONDS: Final[float] = float(os.environ.get("CRAWL_PROGRESS_STALL_SECONDS", "120"))
+# 收尾階段 (FINALIZING) 的單一步驟 (例如重算統計) 可能執行數分鐘，超過此秒數沒有更新才視為停滯
+CRAWL_PROGRESS_FINALIZE_STALL_SECONDS: Final[float] = float(os.environ.get("CRAWL_PROGRESS_FINALIZE_STALL_SECONDS", "1800"))
+# 任務進度紀錄保留的天數，由職缺歸檔任務清理
+CRAWL_PROGRESS_RETENTION_DAYS: Final[int] = int(os.environ.get("CRAWL_PROGRESS_RETENTION_DAYS", "7"))
+
+# --- Data Directory ---
+# 容器內專用的資料目錄 (快取、Parquet 快照等)，可透過環境變數改到其他位置
+DATA_DIR: Final[str] = os.environ.get("DATA_DIR", "/home/app_user/data")
+
+# --- API Configuration ---
+# /jobs/export 每次從伺服器端游標取回並序列化的資料列數
+EXPORT_CHUNK_SIZE: Final[int] = int(os.environ.get("EXPORT_CHUNK_SIZE", "5000"))
+
+# --- Metrics Configuration ---
+# Celery worker 輸出 Prometheus 指標的 port，設為 0 代表不啟動 (API 則由 /metrics 輸出)
+WORKER_METRICS_PORT: Final[int] = int(os.environ.get("WORKER_METRICS_PORT", "9808"))
+
+# --- Profiling Configuration ---
+# 要剖析的任務名稱，以逗號分隔的 fnmatch 樣式 (例如 "*fetch_and_save_all")；
+# "1" 代表剖析所有 crawler.project_104 任務，空字串代表關閉 (仍可用任務參數 _profile=True 開啟單次剖析)
+TASK_PROFILING: Final[str] = os.environ.get("TASK_PROFILING", "")
+# sample：取樣式 (低開銷、涵蓋執行緒池)；cprofile：確定性 (精確呼叫次數，但只涵蓋任務執行緒且開銷較高)
+TASK_PROFILING_MODE: Final[str] = os.environ.get("TASK_PROFILING_MODE", "sample")
+TASK_PROFILING_INTERVAL_MS: Final[float] = float(os.environ.get("TASK_PROFILING_INTERVAL_MS", "10"))
+# 任務結束時在日誌中列出的熱點函數數量
+TASK_PROFILING_TOP_N: Final[int] = int(os.environ.get("TASK_PROFILING_TOP_N", "20"))
+
+# --- Tracing Configuration ---
+# 職缺詳情任務一律彙總每個 URL 各段耗時的百分位數並寫入日誌；以下設定控制是否另外輸出完整 Trace
+# 至 {DATA_DIR}/traces/<task_id>.jsonl：依比例抽樣 (0~1)，以及總耗時超過門檻秒數者一律輸出 (0 代表關閉)
+TRACE_EXPORT_SAMPLE_RATE: Final[float] = float(os.environ.get("TRACE_EXPORT_SAMPLE_RATE", "0"))
+TRACE_EXPORT_SLOW_SECONDS: Final[float] = float(os.environ.get("TRACE_EXPORT_SLOW_SECONDS", "0"))
 
 # --- RabbitMQ Configuration (for Celery) ---
 # 使用與 RabbitMQ Docker 容器相同的環境變數名稱，確保設定的一致性，避免驗證錯誤。
@@ -26,4 +107,6 @@ MYSQL_DATABASE: Final[str] = os.environ.get("MYSQL_DATABASE", "job_data")
 RABBITMQ_HOST: Final[str] = os.environ.get("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_PORT: Final[int] = int(os.environ.get("RABBITMQ_PORT", "5672"))
 RABBITMQ_DEFAULT_USER: Final[str] = os.environ.get("RABBITMQ_DEFAULT_USER", "guest")
-RABBITMQ_DEFAULT_PASS: Final[str] = os.environ.get("RABBITMQ_DEFAULT_PASS", "guest")
\ No newline at end of file
+RABBITMQ_DEFAULT_PASS: Final[str] = os.environ.get("RABBITMQ_DEFAULT_PASS", "guest")
+# 每個 worker 程序預先取得的訊息數倍數 (Celery worker_prefetch_multiplier)
+CELERY_PREFETCH_MULTIPLIER: Final[int] = int(os.environ.get("CELERY_PREFETCH_MULTIPLIER", "1"))
\ No newline at end of file
@@ -0,0 +1,145 @@
+# crawler/database/compression.py
+"""
+tb_jobs 大型文字欄位的壓縮儲存 (由 config.JOBS_TEXT_CODEC 開啟)。
+
+description、qualification_* 與 remote_work_description 佔了 tb_jobs 大部分的空間，
+也是每次 upsert 與查詢時搬移的主要位元組。開啟後這些欄位改為 BLOB，並以 `CompressedText`
+欄位型別在寫入時壓縮、讀出時解壓縮：呼叫端 (repository、API) 看到的仍然是字串，
+且只有查詢實際選取的欄位才會解壓縮 (例如 `/jobs/near` 的候選查詢、統計彙總都不會觸及這些欄位)。
+
+儲存格式：
+- 壓縮值：MARKER (0xFF) + codec 代碼 (1 byte) + 壓縮後的 UTF-8 內容。
+- 未壓縮值：原始的 UTF-8 內容。合法的 UTF-8 不會出現 0xFF，因此不需要標記；
+  太短或壓縮後沒有變小的值、以及轉換欄位型別前寫入的舊資料都以此格式保存。
+"""
+
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import LargeBinary, Text
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+MARKER = 0xFF
+# 短於此位元組數的內容不壓縮 (壓縮標頭與 codec 本身的開銷大於節省的空間)
+MIN_COMPRESS_BYTES = 128
+
+# 可以壓縮儲存的 tb_jobs 欄位
+COMPRESSED_JOB_COLUMNS: Tuple[str, ...] = (
+    "description",
+    "qualification_required",
+    "qualification_bonus",
+    "qualification_other",
+    "remote_work_description",
+)
+
+
+def _zstd():
+    """延遲導入 zstandard (選用依賴)。"""
+    try:
+        import zstandard
+    except ImportError as e:  # pragma: no cover - 依安裝環境而定
+        raise ImportError("JOBS_TEXT_CODEC=zstd 需要安裝 zstandard (pip install zstandard)。") from e
+    return zstandard
+
+
+# codec 名稱 -> (代碼, 壓縮函數, 解壓縮函數)
+_CODECS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (1, lambda data: zlib.compress(data, 6), zlib.decompress),
+    "zstd": (
+        2,
+        lambda data: _zstd().ZstdCompressor(level=3).compress(data),
+        lambda data: _zstd().ZstdDecompressor().decompress(data),
+    ),
+}
+_DECOMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {code: decompress for code, _, decompress in _CODECS.values()}
+
+# 可用的 JOBS_TEXT_CODEC 值；raw 代表維持 BLOB 欄位但不再壓縮新資料 (仍可讀取已壓縮的資料)
+CODEC_NAMES: Tuple[str, ...] = ("raw",) + tuple(_CODECS)
+
+
+def encode_text(value: Optional[str], codec: str) -> Optional[bytes]:
+    """
+    將字串編碼為儲存格式。
+
+    Args:
+        value (Optional[str]): 原始字串。
+        codec (str): "raw"、"zlib" 或 "zstd"。
+
+    Returns:
+        Optional[bytes]: 壓縮值或原始的 UTF-8 內容；value 為 None 時回傳 None。
+    """
+    if value is None:
+        return None
+    data = value.encode("utf-8")
+    if codec == "raw" or len(data) < MIN_COMPRESS_BYTES:
+        return data
+    code, compress, _ = _CODECS[codec]
+    compressed = compress(data)
+    if len(compressed) + 2 >= len(data):
+        return data
+    return bytes((MARKER, code)) + compressed
+
+
+def decode_text(value: Any) -> Optional[str]:
+    """
+    將儲存格式還原為字串 (任一 codec 壓縮的值都能解開，與目前設定的 codec 無關)。
+
+    Args:
+        value (Any): 資料庫讀出的值；TEXT 欄位 (轉換前的舊表格) 讀出的字串原樣回傳。
+
+    Returns:
+        Optional[str]: 原始字串。
+
+    Raises:
+        ValueError: 標記的 codec 代碼未知時。
+    """
+    if value is None or isinstance(value, str):
+        return value
+    data = bytes(value)
+    if not data or data[0] != MARKER:
+        return data.decode("utf-8")
+    try:
+        decompress = _DECOMPRESSORS[data[1]]
+    except (IndexError, KeyError):
+        raise ValueError(f"未知的文字壓縮格式: {data[:2]!r}")
+    return decompress(data[2:]).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """以 BLOB 儲存、對呼叫端呈現為字串的欄位型別 (寫入時壓縮，讀出時解壓縮)。"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, codec: str = "zlib") -> None:
+        if codec not in CODEC_NAMES:
+            raise ValueError(f"不支援的文字壓縮格式: {codec} (可用: {', '.join(CODEC_NAMES)})")
+        if codec == "zstd":
+            _zstd()  # 選用依賴缺少時在啟動 (定義 schema) 時就失敗，而不是在第一次寫入時
+        super().__init__()
+        self.codec = codec
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        return encode_text(value, self.codec)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        return decode_text(value)
+
+    @property
+    def python_type(self) -> type:
+        return str
+
+
+def job_text_type(codec: str) -> TypeEngine:
+    """
+    大型文字欄位的型別：codec 為空字串時為原本的 TEXT，否則為 CompressedText。
+
+    Args:
+        codec (str): config.JOBS_TEXT_CODEC。
+
+    Returns:
+        TypeEngine: 欄位型別。
+    """
+    return CompressedText(codec) if codec else Text()
@@ -4,25 +4,52 @@
 
 它使用模組級別的單例模式創建一個全域的 SQLAlchemy Engine，
 確保在整個應用程式生命週期中只有一個連線池。
+設定唯讀副本時 (MYSQL_REPLICA_HOSTS / DATABASE_REPLICA_URLS)，另外提供分散到副本的讀取引擎。
 同時，提供初始化資料庫表格的函數。
 """
 
+import asyncio
+import itertools
 import logging
-from typing import Optional
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from tenacity import retry, stop_after_attempt, wait_fixed, before_log, RetryError
 
 from crawler import config
+from crawler.database.compression import COMPRESSED_JOB_COLUMNS
 from crawler.database.schema import metadata  # 從統一的 schema 位置導入 metadata
+from crawler.metrics import DB_READ_ROUTES
 
 logger = logging.getLogger(__name__)
 
-# --- 優化：模組級別的單例實現 ---
-# Python 模組的導入機制保證了這段程式碼只會執行一次，
-# 這是實現單例最簡單、最安全的方式。
+def _build_mysql_url(driver: str, host: Optional[str] = None, port: Optional[int] = None) -> str:
+    """
+    依照指定的驅動組合 MySQL 連線字串。
+
+    Args:
+        driver (str): SQLAlchemy 驅動名稱，例如 "pymysql" 或 "asyncmy"。
+        host (Optional[str]): 主機名稱，預設為 config.MYSQL_HOST (唯讀副本使用自己的主機)。
+        port (Optional[int]): 連接埠，預設為 config.MYSQL_PORT。
+
+    Returns:
+        str: 完整的 SQLAlchemy 連線 URL。
+    """
+    return (
+        f"mysql+{driver}://{config.MYSQL_ACCOUNT}:{config.MYSQL_PASSWORD}@"
+        f"{host or config.MYSQL_HOST}:{port or config.MYSQL_PORT}/{config.MYSQL_DATABASE}"
+        f"?charset=utf8mb4" # 確保使用 utf8mb4
+    )
+
+
+# --- 延遲建立的單例 ---
+# Engine 在第一次呼叫 get_engine() 時才建立並測試連線，
+# 只需要 import 本模組 (例如 Producer 或 API 的路由定義) 時不會連線資料庫。
 
 def _create_and_connect_engine() -> Engine:
     """
@@ -38,11 +65,7 @@ def _create_and_connect_engine() -> Engine:
         )
         def _connect_with_retry() -> Engine:
             logger.info("正在嘗試建立 MySQL 引擎...")
-            address = (
-                f"mysql+pymysql://{config.MYSQL_ACCOUNT}:{config.MYSQL_PASSWORD}@"
-                f"{config.MYSQL_HOST}:{config.MYSQL_PORT}/{config.MYSQL_DATABASE}"
-                f"?charset=utf8mb4" # 確保使用 utf8mb4
-            )
+            address = config.DATABASE_URL or _build_mysql_url("pymysql")
             engine = create_engine(address, pool_recycle=3600, echo=False) # 生產環境建議 echo=False
 
             # 建立連線測試，如果失敗則觸發重試
@@ -63,17 +86,247 @@ def _create_and_connect_engine() -> Engine:
         logger.critical(f"創建 MySQL 引擎時發生未預期的嚴重錯誤: {e}", exc_info=True)
         raise
 
-# 在模組加載時直接初始化 Engine
-_engine: Engine = _create_and_connect_engine()
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
 
 
 def get_engine() -> Engine:
     """
-    獲取全域唯一的 SQLAlchemy Engine 單例。
+    獲取全域唯一的 SQLAlchemy Engine 單例 (首次呼叫時建立並測試連線)。
+
+    詳情任務會在多個執行緒中同時寫入，因此以鎖確保只建立一個連線池。
     """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_and_connect_engine()
     return _engine
 
 
+# 非同步引擎採延遲建立：只有 async API 路由會用到，
+# Worker 與 Producer 不需要載入 async 驅動。
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    獲取全域唯一的 SQLAlchemy AsyncEngine 單例 (首次呼叫時建立)。
+
+    使用 config.MYSQL_ASYNC_DRIVER 指定的非同步驅動 (asyncmy / aiomysql)，
+    讓 FastAPI 的 async 路由在等待資料庫時不佔用 threadpool。
+    """
+    global _async_engine
+    if _async_engine is None:
+        logger.info(f"正在建立非同步 MySQL 引擎 (driver={config.MYSQL_ASYNC_DRIVER})...")
+        _async_engine = create_async_engine(
+            _build_mysql_url(config.MYSQL_ASYNC_DRIVER),
+            pool_recycle=3600,
+            pool_size=config.MYSQL_ASYNC_POOL_SIZE,
+            max_overflow=config.MYSQL_ASYNC_MAX_OVERFLOW,
+            echo=False,
+        )
+    return _async_engine
+
+
+# --- 讀寫分離 ---
+# 寫入，以及讀取結果會決定寫入內容的查詢 (差異比對、統計增量、去重候選) 一律使用主庫 (get_engine)；
+# API 查詢與可以接受短暫延遲的讀取 (排程規劃、匯出) 使用 get_read_engine，分散到唯讀副本。
+
+def _split_setting(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _replica_urls(driver: str) -> List[str]:
+    """
+    依設定組出唯讀副本的連線 URL (順序即副本編號)。
+
+    DATABASE_REPLICA_URLS 只用於同步引擎 (與 DATABASE_URL 相同)；
+    非同步引擎一律由 MYSQL_REPLICA_HOSTS 與 config.MYSQL_ASYNC_DRIVER 組成。
+    """
+    if driver == "pymysql" and config.DATABASE_REPLICA_URLS:
+        return _split_setting(config.DATABASE_REPLICA_URLS)
+    urls = []
+    for address in _split_setting(config.MYSQL_REPLICA_HOSTS):
+        host, _, port = address.partition(":")
+        urls.append(_build_mysql_url(driver, host, int(port) if port else None))
+    return urls
+
+
+def replica_lag_seconds(engine: Engine) -> Optional[float]:
+    """
+    查詢唯讀副本落後主庫的秒數。
+
+    MySQL 讀取 SHOW REPLICA STATUS (8.0.22 之前為 SHOW SLAVE STATUS)；
+    沒有設定複寫或複寫已停止時回傳 None。其他資料庫 (例如測試用的 SQLite) 沒有複寫狀態，視為沒有延遲。
+    帳號缺少 REPLICATION CLIENT 權限時記錄警告並回傳 None：副本不會被使用，否則只會默默地改走主庫。
+
+    Args:
+        engine (Engine): 副本的 Engine。
+
+    Returns:
+        Optional[float]: 延遲秒數，無法判斷時為 None。
+    """
+    if engine.dialect.name != "mysql":
+        return 0.0
+    with engine.connect() as connection:
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = connection.execute(text(statement)).mappings().first()
+            except ProgrammingError:
+                # 舊版 MySQL 不認得 SHOW REPLICA STATUS
+                continue
+            except OperationalError as e:
+                logger.warning(
+                    f"無法讀取唯讀副本 {engine.url.host} 的複寫狀態，帳號可能缺少 REPLICATION CLIENT 權限；"
+                    f"在修正前此副本不會被使用，讀取改走主庫。錯誤: {e.orig}"
+                )
+                return None
+            if row is None or row.get(column) is None:
+                return None
+            return float(row[column])
+    logger.warning(f"唯讀副本 {engine.url.host} 不支援 SHOW REPLICA STATUS / SHOW SLAVE STATUS，讀取改走主庫。")
+    return None
+
+
+class ReplicaRouter:
+    """
+    在唯讀副本之間輪流分配讀取，並跳過延遲過大或無法連線的副本。
+
+    每個副本的延遲檢查結果快取 check_interval 秒，檢查本身不會出現在每一次讀取的路徑上。
+
+    Args:
+        replicas (List[Engine]): 副本的同步 Engine (延遲檢查一律以同步連線執行)。
+        max_lag (float): 可接受的最大延遲秒數。
+        check_interval (float): 延遲檢查結果的快取秒數。
+        lag_probe (Callable[[Engine], Optional[float]]): 查詢副本延遲的函數，回傳 None 代表副本不可用。
+        clock (Callable[[], float]): 取得目前時間 (秒) 的函數。
+    """
+
+    def __init__(
+        self,
+        replicas: List[Engine],
+        max_lag: float,
+        check_interval: float,
+        lag_probe: Callable[[Engine], Optional[float]] = replica_lag_seconds,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self.clock = clock
+        # 副本編號 -> (檢查時間, 是否可用)
+        self._health: Dict[int, Tuple[float, bool]] = {}
+        self._turns = itertools.count()
+
+    def is_healthy(self, index: int) -> bool:
+        """副本目前是否可用 (延遲不超過 max_lag)，必要時重新檢查。"""
+        now = self.clock()
+        checked = self._health.get(index)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+        try:
+            lag = self.lag_probe(self.replicas[index])
+        except Exception as e:
+            logger.warning(f"無法查詢唯讀副本 {index} 的複寫延遲: {e}")
+            lag = None
+        healthy = lag is not None and lag <= self.max_lag
+        if checked is None or checked[1] != healthy:
+            state = "恢復使用" if healthy else "暫停使用，讀取改走主庫"
+            logger.info(f"唯讀副本 {index} 延遲 {lag} 秒 (上限 {self.max_lag} 秒)，{state}。")
+        self._health[index] = (now, healthy)
+        return healthy
+
+    def needs_check(self) -> bool:
+        """是否有副本的延遲檢查結果已過期 (下一次 choose 可能需要查詢副本)。"""
+        now = self.clock()
+        return any(
+            index not in self._health or now - self._health[index][0] >= self.check_interval
+            for index in range(len(self.replicas))
+        )
+
+    def choose(self) -> Optional[int]:
+        """
+        輪流挑選一個可用的副本。
+
+        Returns:
+            Optional[int]: 副本編號；所有副本都不可用時為 None (呼叫端改用主庫)。
+        """
+        start = next(self._turns)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            if self.is_healthy(index):
+                DB_READ_ROUTES.labels("replica").inc()
+                return index
+        DB_READ_ROUTES.labels("primary_fallback").inc()
+        return None
+
+
+_read_router: Optional[ReplicaRouter] = None
+_read_router_ready = False
+_async_replica_engines: Optional[List[AsyncEngine]] = None
+
+
+def get_read_router() -> Optional[ReplicaRouter]:
+    """取得唯讀副本的路由器 (首次呼叫時建立)；沒有設定副本時回傳 None。"""
+    global _read_router, _read_router_ready
+    if not _read_router_ready:
+        with _engine_lock:
+            if not _read_router_ready:
+                urls = _replica_urls("pymysql")
+                if urls:
+                    logger.info(f"正在建立 {len(urls)} 個唯讀副本引擎...")
+                    # 副本不在啟動時測試連線：無法連線的副本由延遲檢查排除，不影響主庫的使用
+                    _read_router = ReplicaRouter(
+                        [create_engine(url, pool_recycle=3600, echo=False) for url in urls],
+                        max_lag=config.REPLICA_MAX_LAG_SECONDS,
+                        check_interval=config.REPLICA_LAG_CHECK_SECONDS,
+                    )
+                _read_router_ready = True
+    return _read_router
+
+
+def get_read_engine() -> Engine:
+    """
+    取得讀取用的 Engine：可用的唯讀副本之一，沒有設定副本或所有副本都延遲過大時為主庫。
+
+    只應用於可以接受最多 REPLICA_MAX_LAG_SECONDS 秒延遲的查詢；寫入一律使用 get_engine。
+    """
+    router = get_read_router()
+    index = router.choose() if router is not None else None
+    return get_engine() if index is None else router.replicas[index]
+
+
+async def get_async_read_engine() -> AsyncEngine:
+    """
+    get_read_engine 的非同步版本，供 async API 路由使用。
+
+    副本由 MYSQL_REPLICA_HOSTS 決定；延遲檢查使用對應的同步引擎，
+    快取過期時改在執行緒中查詢，不阻塞事件迴圈。
+    """
+    global _async_replica_engines
+    router = get_read_router()
+    if router is None or not config.MYSQL_REPLICA_HOSTS or config.DATABASE_REPLICA_URLS:
+        return get_async_engine()
+    if _async_replica_engines is None:
+        _async_replica_engines = [
+            create_async_engine(
+                url,
+                pool_recycle=3600,
+                pool_size=config.MYSQL_ASYNC_POOL_SIZE,
+                max_overflow=config.MYSQL_ASYNC_MAX_OVERFLOW,
+                echo=False,
+            )
+            for url in _replica_urls(config.MYSQL_ASYNC_DRIVER)
+        ]
+    index = await asyncio.to_thread(router.choose) if router.needs_check() else router.choose()
+    return get_async_engine() if index is None else _async_replica_engines[index]
+
+
 def initialize_database_tables() -> None:
     """
     確保所有在 metadata 中定義的資料表都存在於資料庫中。
@@ -84,9 +337,139 @@ def initialize_database_tables() -> None:
         engine = get_engine()
         # create_all 會聰明地檢查每個表格是否存在，不存在才會建立
         metadata.create_all(engine) # checkfirst=True 是預設行為，可以省略
+        _add_missing_columns(engine)
+        _warn_pending_migrations(engine)
+        _convert_job_text_columns(engine)
+        _convert_coordinate_columns(engine)
+        if config.JOBS_PARTITIONED:
+            from crawler.database.partitioning import ensure_jobs_partitioning
+
+            ensure_jobs_partitioning(engine, config.JOBS_PARTITION_MONTHS_AHEAD)
         logger.info("資料庫表格初始化檢查完成。")
     except Exception as e:
         logger.critical(
             f"資料庫表格初始化失敗，應用程式可能無法正常運作。錯誤: {e}", exc_info=True
         )
-        raise
\ No newline at end of file
+        raise
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """
+    為已存在的表格補上 schema 中新增的欄位與索引。
+
+    create_all 只會建立不存在的表格，不會修改既有表格；
+    此函數只做「新增」(一律為可為 NULL 的欄位)，不修改或刪除任何既有欄位，
+    因此對已部署的資料庫是安全的。
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"為表格 {table.name} 新增欄位 {column.name} ({column_type})")
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.quote(table.name)} "
+                    f"ADD COLUMN {preparer.quote(column.name)} {column_type} NULL"
+                ))
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    logger.info(f"為表格 {table.name} 建立索引 {index.name}")
+                    index.create(connection)
+
+
+def _warn_pending_migrations(engine: Engine) -> None:
+    """
+    提示尚未執行的一次性遷移。
+
+    會刪除或改寫既有資料的遷移不在啟動時執行 (多個容器可能同時啟動)，
+    改由操作人員以 `python -m crawler.database.migrations <名稱>` 執行。
+    """
+    from crawler.database.migrations import pending_migrations
+
+    pending = pending_migrations(engine)
+    if pending:
+        logger.warning(
+            f"資料庫有尚未執行的遷移 {pending}，寫入可能失敗；"
+            f"請在維護時間執行 python -m crawler.database.migrations {' '.join(pending)}"
+        )
+
+
+def _convert_job_text_columns(engine: Engine) -> None:
+    """
+    開啟 JOBS_TEXT_CODEC 時，把 tb_jobs / tb_jobs_archive 的大型文字欄位從 TEXT 轉為 BLOB (僅 MySQL)。
+
+    轉換只改變欄位型別，既有資料保留為未壓縮的 UTF-8 內容 (讀取時原樣解碼)，
+    之後被重新寫入的職缺才會壓縮。SQLite 的欄位沒有固定型別，不需要轉換。
+    反向 (BLOB 轉回 TEXT) 不會自動執行：欄位中可能已有壓縮的資料，應改設 JOBS_TEXT_CODEC=raw。
+    """
+    if engine.dialect.name != "mysql":
+        return
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table_name in ("tb_jobs", "tb_jobs_archive"):
+            if table_name not in existing_tables:
+                continue
+            for column in inspector.get_columns(table_name):
+                if column["name"] not in COMPRESSED_JOB_COLUMNS:
+                    continue
+                is_binary = column["type"].python_type is bytes
+                if config.JOBS_TEXT_CODEC and not is_binary:
+                    logger.info(f"將 {table_name}.{column['name']} 轉為 BLOB 以壓縮儲存...")
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.quote(table_name)} "
+                        f"MODIFY COLUMN {preparer.quote(column['name'])} BLOB NULL"
+                    ))
+                elif not config.JOBS_TEXT_CODEC and is_binary:
+                    logger.warning(
+                        f"{table_name}.{column['name']} 為 BLOB (可能含有壓縮資料)，"
+                        f"但 JOBS_TEXT_CODEC 未設定；請設為 raw 以停用壓縮。"
+                    )
+
+
+# 座標欄位 -> 合法的絕對值上限 (與 geo.parse_coordinate 在寫入時的檢查一致)
+_COORDINATE_LIMITS = {"latitude": 90, "longitude": 180}
+_NUMBER_PATTERN = "^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)$"
+
+
+def _convert_coordinate_columns(engine: Engine) -> None:
+    """
+    把舊版 tb_jobs / tb_jobs_archive 以 VARCHAR 儲存的 latitude / longitude 轉為 DOUBLE (僅 MySQL)。
+
+    舊版直接存放 104 API 回傳的字串，/jobs/near 的範圍條件在字串欄位上會變成字串比較。
+    轉換前先把無法解析、為 0 或超出範圍的值設為 NULL (與寫入時的 parse_coordinate 相同)，
+    避免嚴格模式下 ALTER TABLE 因無法轉換的值而失敗。已經是數值欄位時不做任何事。
+    """
+    if engine.dialect.name != "mysql":
+        return
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table_name in ("tb_jobs", "tb_jobs_archive"):
+            if table_name not in existing_tables:
+                continue
+            for column in inspector.get_columns(table_name):
+                limit = _COORDINATE_LIMITS.get(column["name"])
+                if limit is None or column["type"].python_type is float:
+                    continue
+                table, name = preparer.quote(table_name), preparer.quote(column["name"])
+                logger.info(f"將 {table_name}.{column['name']} 從 {column['type']} 轉為 DOUBLE...")
+                # CASE 依序求值，只有符合數字格式的值才會被 CAST
+                connection.execute(text(
+                    f"UPDATE {table} SET {name} = CASE "
+                    f"WHEN TRIM({name}) NOT REGEXP '{_NUMBER_PATTERN}' THEN NULL "
+                    f"WHEN CAST(TRIM({name}) AS DOUBLE) = 0 OR ABS(CAST(TRIM({name}) AS DOUBLE)) > {limit} THEN NULL "
+                    f"ELSE TRIM({name}) END "
+                    f"WHERE {name} IS NOT NULL"
+                ))
+                connection.execute(text(f"ALTER TABLE {table} MODIFY COLUMN {name} DOUBLE NULL"))
@@ -0,0 +1,104 @@
+# crawler/database/migrations.py
+"""
+需要手動執行的一次性資料遷移。
+
+啟動時的 initialize_database_tables 只做可以安全重複執行的變更 (建立表格、補上欄位與索引)。
+會刪除或改寫既有資料的遷移集中在此模組，不會在 API 或 worker 啟動時自動執行，
+由操作人員在維護時間以單一程序執行，避免多個容器同時遷移：
+
+    python -m crawler.database.migrations              # 列出尚未執行的遷移
+    python -m crawler.database.migrations move_company_columns
+"""
+
+import argparse
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 舊版 tb_jobs 直接存放的公司欄位，已搬到 tb_companies
+LEGACY_COMPANY_COLUMNS = ("company_name", "industry", "employees")
+
+
+def _legacy_company_columns(engine: Engine) -> List[str]:
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("tb_jobs")}
+    return [name for name in LEGACY_COMPANY_COLUMNS if name in existing_columns]
+
+
+def move_company_columns(engine: Engine) -> None:
+    """
+    把舊版 tb_jobs 上的公司欄位搬到 tb_companies，再刪除這些欄位 (DROP COLUMN 無法復原，請先備份)。
+
+    每家公司取任一筆職缺上的值 (同一家公司在各職缺上的資料相同)；已存在於 tb_companies 的公司不覆寫。
+    新版程式寫入 tb_jobs 時不再提供這些欄位，舊欄位若留著 (NOT NULL 且沒有預設值) 會讓寫入失敗。
+
+    Args:
+        engine (Engine): 主庫的 Engine。
+    """
+    legacy = _legacy_company_columns(engine)
+    if not legacy:
+        logger.info("tb_jobs 沒有舊版的公司欄位，不需要遷移。")
+        return
+    preparer = engine.dialect.identifier_preparer
+    quoted = {name: preparer.quote(name) for name in legacy}
+    selected = ", ".join(f"MAX({quoted[name]})" for name in legacy)
+    logger.info(f"將 tb_jobs 的公司欄位 {legacy} 搬移到 tb_companies...")
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"INSERT INTO tb_companies (company_id, {', '.join(quoted.values())}, updated_at) "
+            f"SELECT company_id, {selected}, CURRENT_TIMESTAMP FROM tb_jobs "
+            f"WHERE company_id IS NOT NULL AND company_id NOT IN (SELECT company_id FROM tb_companies) "
+            f"GROUP BY company_id"
+        ))
+        for name in legacy:
+            connection.execute(text(f"ALTER TABLE tb_jobs DROP COLUMN {quoted[name]}"))
+    logger.info("公司欄位搬移完成。")
+
+
+# 遷移名稱 -> (是否尚未執行, 執行遷移)
+MIGRATIONS: Dict[str, Tuple[Callable[[Engine], bool], Callable[[Engine], None]]] = {
+    "move_company_columns": (lambda engine: bool(_legacy_company_columns(engine)), move_company_columns),
+}
+
+
+def pending_migrations(engine: Engine) -> List[str]:
+    """
+    列出資料庫尚未執行的遷移 (啟動時用來提示操作人員)。
+
+    Args:
+        engine (Engine): 主庫的 Engine。
+
+    Returns:
+        List[str]: 尚未執行的遷移名稱。
+    """
+    return [name for name, (is_pending, _) in MIGRATIONS.items() if is_pending(engine)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """命令列進入點：執行指定的遷移，或列出尚未執行的遷移。"""
+    parser = argparse.ArgumentParser(description="執行一次性的資料庫遷移。")
+    parser.add_argument("migrations", nargs="*", help=f"要執行的遷移 ({', '.join(MIGRATIONS)})；省略時列出尚未執行的遷移")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.migrations if name not in MIGRATIONS]
+    if unknown:
+        parser.error(f"未知的遷移: {', '.join(unknown)}")
+
+    from crawler.database.connection import get_engine
+
+    engine = get_engine()
+    if not args.migrations:
+        pending = pending_migrations(engine)
+        logger.info(f"尚未執行的遷移: {', '.join(pending) if pending else '無'}")
+        return
+    for name in args.migrations:
+        MIGRATIONS[name][1](engine)
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    main()
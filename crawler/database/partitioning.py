@@ -0,0 +1,184 @@
+# crawler/database/partitioning.py
+"""
+tb_jobs 的按月 RANGE 分區 (僅 MySQL，由 config.JOBS_PARTITIONED 開啟)。
+
+分區鍵為 update_date (職缺最後一次被確認仍在刊登的日期)：
+- 以 update_date 篩選的查詢 (例如 `/jobs/?updated_since=`) 只掃描相關月份的分區 (partition pruning)。
+- 過期月份的資料歸檔後以 `ALTER TABLE ... DROP PARTITION` 移除，成本與分區大小無關，
+  不需要逐列 DELETE，也不會產生大量 undo log。
+
+MySQL 要求分區鍵包含在每個唯一鍵中，因此分區後的主鍵為 (job_id, update_date)；
+同一職缺以新的 update_date 寫入時，repository.upsert_jobs 會先刪除它在其他分區的舊版本。
+最後一個分區 pmax (VALUES LESS THAN MAXVALUE) 接住超出預先建立範圍的資料，
+ensure_future_partitions 會把它拆出未來月份的分區 (pmax 為空時只是 metadata 操作)。
+"""
+
+import logging
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+JOBS_TABLE = "tb_jobs"
+PARTITION_COLUMN = "update_date"
+MAXVALUE_PARTITION = "pmax"
+
+# (分區名稱, 上界 (不含)；pmax 為 None)
+Partition = Tuple[str, Optional[date]]
+
+
+def month_start(value: date) -> date:
+    """回傳 value 所在月份的第一天。"""
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """回傳 value 所在月份往後 (或往前) months 個月的第一天。"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """月份分區的名稱，例如 2025 年 1 月為 p202501。"""
+    return f"p{month:%Y%m}"
+
+
+def partition_definitions(first_month: date, last_month: date) -> List[str]:
+    """
+    產生 first_month 到 last_month (含) 每個月一個分區的定義。
+
+    Args:
+        first_month (date): 第一個月份 (任一天皆可)。
+        last_month (date): 最後一個月份 (任一天皆可)。
+
+    Returns:
+        List[str]: 例如 "PARTITION p202501 VALUES LESS THAN ('2025-02-01')"。
+    """
+    definitions = []
+    month = month_start(first_month)
+    while month <= month_start(last_month):
+        upper = add_months(month, 1)
+        definitions.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper.isoformat()}')")
+        month = upper
+    return definitions
+
+
+def _parse_bound(description: Optional[str]) -> Optional[date]:
+    """把 information_schema 的 PARTITION_DESCRIPTION (例如 "'2025-02-01'" 或 "MAXVALUE") 轉為日期。"""
+    if not description or description.strip().upper() == "MAXVALUE":
+        return None
+    return date.fromisoformat(description.strip().strip("'"))
+
+
+def get_partitions(connection: Connection) -> List[Partition]:
+    """讀取 tb_jobs 目前的分區 (依順序)；表格未分區時回傳空列表。"""
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": JOBS_TABLE}).all()
+    return [(name, _parse_bound(description)) for name, description in rows]
+
+
+def expired_partitions(partitions: List[Partition], boundary: date) -> List[str]:
+    """回傳上界不超過 boundary 的分區名稱，即所有資料的 update_date 都早於 boundary 的分區。"""
+    return [name for name, upper in partitions if upper is not None and upper <= boundary]
+
+
+def enable_jobs_partitioning(engine: Engine, months_ahead: int, today: Optional[date] = None) -> bool:
+    """
+    將 tb_jobs 轉換為按月 RANGE 分區 (已分區時不做任何事)。
+
+    轉換會重建整張表格，資料量大時需要較長時間並鎖住寫入，應在維護時段執行一次。
+
+    Args:
+        engine (Engine): MySQL Engine。
+        months_ahead (int): 預先建立的未來月份數。
+        today (Optional[date]): 目前日期，預設為今天。
+
+    Returns:
+        bool: 本次是否執行了轉換 (已分區時為 False)。
+    """
+    today = today or date.today()
+    with engine.begin() as connection:
+        if get_partitions(connection):
+            return False
+        oldest = connection.execute(text(f"SELECT MIN({PARTITION_COLUMN}) FROM {JOBS_TABLE}")).scalar()
+        definitions = partition_definitions(oldest or today, add_months(today, months_ahead))
+        definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        primary_key = inspect(connection).get_pk_constraint(JOBS_TABLE)["constrained_columns"]
+        logger.info(f"將 tb_jobs 轉換為按月分區 ({len(definitions)} 個分區)...")
+        if primary_key != ["job_id", PARTITION_COLUMN]:
+            connection.execute(text(
+                f"ALTER TABLE {JOBS_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (job_id, {PARTITION_COLUMN})"
+            ))
+        connection.execute(text(
+            f"ALTER TABLE {JOBS_TABLE} PARTITION BY RANGE COLUMNS({PARTITION_COLUMN}) ({', '.join(definitions)})"
+        ))
+    return True
+
+
+def ensure_future_partitions(engine: Engine, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """
+    從 pmax 拆出到 today + months_ahead 為止尚未建立的月份分區。
+
+    Returns:
+        List[str]: 新建立的分區名稱。
+    """
+    today = today or date.today()
+    with engine.begin() as connection:
+        partitions = get_partitions(connection)
+        bounds = [upper for _, upper in partitions if upper is not None]
+        if not partitions or not bounds:
+            return []
+        # 最後一個月份分區的上界即下一個要建立的月份
+        definitions = partition_definitions(max(bounds), add_months(today, months_ahead))
+        if not definitions:
+            return []
+        definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        connection.execute(text(
+            f"ALTER TABLE {JOBS_TABLE} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ({', '.join(definitions)})"
+        ))
+    created = [definition.split()[1] for definition in definitions[:-1]]
+    logger.info(f"tb_jobs 新增分區: {created}")
+    return created
+
+
+def drop_expired_partitions(engine: Engine, boundary: date) -> List[str]:
+    """
+    刪除所有資料都早於 boundary 的月份分區 (DROP PARTITION 只移除分區檔案，與資料量無關)。
+
+    Args:
+        engine (Engine): MySQL Engine。
+        boundary (date): 月份的第一天；上界不超過此日期的分區會被刪除。
+
+    Returns:
+        List[str]: 被刪除的分區名稱。
+    """
+    with engine.begin() as connection:
+        names = expired_partitions(get_partitions(connection), boundary)
+        if names:
+            connection.execute(text(f"ALTER TABLE {JOBS_TABLE} DROP PARTITION {', '.join(names)}"))
+    if names:
+        logger.info(f"已刪除 tb_jobs 分區: {names}")
+    return names
+
+
+def ensure_jobs_partitioning(engine: Engine, months_ahead: int) -> None:
+    """啟用分區時於啟動與每次維護時呼叫：尚未分區時轉換 tb_jobs，已分區時補上未來月份的分區。"""
+    if engine.dialect.name != "mysql":
+        logger.warning(f"tb_jobs 分區只支援 MySQL，目前的資料庫為 {engine.dialect.name}，略過。")
+        return
+    if not enable_jobs_partitioning(engine, months_ahead):
+        ensure_future_partitions(engine, months_ahead)
+
+
+def is_partitioned(engine: Engine) -> bool:
+    """tb_jobs 目前是否為分區表格 (非 MySQL 一律為 False)。"""
+    if engine.dialect.name != "mysql":
+        return False
+    with engine.connect() as connection:
+        return bool(get_partitions(connection))
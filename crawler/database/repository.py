@@ -8,20 +8,76 @@
 """
 
 import logging
-import pandas as pd
-import numpy as np
-from typing import List, Set, Optional
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Set, Optional, Tuple
 
+from sqlalchemy import bindparam, delete, func, or_, tuple_, update
 from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
 from sqlmodel import select
 
-from crawler.database.connection import get_engine
-from crawler.database.schema import metadata, Url
+from crawler import config
+from crawler.database.connection import get_engine, get_read_engine
+from crawler.database.schema import (
+    COMPANY_ATTRIBUTES, JOB_CHANGE_CREATED, JOB_CHANGE_DELETED, JOB_CHANGE_UPDATED, metadata, Url, Category, CrawlYield,
+)
+from crawler.metrics import CACHE_LOOKUPS, ROWS_UPSERTED
+from crawler.utilis.lru_cache import LRUCache
+from crawler.utilis.data_processing import job_content_hash
+from crawler.utilis.simhash import SimHashIndex, band_rows, lsh_bands, simhash
+
+if TYPE_CHECKING:
+    # pandas / numpy 在使用到的函數內才導入，只用到查詢函數的 API 與排程任務不必載入
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# IN (...) 查詢一次帶入的值數量上限，避免產生過長的 SQL
+_IN_CLAUSE_CHUNK_SIZE = 500
+# SQLite 單一語句可綁定的參數數量上限 (3.32 之後的預設值)
+_SQLITE_MAX_VARIABLES = 32766
+# tb_crawl_yield.new_url_rate (每小時新職缺數) 的 EWMA 權重，越大越重視最近一次觀察
+NEW_URL_RATE_ALPHA = 0.3
+
+
+def _build_upsert(dialect_name: str, table, rows: List[Dict[str, Any]], update_values: Callable[[Any], Dict[str, Any]]):
+    """
+    依資料庫方言組出「主鍵衝突時更新」的 INSERT 語句。
+
+    正式環境為 MySQL (ON DUPLICATE KEY UPDATE)；離線基準測試以 SQLite 代替
+    (ON CONFLICT DO UPDATE)，兩者共用同一組更新規則。
+
+    Args:
+        dialect_name (str): engine.dialect.name。
+        table: 目標 SQLAlchemy Table。
+        rows (List[Dict[str, Any]]): 要寫入的資料列。
+        update_values (Callable): 接收「新資料列」的欄位代理 (MySQL 的 inserted / SQLite 的 excluded)，
+            回傳衝突時要更新的 {欄位: 值}；回傳空字典時改為忽略衝突的資料列。
+
+    Returns:
+        可直接執行的 INSERT 語句。
+    """
+    if dialect_name == "sqlite":
+        stmt = sqlite_insert(table).values(rows)
+        updates = update_values(stmt.excluded)
+        if not updates:
+            return stmt.on_conflict_do_nothing()
+        index_elements = [column.name for column in table.primary_key.columns]
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=updates)
+
+    stmt = insert(table).values(rows)
+    updates = update_values(stmt.inserted)
+    if not updates:
+        # 如果沒有非主鍵欄位，則退化為普通的 INSERT IGNORE
+        return stmt.prefix_with("IGNORE")
+    return stmt.on_duplicate_key_update(**updates)
+
 
-def _sanitize_dataframe_for_mysql(df: pd.DataFrame) -> pd.DataFrame:
+def _sanitize_dataframe_for_mysql(df: "pd.DataFrame") -> "pd.DataFrame":
     """
     一個健壯的函數，用於清理 DataFrame 以便能安全地寫入 MySQL。
 
@@ -33,11 +89,17 @@ def _sanitize_dataframe_for_mysql(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 清理過的 DataFrame 副本。
     """
+    import numpy as np
+    import pandas as pd
     # where() 函數比 fillna() 或 replace() 更為可靠和通用。
     return df.replace({np.nan: None, pd.NA: None})
 
 
-def upsert_from_dataframe(df: pd.DataFrame, table_name: str) -> None:
+def upsert_from_dataframe(
+    df: "pd.DataFrame",
+    table_name: str,
+    before_write: Optional[Callable[[Connection, List[Dict[str, Any]]], None]] = None,
+) -> None:
     """
     將 Pandas DataFrame 的資料執行 "Upsert" 操作到指定的資料庫表格。
 
@@ -47,6 +109,7 @@ def upsert_from_dataframe(df: pd.DataFrame, table_name: str) -> None:
     Args:
         df (pd.DataFrame): 要寫入的 DataFrame。
         table_name (str): 目標資料表名稱。
+        before_write (Optional[Callable]): 在同一個交易中、寫入之前執行，接收連線與要寫入的資料列。
     """
     if df.empty:
         logger.info(f"傳入的 DataFrame 為空，無需對表格 '{table_name}' 執行操作。")
@@ -67,25 +130,31 @@ def upsert_from_dataframe(df: pd.DataFrame, table_name: str) -> None:
             )
 
         data_to_insert = df_sanitized.to_dict(orient="records")
+        # 只更新 DataFrame 中有的欄位，避免覆蓋由其他流程維護的欄位 (例如 tb_urls 的抓取紀錄)
+        update_cols = [
+            col.name for col in target_table.columns
+            if col.name not in primary_key_cols and col.name in df_sanitized.columns
+        ]
 
-        with engine.begin() as connection:
-            stmt = insert(target_table).values(data_to_insert)
-
-            update_cols = {
-                col.name: stmt.inserted[col.name]
-                for col in target_table.columns
-                if col.name not in primary_key_cols
-            }
-
-            if update_cols:
-                final_stmt = stmt.on_duplicate_key_update(**update_cols)
-            else:
-                # 如果沒有非主鍵欄位，則退化為普通的 INSERT IGNORE
-                final_stmt = stmt.prefix_with("INSERT IGNORE")
+        def update_values(new_row) -> Dict[str, Any]:
+            return {name: new_row[name] for name in update_cols}
 
-            result = connection.execute(final_stmt)
+        # MySQL 一次送出整批；SQLite 有綁定參數數量上限，需要切批
+        dialect_name = engine.dialect.name
+        chunk_size = (
+            max(1, _SQLITE_MAX_VARIABLES // len(target_table.columns)) if dialect_name == "sqlite"
+            else len(data_to_insert)
+        )
+        with engine.begin() as connection:
+            if before_write is not None:
+                before_write(connection, data_to_insert)
+            for start in range(0, len(data_to_insert), chunk_size):
+                chunk = data_to_insert[start:start + chunk_size]
+                connection.execute(_build_upsert(dialect_name, target_table, chunk, update_values))
+            # MySQL 的 rowcount 對更新的資料列會算兩次，因此以送出的筆數計算
+            ROWS_UPSERTED.labels(table_name).inc(len(data_to_insert))
             logger.info(
-                f"成功將 {result.rowcount} 筆資料 Upsert 到表格: {table_name}"
+                f"成功將 {len(data_to_insert)} 筆資料 Upsert 到表格: {table_name}"
             )
 
     except KeyError:
@@ -96,6 +165,138 @@ def upsert_from_dataframe(df: pd.DataFrame, table_name: str) -> None:
         raise
 
 
+def _delete_other_job_versions(connection: Connection, rows: List[Dict[str, Any]]) -> None:
+    """刪除即將寫入的職缺在其他 update_date 分區的舊版本 (分區表格的主鍵包含 update_date)。"""
+    table = metadata.tables["tb_jobs"]
+    by_date: Dict[Any, List[str]] = {}
+    for row in rows:
+        by_date.setdefault(row["update_date"], []).append(row["job_id"])
+    for update_date, job_ids in by_date.items():
+        for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+            connection.execute(delete(table).where(
+                table.c.job_id.in_(job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]),
+                table.c.update_date != update_date,
+            ))
+
+
+def _record_job_changes(connection: Connection, rows: List[Dict[str, Any]], changed_at: datetime) -> List[Dict[str, Any]]:
+    """
+    比對即將寫入的職缺與 tb_jobs 中的現有版本，為新增或內容有變動的職缺寫入 tb_job_changes。
+
+    會就地設定每一列的 version 與 content_hash (內容沒有變動時沿用原本的版本號)。
+    tb_jobs 中沒有的職缺若曾經被刪除過，版本號從 tb_job_changes 中最大的版本接續，
+    讓重新出現的 created 版本高於之前的 deleted，下游以最大版本為準時不會停在已刪除的狀態。
+
+    Returns:
+        List[Dict[str, Any]]: 寫入 tb_job_changes 的變更 (不含 change_id)。
+    """
+    job_table = metadata.tables["tb_jobs"]
+    job_ids = [row["job_id"] for row in rows]
+    existing: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+    for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+        result = connection.execute(
+            select(job_table.c.job_id, job_table.c.version, job_table.c.content_hash)
+            .where(job_table.c.job_id.in_(job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]))
+        )
+        existing.update({job_id: (version, content_hash) for job_id, version, content_hash in result})
+
+    change_table = metadata.tables["tb_job_changes"]
+    missing = [job_id for job_id in dict.fromkeys(job_ids) if job_id not in existing]
+    logged_versions: Dict[str, int] = {}
+    for start in range(0, len(missing), _IN_CLAUSE_CHUNK_SIZE):
+        result = connection.execute(
+            select(change_table.c.job_id, func.max(change_table.c.version))
+            .where(change_table.c.job_id.in_(missing[start:start + _IN_CLAUSE_CHUNK_SIZE]))
+            .group_by(change_table.c.job_id)
+        )
+        logged_versions.update({job_id: version for job_id, version in result})
+
+    changes = []
+    for row in rows:
+        content_hash = job_content_hash(row)
+        previous = existing.get(row["job_id"])
+        version = (previous[0] or 0) if previous else logged_versions.get(row["job_id"], 0)
+        if previous is None or previous[1] != content_hash:
+            version += 1
+            changes.append({
+                "job_id": row["job_id"],
+                "change_type": JOB_CHANGE_UPDATED if previous else JOB_CHANGE_CREATED,
+                "version": version,
+                "changed_at": changed_at,
+            })
+        row["version"] = version
+        row["content_hash"] = content_hash
+        # 同一批中重複的職缺以最後一列為準
+        existing[row["job_id"]] = (version, content_hash)
+    if changes:
+        connection.execute(change_table.insert(), changes)
+        ROWS_UPSERTED.labels("tb_job_changes").inc(len(changes))
+    return changes
+
+
+@contextmanager
+def _job_change_writer() -> Iterator[None]:
+    """
+    在寫入 tb_job_changes 的交易期間登記於 tb_job_change_writers (以獨立的交易先提交)。
+
+    登記時記下目前已提交的最大 change_id，之後配發的 change_id 都會大於它；
+    get_job_changes 只回傳不超過所有進行中寫入者 floor 的紀錄，不論寫入交易執行多久都不會被游標跳過。
+    """
+    table = metadata.tables["tb_job_change_writers"]
+    change_table = metadata.tables["tb_job_changes"]
+    writer_id = uuid.uuid4().hex
+    with get_engine().begin() as connection:
+        floor = connection.execute(select(func.max(change_table.c.change_id))).scalar() or 0
+        connection.execute(table.insert().values(writer_id=writer_id, floor_change_id=floor, started_at=datetime.now()))
+    try:
+        yield
+    finally:
+        with get_engine().begin() as connection:
+            connection.execute(delete(table).where(table.c.writer_id == writer_id))
+
+
+def _publish_job_changes(changes: List[Dict[str, Any]]) -> None:
+    """交易提交後發布職缺變更事件 (config.JOB_CHANGE_EVENTS)；發布失敗不影響寫入，下游可由 /jobs/changes 補齊。"""
+    if not changes or not config.JOB_CHANGE_EVENTS:
+        return
+    from crawler.app import publish_job_changes
+
+    try:
+        publish_job_changes(changes)
+    except Exception as e:
+        logger.warning(f"發布 {len(changes)} 筆職缺變更事件失敗: {e}")
+
+
+def upsert_jobs(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """
+    將職缺寫入 tb_jobs，並在同一個交易中把新增或內容有變動的職缺記錄到 tb_job_changes。
+
+    啟用分區 (config.JOBS_PARTITIONED，僅 MySQL) 時主鍵為 (job_id, update_date)，
+    以新的 update_date 寫入不會與舊版本衝突，因此在同一個交易中先刪除舊版本，維持每個職缺只有一列。
+
+    Args:
+        df (pd.DataFrame): 職缺資料 (需包含 job_id 與 update_date)。
+
+    Returns:
+        List[Dict[str, Any]]: 本次記錄的變更 (job_id、change_type、version、changed_at)。
+    """
+    partitioned = config.JOBS_PARTITIONED and get_engine().dialect.name == "mysql"
+    changes: List[Dict[str, Any]] = []
+    changed_at = datetime.now()
+
+    def before_write(connection: Connection, rows: List[Dict[str, Any]]) -> None:
+        # 先比對現有版本，再刪除其他分區的舊版本
+        changes.extend(_record_job_changes(connection, rows, changed_at))
+        if partitioned:
+            _delete_other_job_versions(connection, rows)
+
+    # version / content_hash 由 before_write 填入，需要先有欄位才會被 upsert 更新
+    with _job_change_writer():
+        upsert_from_dataframe(df.assign(version=None, content_hash=None), "tb_jobs", before_write=before_write)
+    _publish_job_changes(changes)
+    return changes
+
+
 def get_all_urls_by_source(source: str) -> Set[str]:
     """
     從 tb_urls 資料表中獲取指定來源的所有 URL。
@@ -106,7 +307,7 @@ def get_all_urls_by_source(source: str) -> Set[str]:
     Returns:
         Set[str]: 包含不重複 URL 的集合。
     """
-    engine = get_engine()
+    engine = get_read_engine()
     urls: Set[str] = set()
     try:
         with engine.connect() as connection:
@@ -119,4 +320,1014 @@ def get_all_urls_by_source(source: str) -> Set[str]:
         logger.error(f"從 tb_urls 資料表獲取 URL 時發生錯誤: {e}", exc_info=True)
         # 發生錯誤時返回空集合，避免後續邏輯出錯
         return set()
-    return urls
\ No newline at end of file
+    return urls
+
+
+def get_urls_needing_details(source: str) -> Set[str]:
+    """
+    從 tb_urls 取出需要抓取職缺詳情的 URL：從未抓取過、沒有列表摘要可比對，
+    或是搜尋結果列表上的摘要 (含更新日期) 在上次抓取詳情之後變動過。
+
+    Args:
+        source (str): 篩選特定來源的 URL，例如 "104"。
+
+    Returns:
+        Set[str]: 需要抓取詳情的 URL 集合。
+    """
+    query = select(Url.source_url).where(
+        Url.source == source,
+        or_(
+            Url.details_fetched_at.is_(None),
+            Url.listing_hash.is_(None),
+            Url.details_listing_hash.is_(None),
+            Url.listing_hash != Url.details_listing_hash,
+        ),
+    )
+    with get_read_engine().connect() as connection:
+        urls = set(connection.execute(query).scalars().all())
+    logger.info(f"來源 '{source}' 有 {len(urls)} 筆 URL 需要抓取職缺詳情。")
+    return urls
+
+
+def get_existing_urls(urls: Iterable[str]) -> Set[str]:
+    """
+    回傳給定 URL 中已經存在於 tb_urls 的部分，用於計算一次爬取的「新 URL」數量。
+
+    Args:
+        urls (Iterable[str]): 本次抓取到的 URL。
+
+    Returns:
+        Set[str]: 已存在的 URL 集合。
+    """
+    urls = list(urls)
+    existing: Set[str] = set()
+    with get_engine().connect() as connection:
+        for start in range(0, len(urls), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = urls[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            query = select(Url.source_url).where(Url.source_url.in_(chunk))
+            existing.update(connection.execute(query).scalars().all())
+    return existing
+
+
+def get_leaf_categories(source: str) -> List[str]:
+    """
+    從 tb_category 取出指定來源的所有葉節點類別 (沒有任何子類別的類別)。
+
+    Args:
+        source (str): 類別來源，例如 "104"。
+
+    Returns:
+        List[str]: 依類別代碼排序的葉節點類別代碼。
+    """
+    with get_read_engine().connect() as connection:
+        rows = connection.execute(
+            select(Category.category_id, Category.parent_code).where(Category.source == source)
+        ).all()
+    parent_codes = {row.parent_code for row in rows if row.parent_code}
+    return sorted(row.category_id for row in rows if row.category_id not in parent_codes)
+
+
+def get_categories(source: str) -> Dict[str, Dict[str, Any]]:
+    """
+    讀取指定來源的所有類別資料列。
+
+    讀取主庫：結果用來比對出需要寫入的類別 (diff_category_rows)，副本延遲會造成多餘或遺漏的寫入。
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 類別代碼 -> tb_category 的資料列。
+    """
+    with get_engine().connect() as connection:
+        rows = connection.execute(
+            select(metadata.tables["tb_category"]).where(Category.source == source)
+        ).mappings().all()
+    return {row["category_id"]: dict(row) for row in rows}
+
+
+def get_crawl_yields(source: str) -> Dict[str, Dict[str, Any]]:
+    """
+    讀取指定來源所有類別的累積爬取成效。
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 類別代碼 -> tb_crawl_yield 的資料列。
+    """
+    with get_read_engine().connect() as connection:
+        rows = connection.execute(
+            select(metadata.tables["tb_crawl_yield"]).where(CrawlYield.source == source)
+        ).mappings().all()
+    return {row["category_id"]: dict(row) for row in rows}
+
+
+def record_crawl_yield(
+    category_id: str, source: str, request_count: int, new_url_count: int, available_pages: int
+) -> None:
+    """
+    累加一次類別爬取的請求數與新 URL 數到 tb_crawl_yield，並更新每小時新職缺數的估計。
+
+    計數欄位使用 ON DUPLICATE KEY UPDATE 在資料庫端累加，多個 Worker 同時回報也不會互相覆蓋；
+    速率估計需要上次的爬取時間，在同一個交易中先讀出再計算。
+    """
+    table = metadata.tables["tb_crawl_yield"]
+    now = datetime.now()
+    engine = get_engine()
+    with engine.begin() as connection:
+        previous = connection.execute(
+            select(table.c.last_crawled_at, table.c.new_url_rate).where(table.c.category_id == category_id)
+        ).first()
+        new_url_rate = None
+        if previous is not None:
+            hours = (now - previous.last_crawled_at).total_seconds() / 3600 if previous.last_crawled_at else 0.0
+            new_url_rate = _update_new_url_rate(previous.new_url_rate, new_url_count, hours)
+        _upsert_crawl_yield(
+            connection, engine.dialect.name, table, category_id, source,
+            request_count, new_url_count, available_pages, now, new_url_rate,
+        )
+
+
+def _update_new_url_rate(previous_rate: Optional[float], new_url_count: int, hours: float) -> Optional[float]:
+    """以一次爬取的觀察值更新每小時新職缺數；第一次爬取找到的是累積存量而非速率，因此不更新。"""
+    if hours <= 0:
+        return previous_rate
+    sample = new_url_count / hours
+    if previous_rate is None:
+        return sample
+    return NEW_URL_RATE_ALPHA * sample + (1 - NEW_URL_RATE_ALPHA) * previous_rate
+
+
+def _upsert_crawl_yield(
+    connection, dialect_name: str, table, category_id: str, source: str, request_count: int,
+    new_url_count: int, available_pages: int, now: datetime, new_url_rate: Optional[float],
+) -> None:
+    row = {
+        "category_id": category_id,
+        "source": source,
+        "crawl_count": 1,
+        "request_count": request_count,
+        "new_url_count": new_url_count,
+        "last_request_count": request_count,
+        "last_new_url_count": new_url_count,
+        "last_available_pages": available_pages,
+        "last_crawled_at": now,
+        "new_url_rate": new_url_rate,
+    }
+    def update_values(new_row) -> Dict[str, Any]:
+        return {
+            "crawl_count": table.c.crawl_count + new_row.crawl_count,
+            "request_count": table.c.request_count + new_row.request_count,
+            "new_url_count": table.c.new_url_count + new_row.new_url_count,
+            "last_request_count": new_row.last_request_count,
+            "last_new_url_count": new_row.last_new_url_count,
+            "last_available_pages": new_row.last_available_pages,
+            "last_crawled_at": new_row.last_crawled_at,
+            "new_url_rate": new_row.new_url_rate,
+        }
+
+    connection.execute(_build_upsert(dialect_name, table, [row], update_values))
+
+
+def record_detail_fetches(fetches: Dict[str, Optional[str]], fetched_at: Optional[datetime] = None) -> int:
+    """
+    記錄一批職缺詳情的抓取結果，累計每個 URL 的抓取次數、內容變動次數與觀察時數。
+
+    內容以雜湊值比對：與上次的雜湊值不同時算一次變動；新的雜湊值為 None (API 沒有回傳資料)
+    時只記錄抓取，不視為變動。同時把目前的列表摘要雜湊值記為 details_listing_hash，
+    之後列表摘要沒有變動時即可略過重抓。
+
+    Args:
+        fetches (Dict[str, Optional[str]]): source_url -> 內容雜湊值。
+        fetched_at (Optional[datetime]): 抓取時間，預設為現在。
+
+    Returns:
+        int: 偵測到內容變動的 URL 數。
+    """
+    if not fetches:
+        return 0
+    fetched_at = fetched_at or datetime.now()
+    table = metadata.tables["tb_urls"]
+    urls = list(fetches)
+    changed = 0
+    with get_engine().begin() as connection:
+        rows: List[Dict[str, Any]] = []
+        for start in range(0, len(urls), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = urls[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            previous = connection.execute(
+                select(
+                    table.c.source_url, table.c.details_fetched_at, table.c.fetch_count,
+                    table.c.change_count, table.c.observed_hours, table.c.content_hash,
+                    table.c.listing_hash,
+                ).where(table.c.source_url.in_(chunk))
+            ).all()
+            for row in previous:
+                new_hash = fetches[row.source_url]
+                is_change = bool(new_hash and row.content_hash and new_hash != row.content_hash)
+                changed += is_change
+                hours = (fetched_at - row.details_fetched_at).total_seconds() / 3600 if row.details_fetched_at else 0.0
+                rows.append({
+                    "b_source_url": row.source_url,
+                    "details_fetched_at": fetched_at,
+                    "fetch_count": (row.fetch_count or 0) + 1,
+                    "change_count": (row.change_count or 0) + is_change,
+                    "observed_hours": (row.observed_hours or 0.0) + max(hours, 0.0),
+                    "content_hash": new_hash or row.content_hash,
+                    "details_listing_hash": row.listing_hash,
+                })
+        if rows:
+            connection.execute(
+                update(table).where(table.c.source_url == bindparam("b_source_url")).values(
+                    details_fetched_at=bindparam("details_fetched_at"),
+                    fetch_count=bindparam("fetch_count"),
+                    change_count=bindparam("change_count"),
+                    observed_hours=bindparam("observed_hours"),
+                    content_hash=bindparam("content_hash"),
+                    details_listing_hash=bindparam("details_listing_hash"),
+                ),
+                rows,
+            )
+    return changed
+
+
+def iter_url_fetch_stats(source: str, chunk_size: int = 5000) -> Iterator[Dict[str, Any]]:
+    """
+    逐筆產出指定來源所有 URL 的抓取紀錄，供 recrawl scheduler 計算重抓價值。
+
+    以 stream_rows 分批讀取，記憶體用量與 tb_urls 的大小無關。
+
+    Yields:
+        Dict[str, Any]: source_url、details_fetched_at、scheduled_at、change_count、observed_hours、
+            listing_hash、details_listing_hash、updated_at (最近一次在搜尋結果列表上看到的時間)。
+    """
+    table = metadata.tables["tb_urls"]
+    statement = select(
+        table.c.source_url, table.c.details_fetched_at, table.c.scheduled_at,
+        table.c.change_count, table.c.observed_hours,
+        table.c.listing_hash, table.c.details_listing_hash, table.c.updated_at,
+    ).where(table.c.source == source)
+    for rows in stream_rows(statement, chunk_size):
+        yield from rows
+
+
+def mark_urls_scheduled(urls: Iterable[str], scheduled_at: Optional[datetime] = None) -> None:
+    """記錄 URL 已被排入詳情抓取，避免在抓取完成前被下一輪重複排程。"""
+    urls = list(urls)
+    scheduled_at = scheduled_at or datetime.now()
+    table = metadata.tables["tb_urls"]
+    with get_engine().begin() as connection:
+        for start in range(0, len(urls), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = urls[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            connection.execute(update(table).where(table.c.source_url.in_(chunk)).values(scheduled_at=scheduled_at))
+
+
+def stream_rows(statement: Select, chunk_size: int = 5000, read_only: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    以伺服器端游標 (server-side cursor) 串流查詢結果，每次產出一批資料列。
+
+    與一次性 `fetchall()` 不同，資料會分批從 MySQL 取回，
+    記憶體用量只與 chunk_size 相關，與結果集總大小無關。
+    產生器被關閉 (例如客戶端中斷下載) 時，連線會隨之釋放。
+
+    Args:
+        statement (Select): 要執行的查詢語句。
+        chunk_size (int): 每批資料列的筆數。
+        read_only (bool): 為 True 時改在唯讀副本上執行 (見 connection.get_read_engine)，結果可能落後主庫數秒；
+            只有結果不會用來決定寫入內容的讀取 (例如 API 匯出) 才應該開啟。
+
+    Yields:
+        List[Dict[str, Any]]: 一批以欄位名稱為鍵的資料列。
+    """
+    engine = get_read_engine() if read_only else get_engine()
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(statement)
+        for partition in result.mappings().partitions(chunk_size):
+            yield [dict(row) for row in partition]
+
+
+# ==============================================================================
+# 公司維度 (tb_companies)
+# ==============================================================================
+
+# company_id -> 最近一次寫入 (或從資料庫讀到) 的公司欄位值，由本程序的所有批次共用
+_company_cache: LRUCache[str, Tuple[Any, ...]] = LRUCache(config.COMPANY_CACHE_SIZE)
+
+
+def upsert_companies(
+    rows: Iterable[Dict[str, Any]], updated_at: Optional[datetime] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    以 write-through 快取寫入公司資料：只有新的或欄位值有變動的公司才會寫入 tb_companies。
+
+    先查程序內的 LRU 快取，未命中的公司以一次 IN 查詢從資料庫讀回並放入快取，
+    寫入成功後再以新值更新快取。快取只反映本程序看過的資料：其他 worker 寫入的變動
+    最多造成一次多餘的寫入，或在快取項目被淘汰前略過一次寫入。
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): 含 company_id 與 COMPANY_ATTRIBUTES 欄位的資料列 (例如職缺資料)，
+            同一家公司以最後一筆為準。
+        updated_at (Optional[datetime]): 寫入時間，預設為現在。
+
+    Returns:
+        Dict[str, Optional[Dict[str, Any]]]: 實際寫入的 company_id -> 寫入前的公司欄位 (新公司為 None)，
+            供呼叫端重算受影響的統計 (例如公司的產業變更)。
+    """
+    companies = {
+        row["company_id"]: tuple(row.get(name) for name in COMPANY_ATTRIBUTES)
+        for row in rows if row.get("company_id")
+    }
+    previous: Dict[str, Tuple[Any, ...]] = {}
+    missing: List[str] = []
+    for company_id in companies:
+        cached = _company_cache.get(company_id)
+        CACHE_LOOKUPS.labels("companies", "miss" if cached is None else "hit").inc()
+        if cached is None:
+            missing.append(company_id)
+        else:
+            previous[company_id] = cached
+
+    table = metadata.tables["tb_companies"]
+    engine = get_engine()
+    changed: Dict[str, Tuple[Any, ...]] = {}
+    with engine.begin() as connection:
+        for start in range(0, len(missing), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = missing[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            query = select(table.c.company_id, *(table.c[name] for name in COMPANY_ATTRIBUTES)).where(
+                table.c.company_id.in_(chunk)
+            )
+            for company_id, *values in connection.execute(query):
+                previous[company_id] = tuple(values)
+                _company_cache.put(company_id, tuple(values))
+
+        changed = {company_id: values for company_id, values in companies.items() if previous.get(company_id) != values}
+        if changed:
+            updated_at = updated_at or datetime.now()
+            data = [
+                {"company_id": company_id, **dict(zip(COMPANY_ATTRIBUTES, values)), "updated_at": updated_at}
+                for company_id, values in changed.items()
+            ]
+            columns = (*COMPANY_ATTRIBUTES, "updated_at")
+            connection.execute(_build_upsert(
+                engine.dialect.name, table, data, lambda new_row: {name: getattr(new_row, name) for name in columns}
+            ))
+            ROWS_UPSERTED.labels("tb_companies").inc(len(data))
+
+    for company_id, values in changed.items():
+        _company_cache.put(company_id, values)
+    return {
+        company_id: dict(zip(COMPANY_ATTRIBUTES, previous[company_id])) if company_id in previous else None
+        for company_id in changed
+    }
+
+
+
+# ==============================================================================
+# 任務進度 (tb_crawl_progress)
+# ==============================================================================
+
+def upsert_crawl_progress(snapshot: Dict[str, Any]) -> None:
+    """
+    寫入任務的進度快照 (ProgressReporter 的 publish 函數)。
+
+    Args:
+        snapshot (Dict[str, Any]): ProgressReporter.snapshot() 的結果。
+    """
+    table = metadata.tables["tb_crawl_progress"]
+    engine = get_engine()
+    columns = [name for name in snapshot if name not in ("task_id", "started_at")]
+    with engine.begin() as connection:
+        connection.execute(_build_upsert(
+            engine.dialect.name, table, [snapshot], lambda new_row: {name: getattr(new_row, name) for name in columns}
+        ))
+
+
+def prune_crawl_progress(before: datetime) -> int:
+    """
+    刪除最後更新早於指定時間的任務進度紀錄。
+
+    Args:
+        before (datetime): 刪除 updated_at 早於此時間的紀錄。
+
+    Returns:
+        int: 刪除的筆數。
+    """
+    table = metadata.tables["tb_crawl_progress"]
+    with get_engine().begin() as connection:
+        result = connection.execute(delete(table).where(table.c.updated_at < before))
+    return result.rowcount
+
+
+# ==============================================================================
+# 職缺保留與歸檔 (tb_jobs -> tb_jobs_archive)
+# ==============================================================================
+
+def get_oldest_job_date() -> Optional[date]:
+    """回傳 tb_jobs 中最早的 update_date；表格為空時回傳 None。"""
+    job_table = metadata.tables["tb_jobs"]
+    with get_engine().connect() as connection:
+        return connection.execute(select(func.min(job_table.c.update_date))).scalar()
+
+
+def refresh_listed_jobs(listed_since: datetime, older_than: date) -> int:
+    """
+    把仍出現在搜尋結果列表上、但 update_date 早於 older_than 的職缺，update_date 前進到 URL 最近一次被看到的日期。
+
+    列表摘要沒有變動的職缺不會重抓詳情 (見 get_urls_needing_details)，update_date 因此不再前進；
+    以 tb_urls.updated_at (URL 探索最近一次看到的時間) 補上，避免仍在刊登的職缺被當成已下架而歸檔。
+    只會往後調整：最近一次看到的日期不比 update_date 新的職缺維持不變。
+
+    Args:
+        listed_since (datetime): 在此時間之後於列表上出現過的 URL 視為仍在刊登。
+        older_than (date): 只更新 update_date 早於此日期的職缺。
+
+    Returns:
+        int: 更新的職缺數。
+    """
+    url_table = metadata.tables["tb_urls"]
+    job_table = metadata.tables["tb_jobs"]
+    listed = select(url_table.c.source_url, url_table.c.updated_at).where(url_table.c.updated_at >= listed_since)
+    refreshed = 0
+    for rows in stream_rows(listed):
+        # 依最近一次看到的日期分組；職缺 URL 的最後一段即 job_id (與詳情任務取得 job_id 的方式相同)
+        by_seen_date: Dict[date, List[str]] = {}
+        for row in rows:
+            by_seen_date.setdefault(row["updated_at"].date(), []).append(row["source_url"].split("/")[-1].split("?")[0])
+        with get_engine().begin() as connection:
+            for seen_date, job_ids in by_seen_date.items():
+                for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+                    result = connection.execute(
+                        update(job_table)
+                        .where(
+                            job_table.c.job_id.in_(job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]),
+                            job_table.c.update_date < older_than,
+                            job_table.c.update_date < seen_date,
+                        )
+                        .values(update_date=seen_date)
+                    )
+                    refreshed += result.rowcount or 0
+    return refreshed
+
+
+def get_jobs_page(start: date, end: date, after_job_id: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    以 job_id 做 keyset 分頁，讀取 update_date 在 [start, end) 之間的職缺 (完整欄位)。
+
+    Args:
+        start (date): update_date 下界 (含)。
+        end (date): update_date 上界 (不含)。
+        after_job_id (str): 上一頁最後一筆的 job_id。
+        limit (int): 每頁筆數。
+
+    Returns:
+        List[Dict[str, Any]]: 職缺資料列，依 job_id 排序。
+    """
+    job_table = metadata.tables["tb_jobs"]
+    query = (
+        select(job_table)
+        .where(job_table.c.update_date >= start, job_table.c.update_date < end, job_table.c.job_id > after_job_id)
+        .order_by(job_table.c.job_id)
+        .limit(limit)
+    )
+    with get_engine().connect() as connection:
+        return [dict(row) for row in connection.execute(query).mappings()]
+
+
+def archive_job_rows(rows: List[Dict[str, Any]], archived_at: Optional[datetime] = None) -> None:
+    """將職缺資料列寫入 tb_jobs_archive (同一職缺再次歸檔時覆寫)。"""
+    if not rows:
+        return
+    archive_table = metadata.tables["tb_jobs_archive"]
+    archived_at = archived_at or datetime.now()
+    data = [{**row, "archived_at": archived_at} for row in rows]
+    update_cols = [column.name for column in archive_table.columns if not column.primary_key]
+    engine = get_engine()
+    chunk_size = max(1, _SQLITE_MAX_VARIABLES // len(archive_table.columns))
+    with engine.begin() as connection:
+        for start in range(0, len(data), chunk_size):
+            connection.execute(_build_upsert(
+                engine.dialect.name, archive_table, data[start:start + chunk_size],
+                lambda new_row: {name: getattr(new_row, name) for name in update_cols},
+            ))
+    ROWS_UPSERTED.labels("tb_jobs_archive").inc(len(data))
+
+
+def delete_jobs(job_ids: List[str], older_than: date, keep_jobs: bool = False) -> None:
+    """
+    刪除已歸檔的職缺及其 SimHash 分段索引，並在 tb_job_changes 記錄 deleted 變更。
+    被刪除的代表職缺所在的近似重複群組，會由最早刊登的存活成員接任代表。
+
+    Args:
+        job_ids (List[str]): 要刪除的職缺。
+        older_than (date): 只刪除 update_date 早於此日期的資料列 (期間被重新抓取的職缺會保留)。
+        keep_jobs (bool): 為 True 時只刪除分段索引 (tb_jobs 的資料列稍後以 DROP PARTITION 移除)。
+    """
+    job_table = metadata.tables["tb_jobs"]
+    band_table = metadata.tables["tb_job_simhash_bands"]
+    change_table = metadata.tables["tb_job_changes"]
+    changed_at = datetime.now()
+    changes: List[Dict[str, Any]] = []
+    all_deleted: Set[str] = set()
+    with _job_change_writer(), get_engine().begin() as connection:
+        for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            # 鎖定要刪除的資料列：歸檔之後才被重新抓取 (update_date 已前進) 的職缺連同分段索引一起保留
+            deleted = connection.execute(
+                select(job_table.c.job_id, job_table.c.version)
+                .where(job_table.c.job_id.in_(chunk), job_table.c.update_date < older_than)
+                .with_for_update()
+            ).all()
+            if not deleted:
+                continue
+            deleted_ids = [job_id for job_id, _ in deleted]
+            all_deleted.update(deleted_ids)
+            chunk_changes = [
+                {"job_id": job_id, "change_type": JOB_CHANGE_DELETED, "version": (version or 0) + 1, "changed_at": changed_at}
+                for job_id, version in deleted
+            ]
+            connection.execute(change_table.insert(), chunk_changes)
+            ROWS_UPSERTED.labels("tb_job_changes").inc(len(chunk_changes))
+            changes.extend(chunk_changes)
+            connection.execute(delete(band_table).where(band_table.c.job_id.in_(deleted_ids)))
+            if not keep_jobs:
+                connection.execute(
+                    delete(job_table).where(job_table.c.job_id.in_(deleted_ids), job_table.c.update_date < older_than)
+                )
+        # 代表職缺被刪除的群組在同一個交易中選出新的代表，避免成員 (與之後併入的新職缺) 指向不存在的職缺
+        if all_deleted and (repointed := _promote_cluster_canonicals(connection, all_deleted)):
+            logger.info(f"{repointed} 筆職缺的代表職缺已被刪除，改指向群組中新的代表職缺。")
+    _publish_job_changes(changes)
+
+
+def prune_job_changes(before: datetime) -> int:
+    """
+    刪除早於指定時間的職缺變更紀錄。
+
+    Args:
+        before (datetime): 刪除 changed_at 早於此時間的紀錄。
+
+    Returns:
+        int: 刪除的筆數。
+    """
+    table = metadata.tables["tb_job_changes"]
+    with get_engine().begin() as connection:
+        result = connection.execute(delete(table).where(table.c.changed_at < before))
+    return result.rowcount
+
+
+def get_job_changes(since: int, limit: int, now: Optional[datetime] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    依 change_id 順序讀取變更紀錄 (供 /jobs/changes 分頁讀取)。
+
+    讀取主庫：變更紀錄以遞增的 change_id 作為游標，副本延遲可能讓下游跳過尚未複寫的紀錄。
+    同時進行的寫入交易可能較晚才提交較小的 change_id，因此只回傳不超過進行中寫入者 floor 的紀錄
+    (見 _job_change_writer)；超過 config.JOB_CHANGE_WRITER_TIMEOUT_SECONDS 的登記視為已放棄。
+
+    Args:
+        since (int): 游標，只回傳 change_id 大於此值的紀錄。
+        limit (int): 最多回傳的筆數。
+        now (Optional[datetime]): 判斷登記是否逾時的目前時間，預設為現在。
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[int]]: 變更紀錄，以及目前保留中最小的 change_id (沒有紀錄時為 None)。
+    """
+    table = metadata.tables["tb_job_changes"]
+    writer_table = metadata.tables["tb_job_change_writers"]
+    active_since = (now or datetime.now()) - timedelta(seconds=config.JOB_CHANGE_WRITER_TIMEOUT_SECONDS)
+    with get_engine().connect() as connection:
+        oldest = connection.execute(select(func.min(table.c.change_id))).scalar()
+        rows = connection.execute(
+            select(table).where(table.c.change_id > since).order_by(table.c.change_id).limit(limit)
+        ).mappings().all()
+        # 必須在讀取變更之後才讀取寫入者：讀取變更時還沒登記的寫入者，配發的 change_id 都大於已讀到的紀錄
+        floor = connection.execute(
+            select(func.min(writer_table.c.floor_change_id)).where(writer_table.c.started_at >= active_since)
+        ).scalar()
+    return [dict(row) for row in rows if floor is None or row["change_id"] <= floor], oldest
+
+
+def prune_job_change_writers(before: datetime) -> int:
+    """
+    刪除早於指定時間的寫入者登記 (寫入程序中途終止而沒有移除的登記)。
+
+    Args:
+        before (datetime): 刪除 started_at 早於此時間的登記。
+
+    Returns:
+        int: 刪除的筆數。
+    """
+    table = metadata.tables["tb_job_change_writers"]
+    with get_engine().begin() as connection:
+        result = connection.execute(delete(table).where(table.c.started_at < before))
+    return result.rowcount
+
+
+# ==============================================================================
+# 預先彙總統計 (tb_job_stats)
+# ==============================================================================
+
+# 彙總維度即 tb_jobs 的欄位名稱 (industry 來自以 company_id 關聯的 tb_companies)。
+# job_category 是以 ", " 串接的多值欄位，會被拆開分別計數。
+STAT_DIMENSIONS: Tuple[str, ...] = ("job_category", "location", "industry", "posted_date")
+
+_MONTHLY_SALARY_TYPE = 50  # 104 API 的 salaryType：50 代表月薪
+_OPEN_ENDED_SALARY = 9999999  # salaryMax 為此值時代表「以上」，沒有上限
+_STAT_SOURCE_COLUMNS: Tuple[str, ...] = (
+    "job_id", "job_category", "location", "industry", "posted_date",
+    "salary_type", "salary_min", "salary_max", "remote_work_type",
+)
+_LIKE_CLAUSE_CHUNK_SIZE = 50
+
+
+def _stat_source() -> Tuple[Dict[str, Any], Any]:
+    """回傳統計來源欄位 (名稱 -> 欄位) 與 tb_jobs LEFT JOIN tb_companies 的 FROM 子句。"""
+    job_table = metadata.tables["tb_jobs"]
+    company_table = metadata.tables["tb_companies"]
+    columns = {
+        name: company_table.c[name] if name in COMPANY_ATTRIBUTES else job_table.c[name]
+        for name in _STAT_SOURCE_COLUMNS
+    }
+    joined = job_table.outerjoin(company_table, job_table.c.company_id == company_table.c.company_id)
+    return columns, joined
+
+
+def _dimension_values(dimension: str, value: Any) -> List[str]:
+    """將單一欄位值轉為該維度下的統計鍵 (job_category 會被拆成多個鍵)。"""
+    import numpy as np
+    import pandas as pd
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return []
+    if dimension == "job_category":
+        return [item.strip() for item in str(value).split(",") if item.strip()]
+    if isinstance(value, (date, datetime)):
+        return [value.strftime("%Y-%m-%d")]
+    text = str(value).strip()
+    return [text] if text else []
+
+
+def extract_stat_keys(rows: Iterable[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    """
+    從職缺資料列中取出各彙總維度的值，用於決定哪些統計需要重新計算。
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): 職缺資料列 (例如 Job.model_dump() 的結果)。
+
+    Returns:
+        Dict[str, Set[str]]: 維度名稱 -> 受影響的維度值集合。
+    """
+    keys: Dict[str, Set[str]] = {dimension: set() for dimension in STAT_DIMENSIONS}
+    for row in rows:
+        for dimension in STAT_DIMENSIONS:
+            keys[dimension].update(_dimension_values(dimension, row.get(dimension)))
+    return keys
+
+
+def get_stat_keys_for_jobs(job_ids: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    讀取資料庫中既有職缺目前的維度值。
+
+    應在 upsert 之前呼叫：若某職缺的地區或類別被更新，舊值所屬的統計也需要重新計算。
+
+    Args:
+        job_ids (Iterable[str]): 即將被寫入的職缺 ID。
+
+    Returns:
+        Dict[str, Set[str]]: 維度名稱 -> 維度值集合。
+    """
+    job_ids = list(job_ids)
+    source_columns, joined = _stat_source()
+    columns = [source_columns[dimension] for dimension in STAT_DIMENSIONS]
+    rows: List[Dict[str, Any]] = []
+    with get_engine().connect() as connection:
+        for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            query = select(*columns).select_from(joined).where(source_columns["job_id"].in_(chunk))
+            rows.extend(dict(row) for row in connection.execute(query).mappings())
+    return extract_stat_keys(rows)
+
+
+def _load_stat_source(connection, dimension: Optional[str], values: Set[str]) -> "pd.DataFrame":
+    """讀取計算統計所需的 tb_jobs (與 tb_companies) 欄位；dimension 為 None 時讀取全表。"""
+    import pandas as pd
+    source_columns, joined = _stat_source()
+    query = select(*source_columns.values()).select_from(joined)
+    if dimension is None:
+        return pd.read_sql(query, connection)
+
+    column = source_columns[dimension]
+    ordered = sorted(values)
+    frames: List[pd.DataFrame] = []
+    if dimension == "job_category":
+        # 多值欄位無法用 IN 比對，改以 LIKE 取出候選列，聚合時再精確過濾
+        for start in range(0, len(ordered), _LIKE_CLAUSE_CHUNK_SIZE):
+            chunk = ordered[start:start + _LIKE_CLAUSE_CHUNK_SIZE]
+            frames.append(pd.read_sql(query.where(or_(*(column.contains(v) for v in chunk))), connection))
+    else:
+        if dimension == "posted_date":
+            ordered = [datetime.strptime(v, "%Y-%m-%d").date() for v in ordered]
+        for start in range(0, len(ordered), _IN_CLAUSE_CHUNK_SIZE):
+            chunk = ordered[start:start + _IN_CLAUSE_CHUNK_SIZE]
+            frames.append(pd.read_sql(query.where(column.in_(chunk)), connection))
+    if not frames:
+        return pd.DataFrame(columns=list(_STAT_SOURCE_COLUMNS))
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset="job_id")
+
+
+def _aggregate_dimension(
+    df: "pd.DataFrame", dimension: str, only_values: Optional[Set[str]]
+) -> "pd.DataFrame":
+    """將職缺資料依單一維度聚合成 tb_job_stats 的資料列。"""
+    import pandas as pd
+    if df.empty:
+        return pd.DataFrame()
+
+    if dimension == "job_category":
+        keyed = df.assign(dimension_value=df["job_category"].astype("string").str.split(","))
+        keyed = keyed.explode("dimension_value")
+    elif dimension == "posted_date":
+        keyed = df.assign(dimension_value=pd.to_datetime(df["posted_date"]).dt.strftime("%Y-%m-%d"))
+    else:
+        keyed = df.assign(dimension_value=df[dimension].astype("string"))
+    keyed["dimension_value"] = keyed["dimension_value"].astype("string").str.strip()
+    keyed = keyed[keyed["dimension_value"].notna() & (keyed["dimension_value"] != "")]
+    keyed = keyed.drop_duplicates(subset=["job_id", "dimension_value"])
+    if only_values is not None:
+        keyed = keyed[keyed["dimension_value"].isin(only_values)]
+    if keyed.empty:
+        return pd.DataFrame()
+
+    salary_min = pd.to_numeric(keyed["salary_min"], errors="coerce")
+    salary_max = pd.to_numeric(keyed["salary_max"], errors="coerce")
+    salary_max = salary_max.where((salary_max > 0) & (salary_max < _OPEN_ENDED_SALARY))
+    keyed = keyed.assign(
+        salary_min=salary_min,
+        salary_max=salary_max,
+        salary_mid=((salary_min + salary_max) / 2).fillna(salary_min),
+        is_remote=~keyed["remote_work_type"].astype("string").fillna("").isin(["", "0"]),
+    )
+    monthly = keyed[
+        (pd.to_numeric(keyed["salary_type"], errors="coerce") == _MONTHLY_SALARY_TYPE)
+        & (keyed["salary_min"] > 0)
+    ]
+
+    grouped = keyed.groupby("dimension_value")
+    stats = pd.DataFrame({
+        "job_count": grouped.size(),
+        "remote_count": grouped["is_remote"].sum().astype(int),
+    })
+    if not monthly.empty:
+        monthly_grouped = monthly.groupby("dimension_value")
+        quantiles = monthly_grouped["salary_mid"].quantile([0.25, 0.5, 0.75]).unstack()
+        stats = stats.join(pd.DataFrame({
+            "salary_count": monthly_grouped.size(),
+            "salary_min_avg": monthly_grouped["salary_min"].mean(),
+            "salary_max_avg": monthly_grouped["salary_max"].mean(),
+            "salary_p25": quantiles[0.25],
+            "salary_p50": quantiles[0.5],
+            "salary_p75": quantiles[0.75],
+        }))
+    stats = stats.reindex(columns=[
+        "job_count", "remote_count", "salary_count", "salary_min_avg",
+        "salary_max_avg", "salary_p25", "salary_p50", "salary_p75",
+    ])
+    stats["salary_count"] = stats["salary_count"].fillna(0).astype(int)
+    stats["remote_ratio"] = (stats["remote_count"] / stats["job_count"]).round(4)
+    stats = stats.reset_index().rename(columns={"index": "dimension_value"})
+    stats.insert(0, "dimension", dimension)
+    return stats
+
+
+def refresh_job_stats(affected: Optional[Dict[str, Set[str]]] = None) -> int:
+    """
+    重新計算 tb_job_stats 中受影響的統計列。
+
+    只讀取與受影響維度值相關的 tb_jobs 資料列，因此在每次爬取後執行的成本
+    與「本次變動的職缺數」相關，而不是整張表的大小。
+    已經沒有任何職缺的維度值會從統計表中刪除。
+
+    Args:
+        affected (Optional[Dict[str, Set[str]]]): 維度名稱 -> 需要重算的維度值。
+            為 None 時對所有維度做完整重建 (首次部署或資料修復時使用)。
+
+    Returns:
+        int: 寫入的統計列數。
+    """
+    import pandas as pd
+    engine = get_engine()
+    stats_table = metadata.tables["tb_job_stats"]
+    frames: List[pd.DataFrame] = []
+    stale: Dict[str, Set[str]] = {}
+
+    with engine.connect() as connection:
+        full_source = _load_stat_source(connection, None, set()) if affected is None else None
+        for dimension in STAT_DIMENSIONS:
+            values = None if affected is None else affected.get(dimension, set())
+            if values is not None and not values:
+                continue
+            source = full_source if full_source is not None else _load_stat_source(connection, dimension, values)
+            stats = _aggregate_dimension(source, dimension, values)
+
+            existing_query = select(stats_table.c.dimension_value).where(stats_table.c.dimension == dimension)
+            if values is not None:
+                existing_query = existing_query.where(stats_table.c.dimension_value.in_(values))
+            existing = set(connection.execute(existing_query).scalars().all())
+            computed = set(stats["dimension_value"]) if not stats.empty else set()
+            stale[dimension] = existing - computed
+            if not stats.empty:
+                frames.append(stats)
+
+    with engine.begin() as connection:
+        for dimension, values in stale.items():
+            ordered = sorted(values)
+            for start in range(0, len(ordered), _IN_CLAUSE_CHUNK_SIZE):
+                connection.execute(
+                    delete(stats_table).where(
+                        stats_table.c.dimension == dimension,
+                        stats_table.c.dimension_value.in_(ordered[start:start + _IN_CLAUSE_CHUNK_SIZE]),
+                    )
+                )
+
+    if not frames:
+        return 0
+    df_stats = pd.concat(frames, ignore_index=True)
+    df_stats["updated_at"] = datetime.now()
+    upsert_from_dataframe(df_stats, "tb_job_stats")
+    logger.info(f"已重新計算 {len(df_stats)} 筆職缺統計 (tb_job_stats)。")
+    return len(df_stats)
+
+
+
+# ==============================================================================
+# 近似重複職缺 (SimHash / LSH)
+# ==============================================================================
+
+def _get_simhash_candidates(connection, keys: Iterable[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """以 LSH 分段表找出與任一 (公司代碼, 簽章) 落在同一個分段的既有職缺。"""
+    band_table = metadata.tables["tb_job_simhash_bands"]
+    job_table = metadata.tables["tb_jobs"]
+    triples = sorted({
+        (company_id, band, bucket)
+        for company_id, signature in keys
+        for band, bucket in enumerate(lsh_bands(signature))
+    })
+    rows: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(triples), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = triples[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        query = (
+            select(job_table.c.job_id, job_table.c.company_id, job_table.c.simhash, job_table.c.canonical_job_id)
+            .join(band_table, band_table.c.job_id == job_table.c.job_id)
+            .where(tuple_(band_table.c.company_id, band_table.c.band, band_table.c.bucket).in_(chunk))
+            .where(job_table.c.simhash.is_not(None))
+        )
+        for row in connection.execute(query).mappings():
+            rows[row["job_id"]] = dict(row)
+    return list(rows.values())
+
+
+def _get_cluster_roots_with_members(connection, job_ids: List[str]) -> Set[str]:
+    """找出哪些職缺目前是其他職缺的代表職缺 (有其他職缺指向它)。"""
+    job_table = metadata.tables["tb_jobs"]
+    roots: Set[str] = set()
+    for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        query = (
+            select(job_table.c.canonical_job_id)
+            .where(job_table.c.canonical_job_id.in_(chunk))
+            .where(job_table.c.job_id != job_table.c.canonical_job_id)
+            .distinct()
+        )
+        roots.update(connection.execute(query).scalars().all())
+    return roots
+
+
+def _promote_cluster_canonicals(connection: Connection, deleted_ids: Set[str]) -> int:
+    """
+    被刪除的代表職缺所在的群組中，以最早刊登的存活成員 (同日以 job_id 排序) 作為新的代表，其餘成員改指向它。
+
+    Args:
+        connection (Connection): 刪除職缺所在的交易。
+        deleted_ids (Set[str]): 本次刪除的職缺。
+
+    Returns:
+        int: 改指向新代表職缺的成員數 (含新代表自己)。
+    """
+    job_table = metadata.tables["tb_jobs"]
+    orphans: Dict[str, List[Tuple[Optional[date], str]]] = {}
+    deleted = sorted(deleted_ids)
+    for start in range(0, len(deleted), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = deleted[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        rows = connection.execute(
+            select(job_table.c.job_id, job_table.c.canonical_job_id, job_table.c.posted_date)
+            .where(job_table.c.canonical_job_id.in_(chunk))
+        ).all()
+        for job_id, canonical_job_id, posted_date in rows:
+            # keep_jobs 時被刪除的資料列仍在 tb_jobs 中，不能成為新的代表
+            if job_id not in deleted_ids:
+                orphans.setdefault(canonical_job_id, []).append((posted_date, job_id))
+
+    repointed = 0
+    for members in orphans.values():
+        members.sort(key=lambda member: (member[0] is None, member[0] or date.min, member[1]))
+        member_ids = [job_id for _, job_id in members]
+        connection.execute(
+            update(job_table).where(job_table.c.job_id.in_(member_ids)).values(canonical_job_id=member_ids[0])
+        )
+        repointed += len(member_ids)
+    return repointed
+
+
+def assign_canonical_job_ids(job_batch: List[Dict[str, Any]]) -> int:
+    """
+    為一批即將寫入的職缺計算 SimHash 簽章並指定 canonical_job_id (就地修改 job_batch)。
+
+    只在同一家公司的職缺之間比對：不同公司的制式內文不應被視為同一個職缺。
+    代表職缺是群組中最早寫入的職缺；已經有其他職缺指向它的代表職缺不會被併入別的群組，
+    避免群組成員失去代表。此函數也會同步更新 tb_job_simhash_bands，應在寫入 tb_jobs 前呼叫。
+
+    Args:
+        job_batch (List[Dict[str, Any]]): 職缺資料列 (需包含 job_id、company_id、description)，需已完成文字清理。
+
+    Returns:
+        int: 本批次中被判定為重複 (canonical_job_id 不是自己) 的職缺數。
+    """
+    if not job_batch:
+        return 0
+    for job in job_batch:
+        job["simhash"] = simhash(job.get("description"))
+    keys = [(job.get("company_id") or "", job["simhash"]) for job in job_batch if job["simhash"] is not None]
+
+    with get_engine().connect() as connection:
+        candidates = _get_simhash_candidates(connection, keys) if keys else []
+        protected_roots = _get_cluster_roots_with_members(connection, [job["job_id"] for job in job_batch])
+
+    index: SimHashIndex[str] = SimHashIndex()
+    canonicals: Dict[str, str] = {}
+    for row in candidates:
+        index.add(row["job_id"], row["simhash"], row["company_id"] or "")
+        canonicals[row["job_id"]] = row["canonical_job_id"] or row["job_id"]
+
+    duplicates = 0
+    for job in job_batch:
+        job_id, signature, company_id = job["job_id"], job["simhash"], job.get("company_id") or ""
+        # 重新爬取的職缺不能比對到自己舊的簽章
+        index.remove(job_id)
+        canonical = job_id
+        if signature is not None and job_id not in protected_roots:
+            matches = index.query(signature, company_id)
+            if matches:
+                canonical = canonicals[matches[0][1]]
+        job["canonical_job_id"] = canonical
+        duplicates += canonical != job_id
+        if signature is not None:
+            # 同一批次內後面的職缺也要能比對到前面的職缺
+            index.add(job_id, signature, company_id)
+            canonicals[job_id] = canonical
+
+    replace_simhash_bands({job["job_id"]: (job.get("company_id") or "", job["simhash"]) for job in job_batch})
+    if duplicates:
+        logger.info(f"本批次 {len(job_batch)} 筆職缺中有 {duplicates} 筆為近似重複。")
+    return duplicates
+
+
+def replace_simhash_bands(signatures: Dict[str, Tuple[str, Optional[int]]]) -> None:
+    """
+    以新的簽章取代職缺在 tb_job_simhash_bands 中的分段資料。
+
+    Args:
+        signatures (Dict[str, Tuple[str, Optional[int]]]): job_id -> (公司代碼, 簽章)；簽章為 None 時只刪除舊資料。
+    """
+    import pandas as pd
+    band_table = metadata.tables["tb_job_simhash_bands"]
+    job_ids = list(signatures)
+    with get_engine().begin() as connection:
+        for start in range(0, len(job_ids), _IN_CLAUSE_CHUNK_SIZE):
+            connection.execute(
+                delete(band_table).where(band_table.c.job_id.in_(job_ids[start:start + _IN_CLAUSE_CHUNK_SIZE]))
+            )
+    rows = [
+        row
+        for job_id, (company_id, signature) in signatures.items()
+        if signature is not None
+        for row in band_rows(signature, company_id=company_id, job_id=job_id)
+    ]
+    if rows:
+        upsert_from_dataframe(pd.DataFrame(rows), "tb_job_simhash_bands")
+
+
+def update_job_dedup_columns(rows: List[Dict[str, Any]]) -> None:
+    """
+    只更新既有職缺的 simhash 與 canonical_job_id 欄位 (用於全表重建)。
+
+    Args:
+        rows (List[Dict[str, Any]]): 每筆需包含 job_id、simhash、canonical_job_id。
+    """
+    if not rows:
+        return
+    job_table = metadata.tables["tb_jobs"]
+    stmt = (
+        update(job_table)
+        .where(job_table.c.job_id == bindparam("b_job_id"))
+        .values(simhash=bindparam("b_simhash"), canonical_job_id=bindparam("b_canonical_job_id"))
+    )
+    params = [
+        {"b_job_id": row["job_id"], "b_simhash": row["simhash"], "b_canonical_job_id": row["canonical_job_id"]}
+        for row in rows
+    ]
+    with get_engine().begin() as connection:
+        connection.execute(stmt, params)
@@ -3,17 +3,23 @@
 定義應用程式中使用的所有資料庫表格結構。
 """
 from datetime import datetime, date
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import BigInteger, Double, Integer
 from sqlmodel import Field, SQLModel, Column, Text, TIMESTAMP, DATE
 
-class Job(SQLModel, table=True):
-    """代表單一職缺的資料模型"""
-    __tablename__ = "tb_jobs"
+from crawler import config
+from crawler.database.compression import job_text_type
+
+# description 等大型文字欄位的型別，依 config.JOBS_TEXT_CODEC 決定是否壓縮儲存 (見 compression 模組)
+JOB_TEXT_TYPE = job_text_type(config.JOBS_TEXT_CODEC)
+
+class JobBase(SQLModel):
+    """職缺欄位定義，由資料表模型 Job 與 API 回應模型 JobRead 共用。"""
 
     job_id: str = Field(primary_key=True, max_length=50)
     title: str = Field(max_length=255)
-    description: str = Field(sa_column=Column(Text))
+    description: str = Field(sa_column=Column(JOB_TEXT_TYPE))
     posted_date: Optional[date] = Field(default=None, sa_column=Column(DATE))
     
     salary: str = Field(max_length=255)
@@ -27,30 +33,58 @@ class Job(SQLModel, table=True):
     
     location: str = Field(max_length=100)
     company_address: str = Field(max_length=255)
-    longitude: Optional[str] = Field(default=None, max_length=50)
-    latitude: Optional[str] = Field(default=None, max_length=50)
+    longitude: Optional[float] = Field(default=None, sa_column=Column(Double))
+    latitude: Optional[float] = Field(default=None, sa_column=Column(Double))
+    # 由經緯度計算的 Geohash，供半徑查詢以前綴走索引
+    geohash: Optional[str] = Field(default=None, max_length=12, index=True)
     
     degree: str = Field(max_length=100)
     working_experience: str = Field(max_length=100)
     department: Optional[str] = Field(default=None, sa_column=Column(Text))
-    qualification_required: Optional[str] = Field(default=None, sa_column=Column(Text))
-    qualification_bonus: Optional[str] = Field(default=None, sa_column=Column(Text))
-    qualification_other: Optional[str] = Field(default=None, sa_column=Column(Text))
+    qualification_required: Optional[str] = Field(default=None, sa_column=Column(JOB_TEXT_TYPE))
+    qualification_bonus: Optional[str] = Field(default=None, sa_column=Column(JOB_TEXT_TYPE))
+    qualification_other: Optional[str] = Field(default=None, sa_column=Column(JOB_TEXT_TYPE))
     
-    company_id: str = Field(max_length=50)
-    company_name: str = Field(max_length=255)
-    industry: Optional[str] = Field(default=None, max_length=255)
-    employees: Optional[str] = Field(default=None, max_length=255)
+    # 公司名稱、產業與員工人數存放於 tb_companies，職缺只保留 company_id
+    company_id: str = Field(max_length=50, index=True)
 
     remote_work_type: Optional[str] = Field(default=None, max_length=50)
-    remote_work_description: Optional[str] = Field(default=None, sa_column=Column(Text))
+    remote_work_description: Optional[str] = Field(default=None, sa_column=Column(JOB_TEXT_TYPE))
 
     job_category: Optional[str] = Field(default=None, sa_column=Column(Text))
+    # 職缺內文的 SimHash 簽章與近似重複群組的代表職缺；代表職缺的 canonical_job_id 等於自己的 job_id
+    simhash: Optional[int] = Field(default=None, sa_column=Column(BigInteger))
+    canonical_job_id: Optional[str] = Field(default=None, max_length=50, index=True)
     contact_person: Optional[str] = Field(default=None, max_length=100)
     contact_phone: Optional[str] = Field(default=None, max_length=255)
     last_processed_resume_at_time: Optional[datetime] = Field(default=None)
     now_timestamp: Optional[datetime] = Field(default=None)
     update_date: date = Field(default_factory=date.today)
+    # 內容雜湊與版本號 (內容變動時加 1)，由 repository.upsert_jobs 維護並記錄到 tb_job_changes
+    version: Optional[int] = Field(default=None)
+    content_hash: Optional[str] = Field(default=None, max_length=32)
+
+class Job(JobBase, table=True):
+    """代表單一職缺的資料模型"""
+    __tablename__ = "tb_jobs"
+
+class Company(SQLModel, table=True):
+    """公司維度表，由職缺詳情任務經由程序內的 write-through 快取寫入，資料沒有變動時不會重寫。"""
+    __tablename__ = "tb_companies"
+    company_id: str = Field(primary_key=True, max_length=50)
+    company_name: str = Field(max_length=255, index=True)
+    industry: Optional[str] = Field(default=None, max_length=255, index=True)
+    employees: Optional[str] = Field(default=None, max_length=255)
+    updated_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP, nullable=True))
+
+# tb_companies 中由職缺 API 提供的公司欄位 (company_id 之外)
+COMPANY_ATTRIBUTES: Tuple[str, ...] = ("company_name", "industry", "employees")
+
+class JobRead(JobBase):
+    """API 回應用的職缺模型：職缺欄位加上從 tb_companies 關聯出的公司資料。"""
+    company_name: Optional[str] = None
+    industry: Optional[str] = None
+    employees: Optional[str] = None
 
 class Url(SQLModel, table=True):
     __tablename__ = "tb_urls"
@@ -59,6 +93,21 @@ class Url(SQLModel, table=True):
     crawled_at: datetime = Field(sa_column=Column(TIMESTAMP))
     updated_at: datetime = Field(sa_column=Column(TIMESTAMP))
     status: str = Field(default="new", max_length=20)
+    # 職缺詳情的抓取紀錄，供 recrawl scheduler 估計每個 URL 的內容變動率
+    details_fetched_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP, nullable=True))
+    scheduled_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP, nullable=True))
+    fetch_count: Optional[int] = Field(default=None)
+    change_count: Optional[int] = Field(default=None)
+    # 有前後兩次抓取可比較的累計時數 (變動率的分母)
+    observed_hours: Optional[float] = Field(default=None)
+    content_hash: Optional[str] = Field(default=None, max_length=32)
+    # 搜尋結果列表上的職缺摘要 (URL 探索時更新)；listing_hash 與上次抓取詳情時的
+    # details_listing_hash 相同時，代表列表上的日期與摘要都沒變，不需要重抓詳情
+    listing_title: Optional[str] = Field(default=None, max_length=255)
+    listing_company: Optional[str] = Field(default=None, max_length=255)
+    listing_date: Optional[str] = Field(default=None, max_length=20)
+    listing_hash: Optional[str] = Field(default=None, max_length=32)
+    details_listing_hash: Optional[str] = Field(default=None, max_length=32)
 
 class Category(SQLModel, table=True):
     __tablename__ = "tb_category"
@@ -70,4 +119,135 @@ class Category(SQLModel, table=True):
     created_at: datetime = Field(sa_column=Column(TIMESTAMP))
     updated_at: datetime = Field(sa_column=Column(TIMESTAMP))
 
-metadata = SQLModel.metadata
\ No newline at end of file
+class CrawlYield(SQLModel, table=True):
+    """每個職務類別的累積爬取成效，供 crawl planner 依歷史產出排序。"""
+    __tablename__ = "tb_crawl_yield"
+    category_id: str = Field(primary_key=True, max_length=50)
+    source: str = Field(max_length=50)
+    crawl_count: int = Field(default=0)
+    request_count: int = Field(default=0)
+    new_url_count: int = Field(default=0)
+    last_request_count: int = Field(default=0)
+    last_new_url_count: int = Field(default=0)
+    # 上次爬取時搜尋結果的總頁數 (各關鍵字取最大值)，決定下次要翻幾頁
+    last_available_pages: int = Field(default=0)
+    last_crawled_at: datetime = Field(sa_column=Column(TIMESTAMP))
+    # 每小時新職缺數的 EWMA 估計，由 repository.record_crawl_yield 更新
+    new_url_rate: Optional[float] = Field(default=None)
+
+class CrawlProgressBase(SQLModel):
+    """執行中或最近完成的爬取任務進度，由 utilis.progress.ProgressReporter 定期更新。"""
+    task_id: str = Field(primary_key=True, max_length=155)
+    task_name: str = Field(max_length=255)
+    # RUNNING / FINALIZING / SUCCESS / FAILURE
+    state: str = Field(max_length=20)
+    total: int = Field(default=0)
+    # 已完成 (成功、失敗或沒有資料) 的項目數
+    attempted: int = Field(default=0)
+    succeeded: int = Field(default=0)
+    failed: int = Field(default=0)
+    in_flight: int = Field(default=0)
+    # 最近一分鐘的每秒完成數，與依此估計的剩餘秒數
+    qps: float = Field(default=0.0)
+    eta_seconds: Optional[float] = Field(default=None)
+    started_at: datetime = Field(sa_column=Column(TIMESTAMP))
+    updated_at: datetime = Field(sa_column=Column(TIMESTAMP, index=True))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP, nullable=True))
+
+class CrawlProgress(CrawlProgressBase, table=True):
+    __tablename__ = "tb_crawl_progress"
+
+class CrawlProgressRead(CrawlProgressBase):
+    """API 回應用的任務進度：stalled 代表任務仍在執行，但超過 config.CRAWL_PROGRESS_STALL_SECONDS 沒有更新。"""
+    stalled: bool = False
+
+class JobStat(SQLModel, table=True):
+    """依單一維度預先彙總的職缺統計，由 repository.refresh_job_stats 增量維護。"""
+    __tablename__ = "tb_job_stats"
+    dimension: str = Field(primary_key=True, max_length=20)
+    dimension_value: str = Field(primary_key=True, max_length=255)
+    job_count: int = Field(default=0)
+    # 薪資統計只計入月薪職缺，避免年薪、時薪混在同一個分佈中
+    salary_count: int = Field(default=0)
+    salary_min_avg: Optional[float] = Field(default=None)
+    salary_max_avg: Optional[float] = Field(default=None)
+    salary_p25: Optional[float] = Field(default=None)
+    salary_p50: Optional[float] = Field(default=None)
+    salary_p75: Optional[float] = Field(default=None)
+    remote_count: int = Field(default=0)
+    remote_ratio: float = Field(default=0.0)
+    updated_at: datetime = Field(sa_column=Column(TIMESTAMP))
+
+class JobSimhashBand(SQLModel, table=True):
+    """SimHash 的 LSH 分段索引：以 (company_id, band, bucket) 等值查詢找出同公司可能重複的職缺。"""
+    __tablename__ = "tb_job_simhash_bands"
+    company_id: str = Field(primary_key=True, max_length=50)
+    band: int = Field(primary_key=True)
+    bucket: int = Field(primary_key=True)
+    job_id: str = Field(primary_key=True, max_length=50, index=True)
+
+class JobChange(SQLModel, table=True):
+    """
+    tb_jobs 的變更紀錄 (change feed)，由 repository.upsert_jobs / delete_jobs 在寫入的同一個交易中新增。
+
+    change_id 為遞增的游標，下游以 `/jobs/changes?since=<change_id>` 增量同步。
+    """
+    __tablename__ = "tb_job_changes"
+    # SQLite 只有 INTEGER PRIMARY KEY 會自動遞增
+    change_id: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    )
+    job_id: str = Field(max_length=50, index=True)
+    # JOB_CHANGE_TYPES 之一
+    change_type: str = Field(max_length=10)
+    version: int
+    changed_at: datetime = Field(sa_column=Column(TIMESTAMP, index=True))
+
+class JobChangeWriter(SQLModel, table=True):
+    """
+    正在寫入 tb_job_changes 的交易 (見 repository._job_change_writer)。
+
+    floor_change_id 是交易開始前已提交的最大 change_id，交易配發的 change_id 一定大於它。
+    /jobs/changes 不回傳超過進行中交易 floor 的紀錄，游標因此不會越過較晚才提交的較小 change_id。
+    """
+    __tablename__ = "tb_job_change_writers"
+    writer_id: str = Field(primary_key=True, max_length=32)
+    floor_change_id: int = Field(sa_column=Column(BigInteger, nullable=False))
+    started_at: datetime = Field(sa_column=Column(TIMESTAMP, index=True))
+
+class JobChangeRead(SQLModel):
+    """API 回應用的變更紀錄；include_jobs 時附上職缺目前的內容 (已刪除的職缺為 None)。"""
+    change_id: int
+    job_id: str
+    change_type: str
+    version: int
+    changed_at: datetime
+    job: Optional[JobRead] = None
+
+class JobChangePage(SQLModel):
+    """`/jobs/changes` 的回應：一頁變更紀錄與下一次請求使用的游標。"""
+    changes: List[JobChangeRead]
+    next_cursor: int
+
+JOB_CHANGE_CREATED = "created"
+JOB_CHANGE_UPDATED = "updated"
+JOB_CHANGE_DELETED = "deleted"
+JOB_CHANGE_TYPES: Tuple[str, ...] = (JOB_CHANGE_CREATED, JOB_CHANGE_UPDATED, JOB_CHANGE_DELETED)
+
+metadata = SQLModel.metadata
+
+# 已下架職缺的歸檔表：欄位與 tb_jobs 相同，另記錄歸檔時間 (由 task_retention_104 寫入)
+JOB_ARCHIVE_TABLE = Job.__table__.to_metadata(metadata, name="tb_jobs_archive")
+JOB_ARCHIVE_TABLE.append_column(Column("archived_at", TIMESTAMP, nullable=True))
+
+# 各表格中基數低 (重複值多) 的字串欄位，匯出為 Parquet 時以 dictionary 編碼
+LOW_CARDINALITY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "tb_jobs": (
+        "location", "degree", "working_experience", "work_time",
+        "remote_work_type", "need_employees",
+    ),
+    "tb_companies": ("industry", "employees"),
+    "tb_urls": ("source", "status"),
+    "tb_category": ("parent_code", "parent_name", "source"),
+}
\ No newline at end of file
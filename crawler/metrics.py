@@ -0,0 +1,200 @@
+# crawler/metrics.py
+"""
+Prometheus 指標定義與輸出。
+
+爬蟲各階段 (HTTP 請求、解析、批次寫入) 與 API 請求都在此集中定義指標，
+呼叫端只需使用本模組提供的指標物件或輔助函數。
+
+- API：`crawler.api.main` 以 `/metrics` 輸出。
+- Worker：`setup_worker_metrics` 透過 Celery signals 在主程序啟動 HTTP 伺服器並記錄任務指標。
+  prefork 模式下每個子程序各自累計數值，需設定環境變數 PROMETHEUS_MULTIPROC_DIR
+  (必須在任何指標建立前就存在，因此應由容器環境提供)，由主程序彙總所有子程序的檔案輸出。
+"""
+
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from crawler import config
+
+logger = logging.getLogger(__name__)
+
+# HTTP 請求的端點類型 (標籤值)
+ENDPOINT_SEARCH_PAGE = "search_page"
+ENDPOINT_DETAIL_API = "detail_api"
+ENDPOINT_CATEGORY_JSON = "category_json"
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "crawler_http_request_duration_seconds",
+    "對目標網站發出 HTTP 請求的耗時",
+    ["endpoint"],
+    buckets=_LATENCY_BUCKETS,
+)
+HTTP_RESPONSES = Counter(
+    "crawler_http_responses_total",
+    "對目標網站的 HTTP 回應數，status 為狀態碼或例外類別名稱",
+    ["endpoint", "status"],
+)
+HTTP_RETRIES = Counter(
+    "crawler_http_retries_total",
+    "HTTP 請求失敗後的重試次數",
+    ["endpoint"],
+)
+PARSE_DURATION = Histogram(
+    "crawler_parse_duration_seconds",
+    "解析單一回應 (HTML 或 JSON) 的耗時",
+    ["stage"],
+    buckets=_FAST_BUCKETS,
+)
+BATCH_FLUSH_SIZE = Histogram(
+    "crawler_batch_flush_size",
+    "每次批次寫入資料庫的筆數",
+    ["table"],
+    buckets=(1, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+BATCH_FLUSH_DURATION = Histogram(
+    "crawler_batch_flush_duration_seconds",
+    "每次批次寫入資料庫 (含清理與前置查詢) 的耗時",
+    ["table"],
+    buckets=_LATENCY_BUCKETS,
+)
+ROWS_UPSERTED = Counter(
+    "crawler_rows_upserted_total",
+    "透過 upsert_from_dataframe 寫入的資料列數",
+    ["table"],
+)
+CACHE_LOOKUPS = Counter(
+    "crawler_cache_lookups_total",
+    "程序內快取的查詢次數，result 為 hit、miss 或 coalesced (等待同時進行中的相同請求)",
+    ["cache", "result"],
+)
+DB_READ_ROUTES = Counter(
+    "crawler_db_read_routes_total",
+    "設定唯讀副本時讀取連線的去向，target 為 replica 或 primary_fallback (副本延遲過大或無法連線)",
+    ["target"],
+)
+TASK_DURATION = Histogram(
+    "crawler_task_duration_seconds",
+    "Celery 任務的執行時間",
+    ["task"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200),
+)
+TASKS = Counter(
+    "crawler_tasks_total",
+    "Celery 任務的執行次數，依結束狀態區分",
+    ["task", "state"],
+)
+API_REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "API 請求的處理時間，route 為路由樣板 (例如 /stats/{dimension})",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+def instrumented_get(
+    endpoint: str, url: str, session: Optional[requests.Session] = None, **kwargs: Any
+) -> requests.Response:
+    """
+    發出 GET 請求並記錄耗時與回應狀態，例外會原樣拋出。
+
+    Args:
+        endpoint (str): 端點類型，例如 ENDPOINT_DETAIL_API。
+        url (str): 請求網址。
+        session (Optional[requests.Session]): 要使用的 Session (可重用連線)；None 時使用 `requests.get`。
+        **kwargs: 傳給 `requests.get` 的其他參數。使用 stream=True 時，耗時只計算到收到回應標頭為止。
+
+    Returns:
+        requests.Response: 原始回應 (不會呼叫 raise_for_status)。
+    """
+    start = time.perf_counter()
+    try:
+        response = (session or requests).get(url, **kwargs)
+    except requests.RequestException as e:
+        HTTP_RESPONSES.labels(endpoint, type(e).__name__).inc()
+        raise
+    finally:
+        HTTP_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - start)
+    HTTP_RESPONSES.labels(endpoint, str(response.status_code)).inc()
+    return response
+
+
+def get_registry() -> CollectorRegistry:
+    """回傳要輸出的 registry；多程序模式下彙總 PROMETHEUS_MULTIPROC_DIR 中所有程序的數值。"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    以 Prometheus 文字格式輸出目前的所有指標。
+
+    Returns:
+        Tuple[bytes, str]: (內容, Content-Type)。
+    """
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def setup_worker_metrics() -> None:
+    """
+    為 Celery worker 註冊指標相關的 signal handlers。
+
+    - worker_init (主程序)：清空多程序目錄並在 config.WORKER_METRICS_PORT 啟動 HTTP 伺服器。
+    - task_prerun / task_postrun：記錄任務執行時間與結束狀態。
+    - worker_process_shutdown：標記結束的子程序，讓其 gauge 類數值不再被彙總。
+    """
+    from celery import signals
+
+    task_started_at: Dict[str, float] = {}
+
+    @signals.worker_init.connect(weak=False)
+    def _start_metrics_server(**kwargs):
+        if not config.WORKER_METRICS_PORT:
+            logger.info("WORKER_METRICS_PORT 為 0，不啟動 worker 指標伺服器。")
+            return
+        multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        if multiproc_dir:
+            # 上次執行留下的檔案會讓計數器從舊值繼續累加
+            shutil.rmtree(multiproc_dir, ignore_errors=True)
+            os.makedirs(multiproc_dir, exist_ok=True)
+        else:
+            logger.warning("未設定 PROMETHEUS_MULTIPROC_DIR，prefork 子程序中的指標將無法被輸出。")
+        start_http_server(config.WORKER_METRICS_PORT, registry=get_registry())
+        logger.info(f"Worker 指標伺服器已啟動於 port {config.WORKER_METRICS_PORT}。")
+
+    @signals.task_prerun.connect(weak=False)
+    def _on_task_prerun(task_id=None, **kwargs):
+        task_started_at[task_id] = time.perf_counter()
+
+    @signals.task_postrun.connect(weak=False)
+    def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+        started = task_started_at.pop(task_id, None)
+        name = getattr(task, "name", "unknown")
+        if started is not None:
+            TASK_DURATION.labels(name).observe(time.perf_counter() - started)
+        TASKS.labels(name, state or "UNKNOWN").inc()
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _on_process_shutdown(pid=None, **kwargs):
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            multiprocess.mark_process_dead(pid or os.getpid())
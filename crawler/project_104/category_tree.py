@@ -0,0 +1,193 @@
+# crawler/project_104/category_tree.py
+"""
+104 職務類別樹的本地快取與記憶體索引。
+
+快取格式：
+- `{name}.json.gz`：原始 JobCat.json 樹狀結構 (緊湊 JSON + gzip)，通常只有數十 KB。
+- `{name}.meta.json`：ETag、Last-Modified 與抓取時間，用於條件式請求 (HTTP 304)。
+
+`CategoryTree` 提供以類別代碼為鍵的 O(1) 查詢、子類別 / 葉節點 / 祖先查詢；
+`load_category_tree()` 在同一個行程中重複呼叫時，只要快取檔未變更就直接回傳記憶體中的索引
+(類別同步任務每次執行都經由它取得類別樹，快取檔沒有更新時不必重新解壓與解析)。
+"""
+
+import gzip
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler import config
+from crawler.utilis.data_processing import flatten_jobcat_recursive
+
+CACHE_BASENAME = "104_人力銀行_category"
+
+
+@dataclass(frozen=True)
+class CategoryNode:
+    """類別樹中的單一節點。"""
+
+    code: str
+    name: str
+    parent_code: str
+    children: Tuple[str, ...]
+
+
+class CategoryTree:
+    """職務類別樹的記憶體索引。"""
+
+    def __init__(self, nodes: Dict[str, CategoryNode]) -> None:
+        self._nodes = nodes
+
+    @classmethod
+    def from_jobcat_json(cls, data: List[Dict[str, Any]]) -> "CategoryTree":
+        """由 JobCat.json 的原始樹狀資料建立索引。"""
+        rows = flatten_jobcat_recursive(data)
+        children: Dict[str, List[str]] = {}
+        for row in rows:
+            children.setdefault(row["parent_code"], []).append(row["job_code"])
+        nodes = {
+            row["job_code"]: CategoryNode(
+                code=row["job_code"],
+                name=row["job_name"],
+                parent_code=row["parent_code"],
+                children=tuple(children.get(row["job_code"], ())),
+            )
+            for row in rows
+            if row["job_code"]
+        }
+        return cls(nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._nodes
+
+    def get(self, code: str) -> Optional[CategoryNode]:
+        return self._nodes.get(code)
+
+    def leaves(self) -> List[str]:
+        """回傳所有葉節點類別代碼 (已排序)。"""
+        return sorted(code for code, node in self._nodes.items() if not node.children)
+
+    def ancestors(self, code: str) -> List[str]:
+        """回傳由近到遠的祖先類別代碼。"""
+        result: List[str] = []
+        node = self._nodes.get(code)
+        while node is not None and node.parent_code:
+            result.append(node.parent_code)
+            node = self._nodes.get(node.parent_code)
+        return result
+
+    def descendant_leaves(self, code: str) -> List[str]:
+        """回傳某類別底下的所有葉節點類別代碼 (不含自身，除非自身即為葉節點)。"""
+        node = self._nodes.get(code)
+        if node is None:
+            return []
+        if not node.children:
+            return [code]
+        result: List[str] = []
+        stack = list(node.children)
+        while stack:
+            child = self._nodes.get(stack.pop())
+            if child is None:
+                continue
+            if child.children:
+                stack.extend(child.children)
+            else:
+                result.append(child.code)
+        return sorted(result)
+
+    def to_rows(self) -> List[Dict[str, str]]:
+        """轉為 tb_category 的資料列 (不含時間戳記與來源欄位)，依類別代碼排序。"""
+        rows = []
+        for code in sorted(self._nodes):
+            node = self._nodes[code]
+            parent = self._nodes.get(node.parent_code)
+            rows.append({
+                "category_id": code,
+                "category_name": node.name,
+                "parent_code": node.parent_code,
+                "parent_name": parent.name if parent else "",
+            })
+        return rows
+
+
+# --- 本地快取 ---
+
+def cache_paths(data_dir: Optional[str] = None) -> Tuple[str, str]:
+    """回傳 (樹狀資料快取路徑, 中繼資料路徑)。"""
+    data_dir = data_dir or config.DATA_DIR
+    base = os.path.join(data_dir, CACHE_BASENAME)
+    return f"{base}.json.gz", f"{base}.meta.json"
+
+
+def read_cache_meta(data_dir: Optional[str] = None) -> Dict[str, Any]:
+    """讀取快取中繼資料；檔案不存在或損毀時回傳空字典。"""
+    _, meta_path = cache_paths(data_dir)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache_meta(meta: Dict[str, Any], data_dir: Optional[str] = None) -> None:
+    _, meta_path = cache_paths(data_dir)
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+
+
+def read_cached_jobcat(data_dir: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """讀取快取的原始 JobCat 樹；不存在或損毀時回傳 None。"""
+    tree_path, _ = cache_paths(data_dir)
+    try:
+        with gzip.open(tree_path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def write_cached_jobcat(data: List[Dict[str, Any]], data_dir: Optional[str] = None) -> None:
+    """以緊湊 JSON + gzip 寫入原始 JobCat 樹 (先寫暫存檔再原子替換)。"""
+    tree_path, _ = cache_paths(data_dir)
+    tmp_path = f"{tree_path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, tree_path)
+
+
+_tree_lock = threading.Lock()
+# 快取檔路徑 -> ((修改時間 ns, 檔案大小), 類別樹)；不同資料目錄的快取檔各自記錄
+_cached_trees: Dict[str, Tuple[Tuple[int, int], CategoryTree]] = {}
+
+
+def load_category_tree(data_dir: Optional[str] = None) -> Optional[CategoryTree]:
+    """
+    取得記憶體中的類別樹索引；快取檔更新後會自動重新載入。
+
+    Args:
+        data_dir (Optional[str]): 快取所在的資料目錄，預設為 config.DATA_DIR。
+
+    Returns:
+        Optional[CategoryTree]: 類別樹；尚未有任何快取或快取損毀時為 None。
+    """
+    tree_path, _ = cache_paths(data_dir)
+    try:
+        stat = os.stat(tree_path)
+    except OSError:
+        return None
+    path = os.path.abspath(tree_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _tree_lock:
+        cached = _cached_trees.get(path)
+        if cached is None or cached[0] != stamp:
+            data = read_cached_jobcat(data_dir)
+            if data is None:
+                return None
+            cached = _cached_trees[path] = (stamp, CategoryTree.from_jobcat_json(data))
+        return cached[1]
@@ -20,3 +20,32 @@ RETRY_COUNT: int = int(os.environ.get("RETRY_COUNT", "3"))
 RETRY_DELAY_SECONDS: int = int(os.environ.get("RETRY_DELAY_SECONDS", "5"))
 MAX_WORKERS: int = int(os.environ.get("MAX_WORKERS", "10"))
 BATCH_SIZE: int = int(os.environ.get("BATCH_SIZE", "10"))
+# Crawl planner: 每輪 URL 探索的搜尋頁請求預算；大於 0 時 producer_urls 改為依 tb_category 規劃爬取
+CRAWL_REQUEST_BUDGET: int = int(os.environ.get("CRAWL_REQUEST_BUDGET", "0"))
+# 從未爬過的類別先試探的頁數
+CRAWL_PROBE_PAGES: int = int(os.environ.get("CRAWL_PROBE_PAGES", "1"))
+# 104 網站與靜態資源的網址；離線基準測試時改指向本機的假伺服器
+SITE_BASE_URL: str = os.environ.get("CRAWLER_104_BASE_URL", "https://www.104.com.tw").rstrip("/")
+STATIC_BASE_URL: str = os.environ.get("CRAWLER_104_STATIC_URL", "https://static.104.com.tw").rstrip("/")
+# 每個搜尋頁請求前隨機等待的秒數範圍 (禮貌性延遲)
+SEARCH_PAGE_DELAY_MIN: float = float(os.environ.get("SEARCH_PAGE_DELAY_MIN", "0.1"))
+SEARCH_PAGE_DELAY_MAX: float = float(os.environ.get("SEARCH_PAGE_DELAY_MAX", "0.5"))
+# 職缺詳情 API 的全局速率限制 (每秒請求數)；0 代表不限速，只應在對本機假伺服器做基準測試時使用
+DETAIL_REQUESTS_PER_SECOND: float = float(os.environ.get("DETAIL_REQUESTS_PER_SECOND", "10"))
+# 解析管線：抓取執行緒只做網路 I/O，HTML / JSON 的解析交給 process pool。
+# "auto" 使用所有可用核心，數字為固定程序數，0 代表在抓取執行緒中直接解析
+PARSE_PROCESSES: str = os.environ.get("PARSE_PROCESSES", "0")
+# 每次交給解析程序的原始內容筆數 (分攤 pickle 與 IPC 的固定成本)
+PARSE_BATCH_SIZE: int = int(os.environ.get("PARSE_BATCH_SIZE", "25"))
+# Recrawl scheduler (Celery beat)：每隔 RECRAWL_INTERVAL_MINUTES 分鐘，在 RECRAWL_REQUEST_BUDGET 個請求內
+# 依新鮮度排程 URL 探索與職缺詳情重抓；間隔設為 0 代表不註冊排程
+RECRAWL_INTERVAL_MINUTES: int = int(os.environ.get("RECRAWL_INTERVAL_MINUTES", "60"))
+RECRAWL_REQUEST_BUDGET: int = int(os.environ.get("RECRAWL_REQUEST_BUDGET", "3000"))
+# 刷新一筆已變動的職缺相對於找到一筆新職缺的價值
+RECRAWL_DETAIL_CHANGE_WEIGHT: float = float(os.environ.get("RECRAWL_DETAIL_CHANGE_WEIGHT", "0.5"))
+# 每個請求的最低預期價值，低於此值的請求即使還有預算也不排程
+RECRAWL_MIN_VALUE_PER_REQUEST: float = float(os.environ.get("RECRAWL_MIN_VALUE_PER_REQUEST", "0.05"))
+# 每次執行 (URL 探索或職缺詳情任務) 內合併重複的請求：同時進行的相同請求只發出一次，
+# 成功的回應保留 FETCH_CACHE_TTL_SECONDS 秒，最多 FETCH_CACHE_SIZE 筆 (0 代表只合併同時進行的請求)
+FETCH_CACHE_SIZE: int = int(os.environ.get("FETCH_CACHE_SIZE", "512"))
+FETCH_CACHE_TTL_SECONDS: float = float(os.environ.get("FETCH_CACHE_TTL_SECONDS", "300"))
@@ -0,0 +1,108 @@
+# crawler/project_104/crawl_planner.py
+"""
+職缺 URL 探索的爬取規劃器 (Crawl Planner)。
+
+根據 tb_category 的葉節點類別與 tb_crawl_yield 的歷史成效 (每個請求帶來的新 URL 數)，
+在固定的請求預算內決定要爬哪些類別、每個類別爬幾頁，讓同樣的請求數找到最多新職缺。
+
+估計方式：
+- 每個類別的產出率以「新 URL 數 / 請求數」估計，並加上先驗值做平滑，
+  讓只被爬過一兩次的類別不會因為單次結果而被過度看好或看衰。
+- 從未爬過的類別採用樂觀的先驗值，只安排少量「試探頁」，
+  讓規劃器持續探索新類別，同時不浪費大量預算。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping
+
+# 一頁搜尋結果約 20 筆職缺；作為從未爬過之類別的樂觀先驗產出率
+DEFAULT_PRIOR_YIELD = 20.0
+# 先驗值相當於多少個「虛擬請求」的權重
+PRIOR_WEIGHT = 2.0
+
+
+@dataclass(frozen=True)
+class PlannedCrawl:
+    """爬取計畫中的一項：對單一類別以指定頁數上限執行一次 URL 探索。"""
+
+    category_id: str
+    max_pages: int
+    estimated_requests: int
+    expected_yield: float
+
+
+def estimate_yield(stats: Mapping[str, Any], prior_yield: float = DEFAULT_PRIOR_YIELD) -> float:
+    """
+    以平滑後的「每請求新 URL 數」估計類別的產出率。
+
+    Args:
+        stats (Mapping[str, Any]): tb_crawl_yield 的資料列 (可為空，代表從未爬過)。
+        prior_yield (float): 先驗產出率。
+
+    Returns:
+        float: 估計的每請求新 URL 數。
+    """
+    requests = stats.get("request_count") or 0
+    new_urls = stats.get("new_url_count") or 0
+    return (new_urls + PRIOR_WEIGHT * prior_yield) / (requests + PRIOR_WEIGHT)
+
+
+def _pages_per_keyword(stats: Mapping[str, Any], max_pages: int, probe_pages: int) -> int:
+    """依上次觀察到的搜尋結果總頁數決定頁數；從未爬過時只安排試探頁。"""
+    if not stats.get("crawl_count"):
+        return max(1, min(probe_pages, max_pages))
+    available_pages = stats.get("last_available_pages") or 1
+    return max(1, min(max_pages, available_pages))
+
+
+def build_crawl_plan(
+    leaf_categories: Iterable[str],
+    yields: Mapping[str, Mapping[str, Any]],
+    request_budget: int,
+    keyword_count: int,
+    max_pages: int,
+    probe_pages: int = 1,
+) -> List[PlannedCrawl]:
+    """
+    依歷史產出率由高到低貪婪地分配請求預算。
+
+    Args:
+        leaf_categories (Iterable[str]): 可爬取的葉節點類別代碼。
+        yields (Mapping[str, Mapping[str, Any]]): 類別代碼 -> 累積爬取成效。
+        request_budget (int): 本輪可使用的搜尋頁請求總數。
+        keyword_count (int): 每個類別要搭配的關鍵字數量 (每個關鍵字各自翻頁)。
+        max_pages (int): 每個關鍵字的頁數上限。
+        probe_pages (int): 從未爬過之類別的試探頁數。
+
+    Returns:
+        List[PlannedCrawl]: 依預期產出排序的爬取計畫，估計請求數總和不超過預算。
+    """
+    keyword_count = max(keyword_count, 1)
+    observed = [estimate_yield(stats) for stats in yields.values() if stats.get("request_count")]
+    # 樂觀先驗取「預設值」與「已觀察到的最佳產出率」中較大者，確保新類別會被探索
+    prior_yield = max([DEFAULT_PRIOR_YIELD, *observed])
+
+    candidates: List[PlannedCrawl] = []
+    for category_id in leaf_categories:
+        stats: Dict[str, Any] = dict(yields.get(category_id) or {})
+        pages = _pages_per_keyword(stats, max_pages, probe_pages)
+        candidates.append(
+            PlannedCrawl(
+                category_id=category_id,
+                max_pages=pages,
+                estimated_requests=pages * keyword_count,
+                expected_yield=estimate_yield(stats, prior_yield),
+            )
+        )
+
+    candidates.sort(key=lambda item: (-item.expected_yield, item.category_id))
+    plan: List[PlannedCrawl] = []
+    remaining = request_budget
+    for item in candidates:
+        if item.estimated_requests > remaining:
+            continue
+        plan.append(item)
+        remaining -= item.estimated_requests
+        if remaining < keyword_count:
+            break
+    return plan
@@ -3,9 +3,10 @@
 職位類別 Producer。
 
 負責觸發 Celery 任務，以抓取並處理職位類別資料。
+以任務名稱派發，不導入任務模組，因此不會載入 pandas 或連線資料庫。
 """
 import logging
-from crawler.project_104.task_category_104 import process_category_data
+from crawler.app import TASK_PROCESS_CATEGORY, app
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +17,8 @@ def run_producer_category_main():
     """
     logger.info("觸發職位類別資料處理任務...")
     try:
-        # 優化：統一使用最直接的 apply_async，並明確指定隊列
-        process_category_data.apply_async(queue="worker_104")
+        # 佇列與優先權由 crawler.app.TASK_ROUTES 決定
+        app.signature(TASK_PROCESS_CATEGORY).apply_async()
         logger.info("職位類別資料處理任務已成功觸發。")
     except Exception as e:
         logger.error(f"觸發職位類別資料處理任務時發生錯誤: {e}", exc_info=True)
@@ -4,15 +4,13 @@
 
 通過探測 Worker 是否在線來決定是否觸發任務，
 確保任務只在系統準備就緒時發送，且避免了複雜的狀態檢查。
+以任務名稱派發，不導入任務模組，因此不會載入 pandas 或連線資料庫。
 """
 import logging
 import time
 from typing import Optional, List, Dict
 
-from crawler.app import app
-from crawler.project_104.task_job_details_104 import (
-    fetch_and_save_all_job_details,
-)
+from crawler.app import TASK_FETCH_JOB_DETAILS, app
 
 logger = logging.getLogger(__name__)
 
@@ -51,10 +49,8 @@ def run_producer_job_details_main() -> None:
 
     try:
         # 系統在線，放心發送任務
-        fetch_and_save_all_job_details.apply_async(queue="worker_104")
-        logger.info(
-            f"已成功觸發任務 '{fetch_and_save_all_job_details.name}'。"
-        )
+        result = app.signature(TASK_FETCH_JOB_DETAILS).apply_async()
+        logger.info(f"已成功觸發任務 '{TASK_FETCH_JOB_DETAILS}' (task_id: {result.id})，可由 /crawls/{result.id} 查看進度。")
 
     except Exception as e:
         logger.error(f"觸發任務時發生 broker 連線錯誤: {e}", exc_info=True)
@@ -3,10 +3,11 @@
 職缺 URL Producer。
 
 負責根據搜尋條件觸發 Celery 任務，以抓取職缺 URL 列表。
+以任務名稱派發，不導入任務模組，因此不會載入 pandas、BeautifulSoup 或連線資料庫。
 """
 import logging
 from crawler.project_104 import config_104 as config
-from crawler.project_104.task_urls_104 import fetch_and_save_all_urls
+from crawler.app import TASK_FETCH_URLS, TASK_PLAN_URL_CRAWLS, app
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,15 @@ def run_producer_urls_main():
     jobcat = config.JOBCAT_CODE
     keywords_list = config.KEYWORDS_LIST
 
+    if config.CRAWL_REQUEST_BUDGET > 0:
+        # 規劃模式：由 Worker 讀取 tb_category，依歷史產出在預算內分派所有葉節點類別
+        try:
+            app.signature(TASK_PLAN_URL_CRAWLS, kwargs={"keywords_list": keywords_list or [""]}).apply_async()
+            logger.info(f"爬取規劃任務已成功觸發 (請求預算 {config.CRAWL_REQUEST_BUDGET})。")
+        except Exception as e:
+            logger.error(f"觸發爬取規劃任務時發生錯誤: {e}", exc_info=True)
+        return
+
     if not jobcat:
         logger.error("JOBCAT_CODE 未在 .env 中設定，無法執行 URL 抓取任務。")
         return
@@ -31,8 +41,8 @@ def run_producer_urls_main():
     task_kwargs = {"keywords_list": keywords_list or [""]}
 
     try:
-        # 優化：統一使用最直接的 apply_async，並明確指定隊列
-        fetch_and_save_all_urls.apply_async(args=task_args, kwargs=task_kwargs, queue="worker_104")
+        # 佇列與優先權由 crawler.app.TASK_ROUTES 決定
+        app.signature(TASK_FETCH_URLS, args=task_args, kwargs=task_kwargs).apply_async()
         logger.info("職缺 URL 抓取任務已成功觸發。")
     except Exception as e:
         logger.error(f"觸發職缺 URL 抓取任務時發生錯誤: {e}", exc_info=True)
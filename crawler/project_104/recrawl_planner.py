@@ -0,0 +1,200 @@
+# crawler/project_104/recrawl_planner.py
+"""
+依新鮮度 (freshness) 排程重新爬取的規劃器。
+
+排程器每隔固定時間醒來一次，在同一份全局請求預算內比較兩種請求的價值：
+
+- URL 探索：對類別重新搜尋。以每個類別過去觀察到的「每小時新職缺數」
+  (tb_crawl_yield.new_url_rate，由 repository.record_crawl_yield 以 EWMA 更新) 乘上距上次爬取的時數，
+  估計現在能找到多少新職缺；頁數只安排到足以涵蓋這些新職缺 (搜尋結果依日期排序，新職缺在前面)。
+  還沒有速率估計的類別沿用 crawl_planner 的產出率先驗，只安排試探頁。
+- 職缺詳情：重新抓取單一 URL。以該 URL 過去的「內容變動次數 / 觀察時數」(加上先驗值平滑) 作為
+  變動率 λ，假設變動為 Poisson 過程，距上次抓取 Δt 小時後內容已變動的機率為 1 - exp(-λΔt)。
+  從未抓取過詳情的 URL 視為必定有價值。搜尋結果列表上的摘要 (標題、公司、更新日期) 可以直接判斷：
+  摘要在上次抓取詳情之後變動過時視為必定已變動；抓取之後再次在列表上看到相同摘要時視為沒有變動。
+
+所有候選依「每個請求的預期價值」(priority) 由高到低貪婪地放入預算，低於最低價值門檻的請求不排程。
+新職缺要再抓一次詳情才有用，因此 URL 探索的 priority 把後續的詳情請求也算進分母；
+預算只扣除本輪實際發出的請求，找到的新 URL 會在下一輪以「從未抓取」的詳情候選出現。
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, List, Mapping, Optional, Union
+
+from crawler.project_104.crawl_planner import DEFAULT_PRIOR_YIELD, estimate_yield
+
+# 搜尋結果每頁的職缺數
+JOBS_PER_PAGE = 20
+# 內容變動率的先驗值：相當於在 PRIOR_OBSERVED_HOURS 小時內觀察到 PRIOR_CHANGES 次變動 (約每週一次)
+PRIOR_CHANGES = 1.0
+PRIOR_OBSERVED_HOURS = 24.0 * 7
+# 找到一筆新職缺的價值為 1；抓取一筆從未抓過詳情的 URL 同樣為 1
+NEW_POSTING_VALUE = 1.0
+
+
+@dataclass(frozen=True)
+class DiscoveryCandidate:
+    """一次類別 URL 探索：以 max_pages 頁數上限搜尋，預估找到 expected_value 筆新職缺。"""
+
+    category_id: str
+    max_pages: int
+    cost: int
+    expected_value: float
+
+    @property
+    def priority(self) -> float:
+        return self.expected_value / (self.cost + self.expected_value) if self.cost else 0.0
+
+
+@dataclass(frozen=True)
+class DetailCandidate:
+    """一次職缺詳情抓取 (固定一個請求)。"""
+
+    url: str
+    expected_value: float
+    cost: int = 1
+
+    @property
+    def priority(self) -> float:
+        return self.expected_value / self.cost
+
+
+Candidate = Union[DiscoveryCandidate, DetailCandidate]
+
+
+@dataclass
+class RecrawlPlan:
+    """排程結果。"""
+
+    discovery: List[DiscoveryCandidate]
+    details: List[DetailCandidate]
+
+    @property
+    def requests(self) -> int:
+        return sum(item.cost for item in self.discovery) + sum(item.cost for item in self.details)
+
+    @property
+    def expected_value(self) -> float:
+        return sum(item.expected_value for item in self.discovery) + sum(item.expected_value for item in self.details)
+
+
+def _hours_between(earlier: Optional[datetime], later: datetime) -> float:
+    if earlier is None:
+        return 0.0
+    return max((later - earlier).total_seconds() / 3600, 0.0)
+
+
+def change_probability(stats: Mapping[str, Any], now: datetime) -> float:
+    """
+    估計 URL 自上次抓取詳情後內容已變動的機率。
+
+    Args:
+        stats (Mapping[str, Any]): tb_urls 的資料列 (details_fetched_at、change_count、observed_hours，
+            以及列表摘要的 listing_hash、details_listing_hash、updated_at)。
+        now (datetime): 目前時間。
+
+    Returns:
+        float: 0~1 的機率；從未抓取過詳情或列表摘要已變動時為 1，
+            抓取後列表上的摘要沒有變動時為 0。
+    """
+    fetched_at = stats.get("details_fetched_at")
+    if fetched_at is None:
+        return 1.0
+    listing_hash, fetched_listing_hash = stats.get("listing_hash"), stats.get("details_listing_hash")
+    if listing_hash and fetched_listing_hash:
+        if listing_hash != fetched_listing_hash:
+            return 1.0
+        listed_at = stats.get("updated_at")
+        if listed_at is not None and listed_at >= fetched_at:
+            return 0.0
+    rate = ((stats.get("change_count") or 0) + PRIOR_CHANGES) / ((stats.get("observed_hours") or 0.0) + PRIOR_OBSERVED_HOURS)
+    return 1.0 - math.exp(-rate * _hours_between(fetched_at, now))
+
+
+def detail_candidate(stats: Mapping[str, Any], now: datetime, change_weight: float) -> DetailCandidate:
+    """
+    建立單一 URL 的詳情抓取候選。
+
+    Args:
+        stats (Mapping[str, Any]): tb_urls 的資料列。
+        now (datetime): 目前時間。
+        change_weight (float): 刷新一筆已變動職缺相對於找到一筆新職缺的價值。
+
+    Returns:
+        DetailCandidate: 候選項目。
+    """
+    if stats.get("details_fetched_at") is None:
+        return DetailCandidate(stats["source_url"], NEW_POSTING_VALUE)
+    return DetailCandidate(stats["source_url"], change_weight * change_probability(stats, now))
+
+
+def discovery_candidate(
+    category_id: str,
+    stats: Mapping[str, Any],
+    now: datetime,
+    keyword_count: int,
+    max_pages: int,
+    probe_pages: int,
+    prior_yield: float = DEFAULT_PRIOR_YIELD,
+) -> DiscoveryCandidate:
+    """
+    建立單一類別的 URL 探索候選。
+
+    Args:
+        category_id (str): 類別代碼。
+        stats (Mapping[str, Any]): tb_crawl_yield 的資料列 (可為空，代表從未爬過)。
+        now (datetime): 目前時間。
+        keyword_count (int): 每個類別搭配的關鍵字數。
+        max_pages (int): 每個關鍵字的頁數上限。
+        probe_pages (int): 尚無速率估計時的試探頁數。
+        prior_yield (float): 尚無速率估計時的每請求產出率先驗。
+
+    Returns:
+        DiscoveryCandidate: 候選項目。
+    """
+    keyword_count = max(keyword_count, 1)
+    rate = stats.get("new_url_rate")
+    if rate is None or stats.get("last_crawled_at") is None:
+        pages = max(1, min(probe_pages, max_pages))
+        cost = pages * keyword_count
+        expected = min(estimate_yield(stats, prior_yield) * cost, cost * JOBS_PER_PAGE)
+        return DiscoveryCandidate(category_id, pages, cost, expected)
+
+    expected = rate * _hours_between(stats["last_crawled_at"], now)
+    pages = max(1, min(max_pages, math.ceil(expected / JOBS_PER_PAGE)))
+    cost = pages * keyword_count
+    return DiscoveryCandidate(category_id, pages, cost, min(expected, cost * JOBS_PER_PAGE))
+
+
+def build_recrawl_plan(candidates: Iterable[Candidate], request_budget: int, min_value_per_request: float = 0.0) -> RecrawlPlan:
+    """
+    依 priority (每個請求的預期價值) 由高到低，把候選放入請求預算。
+
+    Args:
+        candidates (Iterable[Candidate]): URL 探索與職缺詳情的候選。
+        request_budget (int): 本輪可使用的請求總數。
+        min_value_per_request (float): 每個請求的最低預期價值，低於此值的候選不排程。
+
+    Returns:
+        RecrawlPlan: 排程結果，請求數總和不超過預算。
+    """
+    ranked = sorted(
+        (item for item in candidates if item.cost > 0 and item.priority >= min_value_per_request),
+        key=lambda item: item.priority,
+        reverse=True,
+    )
+    plan = RecrawlPlan(discovery=[], details=[])
+    remaining = request_budget
+    for item in ranked:
+        if remaining <= 0:
+            break
+        if item.cost > remaining:
+            continue
+        if isinstance(item, DiscoveryCandidate):
+            plan.discovery.append(item)
+        else:
+            plan.details.append(item)
+        remaining -= item.cost
+    return plan
@@ -1,97 +1,158 @@
 # crawler/project_104/task_category_104.py
 import logging
 import requests
-import pandas as pd
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
-from crawler.app import app
+from crawler import config
+from crawler.app import TASK_PROCESS_CATEGORY, app
+from crawler.metrics import (
+    BATCH_FLUSH_DURATION,
+    BATCH_FLUSH_SIZE,
+    ENDPOINT_CATEGORY_JSON,
+    PARSE_DURATION,
+    instrumented_get,
+)
+from crawler.project_104 import config_104
 from crawler.project_104.constants_104 import HEADERS
-from crawler.database.repository import upsert_from_dataframe
-from crawler.utilis.data_processing import flatten_jobcat_recursive
+from crawler.project_104.category_tree import (
+    load_category_tree,
+    read_cache_meta,
+    write_cache_meta,
+    write_cached_jobcat,
+)
+from crawler.database.repository import upsert_from_dataframe, get_categories
 
 logger = logging.getLogger(__name__)
 
 # --- 定義一個專用的資料目錄，這個路徑只在容器內部有效 ---
 # 這樣可以避免 Docker volume mount 帶來的權限問題
-CONTAINER_DATA_DIR = "/home/app_user/data"
+CONTAINER_DATA_DIR = config.DATA_DIR
+URL_JOBCAT = f"{config_104.STATIC_BASE_URL}/category-tool/json/JobCat.json"
+CATEGORY_SOURCE = "104"
+_COMPARED_FIELDS = ("category_name", "parent_code", "parent_name")
+
+
+def _fetch_jobcat_conditionally(meta: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    以 ETag / Last-Modified 發出條件式請求。
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: 伺服器回傳 304 (內容未變) 時為 None，否則為新的類別樹。
+    """
+    headers = dict(HEADERS)
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = instrumented_get(ENDPOINT_CATEGORY_JSON, URL_JOBCAT, headers=headers, timeout=10)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    meta["etag"] = response.headers.get("ETag")
+    meta["last_modified"] = response.headers.get("Last-Modified")
+    with PARSE_DURATION.labels(ENDPOINT_CATEGORY_JSON).time():
+        return response.json()
+
+
+def diff_category_rows(
+    desired: List[Dict[str, str]], existing: Dict[str, Dict[str, Any]], now: datetime
+) -> List[Dict[str, Any]]:
+    """
+    比對類別樹與資料庫現況，只回傳新增或內容有變動的資料列。
+
+    既有類別保留原本的 created_at，只有 updated_at 會被更新為 now。
+
+    Args:
+        desired (List[Dict[str, str]]): 由類別樹轉出的資料列。
+        existing (Dict[str, Dict[str, Any]]): 資料庫中的類別 (類別代碼 -> 資料列)。
+        now (datetime): 本次同步的時間。
+
+    Returns:
+        List[Dict[str, Any]]: 需要 upsert 的完整資料列。
+    """
+    changed: List[Dict[str, Any]] = []
+    for row in desired:
+        current = existing.get(row["category_id"])
+        if current is not None and all(current.get(f) == row[f] for f in _COMPARED_FIELDS):
+            continue
+        changed.append({
+            **row,
+            "source": CATEGORY_SOURCE,
+            "created_at": current["created_at"] if current and current.get("created_at") else now,
+            "updated_at": now,
+        })
+    return changed
+
 
 @app.task(
     bind=True,
     max_retries=3,
     default_retry_delay=60,
-    name="crawler.project_104.task_category_104.process_category_data",
+    name=TASK_PROCESS_CATEGORY,
 )
 def process_category_data(self, cache_duration_hours: int = 720) -> None:
     """
     一個 Celery 任務，用於抓取、處理和儲存 104 人力銀行的所有職位類別。
-    此任務包含本地快取機制，以避免頻繁請求 API。
+
+    - 快取在 cache_duration_hours 內直接使用，不發出任何請求。
+    - 快取過期時以 ETag / Last-Modified 發出條件式請求，內容未變時伺服器只回 304。
+    - 寫入資料庫前先與 tb_category 比對，只 upsert 真正變動的類別。
     """
+    import pandas as pd
     logger.info("開始處理職位類別資料...")
 
     # 優化：使用絕對路徑指向容器內專用的資料目錄
     data_dir = CONTAINER_DATA_DIR
     os.makedirs(data_dir, exist_ok=True) # 確保目錄存在
 
-    file_jobcat_csv: str = os.path.join(data_dir, "104_人力銀行_category.csv")
-    url_JobCat: str = "https://static.104.com.tw/category-tool/json/JobCat.json"
-
-    df_jobcat_sorted: Optional[pd.DataFrame] = None
-
-    if os.path.exists(file_jobcat_csv):
-        modified_time = datetime.fromtimestamp(os.path.getmtime(file_jobcat_csv))
-        if datetime.now() - modified_time < timedelta(hours=cache_duration_hours):
-            logger.info(f"從有效快取中載入職業總覽資料: {file_jobcat_csv}")
-            try:
-                df_jobcat_sorted = pd.read_csv(file_jobcat_csv)
-            except Exception as e:
-                logger.warning(f"讀取快取檔案失敗: {e}, 將嘗試從網路重新獲取。")
-                df_jobcat_sorted = None
-
-    if df_jobcat_sorted is None:
+    meta = read_cache_meta(data_dir)
+    # 同一個 worker 程序中，快取檔沒有變動時直接重用記憶體中的類別樹
+    tree = load_category_tree(data_dir)
+
+    fetched_at = meta.get("fetched_at")
+    cache_is_fresh = (
+        tree is not None
+        and fetched_at is not None
+        and datetime.now() - datetime.fromisoformat(fetched_at) < timedelta(hours=cache_duration_hours)
+    )
+
+    if cache_is_fresh:
+        logger.info("從有效快取中載入職業總覽資料。")
+    else:
+        if tree is None:
+            # 快取不存在或已損毀時，不能帶條件式標頭，否則 304 會讓我們沒有任何資料
+            meta = {}
         try:
-            logger.info(f"本地快取無效或不存在，從網路獲取職業總覽資料: {url_JobCat}")
-            response_jobcat: requests.Response = requests.get(
-                url_JobCat, headers=HEADERS, timeout=10
-            )
-            response_jobcat.raise_for_status()
-            jobcat_data: Dict[str, Any] = response_jobcat.json()
-
-            flattened_data: List[Dict[str, str]] = flatten_jobcat_recursive(jobcat_data)
-            df_jobcat: pd.DataFrame = pd.DataFrame(flattened_data)
-            df_jobcat_sorted: pd.DataFrame = df_jobcat.sort_values(by="job_code")
-            df_jobcat_sorted = df_jobcat_sorted.rename(
-                columns={"job_code": "category_id", "job_name": "category_name"}
-            )
-            # 現在會寫入到 /home/app_user/data/104_人力銀行_category.csv
-            df_jobcat_sorted.to_csv(file_jobcat_csv, index=False, encoding="utf-8-sig")
-            logger.info(f"職業總覽資料已成功抓取並儲存為 CSV 快取: '{file_jobcat_csv}'")
-        except requests.RequestException as exc:
+            logger.info(f"快取已過期或不存在，向網路驗證職業總覽資料: {URL_JOBCAT}")
+            fresh_data = _fetch_jobcat_conditionally(meta)
+            if fresh_data is None:
+                logger.info("職業總覽資料未變更 (HTTP 304)，沿用本地快取。")
+            else:
+                write_cached_jobcat(fresh_data, data_dir)
+                tree = load_category_tree(data_dir)
+                logger.info("職業總覽資料已成功抓取並更新本地快取。")
+            meta["fetched_at"] = datetime.now().isoformat(timespec="seconds")
+            write_cache_meta(meta, data_dir)
+        except (requests.RequestException, ValueError) as exc:
             logger.error(f"從網路獲取職位類別資料失敗: {exc}")
-            if os.path.exists(file_jobcat_csv):
-                logger.warning(f"網路獲取失敗，將使用過期的快取檔案: {file_jobcat_csv}")
-                try:
-                    df_jobcat_sorted = pd.read_csv(file_jobcat_csv)
-                except Exception as e:
-                    logger.error(f"讀取過期快取檔案也失敗了: {e}, 任務重試。")
-                    raise self.retry(exc=exc)
+            if tree is not None:
+                logger.warning("網路獲取失敗，將使用過期的快取資料。")
             else:
                 logger.error("網路獲取失敗且無任何快取可用，任務重試。")
                 raise self.retry(exc=exc)
 
-    if df_jobcat_sorted is not None and not df_jobcat_sorted.empty:
-        try:
-            df_jobcat_sorted["source"] = "104"
-            now = datetime.now()
-            df_jobcat_sorted["created_at"] = now
-            df_jobcat_sorted["updated_at"] = now
-            
-            upsert_from_dataframe(df_jobcat_sorted, "tb_category")
-            
-            logger.info("職業總覽資料已成功同步到資料庫。")
-        except Exception as e:
-            logger.error(f"儲存職位類別資料到資料庫時失敗: {e}", exc_info=True)
+    try:
+        changed_rows = diff_category_rows(tree.to_rows(), get_categories(CATEGORY_SOURCE), datetime.now())
+        if changed_rows:
+            BATCH_FLUSH_SIZE.labels("tb_category").observe(len(changed_rows))
+            with BATCH_FLUSH_DURATION.labels("tb_category").time():
+                upsert_from_dataframe(pd.DataFrame(changed_rows), "tb_category")
+        logger.info(f"職業總覽資料已同步到資料庫：{len(tree)} 個類別中有 {len(changed_rows)} 個新增或變動。")
+    except Exception as e:
+        logger.error(f"儲存職位類別資料到資料庫時失敗: {e}", exc_info=True)
 
     logger.info("職位類別資料處理完成。")
 
@@ -110,4 +171,4 @@ if __name__ == "__main__":
     from crawler.logging_config import setup_logging
 
     setup_logging()
-    run_category_main()
\ No newline at end of file
+    run_category_main()
@@ -0,0 +1,67 @@
+# crawler/project_104/task_dedup_104.py
+"""
+近似重複職缺 (canonical_job_id) 相關的 Celery 任務。
+
+日常寫入時 `_flush_batch_to_db` 會逐批指定 canonical_job_id，
+此模組提供完整重建的任務，用於首次部署 (既有職缺尚未有簽章) 或調整比對參數之後。
+"""
+import logging
+from typing import Any, Dict, List
+
+from sqlmodel import select
+
+from crawler import config
+from crawler.app import TASK_REBUILD_DUPLICATE_INDEX, app
+from crawler.database.repository import replace_simhash_bands, stream_rows, update_job_dedup_columns
+from crawler.database.schema import Job
+from crawler.utilis.simhash import SimHashIndex, simhash
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, name=TASK_REBUILD_DUPLICATE_INDEX)
+def rebuild_duplicate_index(self) -> str:
+    """
+    Celery 任務：依 tb_jobs 全表重新計算 SimHash 與 canonical_job_id。
+
+    職缺依刊登日期由舊到新處理，每個近似重複群組以最早刊登的職缺為代表。
+    LSH 索引保留在記憶體中 (每筆職缺只佔一個簽章與六個分段)，資料列則分批串流讀取與寫回。
+    """
+    logger.info("開始重建近似重複職缺索引...")
+    statement = (
+        select(Job.job_id, Job.company_id, Job.description)
+        .order_by(Job.posted_date, Job.job_id)
+    )
+    index: SimHashIndex[str] = SimHashIndex()
+    canonicals: Dict[str, str] = {}
+    total = duplicates = 0
+
+    for chunk in stream_rows(statement, chunk_size=config.EXPORT_CHUNK_SIZE):
+        updates: List[Dict[str, Any]] = []
+        for row in chunk:
+            job_id, signature, company_id = row["job_id"], simhash(row["description"]), row["company_id"] or ""
+            canonical = job_id
+            if signature is not None:
+                matches = index.query(signature, company_id)
+                if matches:
+                    canonical = canonicals[matches[0][1]]
+                index.add(job_id, signature, company_id)
+                canonicals[job_id] = canonical
+            duplicates += canonical != job_id
+            updates.append({"job_id": job_id, "company_id": company_id, "simhash": signature, "canonical_job_id": canonical})
+        update_job_dedup_columns(updates)
+        replace_simhash_bands({row["job_id"]: (row["company_id"], row["simhash"]) for row in updates})
+        total += len(updates)
+        logger.info(f"Progress: {total} jobs indexed, {duplicates} near-duplicates so far.")
+
+    summary = f"近似重複職缺索引重建完成，共 {total} 筆職缺，其中 {duplicates} 筆為重複。"
+    logger.info(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    rebuild_duplicate_index.delay()
+    logger.info("近似重複職缺索引重建任務已成功觸發。")
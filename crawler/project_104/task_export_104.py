@@ -0,0 +1,235 @@
+# crawler/project_104/task_export_104.py
+"""
+Parquet 快照匯出任務。
+
+將 tb_jobs / tb_companies / tb_urls / tb_category 依 update_date 分區匯出為 Parquet 檔案，
+讓歷史分析直接讀取資料目錄中的欄式檔案，不再與爬蟲寫入競爭 MySQL。
+
+目錄結構 (Hive 風格分區，可直接被 pyarrow / DuckDB / Spark 讀取)：
+    {DATA_DIR}/parquet/{table}/dt=YYYY-MM-DD/part-0.parquet
+分區鍵 dt 對 tb_jobs 是 update_date，對 tb_companies / tb_urls / tb_category 是 DATE(updated_at)。
+(不直接命名為 update_date，避免與 tb_jobs 本身的欄位衝突。)
+
+增量策略：每張表記錄上次匯出的最新分區日期，下次只重寫該日期 (含) 之後的分區。
+水位線之前的分區會比對檔案與資料庫中該分區的主鍵：資料列被重新抓取而移到新的分區、
+被保留期限任務刪除，或以較早的日期新增時，該分區會依資料庫目前的內容重寫 (沒有資料列時刪除)，
+因此快照與資料表的目前狀態一致，每個主鍵只出現在一個分區。已刪除職缺的歷史版本請見歸檔資料。
+"""
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Table, func
+from sqlmodel import select
+
+from crawler import config
+from crawler.app import TASK_EXPORT_PARQUET, app
+from crawler.database.connection import get_engine
+from crawler.database.repository import stream_rows
+from crawler.database.schema import LOW_CARDINALITY_COLUMNS, metadata
+from crawler.utilis.arrow_utils import (
+    arrow_schema_for_table,
+    import_pyarrow,
+    record_batch_from_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+PARQUET_DIR = os.path.join(config.DATA_DIR, "parquet")
+STATE_FILE = os.path.join(PARQUET_DIR, "_export_state.json")
+EXPORT_CHUNK_SIZE = 20000
+
+# 表格名稱 -> (分區來源欄位, 是否為 TIMESTAMP 欄位)
+SNAPSHOT_TABLES: Dict[str, Tuple[str, bool]] = {
+    "tb_jobs": ("update_date", False),
+    "tb_companies": ("updated_at", True),
+    "tb_urls": ("updated_at", True),
+    "tb_category": ("updated_at", True),
+}
+
+
+def _load_state() -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(STATE_FILE):
+        return {}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"讀取匯出狀態檔失敗: {e}，將視為首次匯出。")
+        return {}
+
+
+def _save_state(state: Dict[str, Dict[str, str]]) -> None:
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _changed_partitions(table: Table, column_name: str, is_timestamp: bool, since: Optional[date]) -> List[date]:
+    """找出分區欄位值在 since (含) 之後的所有日期；since 為 None 時回傳全部分區。"""
+    column = table.c[column_name]
+    partition_expr = func.date(column) if is_timestamp else column
+    query = select(partition_expr).distinct().where(column.is_not(None))
+    if since is not None:
+        lower_bound = datetime.combine(since, datetime.min.time()) if is_timestamp else since
+        query = query.where(column >= lower_bound)
+    with get_engine().connect() as connection:
+        values = connection.execute(query).scalars().all()
+    return sorted({_to_date(v) for v in values if v is not None})
+
+
+def _partition_condition(table: Table, column_name: str, is_timestamp: bool, partition: date):
+    column = table.c[column_name]
+    if is_timestamp:
+        start = datetime.combine(partition, datetime.min.time())
+        return (column >= start) & (column < start + timedelta(days=1))
+    return column == partition
+
+
+def _partition_dir(table_name: str, partition: date) -> str:
+    return os.path.join(PARQUET_DIR, table_name, f"dt={partition.isoformat()}")
+
+
+def _exported_partitions(table_name: str) -> List[date]:
+    """列出資料目錄中已經匯出的分區。"""
+    table_dir = os.path.join(PARQUET_DIR, table_name)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(
+        _to_date(name[len("dt="):]) for name in os.listdir(table_dir)
+        if name.startswith("dt=") and os.path.isdir(os.path.join(table_dir, name))
+    )
+
+
+def _partition_is_stale(table: Table, column_name: str, is_timestamp: bool, partition: date) -> bool:
+    """比對已匯出分區檔案與資料庫中該分區的主鍵，不一致 (有資料列移入、移出或被刪除) 時回傳 True。"""
+    _, pq = import_pyarrow()
+    key_columns = [column.name for column in table.primary_key.columns]
+    path = os.path.join(_partition_dir(table.name, partition), "part-0.parquet")
+    if not os.path.exists(path):
+        return True
+    exported = pq.read_table(path, columns=key_columns).to_pydict()
+    exported_keys: Set[Tuple[Any, ...]] = set(zip(*(exported[name] for name in key_columns)))
+    query = select(*table.primary_key.columns).where(_partition_condition(table, column_name, is_timestamp, partition))
+    with get_engine().connect() as connection:
+        current_keys = {tuple(row) for row in connection.execute(query)}
+    return exported_keys != current_keys
+
+
+def _write_partition(table: Table, column_name: str, is_timestamp: bool, partition: date) -> int:
+    """將單一分區完整重寫為 Parquet 檔 (先寫暫存檔再原子替換)；分區已沒有資料列時刪除該分區目錄。"""
+    _, pq = import_pyarrow()
+    condition = _partition_condition(table, column_name, is_timestamp, partition)
+
+    dictionary_columns = LOW_CARDINALITY_COLUMNS.get(table.name, ())
+    schema = arrow_schema_for_table(table, dictionary_columns)
+    partition_dir = _partition_dir(table.name, partition)
+    os.makedirs(partition_dir, exist_ok=True)
+    final_path = os.path.join(partition_dir, "part-0.parquet")
+    tmp_path = f"{final_path}.tmp"
+
+    rows_written = 0
+    writer = pq.ParquetWriter(
+        tmp_path, schema, compression="zstd", use_dictionary=list(dictionary_columns)
+    )
+    try:
+        for rows in stream_rows(select(table).where(condition), chunk_size=EXPORT_CHUNK_SIZE):
+            writer.write_batch(record_batch_from_rows(rows, schema))
+            rows_written += len(rows)
+    finally:
+        writer.close()
+    if rows_written == 0:
+        shutil.rmtree(partition_dir)
+        return 0
+    os.replace(tmp_path, final_path)
+    return rows_written
+
+
+def export_table_snapshot(table_name: str, state: Dict[str, Dict[str, str]], full: bool = False) -> int:
+    """
+    增量匯出單一表格的 Parquet 分區，並更新 state 中的水位線。
+
+    Args:
+        table_name (str): 要匯出的表格名稱，需存在於 SNAPSHOT_TABLES。
+        state (Dict[str, Dict[str, str]]): 匯出狀態 (會被就地更新)。
+        full (bool): 為 True 時忽略水位線，重寫所有分區。
+
+    Returns:
+        int: 本次寫入的資料列數。
+    """
+    column_name, is_timestamp = SNAPSHOT_TABLES[table_name]
+    table = metadata.tables[table_name]
+    table_state = state.get(table_name, {})
+    since = None if full or "last_partition" not in table_state else _to_date(table_state["last_partition"])
+
+    partitions = _changed_partitions(table, column_name, is_timestamp, since)
+    # 水位線之前 (或資料庫中已沒有資料列) 的分區只在主鍵與資料庫不一致時重寫
+    stale_partitions = [
+        partition for partition in _exported_partitions(table_name)
+        if partition not in partitions and _partition_is_stale(table, column_name, is_timestamp, partition)
+    ]
+    if not partitions and not stale_partitions:
+        logger.info(f"表格 {table_name} 自 {since} 以來沒有變動的分區。")
+        return 0
+
+    total_rows = 0
+    for partition in sorted(set(partitions) | set(stale_partitions)):
+        rows = _write_partition(table, column_name, is_timestamp, partition)
+        total_rows += rows
+        if rows:
+            logger.info(f"已匯出 {table_name} 分區 dt={partition}: {rows} 筆。")
+        else:
+            logger.info(f"{table_name} 分區 dt={partition} 已沒有資料列，刪除該分區。")
+
+    if partitions:
+        state[table_name] = {
+            "last_partition": partitions[-1].isoformat(),
+            "last_export_at": datetime.now().isoformat(timespec="seconds"),
+        }
+    return total_rows
+
+
+@app.task(bind=True, name=TASK_EXPORT_PARQUET)
+def export_parquet_snapshots(self, tables: Optional[List[str]] = None, full: bool = False) -> str:
+    """
+    Celery 任務：將資料表增量匯出為依 update_date 分區的 Parquet 快照。
+
+    Args:
+        tables (Optional[List[str]]): 要匯出的表格，預設為 SNAPSHOT_TABLES 的全部表格。
+        full (bool): 為 True 時重寫所有分區。
+    """
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    state = _load_state()
+    summary_parts: List[str] = []
+    for table_name in tables or list(SNAPSHOT_TABLES):
+        if table_name not in SNAPSHOT_TABLES:
+            logger.warning(f"表格 {table_name} 不支援快照匯出，略過。")
+            continue
+        rows = export_table_snapshot(table_name, state, full=full)
+        # 每張表完成後立即保存水位線，任務中途失敗時已完成的表格不會重做
+        _save_state(state)
+        summary_parts.append(f"{table_name}={rows}")
+
+    summary = f"Parquet 快照匯出完成: {', '.join(summary_parts)}"
+    logger.info(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    export_parquet_snapshots.delay()
+    logger.info("Parquet 快照匯出任務已成功觸發。")
@@ -1,20 +1,53 @@
 # crawler/project_104/task_job_details_104.py
+import json
 import logging
-import pandas as pd
+import os
 import requests
+import threading
 import time
 import random
-from typing import List, Any, Sequence, Dict, Optional
+from typing import TYPE_CHECKING, List, Any, Sequence, Dict, Optional, Set, Tuple
 from datetime import datetime, date
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 
 from pydantic import ValidationError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from crawler.app import app
-from crawler.database.repository import upsert_from_dataframe, get_all_urls_by_source
+from crawler import config
+from crawler.app import TASK_FETCH_JOB_DETAILS, app
+from crawler.database.repository import (
+    get_all_urls_by_source,
+    get_urls_needing_details,
+    get_stat_keys_for_jobs,
+    extract_stat_keys,
+    refresh_job_stats,
+    assign_canonical_job_ids,
+    record_detail_fetches,
+    upsert_companies,
+    upsert_crawl_progress,
+    upsert_jobs,
+)
+from crawler.metrics import (
+    BATCH_FLUSH_DURATION,
+    BATCH_FLUSH_SIZE,
+    ENDPOINT_DETAIL_API,
+    HTTP_RETRIES,
+    PARSE_DURATION,
+    instrumented_get,
+)
+from crawler.project_104 import config_104
 from crawler.project_104.constants_104 import HEADERS
-from crawler.database.schema import Job
+from crawler.database.schema import COMPANY_ATTRIBUTES, Job
+from crawler.utilis.data_processing import clean_text_columns, job_content_hash
+from crawler.utilis.geo import encode_geohash, parse_coordinate
+from crawler.utilis.parse_pool import BatchedParser, ParsedItem, get_process_pool, resolve_process_count
+from crawler.utilis.progress import ProgressReporter
+from crawler.utilis.single_flight import SingleFlightCache
+from crawler.utilis.tracing import Trace, TraceRecorder, bind_trace, current_trace, span, traced_session
+
+if TYPE_CHECKING:
+    # pandas 在第一次寫入批次時才導入，只派發任務的程序 (Producer、排程器) 不必載入
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +58,28 @@ REQUEST_TIMEOUT = 20
 LOG_PROGRESS_INTERVAL = 100
 # [新] 全局速率限制：每秒最多發起 N 個請求 (1/N = 每個請求的間隔)
 # 例如，10 QPS (Query Per Second) -> 每個請求間隔 0.1 秒
-REQUESTS_PER_SECOND = 10
-DELAY_BETWEEN_REQUESTS = 1.0 / REQUESTS_PER_SECOND
+REQUESTS_PER_SECOND = config_104.DETAIL_REQUESTS_PER_SECOND
+DELAY_BETWEEN_REQUESTS = 1.0 / REQUESTS_PER_SECOND if REQUESTS_PER_SECOND > 0 else 0.0
+# 寫入資料庫前以批次方式清理的長文字欄位
+JOB_TEXT_COLUMNS = (
+    "description", "qualification_required", "qualification_bonus",
+    "qualification_other", "remote_work_description",
+)
+
+# 每個抓取執行緒各自重用一個 Session (保持連線)，並記錄新連線的建立時間
+_thread_local = threading.local()
 
-def _parse_api_data(api_data: Dict[str, Any], job_id: str) -> Job:
-    """接收原始 API 資料，將其轉換並驗證為統一的 Job 模型。"""
+def _get_session() -> requests.Session:
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = traced_session()
+    return session
+
+def _parse_api_data(api_data: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+    """
+    接收原始 API 資料，將其轉換為統一的 Job 模型欄位，並附上 tb_companies 的公司欄位
+    (company_name、industry、employees)，寫入時再分別存入兩張表。
+    """
     def safe_get(keys: Sequence[str], default: Any = None) -> Any:
         d = api_data
         for key in keys:
@@ -49,6 +99,10 @@ def _parse_api_data(api_data: Dict[str, Any], job_id: str) -> Job:
         if not date_str: return None
         try: return datetime.strptime(date_str, "%Y/%m/%d").date()
         except ValueError: return None
+    latitude = parse_coordinate(safe_get(['jobDetail', 'latitude']), 90)
+    longitude = parse_coordinate(safe_get(['jobDetail', 'longitude']), 180)
+    if latitude is None or longitude is None:
+        latitude = longitude = None
     payload = {
         "job_id": job_id, "title": safe_get(['header', 'jobName']), "description": safe_get(['jobDetail', 'jobDescription']),
         "posted_date": to_date_from_string(safe_get(['header', 'appearDate'])), "salary": safe_get(['jobDetail', 'salary']),
@@ -56,7 +110,8 @@ def _parse_api_data(api_data: Dict[str, Any], job_id: str) -> Job:
         "salary_type": safe_get(['jobDetail', 'salaryType']), "work_time": safe_get(['jobDetail', 'workPeriod']),
         "work_type": safe_get(['jobDetail', 'jobType']), "need_employees": safe_get(['jobDetail', 'needEmp']),
         "location": safe_get(['jobDetail', 'addressRegion']), "company_address": safe_get(['jobDetail', 'addressDetail']),
-        "longitude": safe_get(['jobDetail', 'longitude']), "latitude": safe_get(['jobDetail', 'latitude']),
+        "longitude": longitude, "latitude": latitude,
+        "geohash": encode_geohash(latitude, longitude) if latitude is not None else None,
         "degree": safe_get(['condition', 'edu']), "working_experience": safe_get(['condition', 'workExp']),
         "department": extract_and_join(safe_get(['condition', 'major'], [])), "qualification_required": extract_and_join(safe_get(['condition', 'specialty'], [])),
         "qualification_bonus": extract_and_join(safe_get(['condition', 'skill'], [])), "qualification_other": safe_get(['condition', 'other']),
@@ -67,45 +122,202 @@ def _parse_api_data(api_data: Dict[str, Any], job_id: str) -> Job:
         "last_processed_resume_at_time": to_datetime_from_timestamp(safe_get(['interactionRecord', 'lastProcessedResumeAtTime'])),
         "now_timestamp": to_datetime_from_timestamp(safe_get(['interactionRecord', 'nowTimestamp'])),
     }
-    return Job(**payload)
+    company = {name: payload.pop(name) for name in COMPANY_ATTRIBUTES}
+    return {**Job(**payload).model_dump(), **company}
+
+def _before_retry_sleep(retry_state) -> None:
+    HTTP_RETRIES.labels(ENDPOINT_DETAIL_API).inc()
+    trace = current_trace()
+    if trace is not None:
+        trace.add("retry_wait", retry_state.next_action.sleep)
+        trace.attributes["attempts"] = retry_state.attempt_number + 1
+    logger.warning(f"Request for {retry_state.args[0]} failed, retrying in {retry_state.next_action.sleep:.1f}s... (Attempt {retry_state.attempt_number})")
+
+def _job_id_from_url(url: str) -> str:
+    return url.split("/")[-1].split("?")[0]
 
 @retry(
     retry=retry_if_exception_type(requests.HTTPError),
     stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
-    before_sleep=lambda rs: logger.warning(f"Request for {rs.args[0]} failed, retrying in {rs.next_action.sleep:.1f}s... (Attempt {rs.attempt_number})")
+    before_sleep=_before_retry_sleep,
 )
-def _fetch_single_job_data(url: str) -> Optional[Job]:
-    """抓取並解析單一職缺 URL，具備自動重試功能。"""
-    try:
-        job_id = url.split("/")[-1].split("?")[0]
-        api_url = f"https://www.104.com.tw/job/ajax/content/{job_id}"
-        response = requests.get(api_url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        api_data = response.json().get("data")
-        if not api_data: return None
-        return _parse_api_data(api_data, job_id)
-    except requests.RequestException:
-        # 讓 tenacity 捕獲並重試
-        raise
-    except Exception as e:
-        logger.exception(f"Non-retryable error on {url}")
-        return None
+def _download_job_data(url: str) -> Tuple[str, bytes]:
+    """抓取單一職缺 API 的原始回應內容，具備自動重試功能。回傳 (job_id, 回應內容)。"""
+    job_id = _job_id_from_url(url)
+    api_url = f"{config_104.SITE_BASE_URL}/job/ajax/content/{job_id}"
+    # stream=True 讓收到標頭 (ttfb，含 connect) 與下載內文 (download) 可以分開計時
+    with span("ttfb"):
+        response = instrumented_get(
+            ENDPOINT_DETAIL_API, api_url, session=_get_session(),
+            headers=HEADERS, timeout=REQUEST_TIMEOUT, stream=True,
+        )
+    with span("download"):
+        body = response.content
+    response.raise_for_status()
+    return job_id, body
+
+def _download_job_data_once(url: str, fetch_cache: Optional[SingleFlightCache] = None) -> Tuple[str, bytes]:
+    """同一次執行中以職缺 ID 合併重複的下載：指向同一職缺的不同 URL (例如帶有查詢參數) 只下載一次。"""
+    if fetch_cache is None:
+        return _download_job_data(url)
+    return fetch_cache.get_or_fetch(_job_id_from_url(url), lambda: _download_job_data(url))
+
+def _parse_job_body(job_id: str, body: bytes) -> Optional[Dict[str, Any]]:
+    """
+    解碼並解析職缺 API 的回應內容。
+
+    JSON 格式錯誤時拋出 json.JSONDecodeError (視為抓取失敗)；資料驗證等其他錯誤記錄後回傳 None。
+    """
+    with span("json_decode"):
+        api_data = json.loads(body).get("data")
+    if not api_data: return None
+    with span("parse"):
+        try:
+            return _parse_api_data(api_data, job_id)
+        except Exception:
+            logger.exception(f"Non-retryable error on job {job_id}")
+            return None
+
+def _fetch_single_job_data(url: str, fetch_cache: Optional[SingleFlightCache] = None) -> Optional[Dict[str, Any]]:
+    """抓取並解析單一職缺 URL (在抓取執行緒中直接解析)。"""
+    job_id, body = _download_job_data_once(url, fetch_cache)
+    with PARSE_DURATION.labels(ENDPOINT_DETAIL_API).time():
+        return _parse_job_body(job_id, body)
+
+# 解析程序回傳的單筆結果：(職缺資料或 None, 錯誤 (例外類型, 訊息) 或 None, 各段耗時)
+ParsedJob = Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]], Dict[str, float]]
+
+def _parse_job_bodies(items: List[Tuple[str, bytes]]) -> List[ParsedJob]:
+    """在解析程序中執行：解析一批 (job_id, 回應內容)，結果順序與輸入相同。"""
+    results = []
+    for job_id, body in items:
+        trace = Trace(job_id, "parse")
+        with bind_trace(trace):
+            try:
+                results.append((_parse_job_body(job_id, body), None, trace.spans))
+            except Exception as e:
+                results.append((None, (type(e).__name__, str(e)), trace.spans))
+    return results
+
+def _fetch_with_trace(
+    url: str, trace: Trace, fetch_cache: Optional[SingleFlightCache] = None
+) -> Optional[Dict[str, Any]]:
+    """在執行緒池中執行：記錄排隊時間，並把 trace 綁定到目前執行緒後抓取。"""
+    trace.add("queue_wait", time.perf_counter() - trace.started_at)
+    with bind_trace(trace):
+        return _fetch_single_job_data(url, fetch_cache)
+
+def _download_with_trace(url: str, trace: Trace, fetch_cache: Optional[SingleFlightCache] = None) -> Tuple[str, bytes]:
+    """解析管線模式下在執行緒池中執行：只下載原始內容，解析交給 process pool。"""
+    trace.add("queue_wait", time.perf_counter() - trace.started_at)
+    with bind_trace(trace):
+        return _download_job_data_once(url, fetch_cache)
 
-def _flush_batch_to_db(job_batch: List[Dict]) -> None:
-    """將一個批次的職缺資料寫入資料庫。"""
+def _create_trace_recorder(run_id: str) -> TraceRecorder:
+    """依設定建立本次執行的 TraceRecorder，有啟用輸出時寫入 {DATA_DIR}/traces/{run_id}.jsonl。"""
+    export = config.TRACE_EXPORT_SAMPLE_RATE > 0 or config.TRACE_EXPORT_SLOW_SECONDS > 0
+    return TraceRecorder(
+        export_path=os.path.join(config.DATA_DIR, "traces", f"{run_id}.jsonl") if export else None,
+        sample_rate=config.TRACE_EXPORT_SAMPLE_RATE,
+        slow_seconds=config.TRACE_EXPORT_SLOW_SECONDS,
+    )
+
+def _merge_stat_keys(target: Dict[str, Set[str]], keys: Dict[str, Set[str]]) -> None:
+    for dimension, values in keys.items():
+        target.setdefault(dimension, set()).update(values)
+
+def _assign_canonical_ids(df_jobs: "pd.DataFrame") -> None:
+    """以清理後的內文計算 SimHash，把近似重複的職缺連到同一個 canonical_job_id。"""
+    import pandas as pd
+    rows = df_jobs[["job_id", "company_id", "description"]].to_dict(orient="records")
+    assign_canonical_job_ids(rows)
+    # simhash 是 64 位元整數，用 object 欄位避免含 None 時被轉成 float 而失去精度
+    df_jobs["simhash"] = pd.Series([row["simhash"] for row in rows], index=df_jobs.index, dtype=object)
+    df_jobs["canonical_job_id"] = [row["canonical_job_id"] for row in rows]
+
+def _content_hashes(df_jobs: "pd.DataFrame") -> Dict[str, str]:
+    """以清理後的欄位計算每筆職缺的內容雜湊值 (job_id -> md5)。"""
+    return {row["job_id"]: job_content_hash(row) for row in df_jobs.to_dict(orient="records")}
+
+def _flush_batch_to_db(
+    job_batch: List[Dict],
+    stat_keys: Optional[Dict[str, Set[str]]] = None,
+    recorder: Optional[TraceRecorder] = None,
+    job_urls: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    將一個批次的職缺資料寫入資料庫。
+
+    若提供 stat_keys，會把本批次寫入前後的維度值累加進去，
+    供任務結束時增量更新 tb_job_stats。
+    若提供 recorder，會記錄一筆 kind="batch" 的 Trace (各步驟的耗時)。
+    若提供 job_urls (job_id -> URL)，會在 tb_urls 記錄抓取時間與內容是否變動，供 recrawl scheduler 使用。
+    公司欄位經由 write-through 快取寫入 tb_companies (沒有變動的公司不寫入)，tb_jobs 只保留 company_id。
+    """
     if not job_batch: return
+    import pandas as pd
     logger.info(f"Flushing a batch of {len(job_batch)} jobs to database...")
-    try:
-        df_jobs = pd.DataFrame(job_batch)
-        upsert_from_dataframe(df_jobs, "tb_jobs")
-    except Exception:
-        logger.exception("Batch database write failed")
-
-@app.task(bind=True, name="crawler.project_104.task_job_details.fetch_and_save_all")
-def fetch_and_save_all_job_details(self) -> str:
-    """Celery 任務：獲取 URL，使用全局速率限制併發抓取，批次儲存。"""
-    logger.info("Task started. Fetching URLs from database...")
-    urls_to_process = list(get_all_urls_by_source(source="104"))
+    BATCH_FLUSH_SIZE.labels("tb_jobs").observe(len(job_batch))
+    trace = recorder.start(f"batch:{job_batch[0]['job_id']}", kind="batch") if recorder else None
+    with BATCH_FLUSH_DURATION.labels("tb_jobs").time(), bind_trace(trace):
+        try:
+            if stat_keys is not None:
+                # 寫入前先記下舊的維度值，職缺換了類別或地區時舊統計也要重算
+                with span("stat_keys"):
+                    _merge_stat_keys(stat_keys, get_stat_keys_for_jobs(job["job_id"] for job in job_batch))
+            with span("clean"):
+                df_jobs = clean_text_columns(pd.DataFrame(job_batch), JOB_TEXT_COLUMNS)
+            with span("dedup"):
+                _assign_canonical_ids(df_jobs)
+            with span("companies"):
+                previous_companies = upsert_companies(job_batch)
+            with span("upsert"):
+                upsert_jobs(df_jobs.drop(columns=list(COMPANY_ATTRIBUTES)))
+            if job_urls:
+                with span("fetch_log"):
+                    hashes = _content_hashes(df_jobs)
+                    record_detail_fetches({job_urls[job_id]: h for job_id, h in hashes.items() if job_id in job_urls})
+            if stat_keys is not None:
+                # 公司換了產業時，舊產業的統計也要重算
+                _merge_stat_keys(stat_keys, extract_stat_keys(job_batch))
+                _merge_stat_keys(stat_keys, extract_stat_keys(filter(None, previous_companies.values())))
+        except Exception:
+            logger.exception("Batch database write failed")
+            if trace is not None:
+                trace.attributes["failed"] = True
+    if trace is not None:
+        trace.attributes["size"] = len(job_batch)
+        recorder.finish(trace)
+
+def _finish_waiting_traces(recorder: TraceRecorder, waiting: List[Trace]) -> None:
+    """批次寫入完成後結束等待中的 URL Trace，記錄從解析完成到寫入完成的時間 (flush_wait)。"""
+    now = time.perf_counter()
+    for trace in waiting:
+        trace.add("flush_wait", now - trace.attributes.pop("_completed_at"))
+        recorder.finish(trace)
+    waiting.clear()
+
+@app.task(bind=True, name=TASK_FETCH_JOB_DETAILS)
+def fetch_and_save_all_job_details(
+    self, urls: Optional[List[str]] = None, refetch_unchanged: bool = False
+) -> str:
+    """
+    Celery 任務：獲取 URL，使用全局速率限制併發抓取，批次儲存。
+
+    Args:
+        urls (Optional[List[str]]): 只抓取這些 URL (由 recrawl scheduler 排程)；None 時從 tb_urls 取得。
+        refetch_unchanged (bool): urls 為 None 時，是否連搜尋結果列表摘要 (標題、公司、更新日期)
+            自上次抓取後沒有變動的職缺也一併重抓。預設只抓取新的或列表摘要有變動的職缺。
+    """
+    if urls is None and refetch_unchanged:
+        logger.info("Task started. Fetching all URLs from database...")
+        urls_to_process = list(get_all_urls_by_source(source="104"))
+    elif urls is None:
+        logger.info("Task started. Fetching new or changed URLs from database...")
+        urls_to_process = list(get_urls_needing_details(source="104"))
+    else:
+        logger.info(f"Task started with {len(urls)} scheduled URLs.")
+        urls_to_process = list(dict.fromkeys(urls))
     total_urls = len(urls_to_process)
 
     if not total_urls:
@@ -116,43 +328,156 @@ def fetch_and_save_all_job_details(self) -> str:
     logger.info(f"Fetched {total_urls} URLs. Starting processing with rate limit of {REQUESTS_PER_SECOND} QPS...")
 
     job_batch: List[Dict] = []
+    # 已解析、等待批次寫入的 URL Trace
+    waiting_traces: List[Trace] = []
+    # 本批次職缺對應的 URL，以及 API 沒有回傳資料的 URL，用於記錄抓取紀錄
+    job_urls: Dict[str, str] = {}
+    empty_urls: List[str] = []
+    stat_keys: Dict[str, Set[str]] = {}
+    run_id = self.request.id or f"details_{datetime.now():%Y%m%dT%H%M%S}"
+    recorder = _create_trace_recorder(run_id)
+    # 即時進度寫入 tb_crawl_progress，可由 GET /crawls/{task_id} 查詢
+    progress = ProgressReporter(
+        run_id, TASK_FETCH_JOB_DETAILS, total_urls, upsert_crawl_progress,
+        interval=config.CRAWL_PROGRESS_INTERVAL_SECONDS,
+    )
+    # 本次執行內以職缺 ID 合併重複的下載
+    fetch_cache: SingleFlightCache[str, Tuple[str, bytes]] = SingleFlightCache(
+        "job_details", config_104.FETCH_CACHE_SIZE, config_104.FETCH_CACHE_TTL_SECONDS
+    )
     total_processed = 0
     urls_completed = 0
     last_request_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # [關鍵優化] 引入速率限制
-        futures = []
-        for url in urls_to_process:
-            # 確保距離上次請求已超過指定間隔
-            time_since_last_request = time.time() - last_request_time
-            if time_since_last_request < DELAY_BETWEEN_REQUESTS:
-                time.sleep(DELAY_BETWEEN_REQUESTS - time_since_last_request)
-            
-            futures.append(executor.submit(_fetch_single_job_data, url))
-            last_request_time = time.time()
-
-        for future in as_completed(futures):
-            urls_completed += 1
+    # 解析管線：抓取執行緒只下載原始內容，JSON 解碼與 pydantic 驗證在 process pool 中分批進行
+    # 無法建立子程序 (例如在 Celery prefork 的子程序中) 時 get_process_pool 回傳 None，維持在抓取執行緒中解析
+    parse_processes = resolve_process_count(config_104.PARSE_PROCESSES)
+    parse_pool = get_process_pool(parse_processes) if parse_processes else None
+    parser: Optional[BatchedParser[Tuple[str, bytes], ParsedJob]] = None
+    if parse_pool is not None:
+        parser = BatchedParser(
+            _parse_job_bodies,
+            parse_pool,
+            batch_size=config_104.PARSE_BATCH_SIZE,
+            max_pending_batches=2 * parse_processes,
+        )
+        logger.info(f"Parsing in {parse_processes} processes (batch size {config_104.PARSE_BATCH_SIZE}).")
+
+    def _record(trace: Trace, job_data: Optional[Dict], error: Optional[Tuple[str, str]] = None) -> None:
+        """記錄單一 URL 的結果，湊滿一批時寫入資料庫。"""
+        nonlocal total_processed, urls_completed
+        urls_completed += 1
+        progress.completed(succeeded=error is None and bool(job_data), failed=error is not None)
+        if error is not None:
+            # 重試後仍然失敗的異常會在這裡被記錄
+            logger.error(f"A sub-task failed permanently: {error[1]}")
+            trace.attributes["outcome"] = "failed"
+            trace.attributes["error"] = error[0]
+            recorder.finish(trace)
+        elif job_data:
+            job_batch.append(job_data)
+            job_urls[job_data["job_id"]] = trace.key
+            total_processed += 1
+            trace.attributes["outcome"] = "parsed"
+            trace.attributes["_completed_at"] = time.perf_counter()
+            waiting_traces.append(trace)
+        else:
+            empty_urls.append(trace.key)
+            trace.attributes["outcome"] = "empty"
+            recorder.finish(trace)
+
+        if len(job_batch) >= BATCH_SIZE:
+            _flush_batch_to_db(job_batch, stat_keys, recorder, job_urls)
+            job_batch.clear()
+            job_urls.clear()
+            _finish_waiting_traces(recorder, waiting_traces)
+
+        if urls_completed % LOG_PROGRESS_INTERVAL == 0:
+            logger.info(f"Progress: {urls_completed}/{total_urls} URLs attempted ({progress.qps():.1f} URLs/s).")
+
+    def _record_parsed(item: ParsedItem[ParsedJob]) -> None:
+        """記錄解析程序的結果，並把子程序中的各段耗時併入 URL Trace。"""
+        trace = item.tag
+        if item.error is not None:
+            _record(trace, None, (type(item.error).__name__, str(item.error)))
+            return
+        job_data, error, spans = item.result
+        parse_seconds = sum(spans.values())
+        PARSE_DURATION.labels(ENDPOINT_DETAIL_API).observe(parse_seconds)
+        for name, seconds in spans.items():
+            trace.add(name, seconds)
+        # 等待湊滿批次、排隊與傳送到子程序的時間
+        trace.add("parse_handoff", max(item.waited - parse_seconds, 0.0))
+        _record(trace, job_data, error)
+
+    def _handle_done(done: Set[Future]) -> None:
+        for future in done:
+            trace = futures.pop(future)
             try:
-                job_model = future.result()
-                if job_model:
-                    job_batch.append(job_model.model_dump())
-                    total_processed += 1
+                result = future.result()
             except Exception as exc:
-                # 重試後仍然失敗的異常會在這裡被捕獲
-                logger.error(f"A sub-task failed permanently: {exc}")
+                _record(trace, None, (type(exc).__name__, str(exc)))
+                continue
+            if parser is None:
+                _record(trace, result)
+            else:
+                parser.submit(result, trace)
+        if parser is not None:
+            for item in parser.results():
+                _record_parsed(item)
+
+    with progress:
+        futures: Dict[Future, Trace] = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            fetch = _fetch_with_trace if parser is None else _download_with_trace
+            for url in urls_to_process:
+                # [關鍵優化] 全局速率限制：確保距離上次請求已超過指定間隔；
+                # 等待期間順便處理已完成的請求，讓解析與寫入資料庫和抓取同時進行
+                while (remaining := DELAY_BETWEEN_REQUESTS - (time.time() - last_request_time)) > 0:
+                    if futures:
+                        _handle_done(wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)[0])
+                    else:
+                        time.sleep(remaining)
+
+                trace = recorder.start(url)
+                futures[executor.submit(fetch, url, trace, fetch_cache)] = trace
+                progress.submitted()
+                last_request_time = time.time()
+
+            for future in as_completed(list(futures)):
+                _handle_done({future})
+
+        if parser is not None:
+            for item in parser.results(wait=True):
+                _record_parsed(item)
 
-            if len(job_batch) >= BATCH_SIZE:
-                _flush_batch_to_db(job_batch)
-                job_batch.clear()
+        if job_batch:
+            _flush_batch_to_db(job_batch, stat_keys, recorder, job_urls)
+            _finish_waiting_traces(recorder, waiting_traces)
 
-            if urls_completed % LOG_PROGRESS_INTERVAL == 0:
-                logger.info(f"Progress: {urls_completed}/{total_urls} URLs attempted.")
+        # 收尾工作在大型任務中可能執行數分鐘，每個步驟前發布心跳，避免被誤判為停滯；
+        # 收尾時拋出的例外同樣會讓進度標記為 FAILURE
+        progress.finalizing()
+        try:
+            record_detail_fetches({url: None for url in empty_urls})
+        except Exception:
+            logger.exception("Recording empty detail fetches failed")
+        recorder.close()
+        # 各段耗時的百分位數 (單位 ms)，用來判斷尾端延遲來自排隊、網路、解析還是資料庫
+        logger.info(f"Stage timings for this run:\n{recorder.format_summary()}")
+        if recorder.exported:
+            logger.info(f"Exported {recorder.exported} traces to {recorder.export_path}")
 
-    if job_batch:
-        _flush_batch_to_db(job_batch)
+        # 只重算本次有變動的維度值，讓統計 API 不需要即時 GROUP BY 整張 tb_jobs
+        progress.finalizing()
+        try:
+            refresh_job_stats(stat_keys)
+        except Exception:
+            logger.exception("Refreshing job stats failed")
 
+        progress.finish()
     summary = f"Task finished. Attempted {total_urls} URLs, successfully parsed {total_processed} jobs."
+    if fetch_cache.hits or fetch_cache.coalesced:
+        summary += f" {fetch_cache.hits + fetch_cache.coalesced} duplicate job downloads were skipped."
     logger.info(summary)
     return summary
\ No newline at end of file
@@ -0,0 +1,179 @@
+# crawler/project_104/task_retention_104.py
+"""
+tb_jobs 的保留與歸檔任務。
+
+update_date 早於保留期限 (config.JOBS_RETENTION_DAYS) 所在月份的職缺視為已下架：
+先歸檔 (config.JOBS_ARCHIVE_MODE)，再從 tb_jobs 移除，讓熱資料表只保留近期的職缺。
+- "table"：寫入 tb_jobs_archive (欄位與 tb_jobs 相同，另有 archived_at)。
+- "parquet"：寫入 {DATA_DIR}/archive/tb_jobs/dt=YYYY-MM/part-{時間戳}.parquet。
+- "none"：不歸檔，直接移除。
+
+保留期限以整月計算 (boundary 為月份第一天)，與 partitioning 的月份分區一致：
+tb_jobs 已分區時，過期的分區在歸檔完成後以 DROP PARTITION 整個移除；未分區時以分頁逐批 DELETE。
+"""
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from crawler import config
+from crawler.app import TASK_ARCHIVE_EXPIRED_JOBS, TASK_REBUILD_JOB_STATS, app
+from crawler.database.connection import get_engine
+from crawler.database.partitioning import (
+    add_months,
+    drop_expired_partitions,
+    ensure_future_partitions,
+    is_partitioned,
+    month_start,
+)
+from crawler.database.repository import (
+    archive_job_rows,
+    delete_jobs,
+    get_jobs_page,
+    get_oldest_job_date,
+    prune_crawl_progress,
+    prune_job_change_writers,
+    prune_job_changes,
+    refresh_listed_jobs,
+)
+from crawler.database.schema import LOW_CARDINALITY_COLUMNS, metadata
+from crawler.utilis.arrow_utils import arrow_schema_for_table, import_pyarrow, record_batch_from_rows
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join(config.DATA_DIR, "archive", "tb_jobs")
+ARCHIVE_MODES = ("table", "parquet", "none")
+ARCHIVE_PAGE_SIZE = 5000
+
+
+def retention_boundary(retention_days: int, today: Optional[date] = None) -> date:
+    """
+    計算保留期限：update_date 早於回傳日期的職缺會被歸檔。
+
+    以月份為單位向下取整，保留的資料至少涵蓋 retention_days 天。
+
+    Args:
+        retention_days (int): 保留天數。
+        today (Optional[date]): 目前日期，預設為今天。
+
+    Returns:
+        date: 保留期限所在月份的第一天。
+    """
+    today = today or date.today()
+    return month_start(today - timedelta(days=retention_days))
+
+
+def _write_parquet_page(month: date, rows: List[Dict[str, Any]]) -> str:
+    """將一頁職缺寫成該月份歸檔目錄下的一個 Parquet 檔 (先寫暫存檔再原子替換)。"""
+    pa, pq = import_pyarrow()
+    table = metadata.tables["tb_jobs"]
+    dictionary_columns = LOW_CARDINALITY_COLUMNS.get(table.name, ())
+    schema = arrow_schema_for_table(table, dictionary_columns)
+    partition_dir = os.path.join(ARCHIVE_DIR, f"dt={month:%Y-%m}")
+    os.makedirs(partition_dir, exist_ok=True)
+    # 同一月份可能在多次執行中各歸檔一部分 (例如期間被重新抓取的職缺)，以時間戳區分檔案
+    final_path = os.path.join(partition_dir, f"part-{datetime.now():%Y%m%d%H%M%S%f}.parquet")
+    tmp_path = f"{final_path}.tmp"
+    pq.write_table(
+        pa.Table.from_batches([record_batch_from_rows(rows, schema)]),
+        tmp_path, compression="zstd", use_dictionary=list(dictionary_columns),
+    )
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def archive_month(month: date, boundary: date, archive_mode: str, keep_jobs: bool) -> int:
+    """
+    歸檔並移除單一月份中 update_date 早於 boundary 的職缺。
+
+    Args:
+        month (date): 月份的第一天。
+        boundary (date): 保留期限。
+        archive_mode (str): "table"、"parquet" 或 "none"。
+        keep_jobs (bool): 為 True 時不逐列刪除 tb_jobs (稍後整個分區 DROP)。
+
+    Returns:
+        int: 歸檔的職缺數。
+    """
+    end = min(add_months(month, 1), boundary)
+    archived_at = datetime.now()
+    archived = 0
+    last_job_id = ""
+    while True:
+        rows = get_jobs_page(month, end, after_job_id=last_job_id, limit=ARCHIVE_PAGE_SIZE)
+        if not rows:
+            break
+        if archive_mode == "table":
+            archive_job_rows(rows, archived_at)
+        elif archive_mode == "parquet":
+            _write_parquet_page(month, rows)
+        job_ids = [row["job_id"] for row in rows]
+        delete_jobs(job_ids, boundary, keep_jobs=keep_jobs)
+        archived += len(rows)
+        last_job_id = job_ids[-1]
+    if archived:
+        logger.info(f"已歸檔 {month:%Y-%m} 的 {archived} 筆職缺 (模式: {archive_mode})。")
+    return archived
+
+
+@app.task(bind=True, name=TASK_ARCHIVE_EXPIRED_JOBS)
+def archive_expired_jobs(self, retention_days: Optional[int] = None, archive_mode: Optional[str] = None) -> str:
+    """
+    Celery 任務：歸檔並移除超過保留期限的職缺，之後重建職缺統計；
+    同時刪除超過 config.JOB_CHANGES_RETENTION_DAYS 的職缺變更紀錄，
+    以及超過 config.CRAWL_PROGRESS_RETENTION_DAYS 沒有更新的任務進度紀錄。
+
+    Args:
+        retention_days (Optional[int]): 保留天數，預設為 config.JOBS_RETENTION_DAYS；0 代表不移除任何資料。
+        archive_mode (Optional[str]): 歸檔方式，預設為 config.JOBS_ARCHIVE_MODE。
+    """
+    retention_days = config.JOBS_RETENTION_DAYS if retention_days is None else retention_days
+    archive_mode = (archive_mode or config.JOBS_ARCHIVE_MODE).lower()
+    if archive_mode not in ARCHIVE_MODES:
+        raise ValueError(f"不支援的歸檔方式: {archive_mode} (可用: {', '.join(ARCHIVE_MODES)})")
+    if config.JOB_CHANGES_RETENTION_DAYS > 0:
+        pruned = prune_job_changes(datetime.now() - timedelta(days=config.JOB_CHANGES_RETENTION_DAYS))
+        if pruned:
+            logger.info(f"已刪除 {pruned} 筆超過 {config.JOB_CHANGES_RETENTION_DAYS} 天的職缺變更紀錄。")
+    prune_job_change_writers(datetime.now() - timedelta(seconds=config.JOB_CHANGE_WRITER_TIMEOUT_SECONDS))
+    if config.CRAWL_PROGRESS_RETENTION_DAYS > 0:
+        prune_crawl_progress(datetime.now() - timedelta(days=config.CRAWL_PROGRESS_RETENTION_DAYS))
+    if retention_days <= 0:
+        return "未設定保留期限，略過職缺歸檔。"
+
+    engine = get_engine()
+    partitioned = is_partitioned(engine)
+    if partitioned:
+        ensure_future_partitions(engine, config.JOBS_PARTITION_MONTHS_AHEAD)
+
+    boundary = retention_boundary(retention_days)
+    # 列表摘要沒變的職缺不會重抓詳情，以 URL 最近被看到的日期延長它們的 update_date
+    refreshed = refresh_listed_jobs(datetime.combine(boundary, datetime.min.time()), boundary)
+    if refreshed:
+        logger.info(f"{refreshed} 筆職缺在保留期限內仍出現在搜尋結果中，update_date 更新為最近一次看到的日期。")
+
+    archived = 0
+    oldest = get_oldest_job_date()
+    month = month_start(oldest) if oldest else boundary
+    while month < boundary:
+        archived += archive_month(month, boundary, archive_mode, keep_jobs=partitioned)
+        month = add_months(month, 1)
+
+    dropped: List[str] = drop_expired_partitions(engine, boundary) if partitioned else []
+    if archived or dropped:
+        app.signature(TASK_REBUILD_JOB_STATS).apply_async()
+
+    summary = (
+        f"職缺歸檔完成: 保留 {boundary} 之後的職缺，歸檔 {archived} 筆 (模式: {archive_mode})"
+        + (f"，刪除分區 {dropped}" if dropped else "")
+    )
+    logger.info(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    archive_expired_jobs.delay()
+    logger.info("職缺歸檔任務已成功觸發。")
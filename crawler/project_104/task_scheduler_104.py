@@ -0,0 +1,115 @@
+# crawler/project_104/task_scheduler_104.py
+"""
+依新鮮度排程重新爬取的 Celery 任務，由 Celery beat 每隔 config_104.RECRAWL_INTERVAL_MINUTES 分鐘觸發
+(見 crawler.app 的 beat_schedule)。
+
+每一輪在 RECRAWL_REQUEST_BUDGET 個請求內，以 recrawl_planner 比較「重新搜尋類別」與「重抓職缺詳情」
+的預期價值，再以任務名稱派發 `fetch_and_save_all_urls` 與帶有 URL 清單的 `fetch_and_save_all_job_details`。
+"""
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from crawler.app import TASK_FETCH_JOB_DETAILS, TASK_FETCH_URLS, TASK_SCHEDULE_RECRAWLS, app
+from crawler.database.repository import (
+    get_crawl_yields,
+    get_leaf_categories,
+    iter_url_fetch_stats,
+    mark_urls_scheduled,
+)
+from crawler.project_104 import config_104 as config
+from crawler.project_104.recrawl_planner import (
+    DetailCandidate,
+    build_recrawl_plan,
+    detail_candidate,
+    discovery_candidate,
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "104"
+# 每個詳情任務最多帶入的 URL 數，讓多個 details worker 可以分攤同一輪的工作
+DETAIL_TASK_CHUNK_SIZE = 500
+
+
+def _is_pending(stats: Dict[str, Any], now: datetime, timeout: timedelta) -> bool:
+    """URL 已排程但尚未抓取完成 (且未逾時) 時不再重複排程。"""
+    scheduled_at = stats.get("scheduled_at")
+    if scheduled_at is None or now - scheduled_at > timeout:
+        return False
+    fetched_at = stats.get("details_fetched_at")
+    return fetched_at is None or scheduled_at > fetched_at
+
+
+def _detail_candidates(now: datetime, limit: int) -> List[DetailCandidate]:
+    """串流讀取 tb_urls，只保留價值最高的 limit 筆候選 (不會超過預算能用到的數量)。"""
+    timeout = timedelta(minutes=2 * max(config.RECRAWL_INTERVAL_MINUTES, 1))
+    candidates: Iterator[DetailCandidate] = (
+        detail_candidate(stats, now, config.RECRAWL_DETAIL_CHANGE_WEIGHT)
+        for stats in iter_url_fetch_stats(SOURCE)
+        if not _is_pending(stats, now, timeout)
+    )
+    return heapq.nlargest(limit, candidates, key=lambda item: item.priority)
+
+
+@app.task(bind=True, name=TASK_SCHEDULE_RECRAWLS)
+def schedule_recrawls(
+    self,
+    request_budget: Optional[int] = None,
+    keywords_list: Optional[List[str]] = None,
+) -> str:
+    """
+    Celery 任務：在請求預算內依新鮮度排程 URL 探索與職缺詳情重抓。
+
+    Args:
+        request_budget (Optional[int]): 本輪請求預算，預設為 config_104.RECRAWL_REQUEST_BUDGET。
+        keywords_list (Optional[List[str]]): URL 探索搭配的關鍵字，預設為 config_104.KEYWORDS_LIST。
+
+    Returns:
+        str: 排程結果摘要。
+    """
+    task_id = self.request.id
+    budget = request_budget or config.RECRAWL_REQUEST_BUDGET
+    keywords = keywords_list or config.KEYWORDS_LIST or [""]
+    now = datetime.now()
+
+    yields = get_crawl_yields(SOURCE)
+    discovery = [
+        discovery_candidate(
+            category_id, yields.get(category_id) or {}, now,
+            keyword_count=len(keywords), max_pages=config.MAX_PAGES, probe_pages=config.CRAWL_PROBE_PAGES,
+        )
+        for category_id in get_leaf_categories(SOURCE)
+    ]
+    plan = build_recrawl_plan(
+        [*discovery, *_detail_candidates(now, budget)],
+        request_budget=budget,
+        min_value_per_request=config.RECRAWL_MIN_VALUE_PER_REQUEST,
+    )
+
+    for item in plan.discovery:
+        app.signature(
+            TASK_FETCH_URLS,
+            args=(item.category_id,),
+            kwargs={"keywords_list": keywords, "max_pages": item.max_pages},
+        ).apply_async()
+    urls = [item.url for item in plan.details]
+    for start in range(0, len(urls), DETAIL_TASK_CHUNK_SIZE):
+        app.signature(TASK_FETCH_JOB_DETAILS, kwargs={"urls": urls[start:start + DETAIL_TASK_CHUNK_SIZE]}).apply_async()
+    mark_urls_scheduled(urls, now)
+
+    summary = (
+        f"排程完成：{len(plan.discovery)} 個類別探索、{len(urls)} 筆詳情重抓，"
+        f"共 {plan.requests}/{budget} 個請求，預期價值 {plan.expected_value:.1f}。"
+    )
+    logger.info(f"[Task: {task_id}] {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    schedule_recrawls.delay()
+    logger.info("重新爬取排程任務已成功觸發。")
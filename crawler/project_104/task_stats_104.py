@@ -0,0 +1,31 @@
+# crawler/project_104/task_stats_104.py
+"""
+職缺統計 (tb_job_stats) 相關的 Celery 任務。
+
+日常的增量更新會在 `fetch_and_save_all_job_details` 結束時自動執行，
+此模組提供完整重建的任務，用於首次部署或統計資料需要修復時。
+"""
+import logging
+
+from crawler.app import TASK_REBUILD_JOB_STATS, app
+from crawler.database.repository import refresh_job_stats
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, name=TASK_REBUILD_JOB_STATS)
+def rebuild_job_stats(self) -> str:
+    """Celery 任務：依 tb_jobs 全表重建所有維度的職缺統計。"""
+    logger.info("開始完整重建職缺統計...")
+    written = refresh_job_stats(None)
+    summary = f"職缺統計重建完成，共寫入 {written} 筆統計。"
+    logger.info(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    from crawler.logging_config import setup_logging
+
+    setup_logging()
+    rebuild_job_stats.delay()
+    logger.info("職缺統計重建任務已成功觸發。")
@@ -1,21 +1,40 @@
 # crawler/project_104/task_urls_104.py
+import hashlib
 import logging
 import time
 import random
 import requests
-import pandas as pd
 from datetime import datetime
-from typing import Set, List, Optional, Callable, Iterable, Generator, ClassVar
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, Dict, Set, List, Optional, Callable, Iterable, Generator, ClassVar, NamedTuple, Tuple
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 
-from crawler.app import app
+from crawler.app import TASK_FETCH_URLS, TASK_PLAN_URL_CRAWLS, app
 
 # 更改導入路徑，使用新的 repository
-from crawler.database.repository import upsert_from_dataframe
+from crawler.database.repository import (
+    upsert_from_dataframe,
+    get_existing_urls,
+    get_leaf_categories,
+    get_crawl_yields,
+    record_crawl_yield,
+)
+from crawler.metrics import (
+    BATCH_FLUSH_DURATION,
+    BATCH_FLUSH_SIZE,
+    ENDPOINT_SEARCH_PAGE,
+    PARSE_DURATION,
+    instrumented_get,
+)
 from crawler.project_104 import config_104 as config
+from crawler.project_104.crawl_planner import build_crawl_plan
+from crawler.utilis.parse_pool import BatchedParser, ParsedItem, get_process_pool, resolve_process_count
+from crawler.utilis.single_flight import SingleFlightCache
+
+if TYPE_CHECKING:
+    # BeautifulSoup 與 pandas 在第一次解析 / 寫入時才導入，派發任務的程序不必載入
+    from bs4 import BeautifulSoup, Tag
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +63,37 @@ def run_concurrently(
 # ==============================================================================
 
 
+# 搜尋結果卡片上的職缺摘要欄位 (class 名稱)
+LISTING_TITLE_CLASS = "info-job__text"
+LISTING_COMPANY_CLASS = "info-company__text"
+LISTING_DATE_CLASS = "date-container"
+
+
+class JobListing(NamedTuple):
+    """搜尋結果列表上的職缺摘要 (標題、公司與更新日期)。"""
+
+    title: Optional[str]
+    company: Optional[str]
+    date: Optional[str]
+
+    @property
+    def digest(self) -> str:
+        """摘要的雜湊值，列表上的任一欄位變動 (例如職缺更新日期) 都會改變它。"""
+        return hashlib.md5("\x1f".join(value or "" for value in self).encode("utf-8")).hexdigest()
+
+
+class ScrapeResult(NamedTuple):
+    """單次關鍵字抓取的結果與成本。"""
+
+    listings: Dict[str, JobListing]
+    request_count: int
+    available_pages: int
+
+    @property
+    def urls(self) -> Set[str]:
+        return set(self.listings)
+
+
 @dataclass(frozen=True)
 class KeywordScraper:
     """一個使用 dataclass 的、完全自洽的爬蟲物件。"""
@@ -52,34 +102,86 @@ class KeywordScraper:
     jobcat_code: str
     order: int
     max_pages_limit: int
+    # 同一次執行的各關鍵字共用，重複的搜尋頁請求只發出一次
+    fetch_cache: Optional[SingleFlightCache] = field(default=None, compare=False, repr=False)
 
-    BASE_URL: ClassVar[str] = "https://www.104.com.tw/jobs/search/"
+    BASE_URL: ClassVar[str] = f"{config.SITE_BASE_URL}/jobs/search/"
     BASE_PARAMS: ClassVar[dict] = {"jobsource": "index_s", "mode": "s"}
 
     def scrape(self) -> Set[str]:
+        return self.scrape_with_stats().urls
+
+    def scrape_with_stats(self) -> ScrapeResult:
+        """抓取所有頁面，並回報實際發出的請求數與搜尋結果總頁數。"""
+        parse_processes = resolve_process_count(config.PARSE_PROCESSES)
+        parse_pool = get_process_pool(parse_processes) if parse_processes else None
+        if parse_pool is not None:
+            return self._scrape_with_parse_pool(parse_pool, parse_processes)
+
         first_page_soup = self._fetch_soup(1)
         if not first_page_soup:
-            return set()
+            return ScrapeResult({}, 1, 0)
 
-        all_urls = self._parse_job_urls(first_page_soup)
-        has_urls_on_first_page = bool(all_urls)
+        all_listings = self._parse_job_listings(first_page_soup)
+        has_urls_on_first_page = bool(all_listings)
 
-        effective_max = min(
-            self.max_pages_limit,
-            self._parse_max_pages(first_page_soup, has_urls_on_first_page),
-        )
+        available_pages = self._parse_max_pages(first_page_soup, has_urls_on_first_page)
+        effective_max = min(self.max_pages_limit, available_pages)
         logger.info(f"開始抓取: {self}, 有效頁數: {effective_max}")
 
         if effective_max > 1:
             remaining_pages = range(2, effective_max + 1)
             # Assuming config has MAX_WORKERS_PER_KEYWORD, otherwise use a default
             max_workers = getattr(config, "MAX_WORKERS_PER_KEYWORD", 5)
-            soups = run_concurrently(remaining_pages, self._fetch_soup, max_workers)
-            all_urls.update(set.union(*(self._parse_job_urls(s) for s in soups if s)))
+            for soup in run_concurrently(remaining_pages, self._fetch_soup, max_workers):
+                if soup:
+                    all_listings.update(self._parse_job_listings(soup))
+
+        return ScrapeResult(all_listings, max(effective_max, 1), available_pages)
+
+    def _scrape_with_parse_pool(self, parse_pool: Executor, parse_processes: int) -> ScrapeResult:
+        """
+        解析管線模式：抓取執行緒只下載 HTML，BeautifulSoup 解析以批次交給 process pool。
+
+        第一頁必須先解析才知道總頁數，其餘頁面一邊下載一邊分批送出解析。
+        """
+        parser: BatchedParser[str, ParsedPage] = BatchedParser(
+            _parse_search_pages,
+            parse_pool,
+            batch_size=config.PARSE_BATCH_SIZE,
+            max_pending_batches=2 * parse_processes,
+        )
+        first_page_html = self._fetch_html(1)
+        if first_page_html is None:
+            return ScrapeResult({}, 1, 0)
+        parser.submit(first_page_html)
+        first_page = next(parser.results(wait=True))
+        if first_page.error is not None:
+            return ScrapeResult({}, 1, 0)
+
+        all_listings, available_pages, seconds = first_page.result
+        PARSE_DURATION.labels(ENDPOINT_SEARCH_PAGE).observe(seconds)
+        effective_max = min(self.max_pages_limit, available_pages)
+        logger.info(f"開始抓取: {self}, 有效頁數: {effective_max}")
+
+        def collect(items: Iterable[ParsedItem[ParsedPage]]) -> None:
+            for item in items:
+                if item.error is None:
+                    listings, _, seconds = item.result
+                    PARSE_DURATION.labels(ENDPOINT_SEARCH_PAGE).observe(seconds)
+                    all_listings.update(listings)
+
+        if effective_max > 1:
+            max_workers = getattr(config, "MAX_WORKERS_PER_KEYWORD", 5)
+            for html in run_concurrently(range(2, effective_max + 1), self._fetch_html, max_workers):
+                if html is not None:
+                    parser.submit(html)
+                collect(parser.results())
+            collect(parser.results(wait=True))
 
-        return all_urls
+        return ScrapeResult(all_listings, max(effective_max, 1), available_pages)
 
-    def _fetch_soup(self, page: int) -> Optional[BeautifulSoup]:
+    def _fetch_html(self, page: int) -> Optional[str]:
         params = {
             **self.BASE_PARAMS,
             "jobcat": self.jobcat_code,
@@ -88,30 +190,49 @@ class KeywordScraper:
             "page": page,
         }
         try:
-            time.sleep(random.uniform(0.1, 0.5))
-            response = requests.get(self.BASE_URL, params=params, timeout=20)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            if self.fetch_cache is None:
+                return self._download_html(params)
+            key = (self.BASE_URL, *sorted(params.items()))
+            return self.fetch_cache.get_or_fetch(key, lambda: self._download_html(params))
         except requests.RequestException as e:
             logger.error(f"抓取失敗: {self} on page {page} - {e}")
             return None
 
+    def _download_html(self, params: Dict[str, object]) -> str:
+        time.sleep(random.uniform(config.SEARCH_PAGE_DELAY_MIN, config.SEARCH_PAGE_DELAY_MAX))
+        response = instrumented_get(ENDPOINT_SEARCH_PAGE, self.BASE_URL, params=params, timeout=20)
+        response.raise_for_status()
+        return response.text
+
+    def _fetch_soup(self, page: int) -> Optional["BeautifulSoup"]:
+        from bs4 import BeautifulSoup
+        html = self._fetch_html(page)
+        if html is None:
+            return None
+        with PARSE_DURATION.labels(ENDPOINT_SEARCH_PAGE).time():
+            return BeautifulSoup(html, "html.parser")
+
     @staticmethod
-    def _parse_job_urls(soup: BeautifulSoup) -> Set[str]:
-        urls = set()
+    def _parse_job_listings(soup: "BeautifulSoup") -> Dict[str, JobListing]:
+        """解析搜尋結果頁上的職缺卡片，回傳 {職缺 URL: 列表摘要}。"""
+        listings = {}
         job_articles = soup.find_all("div", class_="job-summary")
         for article in job_articles:
-            a_tag = article.find("a", class_="info-job__text")
+            a_tag = article.find("a", class_=LISTING_TITLE_CLASS)
             if a_tag and a_tag.get("href"):
                 # 確保 URL 格式正確
                 full_url = urljoin("https:", a_tag["href"])
                 # 清理 URL 參數
                 clean_url = urlparse(full_url)._replace(query="").geturl()
-                urls.add(clean_url)
-        return urls
+                listings[clean_url] = JobListing(
+                    title=_listing_text(a_tag, 255),
+                    company=_listing_text(article.find(class_=LISTING_COMPANY_CLASS), 255),
+                    date=_listing_text(article.find(class_=LISTING_DATE_CLASS), 20),
+                )
+        return listings
 
     @staticmethod
-    def _parse_max_pages(soup: BeautifulSoup, has_urls: bool) -> int:
+    def _parse_max_pages(soup: "BeautifulSoup", has_urls: bool) -> int:
         page_buttons = soup.select("a.paging__link")
         if not page_buttons:
             return 1 if has_urls else 0
@@ -119,25 +240,76 @@ class KeywordScraper:
         return max(page_numbers) if page_numbers else (1 if has_urls else 0)
 
 
-def _save_job_urls_to_db(job_urls: Set[str], source: str = "104"):
+def _listing_text(tag: Optional["Tag"], max_length: int) -> Optional[str]:
+    """取出卡片欄位的文字，並截斷為 tb_urls 欄位的長度。"""
+    if tag is None:
+        return None
+    return tag.get_text(" ", strip=True)[:max_length] or None
+
+
+# 解析程序回傳的單頁結果：({職缺 URL: 列表摘要}, 搜尋結果總頁數, 解析秒數)
+ParsedPage = Tuple[Dict[str, JobListing], int, float]
+
+
+def _parse_search_pages(htmls: List[str]) -> List[ParsedPage]:
+    """在解析程序中執行：解析一批搜尋結果頁，結果順序與輸入相同。"""
+    from bs4 import BeautifulSoup
+
+    results = []
+    for html in htmls:
+        start = time.perf_counter()
+        try:
+            soup = BeautifulSoup(html, "html.parser")
+            listings = KeywordScraper._parse_job_listings(soup)
+            results.append((listings, KeywordScraper._parse_max_pages(soup, bool(listings)), time.perf_counter() - start))
+        except Exception:
+            logger.exception("解析搜尋結果頁失敗")
+            results.append(({}, 0, time.perf_counter() - start))
+    return results
+
+
+def _save_job_urls_to_db(
+    job_urls: Iterable[str],
+    source: str = "104",
+    listings: Optional[Dict[str, JobListing]] = None,
+):
+    """
+    儲存職缺 URL；提供 listings 時一併更新列表摘要與其雜湊值，供詳情階段判斷是否需要重抓。
+
+    Args:
+        job_urls (Iterable[str]): 職缺 URL。
+        source (str): 資料來源。
+        listings (Optional[Dict[str, JobListing]]): {職缺 URL: 列表摘要}，未提供時不會覆寫既有的摘要。
+    """
     if not job_urls:
         logger.info("沒有新的職缺 URL 需要儲存。")
         return
+    import pandas as pd
+
     current_time = datetime.now()
-    df = pd.DataFrame(
-        [
-            {
-                "source_url": url,
-                "source": source,
-                "crawled_at": current_time,
-                "updated_at": current_time,
-            }
-            for url in job_urls
-        ]
-    )
+    rows = []
+    for url in job_urls:
+        row = {
+            "source_url": url,
+            "source": source,
+            "crawled_at": current_time,
+            "updated_at": current_time,
+        }
+        listing = listings.get(url) if listings else None
+        if listing is not None:
+            row.update(
+                listing_title=listing.title,
+                listing_company=listing.company,
+                listing_date=listing.date,
+                listing_hash=listing.digest,
+            )
+        rows.append(row)
+    df = pd.DataFrame(rows)
+    BATCH_FLUSH_SIZE.labels("tb_urls").observe(len(df))
     try:
         # 使用新的 repository 函數
-        upsert_from_dataframe(df, "tb_urls")
+        with BATCH_FLUSH_DURATION.labels("tb_urls").time():
+            upsert_from_dataframe(df, "tb_urls")
         logger.info(f"成功儲存 {len(df)} 個職缺 URL。")
     except Exception as e:
         logger.error(f"儲存 URL 到資料庫失敗: {e}", exc_info=True)
@@ -145,25 +317,49 @@ def _save_job_urls_to_db(job_urls: Set[str], source: str = "104"):
 
 
 # ... (_run_scraping_session 和 fetch_and_save_all_urls 內容不變，但內部呼叫已更新)
-def _run_scraping_session(keywords: List[str], jobcat_code: str) -> Set[str]:
-    """協調多個關鍵字的抓取任務。"""
+def _run_scraping_session(
+    keywords: List[str], jobcat_code: str, max_pages: Optional[int] = None
+) -> ScrapeResult:
+    """
+    協調多個關鍵字的抓取任務，並彙總所有關鍵字的 URL 與請求數。
+
+    各關鍵字共用一個 SingleFlightCache，請求數以實際發出的搜尋頁請求計算 (重複的請求只算一次)。
+    """
     max_workers = getattr(config, "MAX_WORKERS", 10)
+    fetch_cache: SingleFlightCache[tuple, str] = SingleFlightCache(
+        "search_pages", config.FETCH_CACHE_SIZE, config.FETCH_CACHE_TTL_SECONDS
+    )
     scrapers = (
-        KeywordScraper(kw, jobcat_code, config.ORDER_SETTING, config.MAX_PAGES)
+        KeywordScraper(kw, jobcat_code, config.ORDER_SETTING, max_pages or config.MAX_PAGES, fetch_cache)
         for kw in keywords
     )
-    url_sets_generator = run_concurrently(scrapers, lambda s: s.scrape(), max_workers)
-    return set().union(*(url_set for url_set in url_sets_generator if url_set))
+    results = [r for r in run_concurrently(scrapers, lambda s: s.scrape_with_stats(), max_workers) if r]
+    listings: Dict[str, JobListing] = {}
+    for r in results:
+        listings.update(r.listings)
+    if fetch_cache.hits or fetch_cache.coalesced:
+        logger.info(
+            f"職務 {jobcat_code}: 合併了 {fetch_cache.hits + fetch_cache.coalesced} 個重複的搜尋頁請求 "
+            f"(實際請求 {fetch_cache.fetches} 次)。"
+        )
+    return ScrapeResult(
+        listings=listings,
+        request_count=fetch_cache.fetches,
+        available_pages=max((r.available_pages for r in results), default=0),
+    )
 
 
-@app.task(bind=True)
+@app.task(bind=True, name=TASK_FETCH_URLS)
 def fetch_and_save_all_urls(
-    self, jobcat_code: str, keywords_list: Optional[List[str]] = None
+    self,
+    jobcat_code: str,
+    keywords_list: Optional[List[str]] = None,
+    max_pages: Optional[int] = None,
 ):
     """Celery 任務，整個流程的最高層協調者。"""
     task_id = self.request.id
     logger.info(
-        f"[Task: {task_id}] 任務啟動。職務: {jobcat_code}, 關鍵字: {keywords_list}"
+        f"[Task: {task_id}] 任務啟動。職務: {jobcat_code}, 關鍵字: {keywords_list}, 頁數上限: {max_pages or config.MAX_PAGES}"
     )
 
     if not jobcat_code:
@@ -172,15 +368,74 @@ def fetch_and_save_all_urls(
 
     keywords = keywords_list or [""]
 
-    all_job_urls = _run_scraping_session(keywords, jobcat_code)
+    result = _run_scraping_session(keywords, jobcat_code, max_pages)
+    all_job_urls = result.urls
+    new_url_count = len(all_job_urls - get_existing_urls(all_job_urls)) if all_job_urls else 0
 
     logger.info(
-        f"[Task: {task_id}] 抓取完成，共發現 {len(all_job_urls)} 個不重複 URL。"
+        f"[Task: {task_id}] 抓取完成，共發現 {len(all_job_urls)} 個不重複 URL "
+        f"(新 URL {new_url_count} 個，請求 {result.request_count} 次)。"
     )
 
     if all_job_urls:
-        _save_job_urls_to_db(all_job_urls)
+        _save_job_urls_to_db(all_job_urls, listings=result.listings)
     else:
         logger.warning(f"[Task: {task_id}] 本次任務未抓取到任何 URL。")
 
+    try:
+        # 記錄本次的成本與產出，供 crawl planner 排序類別
+        record_crawl_yield(
+            jobcat_code, "104", result.request_count, new_url_count, result.available_pages
+        )
+    except Exception as e:
+        logger.error(f"[Task: {task_id}] 記錄爬取成效失敗: {e}", exc_info=True)
+
     logger.info(f"[Task: {task_id}] 任務執行完畢。")
+
+
+@app.task(bind=True, name=TASK_PLAN_URL_CRAWLS)
+def plan_and_dispatch_url_crawls(
+    self,
+    request_budget: Optional[int] = None,
+    keywords_list: Optional[List[str]] = None,
+) -> int:
+    """
+    Celery 任務：依 tb_category 的葉節點類別與歷史產出建立爬取計畫，
+    並為計畫中的每個類別派發一個 `fetch_and_save_all_urls` 任務。
+
+    Args:
+        request_budget (Optional[int]): 本輪搜尋頁請求預算，預設為 config.CRAWL_REQUEST_BUDGET。
+        keywords_list (Optional[List[str]]): 每個類別搭配的關鍵字，預設為無關鍵字搜尋。
+
+    Returns:
+        int: 派發的任務數量。
+    """
+    task_id = self.request.id
+    budget = request_budget or config.CRAWL_REQUEST_BUDGET
+    keywords = keywords_list or [""]
+
+    leaf_categories = get_leaf_categories("104")
+    if not leaf_categories:
+        logger.error(f"[Task: {task_id}] tb_category 中沒有任何類別，請先執行職位類別任務。")
+        return 0
+
+    plan = build_crawl_plan(
+        leaf_categories,
+        get_crawl_yields("104"),
+        request_budget=budget,
+        keyword_count=len(keywords),
+        max_pages=config.MAX_PAGES,
+        probe_pages=config.CRAWL_PROBE_PAGES,
+    )
+    planned_requests = sum(item.estimated_requests for item in plan)
+    logger.info(
+        f"[Task: {task_id}] 爬取計畫: {len(plan)}/{len(leaf_categories)} 個類別，"
+        f"預估 {planned_requests}/{budget} 次請求。"
+    )
+
+    for item in plan:
+        fetch_and_save_all_urls.apply_async(
+            args=(item.category_id,),
+            kwargs={"keywords_list": keywords, "max_pages": item.max_pages},
+        )
+    return len(plan)
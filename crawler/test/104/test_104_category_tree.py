@@ -0,0 +1,80 @@
+# crawler/test/104/test_104_category_tree.py
+"""
+針對 project_104 職務類別樹索引與本地快取進行測試。
+"""
+
+import os
+
+from crawler.project_104.category_tree import (
+    CategoryTree,
+    cache_paths,
+    load_category_tree,
+    read_cached_jobcat,
+    write_cached_jobcat,
+)
+
+JOBCAT = [
+    {
+        "no": "2007000000",
+        "des": "資訊軟體系統類",
+        "n": [
+            {
+                "no": "2007001000",
+                "des": "軟體／工程類人員",
+                "n": [
+                    {"no": "2007001004", "des": "軟體工程師"},
+                    {"no": "2007001012", "des": "後端工程師"},
+                ],
+            }
+        ],
+    }
+]
+
+
+def test_tree_index_lookups():
+    """測試葉節點、祖先與子孫葉節點查詢。"""
+    tree = CategoryTree.from_jobcat_json(JOBCAT)
+
+    assert len(tree) == 4
+    assert tree.leaves() == ["2007001004", "2007001012"]
+    assert tree.ancestors("2007001012") == ["2007001000", "2007000000"]
+    assert tree.descendant_leaves("2007000000") == ["2007001004", "2007001012"]
+    assert tree.get("2007001000").children == ("2007001004", "2007001012")
+
+
+def test_to_rows_matches_tb_category_columns():
+    """測試轉出的資料列帶有父類別名稱。"""
+    rows = {row["category_id"]: row for row in CategoryTree.from_jobcat_json(JOBCAT).to_rows()}
+
+    assert rows["2007001004"] == {
+        "category_id": "2007001004",
+        "category_name": "軟體工程師",
+        "parent_code": "2007001000",
+        "parent_name": "軟體／工程類人員",
+    }
+    assert rows["2007000000"]["parent_code"] == ""
+
+
+def test_cache_round_trip_and_memoized_load(tmp_path):
+    """測試快取寫入後可讀回，且重複載入回傳同一個索引物件。"""
+    write_cached_jobcat(JOBCAT, str(tmp_path))
+
+    assert read_cached_jobcat(str(tmp_path)) == JOBCAT
+    first = load_category_tree(str(tmp_path))
+    assert first is load_category_tree(str(tmp_path))
+    assert first.leaves() == ["2007001004", "2007001012"]
+
+
+def test_memoized_load_is_keyed_by_path(tmp_path):
+    """測試兩個資料目錄的快取檔修改時間相同時，各自載入自己的類別樹。"""
+    other = [{"no": "2008000000", "des": "行銷類", "n": [{"no": "2008001001", "des": "行銷企劃"}]}]
+    first_dir, second_dir = tmp_path / "a", tmp_path / "b"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    write_cached_jobcat(JOBCAT, str(first_dir))
+    write_cached_jobcat(other, str(second_dir))
+    for directory in (first_dir, second_dir):
+        os.utime(cache_paths(str(directory))[0], ns=(1_700_000_000_000_000_000,) * 2)
+
+    assert load_category_tree(str(first_dir)).leaves() == ["2007001004", "2007001012"]
+    assert load_category_tree(str(second_dir)).leaves() == ["2008001001"]
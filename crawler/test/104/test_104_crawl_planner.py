@@ -0,0 +1,45 @@
+# crawler/test/104/test_104_crawl_planner.py
+"""
+針對 project_104 crawl planner 的規劃邏輯進行測試。
+"""
+
+from crawler.project_104.crawl_planner import build_crawl_plan, estimate_yield
+
+
+def _stats(requests, new_urls, pages):
+    return {
+        "crawl_count": 1,
+        "request_count": requests,
+        "new_url_count": new_urls,
+        "last_available_pages": pages,
+    }
+
+
+def test_plan_orders_by_yield_and_respects_budget():
+    """測試規劃器依產出率排序，且估計請求數不超過預算。"""
+    yields = {
+        "low": _stats(requests=50, new_urls=10, pages=50),
+        "high": _stats(requests=10, new_urls=180, pages=10),
+    }
+    plan = build_crawl_plan(["low", "high"], yields, request_budget=30, keyword_count=1, max_pages=100)
+
+    assert [item.category_id for item in plan] == ["high"]
+    assert sum(item.estimated_requests for item in plan) <= 30
+
+
+def test_unexplored_categories_are_probed_first():
+    """測試從未爬過的類別以樂觀先驗排在前面，且只安排試探頁。"""
+    yields = {"known": _stats(requests=20, new_urls=40, pages=20)}
+    plan = build_crawl_plan(
+        ["known", "new_a", "new_b"], yields, request_budget=100, keyword_count=2, max_pages=100
+    )
+
+    assert [item.category_id for item in plan[:2]] == ["new_a", "new_b"]
+    assert all(item.max_pages == 1 and item.estimated_requests == 2 for item in plan[:2])
+    assert plan[2].category_id == "known" and plan[2].max_pages == 20
+
+
+def test_estimate_yield_is_smoothed():
+    """測試產出率估計會被先驗值平滑。"""
+    assert estimate_yield({}, prior_yield=20) == 20
+    assert 0 < estimate_yield({"request_count": 1, "new_url_count": 0}, prior_yield=20) < 20
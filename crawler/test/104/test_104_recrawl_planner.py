@@ -0,0 +1,83 @@
+# crawler/test/104/test_104_recrawl_planner.py
+"""
+針對 project_104 recrawl planner 的新鮮度估計與預算分配進行測試。
+"""
+
+from datetime import datetime, timedelta
+
+from crawler.project_104.recrawl_planner import (
+    build_recrawl_plan,
+    change_probability,
+    detail_candidate,
+    discovery_candidate,
+)
+
+NOW = datetime(2025, 1, 8, 12, 0)
+
+
+def _url(name, hours_ago=None, changes=0, observed_hours=0.0):
+    return {
+        "source_url": name,
+        "details_fetched_at": NOW - timedelta(hours=hours_ago) if hours_ago is not None else None,
+        "change_count": changes,
+        "observed_hours": observed_hours,
+    }
+
+
+def test_change_probability_grows_with_change_rate_and_staleness():
+    """測試常變動、且距上次抓取越久的 URL 估計變動機率越高；從未抓取過的為 1。"""
+    volatile = change_probability(_url("a", hours_ago=24, changes=10, observed_hours=240), NOW)
+    stable = change_probability(_url("b", hours_ago=24, changes=0, observed_hours=24 * 60), NOW)
+    stale_stable = change_probability(_url("c", hours_ago=24 * 30, changes=0, observed_hours=24 * 60), NOW)
+
+    assert volatile > stale_stable > stable
+    assert change_probability(_url("d"), NOW) == 1.0
+
+
+def test_discovery_pages_follow_expected_new_postings():
+    """測試有速率估計的類別只安排足以涵蓋預期新職缺的頁數，尚無估計時只試探。"""
+    hot = discovery_candidate(
+        "hot", {"new_url_rate": 10.0, "last_crawled_at": NOW - timedelta(hours=6)}, NOW,
+        keyword_count=2, max_pages=100, probe_pages=1,
+    )
+    unknown = discovery_candidate("unknown", {}, NOW, keyword_count=2, max_pages=100, probe_pages=1)
+
+    assert (hot.max_pages, hot.cost, hot.expected_value) == (3, 6, 60.0)
+    assert (unknown.max_pages, unknown.cost) == (1, 2)
+
+
+def test_plan_shares_budget_by_value_per_request():
+    """測試探索與詳情共用預算，依每請求價值排序，低於門檻的請求不排程。"""
+    dormant = discovery_candidate(
+        "dormant", {"new_url_rate": 0.01, "last_crawled_at": NOW - timedelta(hours=1)}, NOW,
+        keyword_count=1, max_pages=100, probe_pages=1,
+    )
+    hot = discovery_candidate(
+        "hot", {"new_url_rate": 40.0, "last_crawled_at": NOW - timedelta(hours=1)}, NOW,
+        keyword_count=1, max_pages=100, probe_pages=1,
+    )
+    details = [
+        detail_candidate(_url("never"), NOW, change_weight=0.5),
+        detail_candidate(_url("fresh", hours_ago=1), NOW, change_weight=0.5),
+        detail_candidate(_url("stale", hours_ago=24 * 14, changes=5, observed_hours=24 * 20), NOW, change_weight=0.5),
+    ]
+
+    plan = build_recrawl_plan([dormant, hot, *details], request_budget=4, min_value_per_request=0.05)
+
+    assert [item.url for item in plan.details] == ["never", "stale"]
+    assert [item.category_id for item in plan.discovery] == ["hot"]
+    assert plan.requests <= 4
+
+
+def test_listing_summary_decides_change_when_known():
+    """測試列表摘要在抓取後變動時機率為 1，抓取後再次看到相同摘要時為 0，尚未再次看到時沿用變動率模型。"""
+    fetched = _url("a", hours_ago=24 * 30, changes=0, observed_hours=24 * 60)
+    seen_after_fetch = NOW - timedelta(hours=1)
+
+    changed = {**fetched, "listing_hash": "new", "details_listing_hash": "old", "updated_at": seen_after_fetch}
+    unchanged = {**fetched, "listing_hash": "same", "details_listing_hash": "same", "updated_at": seen_after_fetch}
+    not_seen_since = {**unchanged, "updated_at": fetched["details_fetched_at"] - timedelta(hours=1)}
+
+    assert change_probability(changed, NOW) == 1.0
+    assert change_probability(unchanged, NOW) == 0.0
+    assert change_probability(not_seen_since, NOW) == change_probability(fetched, NOW)
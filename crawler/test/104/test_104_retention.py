@@ -0,0 +1,34 @@
+# crawler/test/104/test_104_retention.py
+"""
+針對 tb_jobs 的月份分區定義與保留期限計算進行測試。
+"""
+
+from datetime import date
+
+from crawler.database.partitioning import add_months, expired_partitions, partition_definitions
+from crawler.project_104.task_retention_104 import retention_boundary
+
+
+def test_partition_definitions_cover_each_month():
+    """測試每個月份產生一個分區，上界為下個月第一天 (跨年亦同)。"""
+    assert add_months(date(2024, 11, 20), 3) == date(2025, 2, 1)
+    assert add_months(date(2025, 1, 5), -1) == date(2024, 12, 1)
+    assert partition_definitions(date(2024, 11, 15), date(2025, 1, 2)) == [
+        "PARTITION p202411 VALUES LESS THAN ('2024-12-01')",
+        "PARTITION p202412 VALUES LESS THAN ('2025-01-01')",
+        "PARTITION p202501 VALUES LESS THAN ('2025-02-01')",
+    ]
+
+
+def test_expired_partitions_and_boundary():
+    """測試保留期限向下取整到月份第一天，只有整個月份都早於期限的分區會被刪除 (pmax 永不刪除)。"""
+    boundary = retention_boundary(30, today=date(2025, 3, 10))
+    assert boundary == date(2025, 2, 1)
+
+    partitions = [
+        ("p202412", date(2025, 1, 1)),
+        ("p202501", date(2025, 2, 1)),
+        ("p202502", date(2025, 3, 1)),
+        ("pmax", None),
+    ]
+    assert expired_partitions(partitions, boundary) == ["p202412", "p202501"]
@@ -0,0 +1,22 @@
+# crawler/test/conftest.py
+"""
+各測試目錄共用的 fixture。
+"""
+
+import pytest
+
+
+class FakeClock:
+    """可手動推進的單調時鐘，取代 time.monotonic 傳給接受 clock 參數的類別。"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    """從 0 秒開始的 FakeClock；測試中設定 fake_clock.now 推進時間。"""
+    return FakeClock()
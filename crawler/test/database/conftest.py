@@ -0,0 +1,37 @@
+# crawler/test/database/conftest.py
+"""
+資料庫測試共用的 fixture：以暫存目錄中的 SQLite 資料庫取代 connection 模組的 engine。
+"""
+
+from datetime import date
+from typing import Any, Callable, Dict
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from crawler.database import connection
+from crawler.database.schema import metadata
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path, monkeypatch) -> Engine:
+    """建立所有表格的 SQLite 資料庫，repository 函數經由 get_engine() / get_read_engine() 使用它。"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'crawler.db'}")
+    metadata.create_all(engine)
+    monkeypatch.setattr(connection, "_engine", engine)
+    monkeypatch.setattr(connection, "_read_router", None)
+    monkeypatch.setattr(connection, "_read_router_ready", True)
+    return engine
+
+
+@pytest.fixture
+def make_job() -> Callable[..., Dict[str, Any]]:
+    """產生填好 tb_jobs 必要欄位的職缺資料列。"""
+    def make(job_id: str, title: str = "後端工程師", update_date: date = date(2025, 1, 1)) -> Dict[str, Any]:
+        return {
+            "job_id": job_id, "title": title, "description": "負責後端開發", "salary": "面議", "work_time": "日班",
+            "location": "台北市", "company_address": "台北市", "degree": "大學", "working_experience": "不拘",
+            "company_id": "c1", "update_date": update_date,
+        }
+    return make
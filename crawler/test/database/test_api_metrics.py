@@ -0,0 +1,37 @@
+# crawler/test/database/test_api_metrics.py
+"""
+以 SQLite 測試 API 的 Prometheus middleware：api_request_duration_seconds 以路由樣板與狀態碼作為標籤。
+"""
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from crawler.api.main import app
+
+
+def _request_count(method: str, route: str, status: str) -> float:
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("api_request_duration_seconds_count", labels) or 0.0
+
+
+def test_request_metrics_use_route_template(sqlite_engine):
+    """測試不同路徑參數的請求計入同一個路由樣板，沒有對應路由的請求標記為 unmatched。"""
+    before = {
+        key: _request_count(*key) for key in [
+            ("GET", "/crawls/{task_id}", "404"),
+            ("GET", "/stats/{dimension}", "200"),
+            ("GET", "unmatched", "404"),
+        ]
+    }
+    client = TestClient(app)
+    assert client.get("/crawls/first").status_code == 404
+    assert client.get("/crawls/second").status_code == 404
+    assert client.get("/stats/location").status_code == 200
+    assert client.get("/no/such/path").status_code == 404
+
+    assert {key: _request_count(*key) - value for key, value in before.items()} == {
+        ("GET", "/crawls/{task_id}", "404"): 2,
+        ("GET", "/stats/{dimension}", "200"): 1,
+        ("GET", "unmatched", "404"): 1,
+    }
+    assert _request_count("GET", "/crawls/first", "404") == 0
@@ -0,0 +1,44 @@
+# crawler/test/database/test_compression.py
+"""
+針對 crawler.database.compression 的儲存格式與 CompressedText 欄位型別進行測試。
+"""
+
+import pytest
+from sqlalchemy import Column, MetaData, String, Table, create_engine, insert, select, text
+
+from crawler.database.compression import MARKER, CompressedText, decode_text, encode_text
+
+LONG_TEXT = "負責後端 API 設計與開發，熟悉 Python / FastAPI。\n" * 20
+
+
+def test_encode_and_decode_round_trip():
+    """測試長內容壓縮並帶有 codec 標記，短內容與 raw 保持原始 UTF-8，舊 TEXT 欄位讀出的字串原樣回傳。"""
+    encoded = encode_text(LONG_TEXT, "zlib")
+    assert encoded[0] == MARKER and len(encoded) < len(LONG_TEXT.encode("utf-8"))
+    assert decode_text(encoded) == LONG_TEXT
+
+    assert encode_text("短內容", "zlib") == "短內容".encode("utf-8")
+    assert decode_text(encode_text(LONG_TEXT, "raw")) == LONG_TEXT
+    assert decode_text("舊資料") == "舊資料"
+    assert encode_text(None, "zlib") is None and decode_text(None) is None
+
+    with pytest.raises(ValueError):
+        decode_text(bytes((MARKER, 99)) + b"data")
+
+
+def test_compressed_text_column_is_transparent():
+    """測試 CompressedText 欄位在資料庫中為壓縮的 BLOB，經由 SQLAlchemy 讀寫時為字串。"""
+    engine = create_engine("sqlite://")
+    table = Table(
+        "jobs", MetaData(),
+        Column("job_id", String(10), primary_key=True),
+        Column("description", CompressedText("zlib")),
+    )
+    table.create(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(table), [{"job_id": "a", "description": LONG_TEXT}, {"job_id": "b", "description": None}])
+        stored = connection.execute(text("SELECT description FROM jobs WHERE job_id = 'a'")).scalar()
+        rows = dict(connection.execute(select(table.c.job_id, table.c.description)).all())
+
+    assert isinstance(stored, bytes) and stored[0] == MARKER
+    assert rows == {"a": LONG_TEXT, "b": None}
@@ -0,0 +1,49 @@
+# crawler/test/database/test_crawl_progress_api.py
+"""
+以 SQLite 測試 GET /crawls/ 與 /crawls/{task_id}：讀取 ProgressReporter 寫入 tb_crawl_progress 的進度與停滯判斷。
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from crawler.api.main import app
+from crawler.database.repository import upsert_crawl_progress
+from crawler.database.schema import metadata
+from crawler.utilis.progress import ProgressReporter
+
+
+def _age(engine, task_id: str, seconds: float) -> None:
+    table = metadata.tables["tb_crawl_progress"]
+    with engine.begin() as conn:
+        conn.execute(update(table).where(table.c.task_id == task_id).values(
+            updated_at=datetime.now() - timedelta(seconds=seconds),
+        ))
+
+
+def test_crawl_progress_stalled_flag_and_state_filter(sqlite_engine):
+    """測試各狀態的停滯判斷 (收尾階段使用較長的門檻)、依狀態篩選，以及找不到任務時回傳 404。"""
+    running = ProgressReporter("running", "details", total=10, publish=upsert_crawl_progress, interval=0)
+    finalizing = ProgressReporter("finalizing", "details", total=10, publish=upsert_crawl_progress)
+    done = ProgressReporter("done", "details", total=10, publish=upsert_crawl_progress)
+    with running, finalizing, done:
+        running.submitted(2)
+        finalizing.finalizing()
+        done.finish()
+    for task_id in ("running", "finalizing", "done"):
+        _age(sqlite_engine, task_id, 600)
+
+    client = TestClient(app)
+    response = client.get("/crawls/running")
+    assert response.status_code == 200
+    assert (response.json()["state"], response.json()["in_flight"], response.json()["stalled"]) == ("RUNNING", 2, True)
+    assert client.get("/crawls/finalizing").json()["stalled"] is False
+    assert client.get("/crawls/done").json()["stalled"] is False
+
+    _age(sqlite_engine, "finalizing", 3600)
+    assert client.get("/crawls/finalizing").json()["stalled"] is True
+
+    assert [p["task_id"] for p in client.get("/crawls/", params={"state": "finalizing"}).json()] == ["finalizing"]
+    assert {p["task_id"] for p in client.get("/crawls/").json()} == {"running", "finalizing", "done"}
+    assert client.get("/crawls/missing").status_code == 404
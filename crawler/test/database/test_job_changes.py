@@ -0,0 +1,70 @@
+# crawler/test/database/test_job_changes.py
+"""
+以 SQLite 測試 tb_job_changes 變更紀錄：寫入職缺時記錄新增與內容變動，刪除時記錄刪除。
+"""
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import insert, select
+
+from crawler.database.repository import _job_change_writer, delete_jobs, get_job_changes, upsert_jobs
+from crawler.database.schema import metadata
+
+
+def _changes(since: int = 0):
+    return get_job_changes(since, 100)
+
+
+def test_changes_recorded_only_when_content_changes(sqlite_engine, make_job):
+    """測試新增記為 created，內容不變的重新寫入不記錄，內容變動記為 updated 並遞增版本，刪除記為 deleted。"""
+    upsert_jobs(pd.DataFrame([make_job("a", "後端工程師", date(2025, 1, 1)), make_job("b", "前端工程師", date(2025, 1, 1))]))
+    # 只有 update_date 變動 (每次抓取都會變) 不算內容變動
+    assert upsert_jobs(pd.DataFrame([make_job("a", "後端工程師", date(2025, 1, 2))])) == []
+    upsert_jobs(pd.DataFrame([make_job("a", "資深後端工程師", date(2025, 1, 3))]))
+    delete_jobs(["b"], older_than=date(2025, 1, 2))
+
+    changes, oldest = _changes()
+    assert [(c["job_id"], c["change_type"], c["version"]) for c in changes] == [
+        ("a", "created", 1),
+        ("b", "created", 1),
+        ("a", "updated", 2),
+        ("b", "deleted", 2),
+    ]
+    assert oldest == changes[0]["change_id"]
+
+    jobs = metadata.tables["tb_jobs"]
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(select(jobs.c.job_id, jobs.c.version)).all() == [("a", 2)]
+
+    assert [c["change_type"] for c in _changes(changes[1]["change_id"])[0]] == ["updated", "deleted"]
+
+
+def test_cursor_stops_before_changes_of_running_writers(sqlite_engine, make_job):
+    """測試進行中的寫入交易可能較晚提交較小的 change_id，游標不會越過它開始前的最大 change_id；逾時的登記不再阻擋。"""
+    upsert_jobs(pd.DataFrame([make_job("a")]))
+    with _job_change_writer():
+        # 另一個較晚開始、先提交的寫入者
+        upsert_jobs(pd.DataFrame([make_job("b")]))
+        assert [c["job_id"] for c in _changes()[0]] == ["a"]
+    assert [c["job_id"] for c in _changes()[0]] == ["a", "b"]
+
+    with sqlite_engine.begin() as conn:
+        conn.execute(insert(metadata.tables["tb_job_change_writers"]).values(
+            writer_id="crashed", floor_change_id=0, started_at=datetime.now() - timedelta(hours=1),
+        ))
+    assert [c["job_id"] for c in _changes()[0]] == ["a", "b"]
+
+
+def test_recreated_job_continues_after_deleted_version(sqlite_engine, make_job):
+    """測試刪除後重新出現的職缺，created 的版本號接續在 deleted 之後，最大版本反映目前的狀態。"""
+    upsert_jobs(pd.DataFrame([make_job("a", update_date=date(2025, 1, 1))]))
+    delete_jobs(["a"], older_than=date(2025, 2, 1))
+    upsert_jobs(pd.DataFrame([make_job("a", update_date=date(2025, 3, 1))]))
+
+    assert [(c["change_type"], c["version"]) for c in _changes()[0]] == [
+        ("created", 1), ("deleted", 2), ("created", 3),
+    ]
+    jobs = metadata.tables["tb_jobs"]
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(select(jobs.c.version)).scalar() == 3
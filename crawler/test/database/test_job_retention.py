@@ -0,0 +1,99 @@
+# crawler/test/database/test_job_retention.py
+"""
+以 SQLite 測試職缺歸檔前的 update_date 延長 (refresh_listed_jobs) 與刪除 (delete_jobs，含近似重複群組的代表職缺交接)。
+"""
+
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import insert, select
+
+from crawler.database.repository import delete_jobs, refresh_listed_jobs, upsert_jobs
+from crawler.database.schema import metadata
+
+
+def _add_url(engine, job_id: str, seen_at: datetime) -> None:
+    with engine.begin() as conn:
+        conn.execute(insert(metadata.tables["tb_urls"]).values(
+            source_url=f"https://www.104.com.tw/job/{job_id}", source="104", status="COMPLETED",
+            crawled_at=seen_at, updated_at=seen_at,
+        ))
+
+
+def _update_dates(engine) -> dict:
+    jobs = metadata.tables["tb_jobs"]
+    with engine.connect() as conn:
+        return dict(conn.execute(select(jobs.c.job_id, jobs.c.update_date)).all())
+
+
+def test_refresh_listed_jobs_uses_last_seen_date(sqlite_engine, make_job):
+    """測試 update_date 前進到 URL 最近一次被看到的日期 (而不是今天)，且不會往回調整。"""
+    upsert_jobs(pd.DataFrame([
+        make_job("old", update_date=date(2024, 6, 1)),
+        make_job("recent", update_date=date(2024, 6, 1)),
+        make_job("fresh", update_date=date(2025, 3, 1)),
+        make_job("unseen", update_date=date(2024, 6, 1)),
+    ]))
+    boundary = date(2025, 1, 1)
+    # 在保留期限之後、但很久以前看到的 URL
+    _add_url(sqlite_engine, "old", datetime(2025, 1, 5, 8, 0))
+    _add_url(sqlite_engine, "recent", datetime(2025, 3, 20, 8, 0))
+    _add_url(sqlite_engine, "fresh", datetime(2025, 2, 1, 8, 0))
+    _add_url(sqlite_engine, "unseen", datetime(2024, 12, 1, 8, 0))
+
+    assert refresh_listed_jobs(datetime(2025, 1, 1), boundary) == 2
+    assert _update_dates(sqlite_engine) == {
+        "old": date(2025, 1, 5),
+        "recent": date(2025, 3, 20),
+        "fresh": date(2025, 3, 1),
+        "unseen": date(2024, 6, 1),
+    }
+
+
+def test_delete_jobs_keeps_recrawled_job_and_its_bands(sqlite_engine, make_job):
+    """測試歸檔後才被重新抓取的職缺 (update_date 不早於期限) 連同 SimHash 分段索引一起保留。"""
+    upsert_jobs(pd.DataFrame([
+        make_job("expired", update_date=date(2024, 6, 1)),
+        make_job("recrawled", update_date=date(2025, 2, 1)),
+    ]))
+    bands = metadata.tables["tb_job_simhash_bands"]
+    with sqlite_engine.begin() as conn:
+        conn.execute(insert(bands), [
+            {"company_id": "c1", "band": 0, "bucket": 1, "job_id": "expired"},
+            {"company_id": "c1", "band": 0, "bucket": 2, "job_id": "recrawled"},
+        ])
+
+    delete_jobs(["expired", "recrawled"], older_than=date(2025, 1, 1))
+
+    assert _update_dates(sqlite_engine) == {"recrawled": date(2025, 2, 1)}
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(select(bands.c.job_id)).scalars().all() == ["recrawled"]
+
+
+
+def test_delete_canonical_job_promotes_earliest_surviving_member(sqlite_engine, make_job):
+    """測試刪除代表職缺時，最早刊登的存活成員成為新的代表，其餘成員改指向它；代表仍存在的群組不受影響。"""
+    clusters = [
+        # (job_id, canonical_job_id, posted_date, update_date)
+        ("A", "A", date(2024, 5, 1), date(2024, 6, 1)),
+        ("B", "A", date(2024, 9, 1), date(2025, 2, 1)),
+        ("C", "A", date(2024, 7, 1), date(2025, 2, 1)),
+        ("D", "D", None, date(2024, 6, 1)),
+        ("E", "D", None, date(2025, 2, 1)),
+        ("F", "F", None, date(2025, 2, 1)),
+        ("G", "F", None, date(2024, 6, 1)),
+    ]
+    rows = []
+    for job_id, canonical_job_id, posted_date, update_date in clusters:
+        row = make_job(job_id, update_date=update_date)
+        row.update(canonical_job_id=canonical_job_id, posted_date=posted_date)
+        rows.append(row)
+    upsert_jobs(pd.DataFrame(rows))
+
+    delete_jobs(["A", "D", "G"], older_than=date(2025, 1, 1))
+
+    jobs = metadata.tables["tb_jobs"]
+    with sqlite_engine.connect() as conn:
+        assert dict(conn.execute(select(jobs.c.job_id, jobs.c.canonical_job_id)).all()) == {
+            "B": "C", "C": "C", "E": "E", "F": "F",
+        }
@@ -0,0 +1,74 @@
+# crawler/test/database/test_job_stats.py
+"""
+以 SQLite 測試 tb_job_stats 的彙總 (refresh_job_stats / _aggregate_dimension)：完整重建與增量重算。
+"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+from crawler.database.repository import delete_jobs, refresh_job_stats, upsert_jobs
+from crawler.database.schema import metadata
+
+
+def _job(make_job, job_id, location, category, salary_min=None, salary_max=None, remote=None):
+    return {
+        **make_job(job_id),
+        "location": location, "job_category": category, "posted_date": date(2025, 1, 1),
+        "salary_type": 50 if salary_min else None, "salary_min": salary_min, "salary_max": salary_max,
+        "remote_work_type": remote,
+    }
+
+
+def _stats(engine, dimension):
+    table = metadata.tables["tb_job_stats"]
+    with engine.connect() as conn:
+        rows = conn.execute(select(table).where(table.c.dimension == dimension)).mappings().all()
+    return {row["dimension_value"]: dict(row) for row in rows}
+
+
+def test_full_rebuild_aggregates_counts_salaries_and_remote(sqlite_engine, make_job):
+    """測試完整重建：多值類別各自計數、只有月薪計入薪資分佈、上限為「以上」的薪資只計下限、遠端比例。"""
+    upsert_jobs(pd.DataFrame([
+        _job(make_job, "a", "台北市信義區", "2007001004,2007001012", 40000, 60000, "1"),
+        _job(make_job, "b", "台北市信義區", "2007001004", 60000, 9999999),
+        _job(make_job, "c", "新北市板橋區", "2007001012"),
+    ]))
+
+    assert refresh_job_stats() == 5  # 2 地區 + 2 類別 + 1 刊登日期 (沒有公司資料，不產生產業統計)
+
+    location = _stats(sqlite_engine, "location")
+    xinyi = location["台北市信義區"]
+    assert (xinyi["job_count"], xinyi["salary_count"], xinyi["remote_count"], xinyi["remote_ratio"]) == (2, 2, 1, 0.5)
+    assert xinyi["salary_min_avg"] == 50000 and xinyi["salary_max_avg"] == 60000
+    # 中位數：a 為 (40000 + 60000) / 2，b 沒有上限只取下限 60000
+    assert xinyi["salary_p50"] == pytest.approx(55000)
+    assert (location["新北市板橋區"]["job_count"], location["新北市板橋區"]["salary_count"]) == (1, 0)
+
+    category = _stats(sqlite_engine, "job_category")
+    assert {value: row["job_count"] for value, row in category.items()} == {"2007001004": 2, "2007001012": 2}
+    assert _stats(sqlite_engine, "posted_date")["2025-01-01"]["job_count"] == 3
+
+
+def test_incremental_refresh_replaces_only_affected_rows(sqlite_engine, make_job):
+    """測試增量重算只覆寫受影響的維度值，其他統計列不變；已沒有職缺的維度值被刪除。"""
+    upsert_jobs(pd.DataFrame([
+        _job(make_job, "a", "台北市信義區", "2007001004"),
+        _job(make_job, "b", "台北市信義區", "2007001004"),
+        _job(make_job, "c", "新北市板橋區", "2007001012"),
+    ]))
+    refresh_job_stats()
+    before = _stats(sqlite_engine, "location")
+
+    # b 搬到高雄，c 被刪除；只重算這些職缺前後的地區
+    upsert_jobs(pd.DataFrame([{**_job(make_job, "b", "高雄市前鎮區", "2007001004"), "update_date": date(2025, 3, 1)}]))
+    delete_jobs(["c"], older_than=date(2025, 2, 1))
+    refresh_job_stats({"location": {"台北市信義區", "高雄市前鎮區", "新北市板橋區"}})
+
+    location = _stats(sqlite_engine, "location")
+    assert {value: row["job_count"] for value, row in location.items()} == {"台北市信義區": 1, "高雄市前鎮區": 1}
+    assert location["台北市信義區"]["updated_at"] > before["台北市信義區"]["updated_at"]
+    # 沒有列為受影響的維度不重算 (類別統計仍是 c 刪除前的結果)
+    assert _stats(sqlite_engine, "job_category")["2007001012"]["job_count"] == 1
@@ -0,0 +1,83 @@
+# crawler/test/database/test_jobs_api.py
+"""
+以 SQLite 測試職缺查詢 API：同步與非同步路由共用相同的查詢條件與回應內容，以及 /jobs/export 的各種輸出格式。
+"""
+
+import csv
+import io
+import json
+from datetime import date
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from crawler.api.main import app
+from crawler.database import connection
+from crawler.database.repository import upsert_jobs
+from crawler.database.schema import metadata
+
+
+@pytest.fixture
+def jobs_client(sqlite_engine, make_job, monkeypatch):
+    """寫入兩筆職缺與一家公司，並讓 async 路由以 aiosqlite 連到同一個 SQLite 資料庫。"""
+    upsert_jobs(pd.DataFrame([
+        make_job("a", "Python 後端工程師", date(2025, 1, 1)),
+        {**make_job("b", "前端工程師", date(2025, 2, 1)), "company_id": "c2"},
+    ]))
+    with sqlite_engine.begin() as conn:
+        conn.execute(insert(metadata.tables["tb_companies"]).values(company_id="c1", company_name="範例科技"))
+    async_engine = create_async_engine(
+        sqlite_engine.url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool
+    )
+    monkeypatch.setattr(connection, "_async_engine", async_engine)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"title": "Python"},
+    {"company_name": "範例"},
+    {"company_id": "c2"},
+    {"updated_since": "2025-01-15"},
+])
+def test_async_jobs_route_matches_sync_route(jobs_client, params):
+    """測試 /async/jobs/ 與 /jobs/ 在相同條件下回傳相同的職缺與公司欄位。"""
+    sync = jobs_client.get("/jobs/", params=params)
+    async_ = jobs_client.get("/async/jobs/", params=params)
+    assert sync.status_code == async_.status_code == 200
+    assert async_.json() == sync.json()
+    assert async_.json()
+
+
+def test_async_jobs_route_joins_company(jobs_client):
+    """測試非同步路由的回應附上 tb_companies 的公司名稱，沒有公司資料時為 None。"""
+    jobs = {job["job_id"]: job for job in jobs_client.get("/async/jobs/").json()}
+    assert (jobs["a"]["company_name"], jobs["b"]["company_name"]) == ("範例科技", None)
+
+
+def test_export_formats_stream_all_matching_jobs(jobs_client):
+    """測試 /jobs/export 的 NDJSON、CSV 與 Parquet 輸出相同的職缺與公司欄位，並套用查詢條件。"""
+    import pyarrow.parquet as pq
+
+    ndjson = jobs_client.get("/jobs/export", params={"format": "ndjson"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert {(row["job_id"], row["company_name"]) for row in rows} == {("a", "範例科技"), ("b", None)}
+
+    response = jobs_client.get("/jobs/export", params={"format": "csv", "title": "Python"})
+    assert response.headers["content-disposition"] == 'attachment; filename="jobs.csv"'
+    [row] = list(csv.DictReader(io.StringIO(response.text)))
+    assert (row["job_id"], row["company_name"], row["update_date"]) == ("a", "範例科技", "2025-01-01")
+    assert list(row) == list(rows[0])
+
+    response = jobs_client.get("/jobs/export", params={"format": "parquet"})
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == list(rows[0])
+    exported = {row["job_id"]: row for row in table.to_pylist()}
+    assert (exported["a"]["company_name"], exported["a"]["update_date"]) == ("範例科技", date(2025, 1, 1))
+    assert set(exported) == {"a", "b"}
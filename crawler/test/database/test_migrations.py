@@ -0,0 +1,33 @@
+# crawler/test/database/test_migrations.py
+"""
+以 SQLite 測試一次性遷移：啟動時只提示，不自動執行；手動執行時搬移舊版 tb_jobs 的公司欄位。
+"""
+
+from datetime import date
+
+from sqlalchemy import inspect, insert, select, text
+
+from crawler.database import migrations
+from crawler.database.connection import initialize_database_tables
+from crawler.database.schema import metadata
+
+
+def test_company_columns_move_only_when_run_explicitly(sqlite_engine, make_job, caplog):
+    """測試啟動時只記錄尚未執行的遷移，以命令執行後公司資料搬到 tb_companies、舊欄位被刪除。"""
+    with sqlite_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tb_jobs ADD COLUMN company_name VARCHAR(255)"))
+        conn.execute(insert(metadata.tables["tb_jobs"]), [make_job("a", update_date=date(2025, 1, 1))])
+        conn.execute(text("UPDATE tb_jobs SET company_name = '範例公司'"))
+
+    initialize_database_tables()
+    assert "company_name" in {c["name"] for c in inspect(sqlite_engine).get_columns("tb_jobs")}
+    assert "move_company_columns" in caplog.text
+    assert migrations.pending_migrations(sqlite_engine) == ["move_company_columns"]
+
+    migrations.main(["move_company_columns"])
+
+    assert migrations.pending_migrations(sqlite_engine) == []
+    assert "company_name" not in {c["name"] for c in inspect(sqlite_engine).get_columns("tb_jobs")}
+    companies = metadata.tables["tb_companies"]
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(select(companies.c.company_id, companies.c.company_name)).all() == [("c1", "範例公司")]
@@ -0,0 +1,56 @@
+# crawler/test/database/test_parquet_export.py
+"""
+以 SQLite 測試 Parquet 快照匯出 (export_table_snapshot)：增量匯出時重寫水位線之前主鍵有變動的分區。
+"""
+
+from datetime import date
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from crawler.database.repository import delete_jobs, upsert_jobs
+from crawler.project_104 import task_export_104
+
+
+def _exported_job_ids(parquet_dir) -> dict:
+    table_dir = parquet_dir / "tb_jobs"
+    return {
+        path.name: sorted(pq.read_table(path / "part-0.parquet", columns=["job_id"]).column("job_id").to_pylist())
+        for path in sorted(table_dir.iterdir())
+    }
+
+
+def test_incremental_export_rewrites_moved_and_deleted_partitions(sqlite_engine, make_job, tmp_path, monkeypatch):
+    """測試重新抓取而移到新分區、被刪除與以較早日期新增的職缺，都反映在水位線之前的分區；空分區被刪除。"""
+    parquet_dir = tmp_path / "parquet"
+    monkeypatch.setattr(task_export_104, "PARQUET_DIR", str(parquet_dir))
+    upsert_jobs(pd.DataFrame([
+        make_job("a", update_date=date(2025, 1, 1)),
+        make_job("b", update_date=date(2025, 1, 1)),
+        make_job("c", update_date=date(2025, 1, 2)),
+        make_job("d", update_date=date(2025, 1, 3)),
+    ]))
+    state = {}
+    assert task_export_104.export_table_snapshot("tb_jobs", state) == 4
+    assert _exported_job_ids(parquet_dir) == {
+        "dt=2025-01-01": ["a", "b"], "dt=2025-01-02": ["c"], "dt=2025-01-03": ["d"],
+    }
+
+    # a 重新抓取移到新分區，c 被刪除，e 以水位線之前的日期新增
+    upsert_jobs(pd.DataFrame([
+        {**make_job("a", title="資深後端工程師"), "update_date": date(2025, 1, 4)},
+        make_job("e", update_date=date(2025, 1, 1)),
+    ]))
+    delete_jobs(["c"], older_than=date(2025, 1, 3))
+
+    assert task_export_104.export_table_snapshot("tb_jobs", state) == 4  # dt=01-01 兩筆、01-03 與 01-04 各一筆
+    assert _exported_job_ids(parquet_dir) == {
+        "dt=2025-01-01": ["b", "e"], "dt=2025-01-03": ["d"], "dt=2025-01-04": ["a"],
+    }
+    assert state["tb_jobs"]["last_partition"] == "2025-01-04"
+
+    # 沒有變動時只重寫水位線所在的分區，之前的分區不重寫
+    earlier = parquet_dir / "tb_jobs" / "dt=2025-01-01" / "part-0.parquet"
+    mtime = earlier.stat().st_mtime_ns
+    assert task_export_104.export_table_snapshot("tb_jobs", state) == 1
+    assert earlier.stat().st_mtime_ns == mtime
@@ -0,0 +1,91 @@
+# crawler/test/database/test_read_replicas.py
+"""
+以兩個 SQLite 資料庫分別代表主庫與唯讀副本，測試讀寫分離的路由與複寫延遲保護。
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+
+from crawler.api.main import app
+from crawler.database import connection
+from crawler.database.connection import ReplicaRouter, get_read_engine
+from crawler.database.repository import get_existing_urls, get_leaf_categories, stream_rows, upsert_jobs
+from crawler.database.schema import metadata
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch, fake_clock):
+    """建立主庫與副本 (各自有一筆只存在於該資料庫的類別)，並讓 connection 模組使用它們。"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    now = datetime(2025, 1, 1)
+    for engine, category_id in ((primary, "primary-only"), (replica, "replica-only")):
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(metadata.tables["tb_category"]).values(
+                category_id=category_id, category_name=category_id, parent_code="", parent_name="",
+                source="104", created_at=now, updated_at=now,
+            ))
+    lag = {"seconds": 0.0}
+    clock = fake_clock
+
+    def probe(engine):
+        if lag["seconds"] is None:
+            raise ConnectionError("replica down")
+        return lag["seconds"]
+
+    router = ReplicaRouter([replica], max_lag=5, check_interval=10, lag_probe=probe, clock=clock)
+    monkeypatch.setattr(connection, "_engine", primary)
+    monkeypatch.setattr(connection, "_read_router", router)
+    monkeypatch.setattr(connection, "_read_router_ready", True)
+    return primary, replica, lag, clock
+
+
+def test_reads_go_to_replica_and_writes_path_to_primary(databases):
+    """測試可接受延遲的讀取走副本，讀取結果會決定寫入內容的查詢仍走主庫。"""
+    primary, replica, _, _ = databases
+    assert get_read_engine() is replica
+    assert get_leaf_categories("104") == ["replica-only"]
+
+    with primary.begin() as conn:
+        conn.execute(insert(metadata.tables["tb_urls"]).values(source_url="u1", source="104", status="PENDING"))
+    assert get_existing_urls(["u1", "u2"]) == {"u1"}
+
+    # 串流讀取預設走主庫，只有明確標記 read_only 的讀取 (API 匯出) 走副本
+    categories = select(metadata.tables["tb_category"].c.category_id)
+    assert [row["category_id"] for rows in stream_rows(categories) for row in rows] == ["primary-only"]
+    assert [row["category_id"] for rows in stream_rows(categories, read_only=True) for row in rows] == ["replica-only"]
+
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary(databases):
+    """測試副本延遲超過上限或無法連線時讀取改走主庫，檢查結果快取到期後恢復使用副本。"""
+    primary, replica, lag, clock = databases
+    lag["seconds"] = 30.0
+    assert get_read_engine() is primary
+    assert get_leaf_categories("104") == ["primary-only"]
+
+    # 檢查結果仍在快取期間內，不會重新查詢 (async 路由據此決定是否要在執行緒中查詢)
+    lag["seconds"] = 0.0
+    assert not connection._read_router.needs_check()
+    assert get_read_engine() is primary
+    clock.now += 10
+    assert connection._read_router.needs_check()
+    assert get_read_engine() is replica
+
+    lag["seconds"] = None
+    clock.now += 10
+    assert get_read_engine() is primary
+
+
+def test_job_changes_feed_reads_job_bodies_from_primary(databases, make_job):
+    """測試 /jobs/changes 附上的職缺內容與變更紀錄同樣來自主庫：尚未複寫到副本的新職缺不會被當成已刪除。"""
+    upsert_jobs(pd.DataFrame([make_job("a")]))
+
+    response = TestClient(app).get("/jobs/changes", params={"include_jobs": True})
+    assert response.status_code == 200
+    [change] = response.json()["changes"]
+    assert (change["change_type"], change["job"]["job_id"]) == ("created", "a")
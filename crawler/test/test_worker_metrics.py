@@ -0,0 +1,61 @@
+# crawler/test/test_worker_metrics.py
+"""
+測試 setup_worker_metrics 註冊的 Celery signal handlers：任務耗時與狀態計數、主程序啟動時的指標伺服器。
+"""
+
+import pytest
+from celery import signals
+from prometheus_client import REGISTRY
+
+from crawler import config, metrics
+
+
+class _Task:
+    name = "crawler.test.metrics_task"
+
+
+@pytest.fixture
+def worker_metrics(monkeypatch):
+    """註冊 worker 指標的 signal handlers，測試結束後還原各 signal 原本的 receivers。"""
+    for signal in (signals.worker_init, signals.task_prerun, signals.task_postrun, signals.worker_process_shutdown):
+        monkeypatch.setattr(signal, "receivers", list(signal.receivers))
+    metrics.setup_worker_metrics()
+
+
+def test_task_signals_record_duration_and_state(worker_metrics):
+    """測試 task_prerun / task_postrun 依任務名稱記錄耗時，並依結束狀態計數。"""
+    task = _Task()
+
+    def count(name, state=None):
+        if state is None:
+            return REGISTRY.get_sample_value("crawler_task_duration_seconds_count", {"task": name}) or 0.0
+        return REGISTRY.get_sample_value("crawler_tasks_total", {"task": name, "state": state}) or 0.0
+
+    for task_id, state in [("t1", "SUCCESS"), ("t2", "FAILURE")]:
+        signals.task_prerun.send(sender=task, task_id=task_id, task=task)
+        signals.task_postrun.send(sender=task, task_id=task_id, task=task, state=state)
+    # 沒有對應 prerun 的 postrun 只計數，不記錄耗時
+    signals.task_postrun.send(sender=task, task_id="t3", task=task, state="SUCCESS")
+
+    assert count(task.name) == 2
+    assert (count(task.name, "SUCCESS"), count(task.name, "FAILURE")) == (2, 1)
+
+
+def test_worker_init_clears_multiproc_dir_and_starts_server(worker_metrics, tmp_path, monkeypatch):
+    """測試 worker_init 清除上次執行留下的多程序檔案，並在設定的 port 啟動指標伺服器；port 為 0 時不啟動。"""
+    multiproc_dir = tmp_path / "prometheus"
+    multiproc_dir.mkdir()
+    (multiproc_dir / "counter_1234.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+    started = []
+    monkeypatch.setattr(metrics, "start_http_server", lambda port, registry: started.append((port, registry)))
+
+    monkeypatch.setattr(config, "WORKER_METRICS_PORT", 0)
+    signals.worker_init.send(sender=None)
+    assert started == [] and (multiproc_dir / "counter_1234.db").exists()
+
+    monkeypatch.setattr(config, "WORKER_METRICS_PORT", 9808)
+    signals.worker_init.send(sender=None)
+    assert [port for port, _ in started] == [9808]
+    assert started[0][1] is not REGISTRY
+    assert list(multiproc_dir.iterdir()) == []
@@ -0,0 +1,39 @@
+# crawler/test/utilis/test_data_processing.py
+"""
+針對 crawler.utilis.data_processing 的文字清理函數進行測試。
+"""
+
+import pandas as pd
+
+from crawler.utilis.data_processing import (
+    clean_job_text,
+    clean_text_batch,
+    clean_text_columns,
+    remove_illegal_chars,
+    remove_illegal_chars_batch,
+)
+
+
+def test_remove_illegal_chars_keeps_ascii_newlines_and_cjk():
+    """測試只保留 ASCII 可列印字元、換行、回車與中文字。"""
+    assert remove_illegal_chars("Python 工程師！😀\r\n") == "Python 工程師\r\n"
+    assert remove_illegal_chars(None) is None
+    assert remove_illegal_chars_batch(["a\tb", 3]) == ["ab", 3]
+
+
+def test_clean_text_batch_replaces_line_breaks():
+    """測試批次版本與單筆 clean_text 一樣會把斷行換成空白並移除表情符號。"""
+    assert clean_text_batch(["第一行\n第二行🚀 ", 12]) == ["第一行 第二行", "12"]
+
+
+def test_clean_job_text_normalizes_whitespace():
+    """測試職缺內文保留全形標點，移除零寬字元並壓縮多餘的空行。"""
+    text = "【工作內容】​\r\n負責開發。　\r\n\r\n\r\n\r\n加分：Docker😀\t"
+    assert clean_job_text(text) == "【工作內容】\n負責開發。\n\n加分：Docker"
+
+
+def test_clean_text_columns_skips_missing_columns_and_none():
+    """測試 DataFrame 欄位清理會略過不存在的欄位並保留 None。"""
+    df = pd.DataFrame({"description": ["內容\x07", None]})
+    result = clean_text_columns(df, ["description", "qualification_other"])
+    assert result["description"].tolist() == ["內容", None]
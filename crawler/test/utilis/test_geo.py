@@ -0,0 +1,43 @@
+# crawler/test/utilis/test_geo.py
+"""
+針對 crawler.utilis.geo 的 Geohash 與距離計算進行測試。
+"""
+
+import random
+
+from crawler.utilis.geo import (
+    covering_geohashes,
+    encode_geohash,
+    haversine_km,
+    parse_coordinate,
+)
+
+
+def test_encode_geohash_known_value():
+    """測試 Geohash 編碼結果與公開參考值一致。"""
+    assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_parse_coordinate_rejects_missing_values():
+    """測試空字串、0 與超出範圍的座標會被視為沒有座標。"""
+    assert parse_coordinate("25.0330", 90) == 25.033
+    assert parse_coordinate("", 90) is None
+    assert parse_coordinate("0", 90) is None
+    assert parse_coordinate(None, 90) is None
+    assert parse_coordinate("181", 180) is None
+
+
+def test_covering_geohashes_contains_every_point_in_radius():
+    """測試圓內任意一點的 Geohash 都以某個覆蓋前綴開頭。"""
+    random.seed(0)
+    center_lat, center_lon = 25.033, 121.5654
+    for radius_km in (0.05, 1, 5, 30):
+        prefixes = covering_geohashes(center_lat, center_lon, radius_km)
+        assert prefixes
+        for _ in range(500):
+            lat = center_lat + random.uniform(-1, 1) * radius_km / 111
+            lon = center_lon + random.uniform(-1, 1) * radius_km / 100
+            if haversine_km(center_lat, center_lon, lat, lon) > radius_km:
+                continue
+            point_hash = encode_geohash(lat, lon)
+            assert any(point_hash.startswith(prefix) for prefix in prefixes)
@@ -0,0 +1,26 @@
+# crawler/test/utilis/test_lru_cache.py
+"""
+針對 crawler.utilis.lru_cache 的淘汰順序與命中統計進行測試。
+"""
+
+from crawler.utilis.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    """測試超過容量時淘汰最久未使用的項目，get 會更新使用順序。"""
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert (cache.get("a"), cache.get("c"), cache.get("b")) == (1, 3, None)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_zero_size_disables_cache():
+    """測試容量為 0 時不保存任何項目。"""
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
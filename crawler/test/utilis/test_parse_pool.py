@@ -0,0 +1,99 @@
+# crawler/test/utilis/test_parse_pool.py
+"""
+針對 crawler.utilis.parse_pool 的批次交接與錯誤處理進行測試。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import billiard
+
+from crawler.utilis.parse_pool import BatchedParser, get_process_pool, resolve_process_count
+
+
+def _upper_batch(items: List[str]) -> List[str]:
+    return [item.upper() for item in items]
+
+
+def test_resolve_process_count(monkeypatch):
+    """測試 PARSE_PROCESSES 的解析：auto 為可用核心數，0 或空白為停用。"""
+    monkeypatch.setattr("crawler.utilis.parse_pool.available_cores", lambda: 6)
+    assert resolve_process_count("auto") == 6
+    assert resolve_process_count(" 3 ") == 3
+    assert resolve_process_count("0") == 0
+    assert resolve_process_count("") == 0
+
+
+def test_batches_are_handed_off_when_full():
+    """測試湊滿 batch_size 才送出一批，剩餘的內容在 wait=True 時送出，結果保留 tag 與順序。"""
+    calls = []
+
+    def parse_batch(items):
+        calls.append(list(items))
+        return _upper_batch(items)
+
+    parser = BatchedParser(parse_batch, executor=None, batch_size=2)
+    for i, item in enumerate(["a", "b", "c"]):
+        parser.submit(item, tag=i)
+
+    assert calls == [["a", "b"]]
+    assert [(r.tag, r.result) for r in parser.results()] == [(0, "A"), (1, "B")]
+    assert [(r.tag, r.result) for r in parser.results(wait=True)] == [(2, "C")]
+    assert calls == [["a", "b"], ["c"]]
+
+
+def test_failed_batch_marks_every_item():
+    """測試整個批次失敗時，批次內每一筆都帶有錯誤而不是遺失。"""
+    def broken(items):
+        raise RuntimeError("worker died")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        parser = BatchedParser(broken, executor, batch_size=2, max_pending_batches=1)
+        for item in ["a", "b", "c"]:
+            parser.submit(item, tag=item)
+        results = list(parser.results(wait=True))
+
+    assert [r.tag for r in results] == ["a", "b", "c"]
+    assert all(r.result is None and isinstance(r.error, RuntimeError) for r in results)
+
+
+def test_process_pool_round_trip():
+    """測試以共用的 process pool (spawn) 解析一批內容。"""
+    parser = BatchedParser(_upper_batch, get_process_pool(1), batch_size=10)
+    parser.submit("job", tag="url")
+    [item] = list(parser.results(wait=True))
+    assert (item.tag, item.result, item.error) == ("url", "JOB", None)
+
+
+def _parse_in_daemonic_process(queue) -> None:
+    parser = BatchedParser(_upper_batch, get_process_pool(2), batch_size=10)
+    parser.submit("job", tag="url")
+    queue.put([(item.tag, item.result, item.error) for item in parser.results(wait=True)])
+
+
+def test_daemonic_process_falls_back_to_inline_parsing():
+    """測試在 daemonic 的 billiard 程序 (Celery prefork pool 的子程序) 中不建立解析程序，改在目前的執行緒中解析。"""
+    # 以 spawn 啟動，避免 fork 時複製到其他測試建立的 process pool
+    context = billiard.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_parse_in_daemonic_process, args=(queue,), daemon=True)
+    process.start()
+    try:
+        assert queue.get(timeout=30) == [("url", "JOB", None)]
+    finally:
+        process.join(timeout=10)
+    assert process.exitcode == 0
+
+
+def test_submit_failure_switches_to_inline_parsing():
+    """測試 executor 無法接受批次 (例如無法啟動子程序) 時改在目前的執行緒中解析，之後的批次也不再送出。"""
+    class FailingExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise AssertionError("daemonic processes are not allowed to have children")
+
+    with FailingExecutor(max_workers=1) as executor:
+        parser = BatchedParser(_upper_batch, executor, batch_size=1)
+        parser.submit("a", tag=1)
+        parser.submit("b", tag=2)
+        assert parser.executor is None
+        assert [(r.tag, r.result, r.error) for r in parser.results(wait=True)] == [(1, "A", None), (2, "B", None)]
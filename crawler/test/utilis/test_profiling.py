@@ -0,0 +1,52 @@
+# crawler/test/utilis/test_profiling.py
+"""
+針對 crawler.utilis.profiling 的取樣剖析器與 profile_block 進行測試。
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from crawler.utilis.profiling import SamplingProfiler, profile_block
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_sampling_profiler_covers_threads_started_during_profiling():
+    """測試剖析期間新建立的執行緒 (例如執行緒池) 也會被取樣。"""
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    worker = threading.Thread(target=_busy, args=(0.2,))
+    worker.start()
+    worker.join()
+    profiler.stop()
+
+    totals = {label: total for label, _, total in profiler.top_functions(50)}
+    assert profiler.sample_count > 0
+    assert any(label.startswith("_busy ") and total > 10 for label, total in totals.items())
+
+
+@pytest.mark.parametrize("mode, suffix", [("sample", ".folded"), ("cprofile", ".prof")])
+def test_profile_block_writes_file_and_summary(tmp_path, mode, suffix):
+    """測試兩種模式都會寫出剖析檔並產生包含熱點函數的摘要。"""
+    with profile_block("task/1", str(tmp_path), mode=mode, interval=0.005, top_n=5) as reports:
+        _busy(0.1)
+
+    assert len(reports) == 1
+    report = reports[0]
+    assert report.path.endswith(f"task_1{suffix}")
+    assert os.path.getsize(report.path) > 0
+    assert "_busy" in report.summary
+
+
+def test_profile_block_rejects_unknown_mode(tmp_path):
+    """測試不支援的模式會拋出 ValueError。"""
+    with pytest.raises(ValueError):
+        with profile_block("task", str(tmp_path), mode="tracemalloc"):
+            pass
@@ -0,0 +1,56 @@
+# crawler/test/utilis/test_progress.py
+"""
+針對 crawler.utilis.progress 的進度計數、QPS / ETA 估計與發布節流進行測試。
+"""
+
+import pytest
+
+from crawler.utilis.progress import PROGRESS_FAILURE, PROGRESS_FINALIZING, PROGRESS_SUCCESS, ProgressReporter
+
+
+def test_counts_qps_eta_and_publish_throttling(fake_clock):
+    """測試計數與進行中數量、以時間窗口計算的 QPS 與 ETA、發布間隔，以及收尾階段的心跳。"""
+    clock = fake_clock
+    published = []
+    progress = ProgressReporter("t1", "details", total=100, publish=published.append, interval=5, window_seconds=10, clock=clock)
+
+    progress.submitted(3)
+    assert len(published) == 1  # 第一次更新立即發布
+    clock.now = 2.0
+    progress.completed()
+    progress.completed(succeeded=False, failed=True)
+    progress.completed(succeeded=False)
+    assert len(published) == 1  # 間隔內不再發布
+
+    snapshot = progress.snapshot()
+    assert (snapshot["attempted"], snapshot["succeeded"], snapshot["failed"], snapshot["in_flight"]) == (3, 1, 1, 0)
+    assert snapshot["qps"] == pytest.approx(1.5)
+    assert snapshot["eta_seconds"] == pytest.approx(97 / 1.5, abs=0.1)
+
+    # 時間窗口外的完成數不再計入 QPS
+    clock.now = 20.0
+    assert progress.qps() == 0.0
+    assert progress.snapshot()["eta_seconds"] is None
+
+    # 收尾階段每次呼叫都立即發布心跳，尚未結束
+    published.clear()
+    progress.finalizing()
+    progress.finalizing()
+    assert [p["state"] for p in published] == [PROGRESS_FINALIZING] * 2 and published[-1]["finished_at"] is None
+
+    progress.finish()
+    assert published[-1]["state"] == PROGRESS_SUCCESS and published[-1]["finished_at"] is not None
+
+
+def test_exception_marks_failure_and_publish_errors_are_ignored(fake_clock):
+    """測試 with 區塊內發生例外時標記為 FAILURE，發布函數失敗不影響任務。"""
+    published = []
+
+    def publish(snapshot):
+        published.append(snapshot)
+        raise ConnectionError("database down")
+
+    with pytest.raises(RuntimeError):
+        with ProgressReporter("t2", "details", total=10, publish=publish, clock=fake_clock):
+            raise RuntimeError("boom")
+    assert published[-1]["state"] == PROGRESS_FAILURE
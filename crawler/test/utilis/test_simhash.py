@@ -0,0 +1,56 @@
+# crawler/test/utilis/test_simhash.py
+"""
+針對 crawler.utilis.simhash 的簽章與 LSH 索引進行測試。
+"""
+
+import random
+
+from crawler.utilis.simhash import (
+    LSH_BANDS,
+    SimHashIndex,
+    hamming_distance,
+    lsh_bands,
+    simhash,
+    to_signed64,
+)
+
+_DESCRIPTION = (
+    "負責後端 API 設計與開發，熟悉 Python 與 FastAPI。具備 MySQL、Redis 使用經驗，"
+    "了解資料庫索引與查詢優化。與產品經理討論需求並撰寫技術文件，參與 code review 與團隊技術分享。"
+)
+
+
+def test_simhash_is_close_for_small_edits_and_skips_short_text():
+    """測試小幅修改後的內文簽章距離很近，過短的內文不計算簽章。"""
+    original = simhash(_DESCRIPTION)
+    edited = simhash(_DESCRIPTION.replace("FastAPI", "Django") + "歡迎加入！")
+    assert hamming_distance(original, edited) <= 5
+    assert simhash("請洽面談") is None
+    assert -(1 << 63) <= original < (1 << 63)
+
+
+def test_lsh_bands_cover_all_bits():
+    """測試分段後的位元數加總為 64，且有號與無號表示得到相同的分段。"""
+    value = random.Random(7).getrandbits(64)
+    assert len(lsh_bands(value)) == LSH_BANDS
+    assert lsh_bands(value) == lsh_bands(to_signed64(value))
+
+
+def test_index_finds_every_neighbour_within_distance_in_same_group():
+    """測試 LSH 索引不會漏掉距離門檻內的簽章，也不會跨 group 比對。"""
+    rng = random.Random(42)
+    base = rng.getrandbits(64)
+    index: SimHashIndex[str] = SimHashIndex(max_distance=5)
+    for i in range(200):
+        flipped = base
+        for bit in rng.sample(range(64), rng.randint(0, 5)):
+            flipped ^= 1 << bit
+        index.add(f"near-{i}", flipped, "c1")
+    index.add("other-company", base, "c2")
+    index.add("far", base ^ ((1 << 20) - 1), "c1")
+
+    keys = {key for _, key in index.query(base, "c1")}
+    assert keys == {f"near-{i}" for i in range(200)}
+
+    index.remove("near-0")
+    assert "near-0" not in {key for _, key in index.query(base, "c1")}
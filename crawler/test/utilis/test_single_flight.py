@@ -0,0 +1,52 @@
+# crawler/test/utilis/test_single_flight.py
+"""
+針對 crawler.utilis.single_flight 的請求合併與短期快取進行測試。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from crawler.utilis.single_flight import SingleFlightCache
+
+
+def test_concurrent_requests_for_same_key_fetch_once():
+    """測試同時進行的相同請求只呼叫一次抓取函數，其餘請求等待並取得同一個結果。"""
+    cache = SingleFlightCache("test", maxsize=10, ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "page"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get_or_fetch, "k", fetch) for _ in range(4)]
+        while cache.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        assert [future.result() for future in futures] == ["page"] * 4
+    assert len(calls) == 1 and cache.fetches == 1
+
+
+def test_cached_until_ttl_and_failures_not_cached(fake_clock):
+    """測試成功的結果在 ttl 內直接回傳、過期後重新抓取，失敗的抓取不會被快取。"""
+    clock = fake_clock
+    cache = SingleFlightCache("test", maxsize=10, ttl=60, clock=clock)
+    results = iter(["v1", "v2"])
+    assert cache.get_or_fetch("k", lambda: next(results)) == "v1"
+    assert cache.get_or_fetch("k", lambda: next(results)) == "v1"
+    assert cache.hits == 1
+    clock.now = 61
+    assert cache.get_or_fetch("k", lambda: next(results)) == "v2"
+
+    def fail():
+        raise ConnectionError("timeout")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch("bad", fail)
+    assert cache.get_or_fetch("bad", lambda: "ok") == "ok"
+    assert cache.fetches == 4
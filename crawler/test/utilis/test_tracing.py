@@ -0,0 +1,68 @@
+# crawler/test/utilis/test_tracing.py
+"""
+針對 crawler.utilis.tracing 的分段計時與百分位數彙總進行測試。
+"""
+
+import json
+
+from crawler.utilis.tracing import TOTAL_SPAN, TraceRecorder, bind_trace, percentile, span
+
+
+def test_percentile_uses_nearest_rank():
+    """測試 nearest-rank 百分位數與空數列的處理。"""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 90) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_spans_accumulate_only_on_bound_trace():
+    """測試 span 只記錄到目前執行緒綁定的 Trace，同名的段會累加。"""
+    recorder = TraceRecorder()
+    trace = recorder.start("https://example.com/job/1")
+    with span("parse"):
+        pass
+    with bind_trace(trace):
+        with span("ttfb"):
+            pass
+        with span("ttfb"):
+            pass
+    recorder.finish(trace)
+
+    assert set(trace.spans) == {"ttfb", TOTAL_SPAN}
+    summary = recorder.summary()["url"]
+    assert summary["ttfb"]["count"] == 1
+    assert summary[TOTAL_SPAN]["p99"] >= summary["ttfb"]["p50"]
+
+
+def test_recorder_exports_slow_traces_without_sampling(tmp_path):
+    """測試抽樣率為 0 時，只有超過慢速門檻的 Trace 會被輸出。"""
+    path = tmp_path / "traces" / "run.jsonl"
+    recorder = TraceRecorder(export_path=str(path), sample_rate=0.0, slow_seconds=0.5)
+    fast = recorder.start("fast")
+    recorder.finish(fast)
+    slow = recorder.start("slow")
+    slow.started_at -= 1.0
+    slow.attributes["outcome"] = "parsed"
+    recorder.finish(slow)
+    recorder.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["key"] for line in lines] == ["slow"]
+    assert lines[0]["outcome"] == "parsed"
+    assert recorder.summary()["url"][TOTAL_SPAN]["count"] == 2
+
+
+def test_summary_memory_is_bounded_by_reservoir():
+    """測試每一段只保留 reservoir_size 筆耗時，筆數與最大值仍為精確值，百分位數由均勻抽樣估計。"""
+    recorder = TraceRecorder(reservoir_size=500)
+    for i in range(1, 10001):
+        trace = recorder.start(str(i))
+        trace.add("ttfb", i / 1000)
+        recorder.finish(trace)
+
+    assert len(recorder._durations["url"]["ttfb"].samples) == 500
+    stats = recorder.summary()["url"]["ttfb"]
+    assert (stats["count"], stats["max"]) == (10000, 10.0)
+    assert 4.0 < stats["p50"] < 6.0
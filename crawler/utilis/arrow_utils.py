@@ -0,0 +1,76 @@
+# crawler/utilis/arrow_utils.py
+"""
+此模組包含 Apache Arrow / Parquet 相關的共用函數。
+
+pyarrow 是必要依賴 (見 requirements.txt)，但只在實際讀寫 Parquet 時才導入，
+只需要 import 本模組的程序 (例如 API 與 Producer) 啟動時不必載入它。
+"""
+
+from typing import Any, Dict, Iterable, List, Union
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, LargeBinary, Numeric, Table
+from sqlalchemy.sql import ColumnElement
+
+
+def import_pyarrow():
+    """
+    延遲導入 pyarrow 與 pyarrow.parquet。
+
+    Returns:
+        Tuple[module, module]: (pyarrow, pyarrow.parquet)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    return pa, pq
+
+
+def arrow_schema_for_table(table: Union[Table, Iterable[ColumnElement]], dictionary_columns: Iterable[str] = ()) -> Any:
+    """
+    根據 SQLAlchemy Table 的欄位型別建立對應的 Arrow Schema。
+
+    Args:
+        table (Union[Table, Iterable[ColumnElement]]): 來源資料表，或查詢的欄位 (例如 JOIN 查詢的 selected_columns)。
+        dictionary_columns (Iterable[str]): 需要以 dictionary 編碼的低基數字串欄位。
+
+    Returns:
+        pa.Schema: 與資料表欄位一一對應的 Arrow Schema。
+    """
+    pa, _ = import_pyarrow()
+    dictionary_set = set(dictionary_columns)
+    fields = []
+    for column in (table.columns if isinstance(table, Table) else table):
+        # 依照子類別 -> 父類別的順序判斷，例如 DateTime 不是 Date 的子類別，但要先於字串判斷
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, (Float, Numeric)):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column.type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(column.type, LargeBinary):
+            arrow_type = pa.binary()
+        elif column.name in dictionary_set:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type, nullable=True))
+    return pa.schema(fields)
+
+
+def record_batch_from_rows(rows: List[Dict[str, Any]], schema: Any) -> Any:
+    """
+    將一批資料列 (dict) 轉換為符合 schema 的 Arrow RecordBatch。
+
+    Args:
+        rows (List[Dict[str, Any]]): 資料列，鍵為欄位名稱。
+        schema (pa.Schema): 目標 Schema。
+
+    Returns:
+        pa.RecordBatch: 轉換後的 RecordBatch。
+    """
+    pa, _ = import_pyarrow()
+    return pa.RecordBatch.from_pylist(rows, schema=schema)
@@ -1,11 +1,61 @@
 # crawler/utilis/data_processing.py
 """
-此模組包含通用的資料處理函數，例如字元清理和巢狀結構扁平化。
+此模組包含通用的資料處理函數，例如字元清理、巢狀結構扁平化與職缺內容雜湊。
 """
 
+import hashlib
 import json
 import re
-from typing import Any, List, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class _TranslationTable(dict):
+    """
+    供 `str.translate` 使用的延遲建立轉換表。
+
+    第一次遇到某個字元時呼叫 rule 決定保留 (回傳自身)、刪除 (回傳 None) 或替換，
+    結果會被快取，之後同一字元的查詢全部在 C 層的 dict 查找中完成。
+    """
+
+    def __init__(self, rule: Callable[[int], Optional[int]]) -> None:
+        super().__init__()
+        self._rule = rule
+
+    def __missing__(self, code_point: int) -> Optional[int]:
+        value = self._rule(code_point)
+        self[code_point] = value
+        return value
+
+
+def _legal_char_rule(code_point: int) -> Optional[int]:
+    # 僅允許 ASCII 可列印字元 (0x20-0x7E)、換行符 (0x0A)、回車符 (0x0D) 以及中文字符 (0x4E00-0x9FFF)
+    if 0x20 <= code_point <= 0x7E or code_point in (0x0A, 0x0D) or 0x4E00 <= code_point <= 0x9FFF:
+        return code_point
+    return None
+
+
+_LEGAL_CHARS_TABLE = _TranslationTable(_legal_char_rule)
+
+# 移除表情符號及其他非文字字元，只保留字母、數字、常見標點符號和中文字符
+# \w 匹配字母、數字、底線
+# \s 匹配空白字元
+# \u4e00-\u9fff 匹配中文字符
+# 其他標點符號可以根據需要添加
+_CLEAN_TEXT_PATTERN = re.compile(r'[^\w\s.,!?;:()\'"-—\u4e00-\u9fff]+')
+# 職缺內文要移除的字元：控制字元 (保留 \t \n \r)、軟連字號、零寬與方向控制字元、BOM、
+# 變體選擇符、私用區、代理字元、U+FFF0 之後的特殊字元、表情符號與標籤字元。
+_JOB_TEXT_ILLEGAL_PATTERN = re.compile(
+    "["
+    "\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\u00ad"
+    "\u200b-\u200f\u202a-\u202e\u2060-\u206f\ufeff\ufe00-\ufe0f"
+    "\ue000-\uf8ff\ud800-\udfff\ufff0-\uffff"
+    "\U0001f000-\U0001faff\U000e0000-\U000e007f\U000f0000-\U0010ffff"
+    "]+"
+)
+_EXCESS_NEWLINES_PATTERN = re.compile("\n\n\n+")
 
 
 def remove_illegal_chars(text: Any) -> Any:
@@ -20,18 +70,24 @@ def remove_illegal_chars(text: Any) -> Any:
         Any: 清理後的字串，如果輸入不是字串則為原始輸入。
     """
     if isinstance(text, str):
-        # 僅允許 ASCII 可列印字元 (0x20-0x7E)、換行符 (0x0A)、回車符 (0x0D) 以及中文字符 (0x4E00-0x9FFF)
-        cleaned_text: str = "".join(
-            char
-            for char in text
-            if 0x20 <= ord(char) <= 0x7E
-            or ord(char) in [0x0A, 0x0D]
-            or (0x4E00 <= ord(char) <= 0x9FFF)
-        )
-        return cleaned_text
+        return text.translate(_LEGAL_CHARS_TABLE)
     return text
 
 
+def remove_illegal_chars_batch(texts: Iterable[Any]) -> List[Any]:
+    """
+    `remove_illegal_chars` 的批次版本，逐一套用預先建立的轉換表。
+
+    Args:
+        texts (Iterable[Any]): 要清理的文字 (非字串值原樣保留)。
+
+    Returns:
+        List[Any]: 清理後的結果，順序與輸入相同。
+    """
+    table = _LEGAL_CHARS_TABLE
+    return [text.translate(table) if isinstance(text, str) else text for text in texts]
+
+
 def clean_text(text: Any) -> str:
     """
     清理文字內容，移除斷行符號、表情符號及其他非文字字元，只保留文字。
@@ -45,15 +101,81 @@ def clean_text(text: Any) -> str:
 
     # 移除斷行符號，替換為空格
     text = text.replace('\n', ' ').replace('\r', ' ')
+    return _CLEAN_TEXT_PATTERN.sub('', text).strip()
+
+
+def clean_text_batch(texts: Iterable[Any]) -> List[str]:
+    """
+    `clean_text` 的批次版本，整批共用同一個預先編譯的正規表示式。
+
+    Args:
+        texts (Iterable[Any]): 要清理的輸入文字。
+
+    Returns:
+        List[str]: 清理後的文字，順序與輸入相同。
+    """
+    sub = _CLEAN_TEXT_PATTERN.sub
+    return [
+        sub('', (text if isinstance(text, str) else str(text)).replace('\n', ' ').replace('\r', ' ')).strip()
+        for text in texts
+    ]
+
+
+def clean_job_text(text: Any) -> Any:
+    """
+    清理職缺內文 (工作內容、條件說明等)。
 
-    # 移除表情符號及其他非文字字元，只保留字母、數字、常見標點符號和中文字符
-    # \w 匹配字母、數字、底線
-    # \s 匹配空白字元
-    # \u4e00-\u9fff 匹配中文字符
-    # 其他標點符號可以根據需要添加
-    cleaned_text = re.sub(r'[^\w\s.,!?;:()\'"-—\u4e00-\u9fff]+', '', text)
+    與 `remove_illegal_chars` 不同，這裡保留全形標點與各國文字，只移除會污染資料的字元
+    (控制字元、零寬字元、表情符號等)，並把 \\r 與 \\t 正規化、移除行尾空白、
+    將三個以上的連續換行壓成兩個。
 
-    return cleaned_text.strip()
+    Args:
+        text (Any): 要清理的文字；非字串值原樣返回。
+
+    Returns:
+        Any: 清理後的文字。
+    """
+    if not isinstance(text, str):
+        return text
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\t", " ")
+    text = _JOB_TEXT_ILLEGAL_PATTERN.sub("", text)
+    text = "\n".join(line.rstrip(" \u3000") for line in text.split("\n"))
+    return _EXCESS_NEWLINES_PATTERN.sub("\n\n", text).strip()
+
+
+def clean_job_text_batch(texts: Iterable[Any]) -> List[Any]:
+    """
+    `clean_job_text` 的批次版本，供 `clean_text_columns` 使用。
+
+    Args:
+        texts (Iterable[Any]): 要清理的文字；None 等非字串值原樣保留。
+
+    Returns:
+        List[Any]: 清理後的結果，順序與輸入相同。
+    """
+    return [clean_job_text(text) for text in texts]
+
+
+def clean_text_columns(
+    df: "pd.DataFrame",
+    columns: Iterable[str],
+    cleaner: Callable[[Iterable[Any]], List[Any]] = clean_job_text_batch,
+) -> "pd.DataFrame":
+    """
+    以批次清理函數處理 DataFrame 中的多個文字欄位 (就地修改並回傳同一個 DataFrame)。
+
+    Args:
+        df (pd.DataFrame): 要清理的資料。
+        columns (Iterable[str]): 要清理的欄位，不存在的欄位會被略過。
+        cleaner (Callable): 批次清理函數，預設為 `clean_job_text_batch`。
+
+    Returns:
+        pd.DataFrame: 清理後的 DataFrame。
+    """
+    for column in columns:
+        if column in df.columns:
+            df[column] = cleaner(df[column].tolist())
+    return df
 
 
 def flatten_jobcat_recursive(
@@ -88,4 +210,28 @@ def flatten_jobcat_recursive(
                 parent_no=node.get("no"),
             )
             flat_list.extend(children_list)
-    return flat_list
\ No newline at end of file
+    return flat_list
+
+
+# 不列入職缺內容雜湊的欄位：每次抓取都可能不同的時間戳記，以及衍生或由雜湊本身維護的欄位
+CONTENT_HASH_EXCLUDED_COLUMNS = frozenset({
+    "update_date", "now_timestamp", "last_processed_resume_at_time", "simhash", "canonical_job_id",
+    "version", "content_hash",
+})
+
+
+def job_content_hash(row: Dict[str, Any]) -> str:
+    """
+    計算職缺內容的雜湊 (忽略 CONTENT_HASH_EXCLUDED_COLUMNS)，用於判斷重新抓取的職缺是否真的有變動。
+
+    tb_jobs 的版本號 (repository.upsert_jobs) 與 tb_urls 的抓取紀錄 (詳情任務) 都使用此函數。
+
+    Args:
+        row (Dict[str, Any]): 清理後的職缺資料列。
+
+    Returns:
+        str: 內容的 MD5 十六進位字串。
+    """
+    content = {name: value for name, value in row.items() if name not in CONTENT_HASH_EXCLUDED_COLUMNS}
+    payload = json.dumps(content, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,138 @@
+# crawler/utilis/geo.py
+"""
+此模組包含地理座標相關的工具函數：Geohash 編碼、鄰近格網計算與球面距離。
+
+職缺座標在寫入時轉為 Geohash，半徑查詢先以 Geohash 前綴 (可走 B-Tree 索引)
+縮小候選範圍，再以 Haversine 公式精確過濾，避免全表掃描。
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+# 寫入資料庫的 Geohash 長度：8 碼約為 38m x 19m 的格網
+GEOHASH_PRECISION = 8
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    將經緯度編碼為 Geohash 字串。
+
+    Args:
+        latitude (float): 緯度 (-90 ~ 90)。
+        longitude (float): 經度 (-180 ~ 180)。
+        precision (int): Geohash 長度。
+
+    Returns:
+        str: Geohash 字串。
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars: List[str] = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash 從經度開始交錯編碼
+    while len(chars) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def cell_size_km(precision: int, latitude: float) -> Tuple[float, float]:
+    """
+    回傳指定長度的 Geohash 格網在某緯度上的 (高度, 寬度)，單位為公里。
+    """
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    height = 180.0 / (2 ** lat_bits) * KM_PER_DEGREE
+    width = 360.0 / (2 ** lon_bits) * KM_PER_DEGREE * math.cos(math.radians(latitude))
+    return height, width
+
+
+def covering_geohashes(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """
+    計算能完整覆蓋以 (latitude, longitude) 為圓心、radius_km 為半徑之圓的 Geohash 前綴。
+
+    選擇格網邊長不小於半徑的最長前綴，再取中心格與周圍 8 格，
+    因此圓內任何一點都必定落在回傳的某個前綴中。
+
+    Returns:
+        List[str]: 不重複的 Geohash 前綴；半徑過大 (超過最粗格網) 時回傳空列表，
+        代表無法以前綴縮小範圍。
+    """
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_km(candidate, latitude)
+        if min(height, width) >= radius_km:
+            precision = candidate
+            break
+    if precision == 0:
+        return []
+
+    height, width = cell_size_km(precision, latitude)
+    lat_step = height / KM_PER_DEGREE
+    lon_step = lat_step if width == 0 else width / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    prefixes = set()
+    for d_lat in (-lat_step, 0.0, lat_step):
+        for d_lon in (-lon_step, 0.0, lon_step):
+            lat = min(90.0, max(-90.0, latitude + d_lat))
+            lon = (longitude + d_lon + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(lat, lon, precision))
+    return sorted(prefixes)
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    回傳包住圓的經緯度矩形 (min_lat, max_lat, min_lon, max_lon)。
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """以 Haversine 公式計算兩點間的球面距離 (公里)。"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_coordinate(value: object, limit: float) -> Optional[float]:
+    """
+    將 API 回傳的座標字串轉為浮點數。
+
+    104 API 以字串回傳座標，缺值時可能是空字串或 "0"，這些都視為沒有座標。
+
+    Args:
+        value (object): 原始座標值。
+        limit (float): 合法的絕對值上限 (緯度 90、經度 180)。
+
+    Returns:
+        Optional[float]: 合法的座標，否則為 None。
+    """
+    try:
+        number = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number) or number == 0 or abs(number) > limit:
+        return None
+    return number
@@ -0,0 +1,64 @@
+# crawler/utilis/lru_cache.py
+"""
+此模組提供一個執行緒安全、固定容量的 LRU (Least Recently Used) 快取。
+
+用於在程序內記住最近寫入過資料庫的資料 (例如公司資料)，
+內容沒有變動時就不需要再次查詢或寫入資料庫。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    固定容量的 LRU 快取，超過容量時淘汰最久未使用的項目。
+
+    Args:
+        maxsize (int): 最多保存的項目數；0 代表停用 (get 一律未命中，put 不保存)。
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(maxsize, 0)
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """取得快取值並標記為最近使用；未命中時回傳 None。"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        """寫入快取值，必要時淘汰最久未使用的項目。"""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空快取與命中統計。"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
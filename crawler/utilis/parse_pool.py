@@ -0,0 +1,234 @@
+# crawler/utilis/parse_pool.py
+"""
+此模組把 CPU 密集的解析工作從抓取執行緒移到 process pool。
+
+抓取執行緒只負責網路 I/O 並回傳原始內容 (HTML / JSON bytes)；BeautifulSoup、JSON 解碼與 pydantic
+驗證改在子程序中進行，不再與 I/O 執行緒搶 GIL，worker 容器可以用滿所有 CPU 核心。
+
+- `get_process_pool`：本程序共用的解析 process pool (首次使用時建立，之後的任務重用)；
+  daemonic 程序 (例如 Celery prefork pool 的子程序) 不能建立子程序，此時回傳 None，改在抓取執行緒中解析。
+- `BatchedParser`：把原始內容累積成批次再交給 pool，pickle 與 IPC 的固定成本由整批分攤；
+  同時限制尚未完成的批次數，解析跟不上抓取時由呼叫端等待 (背壓)，記憶體用量不會無限增長。
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def available_cores() -> int:
+    """目前程序可使用的 CPU 核心數 (會考慮容器的 cpuset 限制)。"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - 非 Linux 平台
+        return os.cpu_count() or 1
+
+
+def resolve_process_count(setting: str) -> int:
+    """
+    解析 PARSE_PROCESSES 設定值。
+
+    Args:
+        setting (str): "auto" 代表可用的核心數；數字代表固定的程序數；"0" 或空字串代表停用。
+
+    Returns:
+        int: 解析程序數，0 代表在抓取執行緒中直接解析 (原本的行為)。
+    """
+    setting = (setting or "").strip().lower()
+    if not setting:
+        return 0
+    if setting == "auto":
+        return available_cores()
+    return max(int(setting), 0)
+
+
+def can_start_processes() -> bool:
+    """
+    目前程序是否可以建立子程序。
+
+    Celery prefork pool 的子程序是 daemonic 的 (billiard 也會把 multiprocessing 的目前程序設為它)，
+    在其中建立子程序會拋出 AssertionError。
+    """
+    return not multiprocessing.current_process().daemon
+
+
+def get_process_pool(processes: int) -> Optional[ProcessPoolExecutor]:
+    """
+    取得本程序共用的解析 process pool。
+
+    子程序以 spawn 建立：抓取執行緒池在此時可能已在運作，fork 一個多執行緒的程序可能複製到被鎖住的狀態。
+    子程序會在第一次執行解析函數時導入其所在模組，之後的批次與任務都重用同一組程序。
+
+    Args:
+        processes (int): 程序數；與現有 pool 不同時會重建。
+
+    Returns:
+        Optional[ProcessPoolExecutor]: 共用的 process pool；目前程序不能建立子程序時為 None。
+    """
+    global _pool, _pool_size
+    if not can_start_processes():
+        logger.warning(
+            f"目前程序 ({multiprocessing.current_process().name}) 是 daemonic 程序，不能建立解析子程序，"
+            "改在抓取執行緒中解析；請以 --pool threads 或 solo 執行 Celery worker。"
+        )
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            logger.info(f"建立解析 process pool ({processes} 個程序)。")
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = processes
+        return _pool
+
+
+def _discard_broken_pool(pool: Executor) -> None:
+    """子程序異常終止後 pool 無法再使用，丟棄它讓下一次呼叫重建。"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+@dataclass
+class ParsedItem(Generic[R]):
+    """
+    一筆解析結果。
+
+    Attributes:
+        tag (Any): 呼叫 submit 時附帶的識別資料 (例如 URL 或 Trace)。
+        result (Optional[R]): 解析結果；整個批次失敗時為 None。
+        error (Optional[BaseException]): 整個批次失敗 (例如子程序異常終止) 時的例外。
+        waited (float): 從 submit 到取得結果的秒數 (含等待湊滿批次、排隊與解析)。
+    """
+
+    tag: Any
+    result: Optional[R]
+    error: Optional[BaseException]
+    waited: float
+
+
+class BatchedParser(Generic[T, R]):
+    """
+    以批次把原始內容交給 executor 解析，依完成順序取回結果。
+
+    不是執行緒安全的：應由單一執行緒 (通常是收集抓取結果的主迴圈) 呼叫。
+
+    Args:
+        parse_batch (Callable[[List[T]], List[R]]): 模組層級的批次解析函數 (需可被 pickle)，
+            回傳與輸入等長、順序相同的結果。單筆的解析錯誤應在函數內處理並以結果表示。
+        executor (Optional[Executor]): 執行解析的 executor；None 時在呼叫 flush 的執行緒中直接解析。
+        batch_size (int): 每個批次的筆數。
+        max_pending_batches (int): 尚未完成的批次上限，超過時 submit 會等待最舊的批次完成。
+    """
+
+    def __init__(
+        self,
+        parse_batch: Callable[[List[T]], List[R]],
+        executor: Optional[Executor],
+        batch_size: int = 50,
+        max_pending_batches: int = 4,
+    ) -> None:
+        self.parse_batch = parse_batch
+        self.executor = executor
+        self.batch_size = max(batch_size, 1)
+        self.max_pending_batches = max(max_pending_batches, 1)
+        self._items: List[T] = []
+        self._tags: List[Tuple[Any, float]] = []
+        self._pending: Deque[Tuple[Future, List[Tuple[Any, float]]]] = deque()
+        self._ready: List[ParsedItem[R]] = []
+
+    def submit(self, item: T, tag: Any = None) -> None:
+        """加入一筆原始內容，湊滿 batch_size 時送出批次。"""
+        self._items.append(item)
+        self._tags.append((tag, time.perf_counter()))
+        if len(self._items) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """送出目前累積的內容 (不足一批也送出)。"""
+        if not self._items:
+            return
+        items, tags = self._items, self._tags
+        self._items, self._tags = [], []
+        if self.executor is None:
+            self._collect(tags, self._run_inline(items))
+            return
+        while len(self._pending) >= self.max_pending_batches:
+            future, pending_tags = self._pending.popleft()
+            self._collect(pending_tags, future)
+        try:
+            future = self.executor.submit(self.parse_batch, items)
+        except BrokenProcessPool as e:
+            _discard_broken_pool(self.executor)
+            future = Future()
+            future.set_exception(e)
+        except Exception as e:
+            # 無法啟動子程序 (例如在 daemonic 程序中)：之後的批次都改在目前的執行緒中解析
+            logger.warning(f"無法把解析批次交給 executor ({e!r})，改在目前的執行緒中解析。")
+            _discard_broken_pool(self.executor)
+            self.executor = None
+            while self._pending:
+                future, pending_tags = self._pending.popleft()
+                self._collect(pending_tags, future)
+            self._collect(tags, self._run_inline(items))
+            return
+        self._pending.append((future, tags))
+
+    def _run_inline(self, items: List[T]) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(self.parse_batch(items))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _collect(self, tags: List[Tuple[Any, float]], future: Future) -> None:
+        try:
+            results = future.result()
+            error = None
+        except Exception as e:
+            logger.error(f"解析批次失敗 ({len(tags)} 筆): {e!r}")
+            if isinstance(e, BrokenProcessPool) and self.executor is not None:
+                _discard_broken_pool(self.executor)
+            results, error = [None] * len(tags), e
+        now = time.perf_counter()
+        self._ready.extend(
+            ParsedItem(tag, result, error, now - submitted)
+            for (tag, submitted), result in zip(tags, results)
+        )
+
+    def results(self, wait: bool = False) -> Iterator[ParsedItem[R]]:
+        """
+        取出已完成的解析結果。
+
+        Args:
+            wait (bool): 為 True 時先送出剩餘內容，並等待所有批次完成。
+
+        Yields:
+            ParsedItem[R]: 解析結果，同一批次內維持 submit 的順序。
+        """
+        if wait:
+            self.flush()
+        while self._pending and (wait or self._pending[0][0].done()):
+            future, tags = self._pending.popleft()
+            self._collect(tags, future)
+        ready, self._ready = self._ready, []
+        yield from ready
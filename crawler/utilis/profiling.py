@@ -0,0 +1,176 @@
+# crawler/utilis/profiling.py
+"""
+此模組包含任務層級的效能剖析工具。
+
+- `SamplingProfiler`：以背景執行緒定期讀取 `sys._current_frames()` 的取樣式剖析器。
+  會涵蓋剖析期間新建立的執行緒 (例如 ThreadPoolExecutor 中的抓取工作)，
+  開銷只與取樣頻率有關，可以在正式環境的 worker 上開啟。
+- `profile_block`：依模式 (sample / cprofile) 剖析一段程式碼，把結果寫入檔案並回傳前 N 名熱點摘要。
+
+取樣結果以 folded stacks 格式 (`a;b;c 12`) 輸出，可直接交給 flamegraph.pl 或 speedscope 繪圖。
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+PROFILE_MODES = ("sample", "cprofile")
+# 堆疊超過此深度時只保留最內層的部分
+_MAX_STACK_DEPTH = 128
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    取樣式剖析器。
+
+    每隔 interval 秒記錄一次目標執行緒的呼叫堆疊。目標執行緒為呼叫 start() 的執行緒，
+    以及 start() 之後才建立的所有執行緒；既有的背景執行緒 (例如 worker 的心跳) 不列入。
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self._excluded: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        current = threading.get_ident()
+        self._excluded = {ident for ident in sys._current_frames() if ident != current}
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        self._excluded.add(self._thread.ident)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self._excluded:
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < _MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def top_functions(self, limit: int = 20) -> List[Tuple[str, int, int]]:
+        """
+        回傳取樣次數最多的函數。
+
+        Returns:
+            List[Tuple[str, int, int]]: (函數, self 取樣數, 累計取樣數)，依 self 取樣數排序。
+            self 表示該函數位於堆疊最內層 (正在執行或等待 I/O / sleep)；累計表示出現在堆疊中。
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(limit)]
+
+    def write_folded(self, path: str) -> None:
+        """以 folded stacks 格式寫出所有取樣。"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+@dataclass
+class ProfileReport:
+    """一次剖析的輸出檔案與摘要。"""
+
+    path: str
+    summary: str
+    extra: Dict[str, float] = field(default_factory=dict)
+
+
+def _format_samples(profiler: SamplingProfiler, limit: int) -> str:
+    total = sum(profiler.stacks.values()) or 1
+    lines = [f"{'self%':>7}{'total%':>8}  function"]
+    for label, own, cumulative in profiler.top_functions(limit):
+        lines.append(f"{own / total:>7.1%}{cumulative / total:>8.1%}  {label}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile_block(
+    name: str,
+    output_dir: str,
+    mode: str = "sample",
+    interval: float = 0.01,
+    top_n: int = 20,
+) -> Iterator[List[ProfileReport]]:
+    """
+    剖析 with 區塊內的程式碼，結束時寫出剖析檔並產生摘要。
+
+    Args:
+        name (str): 剖析檔名的前綴 (例如任務名稱與 ID)。
+        output_dir (str): 剖析檔的輸出目錄 (不存在時自動建立)。
+        mode (str): "sample" (取樣，輸出 .folded) 或 "cprofile" (確定性，輸出 .prof，只涵蓋目前執行緒)。
+        interval (float): 取樣間隔秒數 (僅 sample 模式)。
+        top_n (int): 摘要列出的函數數量。
+
+    Yields:
+        List[ProfileReport]: 區塊結束後會包含一筆 ProfileReport。
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"不支援的剖析模式: {mode}，可用的模式為 {PROFILE_MODES}")
+    os.makedirs(output_dir, exist_ok=True)
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    base_path = os.path.join(output_dir, f"{datetime.now():%Y%m%dT%H%M%S}_{safe_name}")
+    reports: List[ProfileReport] = []
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield reports
+        finally:
+            profiler.disable()
+            path = f"{base_path}.prof"
+            profiler.dump_stats(path)
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(top_n)
+            reports.append(ProfileReport(path, buffer.getvalue()))
+        return
+
+    sampler = SamplingProfiler(interval)
+    sampler.start()
+    try:
+        yield reports
+    finally:
+        sampler.stop()
+        path = f"{base_path}.folded"
+        sampler.write_folded(path)
+        reports.append(ProfileReport(
+            path,
+            _format_samples(sampler, top_n),
+            {"samples": sampler.sample_count, "elapsed": sampler.elapsed},
+        ))
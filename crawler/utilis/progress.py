@@ -0,0 +1,154 @@
+# crawler/utilis/progress.py
+"""
+此模組提供長時間執行任務的即時進度回報。
+
+ProgressReporter 記錄已完成、成功、失敗與進行中的數量，以最近一段時間的完成數估計吞吐量 (QPS)
+與剩餘時間 (ETA)，並每隔固定秒數把快照交給 publish 函數 (例如寫入 tb_crawl_progress)，
+讓操作人員不必翻日誌就能看到任務的進度與是否停滯。
+所有項目處理完後的收尾工作 (寫入紀錄、更新統計) 期間狀態為 FINALIZING，每個步驟開始前發布一次心跳。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_RUNNING = "RUNNING"
+PROGRESS_FINALIZING = "FINALIZING"
+PROGRESS_SUCCESS = "SUCCESS"
+PROGRESS_FAILURE = "FAILURE"
+
+
+class ProgressReporter:
+    """
+    執行緒安全的任務進度計數器，定期發布進度快照。
+
+    Args:
+        task_id (str): 任務 ID (Celery request id)。
+        task_name (str): 任務名稱。
+        total (int): 預計處理的項目數。
+        publish (Callable[[Dict[str, Any]], None]): 接收快照的函數；發布失敗只記錄警告，不影響任務。
+        interval (float): 兩次發布之間的最短秒數；0 代表每次更新都發布。
+        window_seconds (float): 計算 QPS 的時間窗口。
+        clock (Callable[[], float]): 單調時鐘，測試時可替換。
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        task_name: str,
+        total: int,
+        publish: Callable[[Dict[str, Any]], None],
+        interval: float = 5.0,
+        window_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.task_id = task_id
+        self.task_name = task_name
+        self.total = total
+        self.attempted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.state = PROGRESS_RUNNING
+        self.started_at = datetime.now()
+        self._publish = publish
+        self._interval = interval
+        self._window_seconds = window_seconds
+        self._clock = clock
+        self._started = clock()
+        self._completions: Deque[float] = deque()
+        self._last_published: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def submitted(self, count: int = 1) -> None:
+        """記錄已送出、尚未完成的項目。"""
+        with self._lock:
+            self.in_flight += count
+        self.maybe_publish()
+
+    def completed(self, succeeded: bool = True, failed: bool = False) -> None:
+        """
+        記錄一個完成的項目。
+
+        Args:
+            succeeded (bool): 是否成功取得資料。
+            failed (bool): 是否失敗；兩者皆為 False 代表完成但沒有資料 (例如職缺已下架)。
+        """
+        now = self._clock()
+        with self._lock:
+            self.attempted += 1
+            self.succeeded += succeeded
+            self.failed += failed
+            self.in_flight = max(self.in_flight - 1, 0)
+            self._completions.append(now)
+        self.maybe_publish()
+
+    def qps(self) -> float:
+        """最近 window_seconds 內的每秒完成數 (任務剛開始時以已執行的時間計算)。"""
+        now = self._clock()
+        with self._lock:
+            while self._completions and self._completions[0] < now - self._window_seconds:
+                self._completions.popleft()
+            count = len(self._completions)
+        elapsed = min(now - self._started, self._window_seconds)
+        return count / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """目前的進度快照 (欄位與 tb_crawl_progress 相同)。"""
+        qps = self.qps()
+        remaining = max(self.total - self.attempted, 0)
+        finished = self.state in (PROGRESS_SUCCESS, PROGRESS_FAILURE)
+        now = datetime.now()
+        return {
+            "task_id": self.task_id,
+            "task_name": self.task_name,
+            "state": self.state,
+            "total": self.total,
+            "attempted": self.attempted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "qps": round(qps, 3),
+            "eta_seconds": 0.0 if finished or self.state == PROGRESS_FINALIZING else (round(remaining / qps, 1) if qps > 0 else None),
+            "started_at": self.started_at,
+            "updated_at": now,
+            "finished_at": now if finished else None,
+        }
+
+    def maybe_publish(self, force: bool = False) -> None:
+        """距離上次發布超過 interval 秒 (或 force) 時發布快照。"""
+        now = self._clock()
+        with self._lock:
+            if not force and self._last_published is not None and now - self._last_published < self._interval:
+                return
+            self._last_published = now
+        try:
+            self._publish(self.snapshot())
+        except Exception as e:
+            logger.warning(f"發布任務 {self.task_id} 的進度失敗: {e}")
+
+    def finalizing(self) -> None:
+        """標記進入收尾階段並立即發布快照；每個耗時的收尾步驟開始前呼叫一次，作為心跳。"""
+        self.state = PROGRESS_FINALIZING
+        self.in_flight = 0
+        self.maybe_publish(force=True)
+
+    def finish(self, state: str = PROGRESS_SUCCESS) -> None:
+        """標記任務結束並立即發布最終快照。"""
+        self.state = state
+        self.in_flight = 0
+        self.maybe_publish(force=True)
+
+    def __enter__(self) -> "ProgressReporter":
+        self.maybe_publish(force=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # 正常結束時由呼叫端在收尾工作完成後呼叫 finish()
+        if exc_type is not None:
+            self.finish(PROGRESS_FAILURE)
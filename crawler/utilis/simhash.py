@@ -0,0 +1,169 @@
+# crawler/utilis/simhash.py
+"""
+此模組包含近似重複文字偵測相關的工具函數：SimHash 簽章與 LSH 分段索引。
+
+64 位元 SimHash 被切成 LSH_BANDS 段，兩個簽章的漢明距離若不超過 LSH_BANDS - 1，
+依鴿籠原理至少有一段完全相同；因此只需以「段序號 + 段值」做等值查詢
+(可走索引) 取得候選，再計算漢明距離確認，不需要兩兩比對所有文字。
+
+職缺內文通常只有數百字，小幅修改就可能讓簽章差到 4~6 個位元，
+因此切成 6 段 (10~11 位元) 並以距離 5 為門檻；段數越多候選越多，
+資料庫端會再以公司代碼縮小範圍。
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Generic, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+SIMHASH_BITS = 64
+LSH_BANDS = 6
+# 漢明距離在此值以內視為近似重複；必須小於 LSH_BANDS 才能保證不漏掉候選
+MAX_HAMMING_DISTANCE = 5
+# 少於此字數的文字 (例如「請洽面談」) 不計算簽章，避免把內容空泛的職缺誤判為重複
+MIN_SIMHASH_CHARS = 50
+SHINGLE_SIZE = 3
+
+_MASK_64 = (1 << SIMHASH_BITS) - 1
+# 計算簽章前移除空白與標點，只保留文字本身
+_NORMALIZE_PATTERN = re.compile(r"[\W_]+")
+
+K = TypeVar("K", bound=Hashable)
+
+
+def _band_layout(bits: int, bands: int) -> List[Tuple[int, int]]:
+    """把 bits 個位元盡量平均地切成 bands 段，回傳每段的 (位移量, 遮罩)。"""
+    layout = []
+    shift = 0
+    for band in range(bands):
+        width = bits // bands + (1 if band < bits % bands else 0)
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
+
+
+_BAND_LAYOUT = _band_layout(SIMHASH_BITS, LSH_BANDS)
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: Optional[str], shingle_size: int = SHINGLE_SIZE) -> Optional[int]:
+    """
+    計算文字的 64 位元 SimHash 簽章。
+
+    以字元 n-gram (中文不需斷詞) 作為特徵、出現次數作為權重。
+    回傳值已轉為有號 64 位元整數，可直接寫入 MySQL BIGINT 欄位。
+
+    Args:
+        text (Optional[str]): 要計算的文字。
+        shingle_size (int): n-gram 的長度。
+
+    Returns:
+        Optional[int]: 簽章；文字過短時為 None。
+    """
+    if not text:
+        return None
+    normalized = _NORMALIZE_PATTERN.sub("", text.lower())
+    if len(normalized) < MIN_SIMHASH_CHARS:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    shingles = Counter(normalized[i:i + shingle_size] for i in range(len(normalized) - shingle_size + 1))
+    for shingle, count in shingles.items():
+        value = _shingle_hash(shingle)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+
+    signature = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            signature |= 1 << bit
+    return to_signed64(signature)
+
+
+def to_signed64(value: int) -> int:
+    """將無號 64 位元整數轉為有號表示 (MySQL BIGINT 的範圍)。"""
+    value &= _MASK_64
+    return value - (1 << SIMHASH_BITS) if value >> (SIMHASH_BITS - 1) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """計算兩個 64 位元簽章的漢明距離 (有號或無號表示皆可)。"""
+    return bin((a ^ b) & _MASK_64).count("1")
+
+
+def lsh_bands(signature: int) -> List[int]:
+    """
+    將簽章切成 LSH_BANDS 段，回傳每段的值。
+
+    Args:
+        signature (int): SimHash 簽章 (有號或無號表示皆可)。
+
+    Returns:
+        List[int]: 第 i 個元素為第 i 段的值。
+    """
+    return [(signature >> shift) & mask for shift, mask in _BAND_LAYOUT]
+
+
+class SimHashIndex(Generic[K]):
+    """
+    記憶體內的 LSH 索引，用於在同一批資料或全表重建時尋找近似重複。
+
+    每筆簽章可指定 group (例如公司代碼)，查詢只會比對同一個 group 的簽章，
+    與資料庫中的 tb_job_simhash_bands (company_id, band, bucket, job_id) 對應。
+    """
+
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE) -> None:
+        if max_distance >= LSH_BANDS:
+            raise ValueError(f"max_distance 必須小於 LSH_BANDS ({LSH_BANDS})，否則會漏掉候選。")
+        self.max_distance = max_distance
+        self._entries: Dict[K, Tuple[Hashable, int]] = {}
+        self._buckets: Dict[Tuple[Hashable, int, int], Set[K]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: K, signature: int, group: Hashable = None) -> None:
+        """加入一筆簽章；同一個 key 重複加入時以新簽章取代。"""
+        self.remove(key)
+        self._entries[key] = (group, signature)
+        for band, bucket in enumerate(lsh_bands(signature)):
+            self._buckets.setdefault((group, band, bucket), set()).add(key)
+
+    def remove(self, key: K) -> None:
+        """移除一筆簽章 (不存在時忽略)。"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        group, signature = entry
+        for band, bucket in enumerate(lsh_bands(signature)):
+            members = self._buckets.get((group, band, bucket))
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[(group, band, bucket)]
+
+    def query(self, signature: int, group: Hashable = None) -> List[Tuple[int, K]]:
+        """
+        找出同一個 group 中與簽章漢明距離在 max_distance 以內的所有 key。
+
+        Returns:
+            List[Tuple[int, K]]: (漢明距離, key)，依距離由近到遠排序。
+        """
+        candidates: Set[K] = set()
+        for band, bucket in enumerate(lsh_bands(signature)):
+            candidates.update(self._buckets.get((group, band, bucket), ()))
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(signature, self._entries[key][1])
+            if distance <= self.max_distance:
+                matches.append((distance, key))
+        return sorted(matches, key=lambda item: item[0])
+
+
+def band_rows(signature: int, **columns: object) -> Iterable[Dict[str, object]]:
+    """產生寫入 LSH 分段表的資料列，columns 為每列都要帶上的其他欄位 (例如 job_id)。"""
+    for band, bucket in enumerate(lsh_bands(signature)):
+        yield {**columns, "band": band, "bucket": bucket}
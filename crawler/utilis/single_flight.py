@@ -0,0 +1,88 @@
+# crawler/utilis/single_flight.py
+"""
+此模組提供抓取層使用的 single-flight 合併與短期回應快取。
+
+同一次執行中，重複的關鍵字或指向同一職缺的不同 URL 會讓爬蟲多次請求相同的資源，
+有時甚至是同時發出。SingleFlightCache 以資源的 key 合併這些請求：
+- 快取中有未過期的回應時直接回傳 (hit)。
+- 相同 key 的請求正在進行時，等待它的結果而不再發出請求 (coalesced)。
+- 否則由目前的執行緒抓取 (miss)，成功的結果放入有容量上限的 LRU 快取，保留 ttl 秒。
+
+抓取失敗 (拋出例外) 時，等待中的執行緒都會收到同一個例外，且失敗結果不會被快取。
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from crawler.metrics import CACHE_LOOKUPS
+from crawler.utilis.lru_cache import LRUCache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlightCache(Generic[K, V]):
+    """
+    合併相同 key 的同時請求，並短期快取成功的結果 (執行緒安全)。
+
+    Args:
+        name (str): 快取名稱，作為 crawler_cache_lookups_total 的 cache 標籤。
+        maxsize (int): 快取的回應數上限；0 代表只合併同時進行的請求，不保留結果。
+        ttl (float): 回應保留的秒數。
+        clock (Callable[[], float]): 單調時鐘，測試時可替換。
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.ttl = ttl
+        # 實際呼叫抓取函數的次數 (每個 key 在快取期間內只有一次)
+        self.fetches = 0
+        self.hits = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._cache: LRUCache[K, Tuple[float, V]] = LRUCache(maxsize)
+        self._in_flight: Dict[K, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, key: K, fetch: Callable[[], V]) -> V:
+        """
+        取得 key 對應的回應，必要時呼叫 fetch 抓取。
+
+        Args:
+            key (K): 資源的識別值 (例如職缺 ID 或搜尋頁的 URL 與參數)。
+            fetch (Callable[[], V]): 抓取資源的函數。
+
+        Returns:
+            V: 快取中、同時進行中的請求或本次抓取的結果。
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > self._clock():
+                self.hits += 1
+                CACHE_LOOKUPS.labels(self.name, "hit").inc()
+                return cached[1]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.fetches += 1
+            else:
+                self.coalesced += 1
+        CACHE_LOOKUPS.labels(self.name, "miss" if leader else "coalesced").inc()
+        if not leader:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache.put(key, (self._clock() + self.ttl, value))
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
@@ -0,0 +1,258 @@
+# crawler/utilis/tracing.py
+"""
+此模組包含輕量的分段計時 (tracing) 工具，用來找出單一 URL 或單一批次的耗時分布。
+
+- `Trace`：一個工作單位 (例如一個職缺 URL) 的各段耗時，同名的段會累加 (例如重試多次的請求)。
+- `span` / `add_span`：對「目前執行緒」綁定的 Trace 計時；沒有綁定時不做任何事，
+  因此可以放在共用函數中而不影響其他呼叫端。
+- `TraceRecorder`：彙總一次執行中所有 Trace 的百分位數 (每一段只保留固定大小的抽樣，長時間執行的記憶體用量有上限)，
+  並可依抽樣率或慢速門檻把完整 Trace 寫成 JSONL。
+- `traced_session`：建立 requests.Session，新建 TCP/TLS 連線的時間會記入目前 Trace 的 "connect" 段。
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+PERCENTILES = (50, 90, 99)
+# 所有 Trace 都會有的總耗時段
+TOTAL_SPAN = "total"
+
+_local = threading.local()
+
+
+class Trace:
+    """單一工作單位的分段耗時 (秒) 與附加屬性。"""
+
+    __slots__ = ("key", "kind", "started_at", "spans", "attributes")
+
+    def __init__(self, key: str, kind: str) -> None:
+        self.key = key
+        self.kind = kind
+        self.started_at = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.attributes: Dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "kind": self.kind,
+            "spans": {name: round(seconds, 6) for name, seconds in self.spans.items()},
+            **self.attributes,
+        }
+
+
+@contextmanager
+def bind_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """在 with 區塊內把 trace 綁定為目前執行緒的 Trace。"""
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+def add_span(name: str, seconds: float) -> None:
+    """把耗時累加到目前執行緒的 Trace (沒有綁定時忽略)。"""
+    trace = current_trace()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """計算 with 區塊的耗時並累加到目前執行緒的 Trace (例外時同樣記錄)。"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """以 nearest-rank 法計算已排序數列的百分位數。"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class _Reservoir:
+    """
+    以 reservoir sampling 保留最多 size 筆數值的均勻抽樣，筆數與最大值則精確記錄。
+
+    超過 size 筆之後，第 n 筆以 size / n 的機率取代抽樣中的任一筆，百分位數由抽樣估計。
+    """
+
+    __slots__ = ("size", "count", "max", "samples")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.count = 0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def add(self, value: float, rng: random.Random) -> None:
+        self.count += 1
+        self.max = max(self.max, value)
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < self.size:
+                self.samples[slot] = value
+
+
+class TraceRecorder:
+    """
+    彙總一次執行 (例如一次 Celery 任務) 的所有 Trace，可在多個執行緒中同時使用。
+
+    Args:
+        export_path (Optional[str]): JSONL 輸出路徑；None 代表不輸出。
+        sample_rate (float): 輸出的抽樣比例 (0~1)。
+        slow_seconds (float): 總耗時超過此秒數的 Trace 一律輸出 (0 代表不啟用)，確保尾端延遲的案例不會被抽樣漏掉。
+        reservoir_size (int): 每一段保留來計算百分位數的耗時筆數上限；超過時改為均勻抽樣 (筆數與最大值仍為精確值)。
+    """
+
+    def __init__(
+        self,
+        export_path: Optional[str] = None,
+        sample_rate: float = 0.0,
+        slow_seconds: float = 0.0,
+        reservoir_size: int = 10000,
+    ) -> None:
+        self.export_path = export_path
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.reservoir_size = reservoir_size
+        self.exported = 0
+        self._durations: Dict[str, Dict[str, _Reservoir]] = {}
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self, key: str, kind: str = "url") -> Trace:
+        return Trace(key, kind)
+
+    def finish(self, trace: Trace) -> None:
+        """結束 Trace：計算總耗時、納入統計，並視條件輸出。"""
+        total = time.perf_counter() - trace.started_at
+        trace.spans[TOTAL_SPAN] = total
+        export = self.export_path is not None and (
+            (self.slow_seconds and total >= self.slow_seconds) or random.random() < self.sample_rate
+        )
+        with self._lock:
+            stages = self._durations.setdefault(trace.kind, {})
+            for name, seconds in trace.spans.items():
+                reservoir = stages.get(name)
+                if reservoir is None:
+                    reservoir = stages[name] = _Reservoir(self.reservoir_size)
+                reservoir.add(seconds, self._rng)
+            if export:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+                    self._file = open(self.export_path, "a", encoding="utf-8")
+                self._file.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + "\n")
+                self.exported += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        計算每種 Trace、每一段的筆數與百分位數。
+
+        筆數超過 reservoir_size 時，百分位數由抽樣估計；count 與 max 為精確值。
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, float]]]: {kind: {span: {"count", "p50", "p90", "p99", "max"}}}。
+        """
+        with self._lock:
+            snapshot = {
+                kind: {name: (r.count, r.max, sorted(r.samples)) for name, r in stages.items()}
+                for kind, stages in self._durations.items()
+            }
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for kind, stages in snapshot.items():
+            result[kind] = {}
+            for name, (count, maximum, values) in stages.items():
+                stats = {"count": count}
+                stats.update({f"p{pct}": percentile(values, pct) for pct in PERCENTILES})
+                stats["max"] = maximum
+                result[kind][name] = stats
+        return result
+
+    def format_summary(self) -> str:
+        """以表格文字輸出 summary()，單位為毫秒，適合寫入日誌。"""
+        columns = [f"p{pct}" for pct in PERCENTILES] + ["max"]
+        lines = []
+        for kind, stages in self.summary().items():
+            lines.append(f"[{kind}] {'span':<18}{'count':>8}" + "".join(f"{c + ' ms':>12}" for c in columns))
+            for name, stats in sorted(stages.items(), key=lambda item: item[0] == TOTAL_SPAN):
+                lines.append(
+                    f"{'':<{len(kind) + 3}}{name:<18}{stats['count']:>8}"
+                    + "".join(f"{stats[c] * 1000:>12.1f}" for c in columns)
+                )
+        return "\n".join(lines)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        with span("connect"):
+            super().connect()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        with span("connect"):
+            super().connect()
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def traced_session() -> requests.Session:
+    """建立會把新連線的建立時間 (TCP + TLS) 記入目前 Trace "connect" 段的 Session。"""
+    session = requests.Session()
+    adapter = _TimedHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
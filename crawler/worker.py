@@ -18,7 +18,11 @@ logger = logging.getLogger(__name__)
 
 # 2. 導入共享的 Celery App 實例
 # 這是關鍵步驟。所有 Worker 都從同一個 app 定義啟動。
-from .app import app
+from .app import app  # noqa: E402
+from .metrics import setup_worker_metrics  # noqa: E402
+
+# 註冊 Prometheus 指標的 signal handlers (任務耗時、狀態，以及指標 HTTP 伺服器)
+setup_worker_metrics()
 
 # 3. 在 Worker 啟動時，初始化資料庫連接並確保表格存在
 try: